@@ -6,10 +6,49 @@ Utility functions for cleaning up temporary files/folders created by ab-av1.
 import logging
 import os
 import shutil
+import threading
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Directories with a live ab-av1 process. Concurrent conversion jobs can share a
+# working directory, and ab-av1 names its temp folders randomly, so a sweep after
+# one run finishes must not delete the temp folder of another run still in progress.
+_active_runs: Counter[str] = Counter()
+_active_runs_lock = threading.Lock()
+
+
+def _run_key(base_dir: str) -> str:
+    return os.path.normcase(os.path.abspath(base_dir))
+
+
+@contextmanager
+def active_run(base_dir: str) -> Iterator[None]:
+    """Mark base_dir as holding a live ab-av1 process for the duration of the block.
+
+    clean_ab_av1_temp_folders() skips directories marked this way; the last run
+    to leave a directory sweeps it.
+    """
+    key = _run_key(base_dir)
+    with _active_runs_lock:
+        _active_runs[key] += 1
+    try:
+        yield
+    finally:
+        with _active_runs_lock:
+            _active_runs[key] -= 1
+            if _active_runs[key] <= 0:
+                del _active_runs[key]
+
+
+def is_run_active(base_dir: str) -> bool:
+    """Whether an active_run() block currently holds base_dir."""
+    with _active_runs_lock:
+        return _active_runs[_run_key(base_dir)] > 0
+
 
 def clean_ab_av1_temp_folders(base_dir: str | None = None) -> int:
     """Clean up temporary folders created by ab-av1 (typically named '.ab-av1-*').
@@ -29,6 +68,10 @@ def clean_ab_av1_temp_folders(base_dir: str | None = None) -> int:
     else:
         logger.debug(f"Cleaning temp folders in: {base_dir}")
 
+    if is_run_active(base_dir):
+        logger.debug(f"Skipping temp folder cleanup in {base_dir}: another ab-av1 run is still active there")
+        return 0
+
     # Find temp folders matching the pattern '.ab-av1-*'
     try:
         base_path = Path(base_dir)
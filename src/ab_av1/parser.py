@@ -11,7 +11,7 @@ from collections.abc import Callable
 from typing import Any
 
 from src.config import SIZE_REDUCTION_CHANGE_THRESHOLD, VMAF_CHANGE_THRESHOLD
-from src.models import ProgressEvent
+from src.models import CrfVmafPoint, ProgressEvent
 from src.privacy import anonymize_filename
 from src.utils import format_crf
 
@@ -163,6 +163,16 @@ class AbAv1Parser:
                         vmaf_val = float(crf_vmaf_match.group(2))
                         stats.crf = crf_val
                         stats.vmaf = vmaf_val
+                        if crf_val not in stats.sample_crfs:
+                            stats.sample_crfs.append(crf_val)
+                            stats.sample_encodes += 1
+                        # Per-sample lines come first; the CRF's summary line (with its size) wins
+                        point_size = self._re_size_reduction_percent.search(line)
+                        previous = stats.crf_curve.get(crf_val)
+                        size_percent = previous.size_percent if previous else None
+                        if point_size:
+                            size_percent = float(point_size.group(1))
+                        stats.crf_curve[crf_val] = CrfVmafPoint(crf=crf_val, vmaf=vmaf_val, size_percent=size_percent)
                         logger.info(f"CRF search update: CRF={format_crf(stats.crf)}, VMAF={stats.vmaf:.2f}")
                         new_quality_progress = min(90.0, stats.progress_quality + 10.0)
                     except (ValueError, IndexError) as e:
@@ -3,10 +3,15 @@
 Result and live-state containers for ab-av1 runs.
 
 EncodeStats is the mutable parse state threaded through AbAv1Parser during a
-run; CrfSearchResult is the immutable outcome of a crf-search.
+run; CrfSearchResult is the immutable outcome of a crf-search; InputProbe
+carries an input's ffprobe result from the worker into every run of the file.
 """
 
-from dataclasses import dataclass
+import os
+from dataclasses import dataclass, field
+from typing import Any
+
+from src.models import CrfVmafPoint
 
 
 @dataclass
@@ -31,13 +36,17 @@ class EncodeStats:
     used_cached_crf: bool = False
     crf_search_time_sec: float = 0.0
     encoding_time_sec: float = 0.0
+    sample_crfs: list[float] = field(default_factory=list)  # CRFs probed by the current attempt
+    sample_encodes: int = 0  # CRFs probed across all attempts (each encodes ab-av1's samples)
+    crf_curve: dict[float, CrfVmafPoint] = field(default_factory=dict)  # Latest point per probed CRF, all attempts
 
     def reset_for_attempt(self, vmaf_target: int) -> None:
         """Reset per-attempt parse state before a VMAF fallback retry.
 
         size_reduction is deliberately NOT reset: the prediction from an
         earlier attempt remains the best available estimate until the next
-        attempt parses a new one.
+        attempt parses a new one. Neither are sample_encodes and crf_curve, which
+        cover the whole run's CRF probes (every attempt samples the same curve).
         """
         self.phase = "crf-search"
         self.progress_quality = 0.0
@@ -46,6 +55,7 @@ class EncodeStats:
         self.crf = None
         self.eta_text = None
         self.last_ffmpeg_fps = None
+        self.sample_crfs = []
         self.vmaf_target_used = vmaf_target
 
 
@@ -62,3 +72,44 @@ class CrfSearchResult:
     used_fallback: bool
     preset_used: int
     crf_search_time_sec: float
+    sample_encodes: int = 0  # CRFs probed, including VMAF fallback and bound-widening retries
+    crf_curve: list[CrfVmafPoint] = field(default_factory=list)  # Every probed CRF, by CRF
+
+
+def _same_path(a: str, b: str) -> bool:
+    return os.path.normcase(os.path.realpath(a)) == os.path.normcase(os.path.realpath(b))
+
+
+@dataclass(frozen=True)
+class InputProbe:
+    """ffprobe result of an input file, reused by later runs while the file is unchanged.
+
+    The worker probes each file once; its search and encode stages hand the
+    probe to AbAv1Wrapper (and process_video) instead of running ffprobe again.
+    """
+
+    input_path: str
+    video_info: dict[str, Any]
+    file_size: int
+    file_mtime: float
+
+    @classmethod
+    def of(cls, input_path: str, video_info: dict[str, Any]) -> "InputProbe | None":
+        """Wrap a fresh probe with the file's current size and mtime (None if the file is gone)."""
+        try:
+            stat = os.stat(input_path)
+        except OSError:
+            return None
+        return cls(input_path=input_path, video_info=video_info, file_size=stat.st_size, file_mtime=stat.st_mtime)
+
+    def is_current(self, input_path: str) -> bool:
+        """Whether this probe is of input_path and the file has not changed since."""
+        try:
+            stat = os.stat(input_path)
+        except OSError:
+            return False
+        return (
+            _same_path(self.input_path, input_path)
+            and stat.st_size == self.file_size
+            and stat.st_mtime == self.file_mtime
+        )
@@ -2,38 +2,50 @@
 """
 Wrapper class for the ab-av1 tool in the AV1 Video Converter application.
 
-Provides the high-level operations (auto-encode, crf-search, encode) on top of
-runner.run_ab_av1, sharing input validation, environment setup, the VMAF
-fallback loop, and failure detection across all three.
+Provides the high-level operations (auto-encode, crf-search, encode, and a
+sample-encode check of a predicted CRF) on top of runner.run_ab_av1, sharing
+input validation, environment setup, the VMAF fallback loop, and failure
+detection across them.
 
 Failure detection relies on ab-av1's contract: it exits 0/1 only, and prints
 "Error: {err}" to stderr as its final line on failure (merged into stdout here).
+
+crf-search and auto-encode accept CRF bounds (a history prior, see
+src/crf_prior.py). A bound the result runs into is widened back to ab-av1's
+default and the run retried: --min-crf when no CRF meets the target (before
+the VMAF fallback lowers it), --max-crf when the best CRF lands on it.
 """
 
+import contextlib
 import logging
+import math
 import os
+import threading
 import time
 from collections.abc import Callable
 from typing import Any, NoReturn
 
 from src.config import (
+    AB_AV1_MAX_ENCODED_PERCENT,
     AB_AV1_NO_SUITABLE_CRF_MESSAGE,
+    CRF_PRIOR_BOUND_TOLERANCE,
     DEFAULT_ENCODING_PRESET,
     DEFAULT_VMAF_TARGET,
     MIN_VMAF_FALLBACK_TARGET,
     VMAF_FALLBACK_STEP,
 )
+from src.models import CrfVmafPoint
 from src.privacy import anonymize_filename
-from src.utils import format_crf, format_file_size, get_video_info
+from src.utils import format_crf, format_file_size, format_time, get_video_info
 from src.vendor_manager import AB_AV1_EXE, AB_AV1_EXE_NAME, FFMPEG_DIR, get_ab_av1_path
 from src.video_metadata import extract_video_metadata
 
 from .checker import get_log_interval_for_duration
-from .cleaner import clean_ab_av1_temp_folders
+from .cleaner import active_run, clean_ab_av1_temp_folders
 from .exceptions import AbAv1CancelledError, AbAv1Error, ConversionNotWorthwhileError, InputFileError, OutputFileError
 from .parser import AbAv1Parser
 from .runner import ProcessResult, run_ab_av1
-from .stats import CrfSearchResult, EncodeStats
+from .stats import CrfSearchResult, EncodeStats, InputProbe
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +61,93 @@ def _is_no_suitable_crf(result: ProcessResult) -> bool:
     return AB_AV1_NO_SUITABLE_CRF_MESSAGE.lower() in haystack.lower()
 
 
+def _fallback_target(curve: list[CrfVmafPoint], failed_target: int) -> int | None:
+    """Next VMAF target after "no suitable crf" at failed_target, predicted from the probed curve.
+
+    Instead of stepping down by VMAF_FALLBACK_STEP per attempt, jump to the
+    highest VMAF a probed CRF reached within AB_AV1_MAX_ENCODED_PERCENT (at
+    least one step down, never below MIN_VMAF_FALLBACK_TARGET). Without usable
+    points this is the plain one-step ladder.
+
+    Returns:
+        The next target, or None when the ladder is exhausted or even the
+        highest VMAF probed is below MIN_VMAF_FALLBACK_TARGET (not worthwhile).
+    """
+    next_target = failed_target - VMAF_FALLBACK_STEP
+    if next_target < MIN_VMAF_FALLBACK_TARGET:
+        return None
+    if not curve:
+        return next_target
+    if max(point.vmaf for point in curve) < MIN_VMAF_FALLBACK_TARGET:
+        return None  # Lower CRFs were probed without reaching the minimum; nothing will
+    reachable = [
+        point.vmaf for point in curve if point.size_percent is None or point.size_percent <= AB_AV1_MAX_ENCODED_PERCENT
+    ]
+    if reachable:
+        next_target = min(next_target, max(MIN_VMAF_FALLBACK_TARGET, math.floor(max(reachable))))
+    return next_target
+
+
+def _predicted_output_size(original_size: int | None, size_reduction: float | None, video_info: dict) -> int | None:
+    """Predict the output size from ab-av1's video stream reduction (audio is copied unchanged)."""
+    if not original_size or not size_reduction:
+        return None
+    # ab-av1's size_reduction is video-only; audio is copied unchanged
+    meta = extract_video_metadata(video_info)
+    audio_size_bytes = 0
+    if meta.duration_sec and meta.total_audio_bitrate_kbps:
+        audio_size_bytes = int(meta.duration_sec * meta.total_audio_bitrate_kbps * 1000 / 8)
+
+    # Apply reduction only to video portion
+    video_size = max(0, original_size - audio_size_bytes)
+    return int(video_size * (1 - size_reduction / 100)) + audio_size_bytes
+
+
+class _CrfBounds:
+    """--min-crf/--max-crf of a bounded search; a side widened back to ab-av1's default is None."""
+
+    def __init__(self, bounds: tuple[float, float] | None):
+        self.min_crf, self.max_crf = bounds if bounds is not None else (None, None)
+
+    def args(self) -> list[str]:
+        args = []
+        if self.min_crf is not None:
+            args.extend(["--min-crf", format_crf(self.min_crf)])
+        if self.max_crf is not None:
+            args.extend(["--max-crf", format_crf(self.max_crf)])
+        return args
+
+    def widen_min(self) -> bool:
+        """Drop --min-crf (no CRF above it met the target); False if already unbounded."""
+        if self.min_crf is None:
+            return False
+        logger.info(f"No suitable CRF above --min-crf {format_crf(self.min_crf)}; widening the search")
+        self.min_crf = None
+        return True
+
+    def widen_max_if_hit(self, crf: float | None) -> bool:
+        """Drop --max-crf if crf landed on it (a higher CRF may still meet the target)."""
+        if self.max_crf is None or crf is None or crf < self.max_crf - CRF_PRIOR_BOUND_TOLERANCE:
+            return False
+        logger.info(f"Best CRF {format_crf(crf)} hit --max-crf {format_crf(self.max_crf)}; widening the search")
+        self.max_crf = None
+        return True
+
+
+class _RunCancel:
+    """cancel_event for ab-av1 runs: the caller's event, or this wrapper aborting a run itself."""
+
+    def __init__(self, cancel_event: Any | None):
+        self.cancel_event = cancel_event
+        self.aborted = threading.Event()
+
+    def is_set(self) -> bool:
+        return self.aborted.is_set() or self.user_cancelled()
+
+    def user_cancelled(self) -> bool:
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+
 def _format_cmd_for_log(cmd: list[str], replacements: dict[str, str]) -> str:
     """Build the anonymized log form of a command by mapping known tokens.
 
@@ -89,9 +188,12 @@ class AbAv1Wrapper:
             info.update(extra)
             self.file_info_callback(os.path.basename(input_path), "failed", info)
 
-    def _validate_input(self, input_path: str) -> tuple[dict, int | None]:
+    def _validate_input(self, input_path: str, probe: InputProbe | None = None) -> tuple[dict, int | None]:
         """Check the input exists and is a video; return (video_info, size or None).
 
+        A probe of the unchanged file (see InputProbe) is validated instead of
+        running ffprobe again.
+
         Raises:
             InputFileError: If the input is missing, unreadable, or has no video stream.
         """
@@ -102,8 +204,13 @@ class AbAv1Wrapper:
             self._fail(input_path, error_msg, "missing_input")
             raise InputFileError(error_msg, error_type="missing_input")
 
+        reuse_probe = probe is not None and probe.is_current(input_path)
         try:
-            video_info = get_video_info(input_path)
+            if reuse_probe:
+                logger.debug(f"Reusing probe of {anonymized}")
+                video_info = probe.video_info
+            else:
+                video_info = get_video_info(input_path)
             if not video_info or "streams" not in video_info:
                 raise InputFileError("Invalid video file", error_type="invalid_video")
             if not extract_video_metadata(video_info).has_video:
@@ -118,6 +225,8 @@ class AbAv1Wrapper:
             self._fail(input_path, error_msg, "analysis_failed")
             raise InputFileError(error_msg, error_type="analysis_failed") from e
 
+        if reuse_probe:
+            return video_info, probe.file_size
         try:
             original_size = os.path.getsize(input_path)
             logger.info(f"Original file size: {original_size} bytes ({format_file_size(original_size)})")
@@ -170,18 +279,23 @@ class AbAv1Wrapper:
         on_line: Callable[[str], None] | None,
         cancel_event: Any | None,
         pid_callback: Callable[..., Any] | None,
+        sample_cache_dir: str | None = None,
     ) -> ProcessResult:
         """Run one ab-av1 process, reporting spawn failures via callback.
 
+        cwd, and sample_cache_dir if given, are marked active for the run so
+        no sweep deletes them underneath it.
+
         Raises:
             FileNotFoundError: If the executable is missing.
             AbAv1Error: If the process cannot be spawned for any other OS reason
                 (e.g. corrupt or non-executable binary).
         """
         try:
-            return run_ab_av1(
-                cmd, cwd=cwd, env=env, on_line=on_line, cancel_event=cancel_event, pid_callback=pid_callback
-            )
+            with active_run(cwd), active_run(sample_cache_dir) if sample_cache_dir else contextlib.nullcontext():
+                return run_ab_av1(
+                    cmd, cwd=cwd, env=env, on_line=on_line, cancel_event=cancel_event, pid_callback=pid_callback
+                )
         except FileNotFoundError:
             error_msg = f"Executable not found: {self.executable_path}"
             logger.exception(error_msg)
@@ -245,8 +359,11 @@ class AbAv1Wrapper:
         pid_callback: Callable[..., Any] | None,
         original_size: int | None,
         verbose_ffmpeg: bool,
+        on_no_suitable_crf: Callable[[], bool] | None = None,
+        crf_curve: dict[float, CrfVmafPoint] | None = None,
+        sample_cache_dir: str | None = None,
     ) -> tuple[ProcessResult, int, str]:
-        """Run ab-av1, decrementing the VMAF target on "no suitable crf" failures.
+        """Run ab-av1, lowering the VMAF target on "no suitable crf" failures.
 
         Args:
             make_cmd: Builds (real command, anonymized command string) for a target.
@@ -254,6 +371,12 @@ class AbAv1Wrapper:
                 (and are cleaned) there.
             on_attempt_start: Called with (target, anonymized command) before each attempt.
             verbose_ffmpeg: See _process_env.
+            on_no_suitable_crf: Called before the target is lowered; True retries
+                the same target (a bounded search widening its --min-crf first).
+            crf_curve: Points parsed from the run's output so far (EncodeStats.crf_curve);
+                the next target is predicted from them (see _fallback_target).
+            sample_cache_dir: The file's sample cache directory (src/sample_cache.py),
+                kept across attempts so probes already encoded are not encoded again.
 
         Returns:
             (successful ProcessResult, VMAF target used, anonymized command string).
@@ -264,6 +387,10 @@ class AbAv1Wrapper:
             AbAv1Error: Silence timeout or any other non-recoverable failure.
         """
         env = self._process_env(verbose_ffmpeg)
+        if sample_cache_dir:
+            os.makedirs(sample_cache_dir, exist_ok=True)
+            # ab-av1 keeps its sample-encode cache under the user cache dir (XDG_CACHE_HOME on Linux)
+            env["XDG_CACHE_HOME"] = sample_cache_dir
         anonymized_input = anonymize_filename(input_path)
         target = initial_target
 
@@ -279,6 +406,7 @@ class AbAv1Wrapper:
             logger.info(f"[Attempt VMAF {target}] Running: {cmd_str_log}")
             on_attempt_start(target, cmd_str_log)
 
+            attempt_start = time.monotonic()
             result = self._run_once(
                 cmd,
                 input_path=input_path,
@@ -287,6 +415,7 @@ class AbAv1Wrapper:
                 on_line=on_line,
                 cancel_event=cancel_event,
                 pid_callback=pid_callback,
+                sample_cache_dir=sample_cache_dir,
             )
 
             if result.cancelled or result.silence_timeout:
@@ -304,13 +433,25 @@ class AbAv1Wrapper:
 
             if _is_no_suitable_crf(result):
                 clean_ab_av1_temp_folders(cwd)
-                next_target = target - VMAF_FALLBACK_STEP
-                if next_target >= MIN_VMAF_FALLBACK_TARGET:
+                if on_no_suitable_crf is not None and on_no_suitable_crf():
+                    continue
+                next_target = _fallback_target(list(crf_curve.values()) if crf_curve else [], target)
+                # Attempts the one-step ladder would have run before next_target (or giving up)
+                ladder_end = MIN_VMAF_FALLBACK_TARGET - VMAF_FALLBACK_STEP if next_target is None else next_target
+                skipped = (target - ladder_end) // VMAF_FALLBACK_STEP - 1
+                if skipped > 0:
+                    saved = format_time(skipped * (time.monotonic() - attempt_start))
+                    logger.info(
+                        f"Curve of {anonymized_input} skips {skipped} VMAF fallback attempt(s), saving ~{saved}"
+                    )
+                if next_target is not None:
                     logger.info(f"No suitable CRF at VMAF {target}; retrying {anonymized_input} at {next_target}")
                     target = next_target
                     continue
                 error_msg = (
                     f"No efficient conversion possible - CRF search failed even at VMAF {MIN_VMAF_FALLBACK_TARGET}"
+                    if target == MIN_VMAF_FALLBACK_TARGET
+                    else f"No efficient conversion possible - no CRF probed reached VMAF {MIN_VMAF_FALLBACK_TARGET}"
                 )
                 logger.info(f"File not worth converting: {anonymized_input}")
                 if self.file_info_callback:
@@ -347,6 +488,9 @@ class AbAv1Wrapper:
         total_duration_seconds: float = 0.0,
         hw_decoder: str | None = None,
         cancel_event: Any | None = None,
+        crf_bounds: tuple[float, float] | None = None,
+        sample_cache_dir: str | None = None,
+        probe: InputProbe | None = None,
     ) -> EncodeStats:
         """Run ab-av1 auto-encode (CRF search + encode) with VMAF fallback.
 
@@ -359,6 +503,12 @@ class AbAv1Wrapper:
             hw_decoder: Optional hardware decoder name (e.g., "h264_cuvid", "hevc_qsv").
             cancel_event: Optional threading.Event; when set, the run is aborted
                 mid-process and AbAv1CancelledError is raised.
+            crf_bounds: Optional (--min-crf, --max-crf) for the search phase. A
+                search ending on --max-crf is stopped before it encodes and rerun
+                without it.
+            sample_cache_dir: Optional directory for the search's samples and
+                sample-encode cache (--temp-dir), kept across VMAF fallback attempts.
+            probe: Optional earlier probe of the input, used instead of ffprobe if still current.
 
         Returns:
             EncodeStats with final statistics and timing breakdown.
@@ -371,11 +521,13 @@ class AbAv1Wrapper:
         self.parser.file_info_callback = file_info_callback
         preset = DEFAULT_ENCODING_PRESET
         initial_target = DEFAULT_VMAF_TARGET
+        bounds = _CrfBounds(crf_bounds)
+        run_cancel = _RunCancel(cancel_event)
 
         process_start_time = time.time()
         anonymized_input_path = anonymize_filename(input_path)
 
-        _video_info, original_size = self._validate_input(input_path)
+        _video_info, original_size = self._validate_input(input_path, probe)
         output_path, output_dir = self._prepare_output(input_path, output_path)
         anonymized_output_path = anonymize_filename(output_path)
 
@@ -409,7 +561,10 @@ class AbAv1Wrapper:
                 str(preset),
                 "--min-vmaf",
                 str(target),
+                *bounds.args(),
             ]
+            if sample_cache_dir:
+                cmd.extend(["--temp-dir", sample_cache_dir])
             if hw_decoder:
                 cmd.extend(["--enc-input", f"c:v={hw_decoder}"])
             if log_interval:
@@ -441,19 +596,37 @@ class AbAv1Wrapper:
             self.parser.parse_line(line, stats)
             if encoding_phase_start[0] is None and stats.phase == "encoding":
                 encoding_phase_start[0] = time.time()
+                if bounds.widen_max_if_hit(stats.crf):
+                    run_cancel.aborted.set()  # Don't encode at the bound; search again without it
 
-        result, target_used, cmd_str_log = self._run_with_vmaf_fallback(
-            input_path=input_path,
-            initial_target=initial_target,
-            make_cmd=make_cmd,
-            cwd=output_dir,
-            on_attempt_start=on_attempt_start,
-            on_line=on_line,
-            cancel_event=cancel_event,
-            pid_callback=pid_callback,
-            original_size=original_size,
-            verbose_ffmpeg=True,
-        )
+        attempt_target = initial_target
+        while True:
+            try:
+                result, target_used, cmd_str_log = self._run_with_vmaf_fallback(
+                    input_path=input_path,
+                    initial_target=attempt_target,
+                    make_cmd=make_cmd,
+                    cwd=output_dir,
+                    on_attempt_start=on_attempt_start,
+                    on_line=on_line,
+                    cancel_event=run_cancel,
+                    pid_callback=pid_callback,
+                    original_size=original_size,
+                    verbose_ffmpeg=True,
+                    on_no_suitable_crf=bounds.widen_min,
+                    crf_curve=stats.crf_curve,
+                    sample_cache_dir=sample_cache_dir,
+                )
+                break
+            except AbAv1CancelledError:
+                if not run_cancel.aborted.is_set() or run_cancel.user_cancelled():
+                    raise
+            # Stopped at the start of its encode: drop the barely started output and retry
+            with contextlib.suppress(OSError):
+                os.remove(output_path)
+            run_cancel.aborted.clear()
+            encoding_phase_start[0] = None
+            attempt_target = stats.vmaf_target_used or initial_target
 
         # --- Success Path ---
         self._verify_output_exists(output_path, input_path=input_path, cmd_str_log=cmd_str_log)
@@ -521,6 +694,11 @@ class AbAv1Wrapper:
         stop_event: Any | None = None,
         hw_decoder: str | None = None,
         pid_callback: Callable[..., Any] | None = None,
+        crf_bounds: tuple[float, float] | None = None,
+        samples: int | None = None,
+        sample_duration_sec: float | None = None,
+        sample_cache_dir: str | None = None,
+        probe: InputProbe | None = None,
     ) -> CrfSearchResult:
         """Run ab-av1 crf-search with VMAF fallback (no full encoding).
 
@@ -536,6 +714,13 @@ class AbAv1Wrapper:
             stop_event: Optional threading.Event to signal cancellation (aborts mid-run).
             hw_decoder: Optional hardware decoder name (e.g., "h264_cuvid", "hevc_qsv").
             pid_callback: Optional callback to receive the process ID (for force-stop).
+            crf_bounds: Optional (--min-crf, --max-crf) to search within; a bound
+                the result runs into is widened and the search rerun.
+            samples: Optional --samples (sample encodes per CRF); None keeps ab-av1's default.
+            sample_duration_sec: Optional --sample-duration; None keeps ab-av1's default.
+            sample_cache_dir: Optional directory for the samples and sample-encode
+                cache (--temp-dir), kept across VMAF fallback attempts and searches.
+            probe: Optional earlier probe of the input, used instead of ffprobe if still current.
 
         Returns:
             CrfSearchResult with the optimal CRF, achieved VMAF, and predictions.
@@ -557,9 +742,10 @@ class AbAv1Wrapper:
 
         crf_search_start_time = time.time()
         initial_target = vmaf_target
+        bounds = _CrfBounds(crf_bounds)
         anonymized_input_path = anonymize_filename(input_path)
 
-        video_info, original_size = self._validate_input(input_path)
+        video_info, original_size = self._validate_input(input_path, probe)
 
         # Use input file's directory as cwd so temp folders are created (and cleaned) there
         input_dir = os.path.dirname(input_path) or os.getcwd()
@@ -581,7 +767,14 @@ class AbAv1Wrapper:
                 str(preset),
                 "--min-vmaf",
                 str(target),
+                *bounds.args(),
             ]
+            if samples is not None:
+                cmd.extend(["--samples", str(samples)])
+            if sample_duration_sec is not None:
+                cmd.extend(["--sample-duration", f"{sample_duration_sec:g}s"])
+            if sample_cache_dir:
+                cmd.extend(["--temp-dir", sample_cache_dir])
             if hw_decoder:
                 cmd.extend(["--enc-input", f"c:v={hw_decoder}"])
             return cmd, _format_cmd_for_log(cmd, log_replacements)
@@ -608,52 +801,48 @@ class AbAv1Wrapper:
             message = f"CRF:{format_crf(stats.crf)}, VMAF:{vmaf_text}{suffix}"
             progress_callback(stats.progress_quality, message)
 
-        result, target_used, cmd_str_log = self._run_with_vmaf_fallback(
-            input_path=input_path,
-            initial_target=initial_target,
-            make_cmd=make_cmd,
-            cwd=input_dir,
-            on_attempt_start=on_attempt_start,
-            on_line=on_line,
-            cancel_event=stop_event,
-            pid_callback=pid_callback,
-            original_size=original_size,
-            verbose_ffmpeg=False,
-        )
+        target_used = initial_target
+        while True:
+            result, target_used, cmd_str_log = self._run_with_vmaf_fallback(
+                input_path=input_path,
+                initial_target=target_used,
+                make_cmd=make_cmd,
+                cwd=input_dir,
+                on_attempt_start=on_attempt_start,
+                on_line=on_line,
+                cancel_event=stop_event,
+                pid_callback=pid_callback,
+                original_size=original_size,
+                verbose_ffmpeg=False,
+                on_no_suitable_crf=bounds.widen_min,
+                crf_curve=stats.crf_curve,
+                sample_cache_dir=sample_cache_dir,
+            )
 
-        # --- Parse Final Results ---
-        self.parser.parse_final_output(result.output, stats)
+            # --- Parse Final Results ---
+            self.parser.parse_final_output(result.output, stats)
 
-        if stats.crf is None or stats.vmaf is None:
-            error_msg = "CRF search completed but could not parse results"
-            logger.error(error_msg)
-            logger.error(f"Output:\n{result.output[-1000:]}")
-            raise AbAv1Error(error_msg, command=cmd_str_log, output=result.output, error_type="parse_error")
-
-        # Calculate predicted output size (accounting for audio which is copied unchanged)
-        predicted_output_size = None
-        if original_size and stats.size_reduction:
-            # ab-av1's size_reduction is video-only; audio is copied unchanged
-            meta = extract_video_metadata(video_info)
-            audio_size_bytes = 0
-            if meta.duration_sec and meta.total_audio_bitrate_kbps:
-                audio_size_bytes = int(meta.duration_sec * meta.total_audio_bitrate_kbps * 1000 / 8)
-
-            # Apply reduction only to video portion
-            video_size = max(0, original_size - audio_size_bytes)
-            predicted_video = int(video_size * (1 - stats.size_reduction / 100))
-            predicted_output_size = predicted_video + audio_size_bytes
+            if stats.crf is None or stats.vmaf is None:
+                error_msg = "CRF search completed but could not parse results"
+                logger.error(error_msg)
+                logger.error(f"Output:\n{result.output[-1000:]}")
+                raise AbAv1Error(error_msg, command=cmd_str_log, output=result.output, error_type="parse_error")
+            if not bounds.widen_max_if_hit(stats.crf):
+                break
+            clean_ab_av1_temp_folders(input_dir)
 
         search_result = CrfSearchResult(
             best_crf=stats.crf,
             best_vmaf=stats.vmaf,
             predicted_size_reduction=stats.size_reduction,
-            predicted_output_size=predicted_output_size,
+            predicted_output_size=_predicted_output_size(original_size, stats.size_reduction, video_info),
             vmaf_target_used=target_used,
             original_size=original_size,
             used_fallback=target_used != initial_target,
             preset_used=preset,
             crf_search_time_sec=time.time() - crf_search_start_time,
+            sample_encodes=stats.sample_encodes,
+            crf_curve=sorted(stats.crf_curve.values(), key=lambda point: point.crf),
         )
 
         reduction_text = (
@@ -664,12 +853,134 @@ class AbAv1Wrapper:
             f"VMAF={search_result.best_vmaf:.2f}, "
             f"Reduction={reduction_text}%, "
             f"Target={target_used}"
-            f"{' (fallback)' if search_result.used_fallback else ''}"
+            f"{' (fallback)' if search_result.used_fallback else ''}, "
+            f"{search_result.sample_encodes} CRF(s) probed"
         )
 
         clean_ab_av1_temp_folders(input_dir)
         return search_result
 
+    def verify_crf(
+        self,
+        input_path: str,
+        crf: float,
+        vmaf_target: int,
+        preset: int,
+        samples: int,
+        stop_event: Any | None = None,
+        hw_decoder: str | None = None,
+        pid_callback: Callable[..., Any] | None = None,
+        sample_duration_sec: float | None = None,
+        sample_cache_dir: str | None = None,
+        probe: InputProbe | None = None,
+    ) -> CrfSearchResult | None:
+        """Check a predicted CRF with one ab-av1 sample-encode instead of a full crf-search.
+
+        Args:
+            input_path: Path to the input video file.
+            crf: The CRF to check (e.g. a preset transfer, see src/preset_transfer.py).
+            vmaf_target: VMAF the samples must reach.
+            preset: SVT-AV1 encoding preset.
+            samples: --samples for the check.
+            stop_event, hw_decoder, pid_callback, sample_duration_sec, sample_cache_dir,
+                probe: As for crf_search.
+
+        Returns:
+            A CrfSearchResult for the CRF (one sample encode), or None when the
+            samples miss the VMAF target or exceed AB_AV1_MAX_ENCODED_PERCENT.
+
+        Raises:
+            InputFileError: If input file is missing or invalid
+            AbAv1CancelledError: If the check was cancelled via stop_event
+            AbAv1Error: If the sample-encode run failed
+        """
+        self.file_info_callback = None
+        self.parser.file_info_callback = None
+
+        start_time = time.time()
+        anonymized_input_path = anonymize_filename(input_path)
+        video_info, original_size = self._validate_input(input_path, probe)
+        input_dir = os.path.dirname(input_path) or os.getcwd()
+
+        cmd = [
+            self.executable_path,
+            "sample-encode",
+            "-i",
+            input_path,
+            "--crf",
+            f"{crf:g}",
+            "--preset",
+            str(preset),
+            "--samples",
+            str(samples),
+        ]
+        if sample_duration_sec is not None:
+            cmd.extend(["--sample-duration", f"{sample_duration_sec:g}s"])
+        if sample_cache_dir:
+            cmd.extend(["--temp-dir", sample_cache_dir])
+        if hw_decoder:
+            cmd.extend(["--enc-input", f"c:v={hw_decoder}"])
+        cmd_str_log = _format_cmd_for_log(
+            cmd,
+            {
+                self.executable_path: os.path.basename(self.executable_path),
+                input_path: os.path.basename(anonymized_input_path),
+            },
+        )
+
+        env = self._process_env(verbose_ffmpeg=False)
+        if sample_cache_dir:
+            os.makedirs(sample_cache_dir, exist_ok=True)
+            env["XDG_CACHE_HOME"] = sample_cache_dir
+        stats = EncodeStats(input_path=input_path, original_size=original_size, vmaf_target_used=vmaf_target)
+        stats.crf = crf
+        logger.info(f"[Verify CRF {format_crf(crf)}] Running: {cmd_str_log}")
+        result = self._run_once(
+            cmd,
+            input_path=input_path,
+            cwd=input_dir,
+            env=env,
+            on_line=lambda line: self.parser.parse_line(line, stats),
+            cancel_event=stop_event,
+            pid_callback=pid_callback,
+            sample_cache_dir=sample_cache_dir,
+        )
+        if result.cancelled or result.silence_timeout or result.return_code != 0:
+            self._raise_for_failed_result(
+                result,
+                input_path=input_path,
+                cmd_str_log=cmd_str_log,
+                cleanup_dir=input_dir,
+                failure_error_type="ab_av1_failed",
+            )
+        clean_ab_av1_temp_folders(input_dir)
+
+        self.parser.parse_final_output(result.output, stats)
+        if stats.vmaf is None:
+            logger.warning(f"CRF {format_crf(crf)} check of {anonymized_input_path} printed no VMAF")
+            return None
+        size_percent = 100.0 - stats.size_reduction if stats.size_reduction is not None else None
+        if stats.vmaf < vmaf_target or (size_percent is not None and size_percent > AB_AV1_MAX_ENCODED_PERCENT):
+            logger.info(
+                f"CRF {format_crf(crf)} missed for {anonymized_input_path}: VMAF {stats.vmaf:.2f} "
+                f"(target {vmaf_target}), size {size_percent if size_percent is not None else '?'}%"
+            )
+            return None
+        logger.info(f"CRF {format_crf(crf)} verified for {anonymized_input_path}: VMAF {stats.vmaf:.2f}")
+        return CrfSearchResult(
+            best_crf=crf,
+            best_vmaf=stats.vmaf,
+            predicted_size_reduction=stats.size_reduction,
+            predicted_output_size=_predicted_output_size(original_size, stats.size_reduction, video_info),
+            vmaf_target_used=vmaf_target,
+            original_size=original_size,
+            used_fallback=False,
+            preset_used=preset,
+            crf_search_time_sec=time.time() - start_time,
+            sample_encodes=1,
+            crf_curve=[CrfVmafPoint(crf=crf, vmaf=stats.vmaf, size_percent=size_percent)],
+        )
+
     def encode_with_crf(
         self,
         input_path: str,
@@ -681,6 +992,7 @@ class AbAv1Wrapper:
         total_duration_seconds: float = 0.0,
         hw_decoder: str | None = None,
         cancel_event: Any | None = None,
+        probe: InputProbe | None = None,
     ) -> EncodeStats:
         """Run ab-av1 encode with explicit CRF (skip CRF search phase).
 
@@ -697,6 +1009,7 @@ class AbAv1Wrapper:
             hw_decoder: Optional hardware decoder name (e.g., "h264_cuvid", "hevc_qsv").
             cancel_event: Optional threading.Event; when set, the run is aborted
                 mid-process and AbAv1CancelledError is raised.
+            probe: Optional earlier probe of the input, used instead of ffprobe if still current.
 
         Returns:
             EncodeStats with final statistics and timing breakdown.
@@ -713,7 +1026,7 @@ class AbAv1Wrapper:
         encoding_start_time = time.time()
         anonymized_input_path = anonymize_filename(input_path)
 
-        _video_info, original_size = self._validate_input(input_path)
+        _video_info, original_size = self._validate_input(input_path, probe)
         output_path, output_dir = self._prepare_output(input_path, output_path)
         anonymized_output_path = anonymize_filename(output_path)
 
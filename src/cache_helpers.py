@@ -3,15 +3,23 @@
 
 The quality analysis (Layer 2) caches CRF search results in FileRecord.
 These helpers determine when cached results can be reused during conversion,
-avoiding redundant CRF searches.
+avoiding redundant CRF searches, and which files the queue should take at all
+(filter_file_for_queue, shared by the GUI queue and the headless runner).
+
+Besides the best CRF, a record keeps every (CRF, VMAF) point its search
+probed, so a different VMAF target inside the sampled range is answered by
+interpolating that curve instead of searching again.
 """
 
+import itertools
 import logging
+import math
 import os
 
-from src.config import MTIME_TOLERANCE
-from src.history_index import compute_path_hash
-from src.models import FileRecord
+from src.config import AB_AV1_MAX_ENCODED_PERCENT, CRF_CURVE_STEP, MTIME_TOLERANCE, NOT_WORTHWHILE_SCREEN_SKIP
+from src.history_index import compute_path_hash, get_history_index
+from src.models import CrfVmafPoint, FileRecord, FileStatus, OperationType
+from src.worthwhile_screen import is_flagged
 
 logger = logging.getLogger(__name__)
 
@@ -93,13 +101,44 @@ def converted_verdict_applies(record: FileRecord, file_path: str) -> bool:
         return True  # Conservative: keep the verdict rather than re-queue
 
 
-def can_reuse_crf(record: FileRecord, desired_vmaf: int, desired_preset: int) -> bool:
-    """Check if cached CRF can be reused for conversion.
+def crf_for_vmaf_target(curve: list[CrfVmafPoint], vmaf_target: float) -> float | None:
+    """Interpolate the highest CRF that reaches vmaf_target on a sampled CRF/VMAF curve.
+
+    VMAF falls as CRF rises, so the answer lies between the highest probed CRF
+    that reached the target and the next probed CRF that missed it. The
+    interpolated CRF is rounded down to CRF_CURVE_STEP (towards higher quality).
+    Points whose predicted size exceeded AB_AV1_MAX_ENCODED_PERCENT were
+    rejected by ab-av1, so no answer is interpolated next to them.
+
+    Args:
+        curve: Points a crf-search probed.
+        vmaf_target: The VMAF target to answer.
+
+    Returns:
+        The CRF, or None when the target lies outside the sampled VMAF range or
+        its bracketing points are too large (a new search is needed).
+    """
+    points = sorted(curve, key=lambda point: point.crf)
+    for lower, upper in itertools.pairwise(points):
+        if lower.vmaf >= vmaf_target > upper.vmaf:
+            if any(p.size_percent is not None and p.size_percent > AB_AV1_MAX_ENCODED_PERCENT for p in (lower, upper)):
+                return None
+            fraction = (lower.vmaf - vmaf_target) / (lower.vmaf - upper.vmaf)
+            crf = lower.crf + fraction * (upper.crf - lower.crf)
+            return max(lower.crf, math.floor(crf / CRF_CURVE_STEP) * CRF_CURVE_STEP)
+    return None
+
+
+def reusable_crf(record: FileRecord, desired_vmaf: int, desired_preset: int) -> float | None:
+    """Get the cached CRF to encode with, if the record's analysis can answer this target.
 
     Cache is valid when:
     - CRF was found during analysis (best_crf is set)
     - Preset matches exactly (different presets produce different quality at same CRF)
-    - Cached VMAF target >= desired VMAF target (if we achieved 95, we can definitely achieve 90)
+    - The search ran at the desired VMAF target (its best CRF is used), or the
+      stored curve brackets the desired target (interpolated), or the cached
+      VMAF target is above the desired one (if we achieved 95, we can
+      definitely achieve 90)
 
     Args:
         record: FileRecord with cached analysis results.
@@ -107,29 +146,92 @@ def can_reuse_crf(record: FileRecord, desired_vmaf: int, desired_preset: int) ->
         desired_preset: The encoding preset for the current conversion.
 
     Returns:
-        True if cached CRF can be reused, False otherwise.
+        The CRF to encode with, or None if a new CRF search is needed.
     """
     if record.best_crf is None:
-        return False
+        return None
 
     if record.preset_when_analyzed is None:
         # Old cache entry without preset info - can't validate
-        return False
+        return None
 
     if record.vmaf_target_when_analyzed is None:
-        return False
+        return None
 
     # Preset must match exactly - different presets give different quality at same CRF
     if record.preset_when_analyzed != desired_preset:
         logger.debug(f"Cache invalid: preset mismatch (cached={record.preset_when_analyzed}, desired={desired_preset})")
-        return False
+        return None
+
+    if record.vmaf_target_when_analyzed == desired_vmaf:
+        return record.best_crf
+
+    interpolated = crf_for_vmaf_target(record.crf_curve, desired_vmaf)
+    if interpolated is not None:
+        logger.debug(f"Cache valid: CRF {interpolated} interpolated for VMAF {desired_vmaf} from the stored curve")
+        return interpolated
 
     # If cached VMAF >= desired, the cached CRF will achieve at least the desired quality
-    if record.vmaf_target_when_analyzed >= desired_vmaf:
+    if record.vmaf_target_when_analyzed > desired_vmaf:
         logger.debug(
             f"Cache valid: VMAF {record.vmaf_target_when_analyzed} >= desired {desired_vmaf}, CRF={record.best_crf}"
         )
-        return True
+        return record.best_crf
 
     logger.debug(f"Cache invalid: VMAF mismatch (cached={record.vmaf_target_when_analyzed}, desired={desired_vmaf})")
-    return False
+    return None
+
+
+def can_reuse_crf(record: FileRecord, desired_vmaf: int, desired_preset: int) -> bool:
+    """Check if cached analysis can answer this target without a new CRF search (see reusable_crf)."""
+    return reusable_crf(record, desired_vmaf, desired_preset) is not None
+
+
+def filter_file_for_queue(file_path: str, operation_type: OperationType, index=None) -> tuple[bool, str | None]:
+    """Check if a file should be added to the queue.
+
+    Args:
+        file_path: Path to the video file.
+        operation_type: The operation type (CONVERT or ANALYZE).
+        index: Optional HistoryIndex instance (will get singleton if not provided).
+
+    Returns:
+        Tuple of (should_add, skip_reason) where:
+        - should_add: True if file passes all filters
+        - skip_reason: Reason string if skipped, None if should_add is True
+    """
+    if index is None:
+        index = get_history_index()
+
+    record = index.lookup_file(file_path)
+    if record:
+        # Already converted - skip while the verdict still describes this file
+        # (handles the replace-mode output sitting at the input path)
+        if record.status == FileStatus.CONVERTED:
+            if converted_verdict_applies(record, file_path):
+                return False, "already converted"
+            return True, None  # Content changed since conversion - re-queueable
+
+        # For other statuses the verdict/metadata only describe the analyzed
+        # file version - a changed file is re-queueable
+        if not is_file_unchanged(record, file_path):
+            return True, None
+
+        # Not worth converting - skip
+        if record.status == FileStatus.NOT_WORTHWHILE:
+            return False, "not worth converting"
+        # Flagged by the Layer-1 pre-screen - skip only when configured to (else a quick check runs first)
+        if (
+            NOT_WORTHWHILE_SCREEN_SKIP
+            and record.status == FileStatus.SCANNED
+            and is_flagged(record.not_worthwhile_likelihood)
+        ):
+            return False, "likely not worth converting"
+        # Already analyzed - skip for ANALYZE operations
+        if operation_type == OperationType.ANALYZE and record.status == FileStatus.ANALYZED:
+            return False, "already analyzed"
+        # Already AV1 codec - skip for CONVERT operations
+        if operation_type == OperationType.CONVERT and record.video_codec == "av1":
+            return False, "already AV1"
+
+    return True, None
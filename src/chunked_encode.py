@@ -0,0 +1,443 @@
+# src/chunked_encode.py
+"""
+Keyframe-chunked parallel encoding of long files.
+
+A single ab-av1 encode of a multi-hour file keeps one SVT-AV1 process busy for
+hours. For long inputs the video stream is instead split at keyframes into
+segments (ffmpeg segment muxer, stream copy), the segments are encoded
+concurrently with ab-av1 at the CRF the search found, and the encoded segments
+are joined losslessly (concat demuxer, stream copy) while the source's audio,
+subtitles, chapters and metadata are muxed in once. The joined file must match
+the source's duration and video frame count before it takes the output path.
+
+All intermediate files live in a hidden work folder next to the output, so
+the final rename stays on one filesystem and the source is untouched until the
+verified result replaces it.
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from src.ab_av1.exceptions import AbAv1CancelledError, AbAv1Error
+from src.ab_av1.runner import run_ab_av1
+from src.ab_av1.stats import EncodeStats
+from src.ab_av1.wrapper import AbAv1Wrapper
+from src.config import (
+    AUDIO_ENCODERS,
+    CHUNKED_DURATION_TOLERANCE_SEC,
+    CHUNKED_ENCODE_MIN_DURATION_SEC,
+    CHUNKED_PROBE_TIMEOUT_SEC,
+    CHUNKED_SEGMENT_SEC,
+    CHUNKED_WORK_DIR_PREFIX,
+    DEFAULT_ENCODING_PRESET,
+)
+from src.conversion_engine.scheduler import JobCancelEvent
+from src.models import ProgressEvent
+from src.platform_utils import get_windows_subprocess_startupinfo
+from src.privacy import anonymize_filename
+from src.utils import format_crf, get_video_info
+from src.vendor_manager import get_ffmpeg_path, get_ffprobe_path
+
+logger = logging.getLogger(__name__)
+
+_SEGMENT_PATTERN = "segment_%05d.mkv"
+_FFMPEG_BASE_ARGS = ["-hide_banner", "-nostdin", "-y", "-loglevel", "error", "-stats"]  # -stats keeps output flowing
+_COPYABLE_AUDIO = frozenset({"aac", "opus"})  # Kept as-is even when audio conversion is on (as the setting says)
+_MKV_INCOMPATIBLE_SUBTITLES = {"mov_text": "srt"}  # MP4 text subtitles cannot be stream-copied into MKV
+_DONE_PERCENT = 100.0
+
+
+class ChunkedEncodeError(AbAv1Error):
+    """Splitting, a segment encode, joining or verification failed; the file can still be encoded whole."""
+
+
+def should_chunk(duration_sec: float | None, chunk_jobs: int) -> bool:
+    """Whether a file this long is encoded as concurrent segments."""
+    return chunk_jobs > 1 and (duration_sec or 0.0) >= CHUNKED_ENCODE_MIN_DURATION_SEC
+
+
+def _stream_duration(video_info: dict | None) -> float:
+    try:
+        return float((video_info or {}).get("format", {}).get("duration") or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def build_split_command(ffmpeg: str, input_path: str, segment_pattern: str, segment_sec: float) -> list[str]:
+    """ffmpeg command copying the first video stream into keyframe-aligned segments."""
+    return [
+        ffmpeg,
+        *_FFMPEG_BASE_ARGS,
+        "-i",
+        input_path,
+        "-map",
+        "0:v:0",
+        "-c",
+        "copy",
+        "-f",
+        "segment",
+        "-segment_time",
+        str(segment_sec),
+        "-segment_format",
+        "matroska",
+        "-reset_timestamps",
+        "1",
+        segment_pattern,
+    ]
+
+
+def build_join_command(
+    ffmpeg: str,
+    concat_list: str,
+    input_path: str,
+    output_path: str,
+    *,
+    video_info: dict | None,
+    convert_audio: bool,
+    audio_codec: str,
+) -> list[str]:
+    """ffmpeg command joining encoded segments and muxing the source's other streams once.
+
+    Video comes from the concat list (stream copy); audio, subtitles, chapters
+    and metadata from the source. Audio streams that are not AAC/Opus are
+    encoded with audio_codec when convert_audio is set; everything else is copied.
+    """
+    cmd = [ffmpeg, *_FFMPEG_BASE_ARGS, "-f", "concat", "-safe", "0", "-i", concat_list, "-i", input_path]
+    cmd += ["-map", "0:v:0", "-map", "1:a?", "-map", "1:s?", "-map_metadata", "1", "-map_chapters", "1", "-c", "copy"]
+    streams = (video_info or {}).get("streams", [])
+    audio = [s for s in streams if s.get("codec_type") == "audio"]
+    subtitles = [s for s in streams if s.get("codec_type") == "subtitle"]
+    encoder = AUDIO_ENCODERS.get(audio_codec.lower())
+    for i, stream in enumerate(audio):
+        if convert_audio and encoder and (stream.get("codec_name") or "").lower() not in _COPYABLE_AUDIO:
+            cmd += [f"-c:a:{i}", encoder]
+    for i, stream in enumerate(subtitles):
+        replacement = _MKV_INCOMPATIBLE_SUBTITLES.get((stream.get("codec_name") or "").lower())
+        if replacement:
+            cmd += [f"-c:s:{i}", replacement]
+    cmd.append(output_path)
+    return cmd
+
+
+def count_video_frames(path: str, timeout: float = CHUNKED_PROBE_TIMEOUT_SEC) -> int | None:
+    """Count the first video stream's packets (demux only, no decoding); None if ffprobe fails."""
+    ffprobe = get_ffprobe_path()
+    if ffprobe is None:
+        return None
+    cmd = [
+        str(ffprobe),
+        "-v",
+        "error",
+        "-select_streams",
+        "v:0",
+        "-count_packets",
+        "-show_entries",
+        "stream=nb_read_packets",
+        "-of",
+        "csv=p=0",
+        path,
+    ]
+    try:
+        startupinfo, _ = get_windows_subprocess_startupinfo()
+        result = subprocess.run(
+            cmd, capture_output=True, text=True, check=True, startupinfo=startupinfo, encoding="utf-8", timeout=timeout
+        )
+        return int(result.stdout.strip().split(",")[0])
+    except (subprocess.SubprocessError, OSError, ValueError):
+        logger.exception(f"Could not count frames of {anonymize_filename(path)}")
+        return None
+
+
+def verify_joined_output(
+    input_path: str,
+    output_path: str,
+    source_info: dict | None,
+    frame_counter: Callable[[str], int | None] | None = None,
+    info_reader: Callable[[str], dict | None] | None = None,
+) -> None:
+    """Check the joined file against the source: duration and video frame count.
+
+    Args:
+        input_path: Source video.
+        output_path: Joined output.
+        source_info: ffprobe info of the source.
+        frame_counter: Frame counter (default: count_video_frames).
+        info_reader: ffprobe reader (default: get_video_info).
+
+    Raises:
+        ChunkedEncodeError: If either differs or cannot be read.
+    """
+    frame_counter = frame_counter or count_video_frames
+    info_reader = info_reader or get_video_info
+    source_duration = _stream_duration(source_info)
+    output_duration = _stream_duration(info_reader(output_path))
+    if not output_duration or abs(output_duration - source_duration) > CHUNKED_DURATION_TOLERANCE_SEC:
+        raise ChunkedEncodeError(
+            f"Joined output lasts {output_duration:.2f}s, source {source_duration:.2f}s", error_type="chunk_verify"
+        )
+    source_frames = frame_counter(input_path)
+    output_frames = frame_counter(output_path)
+    if source_frames is None or output_frames is None or source_frames != output_frames:
+        raise ChunkedEncodeError(
+            f"Joined output has {output_frames} video frames, source {source_frames}", error_type="chunk_verify"
+        )
+
+
+class _ChunkProgress:
+    """Fold per-segment encode progress into one duration-weighted file progress."""
+
+    def __init__(
+        self,
+        durations: list[float],
+        filename: str,
+        crf: float,
+        original_size: int | None,
+        callback: Callable[..., Any] | None,
+    ):
+        self._durations = durations
+        self._total = sum(durations) or 1.0
+        self._percent = [0.0] * len(durations)
+        self._filename = filename
+        self._crf = crf
+        self._original_size = original_size
+        self._callback = callback
+        self._reported = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def overall(self) -> float:
+        return sum(d * p for d, p in zip(self._durations, self._percent, strict=True)) / self._total
+
+    def update(self, index: int, percent: float) -> None:
+        if self._callback is None:
+            return
+        with self._lock:
+            self._percent[index] = max(self._percent[index], min(_DONE_PERCENT, percent))
+            overall = self.overall
+            if overall < self._reported + 0.1:
+                return
+            self._reported = overall
+            done = sum(1 for p in self._percent if p >= _DONE_PERCENT)
+        self._callback(
+            self._filename,
+            "progress",
+            ProgressEvent(
+                progress_quality=100.0,
+                progress_encoding=overall,
+                phase="encoding",
+                message=f"Encoding: {overall:.1f}% ({done}/{len(self._durations)} chunks done)",
+                crf=self._crf,
+                original_size=self._original_size,
+            ),
+        )
+
+    def segment_callback(self, index: int) -> Callable[..., None]:
+        """file_info_callback for one segment encode: forwards progress, drops per-segment status events."""
+
+        def on_event(_filename, status, info=None):
+            if status == "progress" and isinstance(info, ProgressEvent):
+                self.update(index, info.progress_encoding)
+            elif status == "completed":
+                self.update(index, _DONE_PERCENT)
+
+        return on_event
+
+
+def _run_ffmpeg(
+    cmd: list[str], *, cwd: str, cancel_event: Any | None, pid_callback: Callable[..., Any] | None, step: str
+) -> None:
+    """Run one ffmpeg pass through the ab-av1 runner (cancellation and hang detection).
+
+    Raises:
+        AbAv1CancelledError: If cancel_event was set.
+        ChunkedEncodeError: If ffmpeg failed.
+    """
+    try:
+        result = run_ab_av1(cmd, cwd=cwd, env=os.environ.copy(), cancel_event=cancel_event, pid_callback=pid_callback)
+    except OSError as e:
+        raise ChunkedEncodeError(f"Could not start ffmpeg to {step}: {e}", error_type="chunk_ffmpeg") from e
+    if result.cancelled:
+        raise AbAv1CancelledError("Cancelled by user", error_type="cancelled")
+    if result.return_code != 0 or result.silence_timeout:
+        tail = result.output.splitlines()[-5:] if result.output else []
+        raise ChunkedEncodeError(
+            f"ffmpeg failed to {step} (rc={result.return_code}): {' | '.join(tail)}",
+            output=result.output,
+            error_type="chunk_ffmpeg",
+        )
+
+
+def encode_chunked(
+    input_path: str,
+    output_path: str,
+    *,
+    crf: float,
+    jobs: int,
+    video_info: dict | None,
+    preset: int | None = None,
+    convert_audio: bool = True,
+    audio_codec: str = "opus",
+    file_info_callback: Callable[..., Any] | None = None,
+    pid_callback: Callable[..., Any] | None = None,
+    hw_decoder: str | None = None,
+    cancel_event: Any | None = None,
+    segment_sec: float = CHUNKED_SEGMENT_SEC,
+) -> EncodeStats:
+    """Encode a long file as keyframe-aligned segments, up to jobs at a time.
+
+    Args:
+        input_path: Source video.
+        output_path: Final output (.mkv); replaced only after verification.
+        crf: CRF chosen by the search stage (or reused from history).
+        jobs: Segment encodes run concurrently.
+        video_info: ffprobe info of the source (stream list and duration).
+        preset: SVT-AV1 preset (default: DEFAULT_ENCODING_PRESET).
+        convert_audio: Encode non-AAC/Opus audio with audio_codec.
+        audio_codec: "opus" or "aac".
+        file_info_callback: Receives "starting", aggregated "progress" and "completed" events.
+        pid_callback: Called with every ffmpeg/ab-av1 process ID.
+        hw_decoder: Hardware decoder for the segment encodes.
+        cancel_event: Force-stop; aborts every running process.
+        segment_sec: Target segment length.
+
+    Returns:
+        EncodeStats of the joined file (vmaf is not measured per segment).
+
+    Raises:
+        AbAv1CancelledError: If cancel_event was set.
+        ChunkedEncodeError: If any step failed; output_path is left untouched.
+    """
+    ffmpeg = get_ffmpeg_path()
+    if ffmpeg is None:
+        raise ChunkedEncodeError("ffmpeg not found", error_type="chunk_ffmpeg")
+    preset = DEFAULT_ENCODING_PRESET if preset is None else preset
+    filename = os.path.basename(input_path)
+    anonymized = anonymize_filename(input_path)
+    original_size = (video_info or {}).get("file_size") or None
+    start_time = time.time()
+
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(output_dir, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix=CHUNKED_WORK_DIR_PREFIX, dir=output_dir)
+    try:
+        if file_info_callback:
+            file_info_callback(
+                filename,
+                "starting",
+                {
+                    "message": f"Encoding in chunks with CRF {format_crf(crf)}",
+                    "crf": crf,
+                    "original_size": original_size,
+                    "used_cached_crf": True,
+                },
+            )
+
+        # --- Split at keyframes ---
+        split_cmd = build_split_command(str(ffmpeg), input_path, os.path.join(work_dir, _SEGMENT_PATTERN), segment_sec)
+        _run_ffmpeg(split_cmd, cwd=work_dir, cancel_event=cancel_event, pid_callback=pid_callback, step="split")
+        segments = sorted(
+            os.path.join(work_dir, name)
+            for name in os.listdir(work_dir)
+            if name.startswith("segment_") and name.endswith(".mkv")
+        )
+        if not segments:
+            raise ChunkedEncodeError("Splitting produced no segments", error_type="chunk_split")
+        durations = [_stream_duration(get_video_info(segment)) for segment in segments]
+        logger.info(f"Split {anonymized} into {len(segments)} segments; encoding {jobs} at a time")
+
+        # --- Encode segments concurrently ---
+        progress = _ChunkProgress(durations, filename, crf, original_size, file_info_callback)
+        abort = JobCancelEvent(cancel_event)  # Set on the first failure so sibling encodes stop early
+        encoded = [os.path.join(work_dir, f"encoded_{i:05d}.mkv") for i in range(len(segments))]
+
+        def encode_segment(index: int) -> None:
+            if abort.is_set():
+                return
+            try:
+                AbAv1Wrapper().encode_with_crf(
+                    input_path=segments[index],
+                    output_path=encoded[index],
+                    crf=crf,
+                    preset=preset,
+                    file_info_callback=progress.segment_callback(index),
+                    pid_callback=pid_callback,
+                    total_duration_seconds=durations[index],
+                    hw_decoder=hw_decoder,
+                    cancel_event=abort,
+                )
+            except Exception:
+                abort.set()
+                raise
+
+        with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="chunk-encode") as pool:
+            futures = [pool.submit(encode_segment, i) for i in range(len(segments))]
+        if cancel_event is not None and cancel_event.is_set():
+            raise AbAv1CancelledError("Cancelled by user", error_type="cancelled")
+        for index, future in enumerate(futures):
+            error = future.exception()
+            if error is not None and not isinstance(error, AbAv1CancelledError):
+                message = getattr(error, "message", str(error))
+                raise ChunkedEncodeError(f"Segment {index + 1} failed: {message}", error_type="chunk_encode") from error
+        encode_seconds = time.time() - start_time
+
+        # --- Join and mux the other streams once ---
+        concat_list = os.path.join(work_dir, "segments.txt")
+        with open(concat_list, "w", encoding="utf-8") as f:
+            f.writelines("file '" + path.replace("'", "'\\''") + "'\n" for path in encoded)
+        joined = os.path.join(work_dir, "joined.mkv")
+        join_cmd = build_join_command(
+            str(ffmpeg),
+            concat_list,
+            input_path,
+            joined,
+            video_info=video_info,
+            convert_audio=convert_audio,
+            audio_codec=audio_codec,
+        )
+        _run_ffmpeg(join_cmd, cwd=work_dir, cancel_event=cancel_event, pid_callback=pid_callback, step="join")
+
+        verify_joined_output(input_path, joined, video_info)
+        os.replace(joined, output_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output_size = os.path.getsize(output_path)
+    size_reduction = (original_size - output_size) / original_size * 100 if original_size else None
+    logger.info(
+        f"Chunked encode of {anonymized} finished: {len(segments)} segments, CRF {format_crf(crf)}, "
+        f"{time.time() - start_time:.0f}s (encode {encode_seconds:.0f}s)"
+    )
+    if file_info_callback:
+        completed = {
+            "message": f"Complete (CRF {format_crf(crf)}, {len(segments)} chunks)",
+            "crf": crf,
+            "size_reduction": size_reduction,
+            "output_path": output_path,
+            "output_size": output_size,
+            "used_cached_crf": True,
+        }
+        file_info_callback(filename, "completed", completed)
+
+    return EncodeStats(
+        input_path=input_path,
+        output_path=output_path,
+        command=f"chunked encode: {len(segments)} segments x crf {format_crf(crf)}",
+        phase="encoding",
+        progress_quality=100.0,
+        progress_encoding=100.0,
+        crf=crf,
+        size_reduction=size_reduction,
+        original_size=original_size,
+        output_size=output_size,
+        total_duration_seconds=_stream_duration(video_info),
+        used_cached_crf=True,
+        encoding_time_sec=time.time() - start_time,
+    )
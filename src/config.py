@@ -36,6 +36,7 @@ DEFAULT_ENCODING_PRESET = 6  # Corresponds to SVT-AV1 "--preset 6" (Balanced spe
 # --- VMAF Fallback Settings ---
 MIN_VMAF_FALLBACK_TARGET = 90  # Minimum VMAF target to attempt if initial target fails
 VMAF_FALLBACK_STEP = 1  # How much to decrement VMAF target on each fallback attempt
+AB_AV1_MAX_ENCODED_PERCENT = 80  # ab-av1's --max-encoded-percent default: larger predicted outputs fail the search
 
 # --- ab-av1 Process Management ---
 AB_AV1_OUTPUT_POLL_SEC = 1.0  # Read-loop wake interval for cancellation checks
@@ -85,6 +86,31 @@ HISTORY_SCHEMA_VERSION = 2
 # multi-MB JSON, so at most one save per interval; hard checkpoints still flush unconditionally.
 HISTORY_SAVE_INTERVAL_SEC = 30
 
+# --- Job Journal ---
+# Write-ahead log of the worker's jobs (src/conversion_engine/journal.py): every job start, stage,
+# history record and commit/abort is fsynced before the work it describes. Startup recovery rolls
+# back jobs a crash left open and replays records the history debounce had not saved yet.
+# Each journal is locked by the process writing it; a second converting process (GUI and a
+# headless run, or a coordinator and a node on one host) writes its own "job_journal.<run>.jsonl".
+JOB_JOURNAL_FILE = "job_journal.jsonl"
+JOB_JOURNAL_LOCK_SUFFIX = ".lock"  # OS-locked file beside each journal while its process runs
+
+# --- Scan Snapshots ---
+# Last completed Analysis-tab scan per root folder, used to rebuild the tree instantly at
+# startup before a background walk revalidates it. One JSON file per root, newest kept.
+SCAN_SNAPSHOT_DIR = "scan_snapshots"
+SCAN_SNAPSHOT_SCHEMA_VERSION = 1
+SCAN_SNAPSHOT_MAX_ROOTS = 10
+
+# --- Sample Cache ---
+# Per-file, per-preset home of ab-av1's sample-encode cache, kept across VMAF fallback
+# attempts and from ANALYZE to CONVERT and deleted once the file's verdict is recorded.
+# Caches of files that never got one are swept at worker start: oldest first beyond the
+# size cap, and any left unused for the maximum age.
+SAMPLE_CACHE_DIR = "sample_cache"
+SAMPLE_CACHE_MAX_BYTES = 5 * 1024**3
+SAMPLE_CACHE_MAX_AGE_DAYS = 14
+
 # --- Settings File ---
 CONFIG_FILE = "ab_av1_gui_config.json"
 
@@ -105,9 +131,18 @@ class ConfigDict(TypedDict):
     anonymize_logs: bool
     anonymize_history: bool
     hw_decode_enabled: bool
+    concurrent_jobs: int
+    concurrent_search_jobs: int
+    batch_search_jobs: int
+    chunked_encode_jobs: int
+    queue_order: str
+    queue_deadline_hours: int
     default_output_mode: str
     default_suffix: str
     default_output_folder: str
+    staging_folder: str
+    resource_governor: bool
+    verify_output_quality: bool
 
 
 # Default configuration values (used for merging with loaded config)
@@ -125,21 +160,162 @@ CONFIG_DEFAULTS: ConfigDict = {
     "anonymize_logs": True,
     "anonymize_history": False,
     "hw_decode_enabled": True,
+    "concurrent_jobs": 0,  # 0 = auto (CPU cores / CORES_PER_ENCODE_JOB)
+    "concurrent_search_jobs": 0,  # 0 = auto (CPU cores / CORES_PER_SEARCH_JOB)
+    "batch_search_jobs": 0,  # Short-clip searches, paid for with search slots; 0 = auto (one search slot's worth)
+    "chunked_encode_jobs": 0,  # Segments of one long file encoded at once; 0 = auto, 1 = never chunk
+    "queue_order": "user",  # QueueOrder value
+    "queue_deadline_hours": 8,  # Time window for the "deadline" queue order
     "default_output_mode": "replace",
     "default_suffix": "_av1",
     "default_output_folder": "",
+    "staging_folder": "",  # Local scratch folder for encodes ("" = encode at the destination)
+    "resource_governor": False,  # Throttle encodes and probes while the system is busy (Linux)
+    "verify_output_quality": False,  # VMAF spot check of each output against its source
 }
 
 # --- UI Batching ---
 TREE_UPDATE_BATCH_SIZE = 50  # Number of items to batch before updating UI
 MIN_FILES_FOR_PERCENT_UPDATES = 20  # Minimum files before using percentage-based update intervals
 
+# --- Analysis Pipeline ---
+ANALYSIS_PIPELINE_QUEUE_SIZE = 64  # Capacity of each queue between scan/probe/record stages (backpressure)
+ANALYSIS_PROBE_WORKERS = 4  # Default number of parallel ffprobe workers
+
+# --- Concurrent Jobs ---
+CONCURRENT_JOBS_AUTO = 0  # Setting value meaning "derive job count from CPU cores"
+CORES_PER_ENCODE_JOB = 8  # SVT-AV1 scales well up to roughly this many cores per encode
+CORES_PER_SEARCH_JOB = 16  # crf-search sample encodes are short bursts; one search keeps several encodes fed
+MAX_CONCURRENT_JOBS = 8  # Upper bound on parallel ab-av1 processes
+
+# --- Batch CRF Search ---
+# Searches of clips this short run in their own scheduler stage with more, smaller slots
+# (src/conversion_engine/batch_search.py): their fixed per-process cost leaves cores idle.
+# The lane's slots are traded from the search budget: one search slot buys
+# CORES_PER_SEARCH_JOB // BATCH_SEARCH_CORES_PER_JOB of them.
+BATCH_SEARCH_MAX_DURATION_SEC = 300
+BATCH_SEARCH_CORES_PER_JOB = 4  # Cores one short-clip search keeps busy
+
+# --- Chunked Encoding ---
+# Files at least this long are split at keyframes and their segments encoded concurrently at
+# the searched CRF, then joined losslessly (src/chunked_encode.py). Shorter files run as one
+# ab-av1 process: per-segment startup and the split/join passes only pay off on long inputs.
+CHUNKED_ENCODE_MIN_DURATION_SEC = 3600
+CHUNKED_SEGMENT_SEC = 300  # Target segment length; cuts land on the first keyframe after it
+CHUNKED_DURATION_TOLERANCE_SEC = 1.0  # Allowed duration difference between source and joined output
+CHUNKED_PROBE_TIMEOUT_SEC = 900  # Frame counting demuxes the whole file
+CHUNKED_WORK_DIR_PREFIX = ".av1-chunks-"  # Per-file segment folder created beside the output
+AUDIO_ENCODERS = {"opus": "libopus", "aac": "aac"}  # audio_codec setting -> ffmpeg encoder
+
+# --- Scratch Staging ---
+# With a staging folder set, encodes (and ab-av1's sample files) run on that local disk and a
+# background mover copies each finished output to its destination (src/staging.py).
+STAGING_DIR_PREFIX = ".av1-stage-"  # Per-file scratch folder under the staging folder
+STAGING_COPY_SUFFIX = ".partial"  # Verified copy beside the destination, renamed into place last
+STAGING_SPACE_FACTOR = 2.0  # Scratch space one file needs, as a multiple of its input size
+STAGING_MIN_FREE_BYTES = 2 * 1024**3  # Free space the scratch disk always keeps (2 GB)
+STAGING_COPY_CHUNK_BYTES = 8 * 1024**2  # Read/write block size of the mover's copy
+
+# --- Disk Space Admission ---
+# Before a file queues for an encode slot the worker reserves its predicted output size on the
+# output volume (src/conversion_engine/disk_budget.py), so a full disk is caught up front
+# instead of hours into an encode. A file that does not fit waits while other jobs hold
+# reservations on the volume and fails only if it cannot fit on its own.
+DISK_RESERVATION_MARGIN = 1.3  # Reserve this multiple of the predicted output size
+DISK_MIN_FREE_BYTES = 1024**3  # Free space an output volume always keeps (1 GB)
+DISK_ADMISSION_POLL_SEC = 5.0  # How often a deferred job re-checks free space
+
+# --- Resource Governor ---
+# On Linux, src/resource_governor.py samples /proc while enabled. Above any limit it holds back
+# job slots, lowers the CPU and I/O priority of running encodes and pauses new ffprobes, so the
+# machine stays responsive for other services (e.g. a media server transcoding for playback).
+GOVERNOR_SAMPLE_INTERVAL_SEC = 5.0
+GOVERNOR_MAX_LOAD_PER_CORE = 1.5  # 1-minute load average per logical CPU
+GOVERNOR_MIN_AVAILABLE_MEMORY = 0.10  # MemAvailable as a fraction of MemTotal
+GOVERNOR_MAX_DISK_BUSY = 0.90  # Fraction of the sample interval the busiest disk spent on I/O
+GOVERNOR_RELEASE_RATIO = 0.8  # Throttling ends once every metric is this far inside its limit
+GOVERNOR_THROTTLED_SLOTS = 1  # Encode and CRF search slots per stage left to jobs while throttled
+GOVERNOR_THROTTLED_NICE = 15  # Niceness of throttled ab-av1 process groups (I/O class: idle)
+
+# --- Queue Ordering ---
+MAX_QUEUE_DEADLINE_HOURS = 72  # Upper bound for the "deadline" order's time window
+
+# --- Distributed Encoding ---
+# A coordinator hands out file jobs to encode nodes over HTTP/JSON; a node holds a lease on
+# each claimed job and renews it by heartbeat. Expired leases (dead node) go back to the queue.
+BROKER_DEFAULT_PORT = 8765
+BROKER_LEASE_SEC = 120  # Lease length; a node that misses heartbeats this long loses the job
+BROKER_HEARTBEAT_SEC = 20  # How often a node renews its leases and reports progress
+BROKER_POLL_SEC = 5  # How long an idle node waits before asking for work again
+BROKER_MAX_ATTEMPTS = 3  # Lease expiries before a job is failed instead of re-queued
+BROKER_REQUEST_TIMEOUT_SEC = 10  # Timeout for one node -> coordinator request
+
 # --- Time Estimation ---
 MIN_SAMPLES_FOR_ESTIMATE = 5  # Minimum conversion history samples needed for estimates
 MIN_SAMPLES_HIGH_CONFIDENCE = 10  # Samples needed for "high" vs "medium" confidence
 DEFAULT_REDUCTION_ESTIMATE_PERCENT = 45.0  # Default file size reduction estimate if no history data
 RESOLUTION_TOLERANCE_PERCENT = 0.2  # Tolerance for resolution matching (20%)
 
+# --- CRF Search Prior ---
+# crf-search bounds seeded from history: --min-crf/--max-crf are set from the
+# best CRFs of similar files (same codec, resolution bucket, bitrate band,
+# preset and VMAF target), widened back to ab-av1's range when a result hits one.
+AB_AV1_DEFAULT_MIN_CRF = 10  # ab-av1's own --min-crf for svt-av1
+AB_AV1_DEFAULT_MAX_CRF = 55  # ab-av1's own --max-crf for svt-av1
+CRF_PRIOR_MIN_SAMPLES = 10  # Similar records needed before a search is bounded
+CRF_PRIOR_MARGIN = 2.0  # CRF added outside the P10-P90 range of similar files
+CRF_PRIOR_BOUND_TOLERANCE = 0.5  # A best CRF this close to --max-crf "hit" the bound
+# Bitrate per pixel (bits/s per pixel of frame area) band edges for grouping similar files
+CRF_PRIOR_BITRATE_BANDS = (0.5, 1.0, 2.0, 4.0, 8.0)
+CRF_CURVE_STEP = 0.25  # CRFs interpolated from a stored CRF/VMAF curve are rounded down to this step
+CRF_SEARCH_BASELINE_PROBES = 6  # CRFs an unbounded crf-search probes, until history has its own median
+
+# --- Preset Transfer ---
+# A file searched at another preset gets its CRF for this preset from the median CRF offset
+# between the two presets over files searched at both (src/preset_transfer.py); a short
+# sample encode at that CRF confirms the VMAF target instead of a full crf-search.
+PRESET_TRANSFER_MIN_SAMPLES = 5  # Files searched at both presets needed before an offset is used
+PRESET_TRANSFER_VERIFY_SAMPLES = 3  # --samples of the verification sample encode
+
+# --- Output Quality Check ---
+# Optional VMAF spot check of finished outputs against their source (src/quality_check.py).
+# Groups of similar files whose checked outputs keep missing the predicted VMAF stop
+# reusing cached or preset-transferred CRFs. Only a group's latest checks count, and a
+# share of its files still take the distrusted source with the check forced on, so a
+# group whose CRFs are fine again wins its trust back.
+QUALITY_CHECK_SEGMENTS = 4  # Segments of the output scored per file
+QUALITY_CHECK_SEGMENT_SEC = 5.0  # Length of each scored segment
+QUALITY_DRIFT_MIN_RECORDS = 5  # Checked outputs of a group needed before it can lose trust
+QUALITY_DRIFT_MAX_MISS = 1.0  # Median VMAF shortfall against the prediction that ends trust
+QUALITY_DRIFT_WINDOW = 10  # Latest checked outputs per group that count (older misses age out)
+QUALITY_DRIFT_TRIAL_PERCENT = 20  # Files of a distrusted group encoded with its source anyway, checked
+
+# --- CRF Search Sampling ---
+# --samples/--sample-duration chosen per file from its duration, adjusted by how
+# far similar files' searches missed their output's measured VMAF.
+CRF_SAMPLE_EVERY_SEC = 720  # One sample per 12 minutes (ab-av1's own --sample-every)
+CRF_SAMPLES_MIN = 3
+CRF_SAMPLES_MAX = 15
+CRF_SAMPLE_DURATION_SEC = 20  # ab-av1's own --sample-duration
+CRF_SAMPLE_MIN_DURATION_SEC = 4
+CRF_SAMPLE_MAX_COVERAGE = 0.2  # Samples of a short file cover at most this share of it
+CRF_SAMPLE_STABILITY_MIN_RECORDS = 5  # Scored searches of similar files needed to adjust the count
+CRF_SAMPLE_ERROR_HIGH = 1.0  # Median |measured - predicted VMAF| above which more samples are taken
+CRF_SAMPLE_ERROR_LOW = 0.3  # ... and below which fewer are
+
+# --- NOT_WORTHWHILE Pre-screen ---
+# Layer-1 scans flag files whose group of similar files (codec, bits per pixel
+# per frame, duration) mostly ended NOT_WORTHWHILE rather than CONVERTED. Flagged
+# files get a reduced-sample crf-search before the full one, or are left out of the queue.
+NOT_WORTHWHILE_SCREEN_MIN_SAMPLES = 10  # NOT_WORTHWHILE + CONVERTED records a group needs before it flags
+NOT_WORTHWHILE_SCREEN_THRESHOLD = 0.9  # Smoothed NOT_WORTHWHILE share at which a file is flagged
+NOT_WORTHWHILE_SCREEN_BPP_BANDS = (0.02, 0.05, 0.1, 0.2)  # Bits per pixel per frame band edges
+NOT_WORTHWHILE_SCREEN_DURATION_BANDS = (600, 2400)  # Duration band edges in seconds
+NOT_WORTHWHILE_SCREEN_ASSUMED_FPS = 25.0  # Frame rate of records scanned before fps was stored
+NOT_WORTHWHILE_SCREEN_HOLDOUT_PERCENT = 20  # History held out to report the screen's precision/recall
+NOT_WORTHWHILE_SCREEN_CHECK_SAMPLES = 2  # ab-av1 --samples of a flagged file's quick crf-search
+NOT_WORTHWHILE_SCREEN_SKIP = False  # True: leave flagged files out of the queue instead
+
 # --- Duplicate Detection ---
 # Tolerance for duration matching - must account for rounding differences between code paths:
 # - folder_analysis.py stores raw ffprobe duration (e.g., 384.533313)
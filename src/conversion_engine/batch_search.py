@@ -0,0 +1,113 @@
+# src/conversion_engine/batch_search.py
+"""
+Batch lane for CRF searches of short clips.
+
+A crf-search of a 2-5 minute clip is mostly fixed cost - process start, input
+validation, ab-av1 setup, a handful of short sample encodes - and leaves most
+of the cores a search slot is sized for (CORES_PER_SEARCH_JOB) idle, so a
+library of thousands of clips ran far below the machine's capacity. Files no
+longer than BATCH_SEARCH_MAX_DURATION_SEC search in their own scheduler stage
+(BATCH_SEARCH_STAGE) next to the regular search stage, and reuse the job's
+probe (InputProbe) for validation.
+
+The lane's slots come out of the search budget rather than on top of it:
+split_search_slots() trades whole search slots for lane slots, each buying
+CORES_PER_SEARCH_JOB / BATCH_SEARCH_CORES_PER_JOB of them, and always leaves
+the regular stage at least one slot.
+
+BatchSearchMeter reports the lane's clips/hour against the same searches run
+back to back, which is what the one-at-a-time search stage did.
+"""
+
+import logging
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from src.config import (
+    BATCH_SEARCH_CORES_PER_JOB,
+    BATCH_SEARCH_MAX_DURATION_SEC,
+    CORES_PER_SEARCH_JOB,
+    MAX_CONCURRENT_JOBS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Lane slots one search slot buys
+BATCH_SLOTS_PER_SEARCH_SLOT = max(1, CORES_PER_SEARCH_JOB // BATCH_SEARCH_CORES_PER_JOB)
+
+
+def is_batch_clip(duration_sec: float | None) -> bool:
+    """Whether a file is short enough to search in the batch lane."""
+    return bool(duration_sec) and duration_sec <= BATCH_SEARCH_MAX_DURATION_SEC
+
+
+def split_search_slots(search_jobs: int, batch_jobs: int) -> tuple[int, int]:
+    """Share the search budget between the regular search stage and the batch lane.
+
+    Args:
+        search_jobs: Search slots of the run (resolved concurrent_search_jobs).
+        batch_jobs: Requested lane slots; 0 (CONCURRENT_JOBS_AUTO) trades one search slot.
+
+    Returns:
+        (search slots, lane slots). No lane (0) with a single search slot:
+        short clips then search in the regular stage.
+    """
+    if search_jobs <= 1:
+        return search_jobs, 0
+    wanted = batch_jobs if batch_jobs > 0 else BATCH_SLOTS_PER_SEARCH_SLOT
+    traded = min(search_jobs - 1, -(-wanted // BATCH_SLOTS_PER_SEARCH_SLOT))
+    return search_jobs - traded, min(wanted, traded * BATCH_SLOTS_PER_SEARCH_SLOT, MAX_CONCURRENT_JOBS)
+
+
+@dataclass(frozen=True)
+class BatchSearchReport:
+    """Throughput of the batch lane over one worker run."""
+
+    clips: int
+    wall_sec: float  # First search start to last search end
+    search_sec: float  # Sum of the searches' own durations (back-to-back time)
+
+    @property
+    def clips_per_hour(self) -> float:
+        return self.clips * 3600 / self.wall_sec if self.wall_sec > 0 else 0.0
+
+    @property
+    def serial_clips_per_hour(self) -> float:
+        return self.clips * 3600 / self.search_sec if self.search_sec > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.clips} short clip(s) searched at {self.clips_per_hour:.0f} clips/hour "
+            f"(one at a time: {self.serial_clips_per_hour:.0f} clips/hour)"
+        )
+
+
+class BatchSearchMeter:
+    """Collects the start and end of every batch-lane search (thread-safe)."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._first_start: float | None = None
+        self._last_end: float | None = None
+        self._clips = 0
+        self._search_sec = 0.0
+
+    def record(self, started: float, finished: float) -> None:
+        """Count one search that ran from started to finished (clock() readings)."""
+        with self._lock:
+            self._clips += 1
+            self._search_sec += finished - started
+            self._first_start = started if self._first_start is None else min(self._first_start, started)
+            self._last_end = finished if self._last_end is None else max(self._last_end, finished)
+
+    def report(self) -> BatchSearchReport | None:
+        """The lane's throughput so far, or None if it ran no search."""
+        with self._lock:
+            if not self._clips:
+                return None
+            return BatchSearchReport(
+                clips=self._clips, wall_sec=self._last_end - self._first_start, search_sec=self._search_sec
+            )
@@ -0,0 +1,471 @@
+# src/conversion_engine/broker.py
+"""
+Job broker for distributed encoding across several machines.
+
+A coordinator expands its queue into one job per file and serves the jobs over
+HTTP/JSON (standard library only). Encode nodes claim jobs under a lease,
+renew the lease with heartbeats that carry progress, and report the outcome
+together with the history record they wrote; the coordinator merges those
+records into its own HistoryIndex. A lease that is not renewed in time (node
+died or lost the network) puts the job back in the queue.
+
+Paths travel in the coordinator's spelling (normalize_path); each node maps
+them onto its own mount points with a PathMapper.
+"""
+
+import dataclasses
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from src.config import BROKER_LEASE_SEC, BROKER_MAX_ATTEMPTS, BROKER_REQUEST_TIMEOUT_SEC, HISTORY_SAVE_INTERVAL_SEC
+from src.history_index import compute_path_hash, get_history_index, record_from_dict
+from src.models import BrokerJobState, OperationType, OutputMode, QueueItem, QueueItemStatus
+from src.privacy import anonymize_filename, normalize_path
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Broker-Secret"  # noqa: S105 - header name, not a secret
+_MAX_REQUEST_BYTES = 1024 * 1024  # A result carries one history record; anything larger is not ours
+
+# Outcomes a node reports for a job
+OUTCOME_SUCCEEDED = "succeeded"
+OUTCOME_SKIPPED = "skipped"
+OUTCOME_FAILED = "failed"
+OUTCOME_STOPPED = "stopped"  # Node stopped before finishing; the job goes back to the queue
+_OUTCOMES = frozenset({OUTCOME_SUCCEEDED, OUTCOME_SKIPPED, OUTCOME_FAILED, OUTCOME_STOPPED})
+
+
+class BrokerError(Exception):
+    """A request to the coordinator failed (unreachable, rejected or malformed)."""
+
+
+def _clean_prefix(prefix: str) -> str:
+    return prefix.replace("\\", "/").rstrip("/") or "/"
+
+
+def _strip_prefix(path: str, prefix: str, casefold: bool) -> str | None:
+    """Return the rest of path below prefix (starting with "/" or empty), or None."""
+    if prefix == "/":
+        return path if path.startswith("/") else None
+    head, rest = path[: len(prefix)], path[len(prefix) :]
+    if (head.casefold() == prefix.casefold() if casefold else head == prefix) and (not rest or rest[0] == "/"):
+        return rest
+    return None
+
+
+class PathMapper:
+    """Translate paths between the coordinator's and this node's spelling.
+
+    Each mapping pairs a coordinator prefix (as the coordinator's
+    normalize_path spells it, e.g. "//nas/media" or "z:/media") with the local
+    mount point of the same share (e.g. "/mnt/media"). Paths outside every
+    mapping are used unchanged, for shares mounted at the same path everywhere.
+    """
+
+    def __init__(self, mappings: Iterable[tuple[str, str]] = ()):
+        self._mappings = [(_clean_prefix(coordinator), normalize_path(local)) for coordinator, local in mappings]
+
+    @classmethod
+    def parse(cls, specs: Iterable[str]) -> "PathMapper":
+        """Build from "COORDINATOR_PREFIX=LOCAL_PREFIX" strings.
+
+        Raises:
+            ValueError: If a spec has no "=" or an empty side.
+        """
+        mappings = []
+        for spec in specs:
+            coordinator, sep, local = spec.partition("=")
+            if not sep or not coordinator.strip() or not local.strip():
+                raise ValueError(f"Path mapping must look like COORDINATOR_PREFIX=LOCAL_PREFIX: {spec!r}")
+            mappings.append((coordinator.strip(), local.strip()))
+        return cls(mappings)
+
+    def to_local(self, path: str) -> str:
+        """Coordinator spelling -> local path."""
+        spelled = path.replace("\\", "/")
+        for coordinator, local in self._mappings:
+            # The coordinator's platform is unknown here, so its prefix matches case-insensitively
+            rest = _strip_prefix(spelled, coordinator, casefold=True)
+            if rest is not None:
+                return normalize_path(local + rest)
+        return path
+
+    def to_coordinator(self, path: str) -> str:
+        """Local path -> coordinator spelling."""
+        normalized = normalize_path(path)
+        for coordinator, local in self._mappings:
+            rest = _strip_prefix(normalized, local, casefold=False)
+            if rest is not None:
+                return coordinator + rest if coordinator != "/" else rest
+        return normalized
+
+
+@dataclass(eq=False)
+class BrokerJob:
+    """One file of the coordinator's queue and its lease."""
+
+    job_id: str
+    path: str  # Coordinator spelling (normalize_path)
+    source_folder: str  # Base for SEPARATE_FOLDER subfolders: the queue item's folder, or the file's parent
+    operation_type: OperationType
+    output_mode: OutputMode
+    output_suffix: str | None
+    output_folder: str | None
+    state: BrokerJobState = BrokerJobState.PENDING
+    node: str | None = None
+    token: str | None = None  # Changes on every claim, so a stale node cannot renew or report
+    lease_expires: float = 0.0
+    attempts: int = 0  # Leases that expired
+    outcome: str | None = None
+    message: str | None = None
+    progress: dict | None = None
+
+    def to_wire(self) -> dict[str, Any]:
+        """Fields a node needs to run the job."""
+        return {
+            "job_id": self.job_id,
+            "token": self.token,
+            "path": self.path,
+            "source_folder": self.source_folder,
+            "operation_type": self.operation_type.value,
+            "output_mode": self.output_mode.value,
+            "output_suffix": self.output_suffix,
+            "output_folder": self.output_folder,
+        }
+
+
+def jobs_from_queue(queue_items: Iterable[QueueItem]) -> list[BrokerJob]:
+    """Expand pending queue items into one job per file."""
+    jobs = []
+    for item in queue_items:
+        if item.status != QueueItemStatus.PENDING:
+            continue
+        paths = [f.path for f in item.files] if item.is_folder else [item.source_path]
+        source_folder = item.source_path if item.is_folder else os.path.dirname(item.source_path)
+        jobs.extend(
+            BrokerJob(
+                job_id=uuid.uuid4().hex,
+                path=normalize_path(path),
+                source_folder=normalize_path(source_folder),
+                operation_type=item.operation_type,
+                output_mode=item.output_mode,
+                output_suffix=item.output_suffix,
+                output_folder=normalize_path(item.output_folder) if item.output_folder else None,
+            )
+            for path in paths
+        )
+    return jobs
+
+
+class JobBroker:
+    """Lease table of the coordinator's jobs (thread-safe).
+
+    claim() hands out the oldest pending job with a fresh lease token;
+    heartbeat() renews it; complete() records the outcome and merges the
+    node's history record. expire() - also run on every claim and heartbeat -
+    puts jobs whose lease ran out back in the queue, or fails them after
+    max_attempts expiries so a file that kills its node cannot loop forever.
+    """
+
+    def __init__(
+        self,
+        jobs: list[BrokerJob],
+        lease_sec: float = BROKER_LEASE_SEC,
+        max_attempts: int = BROKER_MAX_ATTEMPTS,
+        on_event: Callable[..., Any] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.lease_sec = lease_sec
+        self.max_attempts = max_attempts
+        self._jobs = {job.job_id: job for job in jobs}  # Insertion order = queue order
+        self._on_event = on_event or (lambda event, **fields: None)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._finished = threading.Condition(self._lock)
+
+    def claim(self, node: str) -> dict[str, Any]:
+        """Lease the next pending job to node.
+
+        Returns:
+            {"state": "job", "job": {...}, "lease_sec": ..., "pending": n} when a job
+            was leased, {"state": "wait"} while other nodes still hold leases, or
+            {"state": "done"} when every job is finished.
+        """
+        with self._lock:
+            self._expire_locked()
+            job = next((j for j in self._jobs.values() if j.state == BrokerJobState.PENDING), None)
+            if job is None:
+                return {"state": "done" if self._all_finished() else "wait"}
+            job.state = BrokerJobState.LEASED
+            job.node = node
+            job.token = uuid.uuid4().hex
+            job.lease_expires = self._clock() + self.lease_sec
+            job.progress = None
+            pending = self._count(BrokerJobState.PENDING)
+            wire = job.to_wire()
+        logger.info(f"Leased job {job.job_id} ({anonymize_filename(job.path)}) to node {node}")
+        self._on_event("claimed", job=job.job_id, node=node, file=job.path)
+        return {"state": "job", "job": wire, "lease_sec": self.lease_sec, "pending": pending}
+
+    def heartbeat(self, job_id: str, token: str, progress: dict | None = None) -> bool:
+        """Renew a lease; False means the lease is lost and the node should abandon the job."""
+        with self._lock:
+            self._expire_locked()
+            job = self._jobs.get(job_id)
+            if job is None or job.state != BrokerJobState.LEASED or job.token != token:
+                return False
+            job.lease_expires = self._clock() + self.lease_sec
+            if progress is not None:
+                job.progress = progress
+            return True
+
+    def complete(
+        self, job_id: str, token: str, outcome: str, record: dict | None = None, message: str | None = None
+    ) -> bool:
+        """Record a node's result for a job.
+
+        A success or skip from a node whose lease already expired is still
+        accepted while the job is unfinished - the work is done; the node now
+        holding the job learns from its next heartbeat that its lease is gone.
+        Failures and stops only count from the current lease holder.
+
+        Returns:
+            True if the result was accepted.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.state not in (BrokerJobState.PENDING, BrokerJobState.LEASED):
+                return False
+            if outcome not in _OUTCOMES:
+                raise ValueError(f"Unknown outcome: {outcome!r}")
+            current_holder = job.state == BrokerJobState.LEASED and job.token == token
+            if outcome in (OUTCOME_FAILED, OUTCOME_STOPPED) and not current_holder:
+                return False  # The job was handed to another node meanwhile
+            if outcome == OUTCOME_STOPPED:
+                job.state = BrokerJobState.PENDING
+                job.node = job.token = None
+            else:
+                job.state = BrokerJobState.FAILED if outcome == OUTCOME_FAILED else BrokerJobState.DONE
+                job.outcome = outcome
+                job.message = message
+                job.token = None
+                self._finished.notify_all()
+        if record is not None:
+            self._merge_record(job, record)
+        event = "requeued" if outcome == OUTCOME_STOPPED else "completed"
+        self._on_event(event, job=job_id, file=job.path, outcome=outcome, message=message)
+        return True
+
+    def expire(self) -> int:
+        """Re-queue (or fail) jobs whose lease ran out; returns how many."""
+        with self._lock:
+            return self._expire_locked()
+
+    def _expire_locked(self) -> int:
+        now = self._clock()
+        expired = [j for j in self._jobs.values() if j.state == BrokerJobState.LEASED and j.lease_expires < now]
+        for job in expired:
+            job.attempts += 1
+            logger.warning(f"Lease of job {job.job_id} on node {job.node} expired (attempt {job.attempts})")
+            node, job.node, job.token = job.node, None, None
+            if job.attempts >= self.max_attempts:
+                job.state = BrokerJobState.FAILED
+                job.outcome = OUTCOME_FAILED
+                job.message = f"Lease expired {job.attempts} times"
+                self._finished.notify_all()
+            else:
+                job.state = BrokerJobState.PENDING
+            self._on_event("expired", job=job.job_id, node=node, file=job.path, state=job.state)
+        return len(expired)
+
+    def _merge_record(self, job: BrokerJob, record_dict: dict) -> None:
+        """Upsert a node's history record under the coordinator's path (newest record wins)."""
+        try:
+            record = record_from_dict(record_dict)
+        except (TypeError, ValueError, KeyError):
+            logger.warning(f"Ignoring malformed history record for job {job.job_id}", exc_info=True)
+            return
+        index = get_history_index()
+        path_hash = compute_path_hash(job.path)
+        existing = index.get(path_hash)
+        if existing is not None and (existing.last_updated or "") > (record.last_updated or ""):
+            return
+        record = dataclasses.replace(
+            record,
+            path_hash=path_hash,
+            # Anonymized histories never carry the path (see _create_file_record)
+            original_path=job.path if record.original_path is not None else None,
+            first_seen=(existing.first_seen if existing else None) or record.first_seen,
+        )
+        index.upsert(record)
+        index.save_if_stale(HISTORY_SAVE_INTERVAL_SEC)
+
+    def _count(self, state: BrokerJobState) -> int:
+        return sum(1 for j in self._jobs.values() if j.state == state)
+
+    def _all_finished(self) -> bool:
+        return all(j.state in (BrokerJobState.DONE, BrokerJobState.FAILED) for j in self._jobs.values())
+
+    @property
+    def finished(self) -> bool:
+        """Whether every job is done or failed."""
+        with self._lock:
+            return self._all_finished()
+
+    def wait_finished(self, timeout: float) -> bool:
+        """Block up to timeout seconds for every job to finish."""
+        with self._finished:
+            return self._finished.wait_for(self._all_finished, timeout)
+
+    def summary(self) -> dict[str, Any]:
+        """Job counts per state plus each leased job's node and latest progress."""
+        with self._lock:
+            return {
+                "counts": {state.value: self._count(state) for state in BrokerJobState},
+                "leased": [
+                    {"job": j.job_id, "node": j.node, "file": j.path, "progress": j.progress}
+                    for j in self._jobs.values()
+                    if j.state == BrokerJobState.LEASED
+                ],
+            }
+
+
+class _BrokerRequestHandler(BaseHTTPRequestHandler):
+    """JSON endpoints: POST /claim, /heartbeat, /complete; GET /status."""
+
+    server: "_BrokerHTTPServer"
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        if self.path == "/status":
+            self._reply(200, self.server.broker.summary())
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > _MAX_REQUEST_BYTES:
+            self._reply(413, {"error": "request too large"})
+            return
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+            broker = self.server.broker
+            if self.path == "/claim":
+                self._reply(200, broker.claim(str(body["node"])))
+            elif self.path == "/heartbeat":
+                self._reply(200, {"ok": broker.heartbeat(body["job_id"], body["token"], body.get("progress"))})
+            elif self.path == "/complete":
+                accepted = broker.complete(
+                    body["job_id"], body["token"], body["outcome"], body.get("record"), body.get("message")
+                )
+                self._reply(200, {"ok": accepted})
+            else:
+                self._reply(404, {"error": "not found"})
+        except (ValueError, KeyError, TypeError) as e:
+            self._reply(400, {"error": f"bad request: {e}"})
+
+    def _authorized(self) -> bool:
+        secret = self.server.secret
+        if secret and not hmac.compare_digest(self.headers.get(SECRET_HEADER, ""), secret):
+            self._reply(403, {"error": "forbidden"})
+            return False
+        return True
+
+    def _reply(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # noqa: A002 - BaseHTTPRequestHandler signature
+        logger.debug(f"Broker {self.address_string()}: {format % args}")
+
+
+class _BrokerHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], broker: JobBroker, secret: str | None):
+        super().__init__(address, _BrokerRequestHandler)
+        self.broker = broker
+        self.secret = secret
+
+
+class BrokerServer:
+    """Serve a JobBroker over HTTP on a background thread."""
+
+    def __init__(self, broker: JobBroker, host: str, port: int, secret: str | None = None):
+        self._httpd = _BrokerHTTPServer((host, port), broker, secret)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="job-broker", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "BrokerServer":
+        self._thread.start()
+        logger.info(f"Job broker listening on {self.url}")
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class BrokerClient:
+    """Node-side client for a coordinator's BrokerServer."""
+
+    def __init__(self, url: str, secret: str | None = None, timeout: float = BROKER_REQUEST_TIMEOUT_SEC):
+        self.url = url.rstrip("/")
+        self._secret = secret
+        self._timeout = timeout
+
+    def claim(self, node: str) -> dict[str, Any]:
+        return self._request("/claim", {"node": node})
+
+    def heartbeat(self, job_id: str, token: str, progress: dict | None = None) -> bool:
+        return bool(self._request("/heartbeat", {"job_id": job_id, "token": token, "progress": progress}).get("ok"))
+
+    def complete(
+        self, job_id: str, token: str, outcome: str, record: dict | None = None, message: str | None = None
+    ) -> bool:
+        payload = {"job_id": job_id, "token": token, "outcome": outcome, "record": record, "message": message}
+        return bool(self._request("/complete", payload).get("ok"))
+
+    def status(self) -> dict[str, Any]:
+        return self._request("/status", None)
+
+    def _request(self, path: str, payload: dict | None) -> dict[str, Any]:
+        """Send one request (POST with a JSON body, GET without).
+
+        Raises:
+            BrokerError: If the coordinator is unreachable or rejects the request.
+        """
+        data = json.dumps(payload, default=str).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"}
+        if self._secret:
+            headers[SECRET_HEADER] = self._secret
+        request = urllib.request.Request(self.url + path, data=data, headers=headers)  # noqa: S310 - user-configured broker URL
+        try:
+            with urllib.request.urlopen(request, timeout=self._timeout) as response:  # noqa: S310
+                return json.loads(response.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            raise BrokerError(f"Coordinator rejected {path}: HTTP {e.code}") from e
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            raise BrokerError(f"Coordinator request {path} failed: {e}") from e
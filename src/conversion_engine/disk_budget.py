@@ -0,0 +1,251 @@
+# src/conversion_engine/disk_budget.py
+"""
+Disk-space admission control for encodes.
+
+Nothing used to check free space before an encode, so a full output volume
+failed a file hours in - and in suffix and separate-folder modes the originals
+and the outputs coexist. Before a file queues for an encode slot, the worker
+now reserves its predicted output size (times DISK_RESERVATION_MARGIN) on the
+output volume:
+
+- the reservation fits when the volume's free space, minus what running jobs
+  have reserved but not yet written, keeps DISK_MIN_FREE_BYTES
+- a file that does not fit waits while other jobs hold reservations on the
+  same volume (they may finish, or replace their originals), and fails with
+  an "insufficient_space" OutputFileError only if it cannot fit on its own
+- reservations are released when the encode stage ends
+
+Every change is reported as a list of VolumeBudgets so the front end can show
+the budget across concurrent jobs.
+"""
+
+import contextlib
+import logging
+import os
+import shutil
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any
+
+from src.ab_av1.exceptions import OutputFileError
+from src.config import (
+    DEFAULT_REDUCTION_ESTIMATE_PERCENT,
+    DISK_ADMISSION_POLL_SEC,
+    DISK_MIN_FREE_BYTES,
+    DISK_RESERVATION_MARGIN,
+    STAGING_COPY_SUFFIX,
+)
+from src.models import FileRecord
+from src.privacy import anonymize_filename
+from src.utils import format_file_size
+
+from .scheduler import ConversionJob
+
+logger = logging.getLogger(__name__)
+
+
+def predict_output_size(record: FileRecord | None, input_size: int, searched_size: int | None = None) -> int:
+    """Predict a file's output size, best prediction first.
+
+    Args:
+        record: The file's history record (None if unknown).
+        input_size: Input file size in bytes.
+        searched_size: predicted_output_size of a crf-search that just ran.
+
+    Returns:
+        Predicted output bytes: the crf-search prediction, else the record's
+        predicted or similar-files reduction, else DEFAULT_REDUCTION_ESTIMATE_PERCENT.
+    """
+    if searched_size is not None:
+        return searched_size
+    if record is not None:
+        if record.predicted_output_size is not None:
+            return record.predicted_output_size
+        for percent in (record.predicted_size_reduction, record.estimated_reduction_percent):
+            if percent is not None:
+                return int(input_size * max(0.0, 100 - percent) / 100)
+    return int(input_size * (100 - DEFAULT_REDUCTION_ESTIMATE_PERCENT) / 100)
+
+
+@dataclass(frozen=True)
+class VolumeBudget:
+    """Space budget of one output volume with reservations."""
+
+    path: str  # Output folder of a job reserving on the volume
+    free_bytes: int
+    reserved_bytes: int  # Reserved by running jobs and not yet written
+    jobs: int
+
+    @property
+    def available_bytes(self) -> int:
+        """Space a new reservation may still take."""
+        return max(0, self.free_bytes - self.reserved_bytes - DISK_MIN_FREE_BYTES)
+
+
+def describe_budget(volumes: list[VolumeBudget]) -> str:
+    """One-line summary of the tightest volume ("" when nothing is reserved)."""
+    if not volumes:
+        return ""
+    tightest = min(volumes, key=lambda v: v.available_bytes)
+    return (
+        f"Output disk: {format_file_size(tightest.free_bytes)} free, "
+        f"{format_file_size(tightest.reserved_bytes)} reserved by {tightest.jobs} job(s)"
+    )
+
+
+@dataclass(eq=False)
+class _Reservation:
+    folder: str
+    volume: int  # st_dev of the output folder
+    output_path: str
+    size: int
+    preexisting: bool  # A file was already at output_path (its size says nothing about progress)
+
+    def outstanding(self) -> int:
+        """Reserved bytes not yet written to the output (or its staging copy)."""
+        if self.preexisting:
+            return self.size
+        written = 0
+        for path in (self.output_path, self.output_path + STAGING_COPY_SUFFIX):
+            with contextlib.suppress(OSError):
+                written += os.path.getsize(path)
+        return max(0, self.size - written)
+
+
+def _existing_folder(path: str) -> str:
+    """Nearest existing folder of path (separate-folder outputs may not exist yet)."""
+    folder = os.path.dirname(os.path.abspath(path))
+    while not os.path.isdir(folder) and os.path.dirname(folder) != folder:
+        folder = os.path.dirname(folder)
+    return folder
+
+
+class DiskSpaceBudget:
+    """Per-volume output space reservations of one worker run.
+
+    Thread-safe: every job thread of the run shares one budget. on_change
+    receives the budget of every volume with reservations after each change.
+    Free space and written bytes are read outside the lock; the lock only
+    guards the reservation table.
+    """
+
+    def __init__(
+        self,
+        on_change: Callable[[list[VolumeBudget]], Any] | None = None,
+        disk_usage: Callable[[str], Any] = shutil.disk_usage,
+    ):
+        self._on_change = on_change
+        self._disk_usage = disk_usage
+        self._changed = threading.Condition()
+        self._reservations: dict[int, _Reservation] = {}
+        self._generation = 0  # Bumped on every reservation change
+
+    @contextmanager
+    def reservation(
+        self, job: ConversionJob, output_path: str, predicted_size: int, stop_event: threading.Event
+    ) -> Iterator[bool]:
+        """Hold space for job's output for the duration of the block.
+
+        Waits while the output does not fit and other jobs hold reservations
+        on its volume; the block receives False (nothing reserved) if
+        stop_event was set while waiting.
+
+        Raises:
+            OutputFileError: If the output cannot fit even with no other
+                reservations on the volume (error_type "insufficient_space").
+        """
+        reserved = self._reserve(job, output_path, predicted_size, stop_event)
+        try:
+            yield reserved
+        finally:
+            if reserved:
+                self.release(job)
+
+    def _reserve(self, job: ConversionJob, output_path: str, predicted_size: int, stop_event: threading.Event) -> bool:
+        size = int(predicted_size * DISK_RESERVATION_MARGIN)
+        folder = _existing_folder(output_path)
+        anonymized = anonymize_filename(job.file_path)
+        deferred = False
+        try:
+            volume = os.stat(folder).st_dev
+        except OSError:
+            logger.warning(f"Cannot check free space in {folder}; encoding {anonymized} unchecked")
+            return True
+        preexisting = os.path.exists(output_path)
+        while True:
+            # Measure outside the lock (a slow share must not stall the other jobs),
+            # then compare and record under it unless the reservations changed meanwhile
+            with self._changed:
+                generation = self._generation
+                others = [r for r in self._reservations.values() if r.volume == volume]
+            try:
+                free = self._disk_usage(folder).free
+            except OSError:
+                logger.warning(f"Cannot check free space in {folder}; encoding {anonymized} unchecked")
+                return True
+            available = free - sum(r.outstanding() for r in others) - DISK_MIN_FREE_BYTES
+            with self._changed:
+                if generation != self._generation:
+                    continue
+                if size <= available:
+                    self._reservations[job.job_id] = _Reservation(
+                        folder=folder, volume=volume, output_path=output_path, size=size, preexisting=preexisting
+                    )
+                    self._generation += 1
+                    break
+                if not others:
+                    raise OutputFileError(
+                        f"Not enough disk space for the output: needs about {format_file_size(size)}, "
+                        f"{format_file_size(max(0, free - DISK_MIN_FREE_BYTES))} available",
+                        error_type="insufficient_space",
+                    )
+                if not deferred:
+                    deferred = True
+                    logger.info(
+                        f"Deferring {anonymized}: needs about {format_file_size(size)} on the output disk, "
+                        f"{format_file_size(max(0, available))} left after {len(others)} running job(s)"
+                    )
+                self._changed.wait(DISK_ADMISSION_POLL_SEC)
+            if stop_event.is_set():
+                return False
+        logger.info(f"Reserved {format_file_size(size)} of output space for {anonymized}")
+        self._report(self.summary())
+        return True
+
+    def release(self, job: ConversionJob) -> None:
+        """Drop job's reservation (its output is written or abandoned)."""
+        with self._changed:
+            if self._reservations.pop(job.job_id, None) is None:
+                return
+            self._generation += 1
+            self._changed.notify_all()
+        self._report(self.summary())
+
+    def summary(self) -> list[VolumeBudget]:
+        """Budget of every volume with reservations."""
+        by_volume: dict[int, list[_Reservation]] = {}
+        with self._changed:
+            for reservation in self._reservations.values():
+                by_volume.setdefault(reservation.volume, []).append(reservation)
+        volumes = []
+        for reservations in by_volume.values():
+            folder = reservations[0].folder
+            try:
+                free = self._disk_usage(folder).free
+            except OSError:
+                continue
+            volumes.append(
+                VolumeBudget(
+                    path=folder,
+                    free_bytes=free,
+                    reserved_bytes=sum(r.outstanding() for r in reservations),
+                    jobs=len(reservations),
+                )
+            )
+        return volumes
+
+    def _report(self, volumes: list[VolumeBudget]) -> None:
+        if self._on_change is not None:
+            self._on_change(volumes)
@@ -0,0 +1,84 @@
+# src/conversion_engine/events.py
+"""
+Event-sink interface between the queue conversion worker and its front end.
+
+The worker never touches widgets: everything it reports - file events, queue
+item progress, the current-file panel, session statistics and completion -
+goes through a ConversionEventSink. The GUI implements it on top of the Tk
+event loop (src/gui/conversion_controller.py); the headless runner
+(src/headless.py) prints the same events as JSON lines.
+"""
+
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any, Protocol
+
+from src.models import ConversionSessionState, QueueItem, QueueItemStatus
+
+if TYPE_CHECKING:
+    from .disk_budget import VolumeBudget
+    from .scheduler import ConversionJob, JobScheduler
+
+
+class ConversionEventSink(Protocol):
+    """Receiver of everything a queue conversion run reports.
+
+    Threading contract: file_event, queue_status, next_item, process_started
+    and scheduler_started are called directly on worker and job threads.
+    session is only mutated inside functions passed to call(), which runs
+    them on the sink's owner thread (the Tk main loop for the GUI) so
+    statistics updates never race. job_shown, status, file_outcome,
+    disk_budget and finished are always invoked through call().
+    """
+
+    @property
+    def session(self) -> ConversionSessionState:
+        """Statistics of the running queue (counters, totals, current file)."""
+        ...
+
+    def call(self, fn: Callable[..., Any], *args: Any) -> None:
+        """Run fn(*args) on the sink's owner thread (may return before it runs)."""
+        ...
+
+    def file_event(self, filename: str, status: str, info: Any = None) -> None:
+        """One file event ("starting", "progress", "completed", "failed", "skipped", ...)."""
+        ...
+
+    def queue_status(self, item_id: str, status: QueueItemStatus, processed: int, total: int) -> None:
+        """A queue item's status or file counters changed (read-only view of the item)."""
+        ...
+
+    def next_item(self) -> tuple[QueueItem | None, int, bool]:
+        """Claim the next pending queue item.
+
+        Returns:
+            (item or None when the queue is exhausted, remaining pending count, timed_out)
+        """
+        ...
+
+    def job_shown(self, job: "ConversionJob") -> None:
+        """job became the one whose progress the current-file display follows."""
+        ...
+
+    def status(self, text: str) -> None:
+        """Overall status line (e.g. "File 3/10", running totals)."""
+        ...
+
+    def file_outcome(self, file_path: str, outcome: str) -> None:
+        """A file's history record was saved; outcome is "done" or "skip"."""
+        ...
+
+    def disk_budget(self, volumes: "list[VolumeBudget]") -> None:
+        """Output space reservations changed; volumes is empty when none are held."""
+        ...
+
+    def process_started(self, pid: int, file_path: str) -> None:
+        """An ab-av1 process was started for file_path."""
+        ...
+
+    def scheduler_started(self, scheduler: "JobScheduler") -> None:
+        """The run's scheduler exists (force-stop reaches every job through it)."""
+        ...
+
+    def finished(self, message: str) -> None:
+        """The worker is done; message is the final status."""
+        ...
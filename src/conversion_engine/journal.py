@@ -0,0 +1,490 @@
+# src/conversion_engine/journal.py
+"""
+Write-ahead journal of conversion jobs, for recovery after a crash.
+
+The queue itself is only saved with the GUI config, and history records are
+flushed with a debounce, so a crash (or power loss) mid-run used to leave
+half-written outputs and ab-av1 temp folders behind and could lose the last
+records. The worker now appends every job's lifecycle to a journal and fsyncs
+each entry before doing the work it describes:
+
+    {"op": "start", "job": "3f2a91c0-7", "file": "/v/a.mp4", "item": "<queue item id>"}
+    {"op": "stage", "job": "3f2a91c0-7", "stage": "encode", "work_dir": "/v",
+     "scratch_dir": null, "output": "/v/a_av1.mkv", "output_stat": null}
+    {"op": "record", "job": "3f2a91c0-7", "record": {...history record...}}
+    {"op": "commit", "job": "3f2a91c0-7"}   (or "abort")
+
+A job that aborts rolls back its own partial output. At startup,
+recover_interrupted_jobs() replays the journal: jobs without a commit or abort
+are rolled back (partial output and temp folders removed), journaled records
+newer than history are restored, and the journal is emptied. The queue then
+resumes from the saved queue items reconciled with history - folders are not
+rescanned and files are not probed.
+
+Each journal is held under an exclusive OS lock (JournalLock) for as long as
+its process runs; the OS drops the lock however the process ends. A second
+converting process on the same installation (the GUI next to a headless run,
+or a coordinator and a node on one host) finds the lock taken and writes a
+journal of its own beside it, and recovery skips every journal whose lock is
+still held - including the temp folders of that process's open jobs - so it
+never rolls back work that is still running. The journal holds full paths
+(needed for rollback) and is truncated once a run's records are safely in
+history.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from src.ab_av1.cleaner import clean_ab_av1_temp_folders
+from src.cache_helpers import mtimes_match
+from src.config import (
+    CHUNKED_WORK_DIR_PREFIX,
+    JOB_JOURNAL_FILE,
+    JOB_JOURNAL_LOCK_SUFFIX,
+    STAGING_COPY_SUFFIX,
+    STAGING_DIR_PREFIX,
+)
+from src.history_index import get_history_index, record_from_dict, record_to_dict
+from src.logging_setup import get_script_directory
+from src.models import FileRecord
+from src.privacy import anonymize_filename
+
+from .scheduler import ConversionJob
+
+logger = logging.getLogger(__name__)
+
+
+def get_journal_path() -> str:
+    """Get the path to the job journal (next to the history file)."""
+    return os.path.join(get_script_directory(), JOB_JOURNAL_FILE)
+
+
+def _sibling_journal_paths(path: str) -> list[str]:
+    """Journals other processes wrote beside path ("<stem>.<run id><ext>"), oldest name first."""
+    stem, ext = os.path.splitext(path)
+    return sorted(str(p) for p in Path(path).parent.glob(f"{Path(stem).name}.*{ext}"))
+
+
+class JournalLock:
+    """Exclusive, non-blocking OS lock on a journal, held by the process using it.
+
+    The lock is taken on a "<journal>.lock" file (never read or written), so
+    the journal itself stays readable on Windows, where byte-range locks
+    block other readers. The OS releases it when the process exits, so a lock
+    that cannot be taken means a live process owns the journal.
+    """
+
+    def __init__(self, journal_path: str):
+        self.path = journal_path + JOB_JOURNAL_LOCK_SUFFIX
+        self._file = None
+
+    def acquire(self) -> bool:
+        """Take the lock; False if another process holds it (or it cannot be created)."""
+        try:
+            lock_file = open(self.path, "a+b")  # noqa: SIM115 - held until release()
+        except OSError:
+            logger.exception(f"Cannot open job journal lock {self.path}")
+            return False
+        try:
+            if sys.platform == "win32":
+                import msvcrt  # noqa: PLC0415 - Windows only
+
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl  # noqa: PLC0415 - POSIX only
+
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+
+    def release(self, remove: bool = False) -> None:
+        """Drop the lock; remove deletes the lock file too (only for journals named per run)."""
+        if self._file is None:
+            return
+        with contextlib.suppress(OSError):
+            self._file.close()
+        self._file = None
+        if remove:
+            with contextlib.suppress(OSError):
+                os.remove(self.path)
+
+
+@dataclass
+class JournalJob:
+    """A job's state as replayed from the journal."""
+
+    key: str
+    file_path: str
+    queue_item_id: str | None = None
+    stage: str | None = None
+    work_dirs: set[str] = field(default_factory=set)  # Where ab-av1 / chunk / staging temp folders appear
+    output_path: str | None = None  # Output written by the encode stage (None: never, or same as input)
+    output_stat: tuple[int, float] | None = None  # (size, mtime) of a file already at output_path
+    partial_path: str | None = None  # Staging copy beside the output (also set when output is the input)
+    record: dict | None = None  # Latest history record written for the file
+    finished: bool = False
+
+
+@dataclass
+class RecoveryReport:
+    """What recover_interrupted_jobs() found and undid."""
+
+    interrupted: list[str] = field(default_factory=list)  # Source paths of jobs a crash left open
+    removed_outputs: list[str] = field(default_factory=list)
+    cleaned_folders: int = 0
+    restored_records: int = 0
+
+
+def _stat_key(path: str) -> tuple[int, float] | None:
+    try:
+        stat_info = os.stat(path)
+    except OSError:
+        return None
+    return stat_info.st_size, stat_info.st_mtime
+
+
+def roll_back_output(job: JournalJob) -> bool:
+    """Remove the partial output an unfinished encode left behind.
+
+    Only a file the encode created or replaced is removed: a file that was
+    already at the output path and still has its old size and mtime is kept,
+    and nothing is removed once the source is gone (REPLACE mode deletes the
+    original only after a finished encode, so the output is then the only copy).
+    An unfinished staging copy ("<output>.partial") is always removed, also
+    when the output replaces the input in place.
+
+    Returns:
+        True if the output itself was removed.
+    """
+    if job.partial_path:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(job.partial_path)
+    output_path = job.output_path
+    if not output_path:
+        return False
+    if not os.path.exists(job.file_path):
+        return False
+    current = _stat_key(output_path)
+    if current is None:
+        return False
+    if (
+        job.output_stat is not None
+        and current[0] == job.output_stat[0]
+        and mtimes_match(current[1], job.output_stat[1])
+    ):
+        return False
+    try:
+        os.remove(output_path)
+    except OSError as e:
+        logger.warning(f"Could not remove partial output {anonymize_filename(output_path)}: {e}")
+        return False
+    logger.info(f"Removed partial output {anonymize_filename(output_path)}")
+    return True
+
+
+def _clean_work_dir(work_dir: str) -> int:
+    """Remove ab-av1, chunked-encode and staging temp folders from a directory."""
+    cleaned = clean_ab_av1_temp_folders(work_dir) if os.path.isdir(work_dir) else 0
+    for prefix in (CHUNKED_WORK_DIR_PREFIX, STAGING_DIR_PREFIX):
+        for temp_dir in Path(work_dir).glob(f"{prefix}*"):
+            if temp_dir.is_dir():
+                shutil.rmtree(temp_dir, ignore_errors=True)
+                cleaned += 1
+    return cleaned
+
+
+class JobJournal:
+    """Append-only journal the worker writes each job's lifecycle to.
+
+    With path None nothing is written, but aborted jobs still roll back their
+    partial output. When another live process holds the journal at path, this
+    run writes "<stem>.<run id><ext>" beside it instead. Thread-safe: every job
+    thread of a run shares one journal. Journal write errors are logged and
+    never fail a conversion.
+    """
+
+    def __init__(self, path: str | None):
+        self._run_id = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._jobs: dict[int, JournalJob] = {}
+        self._file = None
+        self._file_lock: JournalLock | None = None
+        self._per_run = False
+        if path:
+            path = self._open(path)
+        self.path = path
+
+    def _open(self, path: str) -> str | None:
+        """Lock and open the journal (or this run's own one beside it); returns the path written."""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        except OSError:
+            logger.exception(f"Cannot create the job journal folder for {path}; running without crash recovery")
+            return None
+        file_lock = JournalLock(path)
+        if not file_lock.acquire():
+            stem, ext = os.path.splitext(path)
+            path = f"{stem}.{self._run_id}{ext}"
+            logger.info(f"Job journal in use by another process; journaling this run to {path}")
+            file_lock = JournalLock(path)
+            self._per_run = True
+            if not file_lock.acquire():
+                logger.warning(f"Cannot lock job journal {path}; running without crash recovery")
+                return None
+        try:
+            self._file = open(path, "a", encoding="utf-8")  # noqa: SIM115 - held for the run
+        except OSError:
+            logger.exception(f"Cannot open job journal {path}; running without crash recovery")
+            file_lock.release(remove=self._per_run)
+            return None
+        self._file_lock = file_lock
+        return path
+
+    def _append(self, entry: dict[str, Any]) -> None:
+        if self._file is None:
+            return
+        try:
+            self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except OSError:
+            logger.exception("Failed to write job journal entry")
+
+    def begin(self, job: ConversionJob) -> None:
+        """Journal a job's start (before any work on its file)."""
+        entry = JournalJob(key=f"{self._run_id}-{job.job_id}", file_path=job.file_path, queue_item_id=job.queue_item.id)
+        with self._lock:
+            self._jobs[job.job_id] = entry
+            self._append({"op": "start", "job": entry.key, "file": entry.file_path, "item": entry.queue_item_id})
+
+    def stage(
+        self, job: ConversionJob, stage: str, output_path: str | None = None, scratch_dir: str | None = None
+    ) -> None:
+        """Journal a job entering a stage.
+
+        Args:
+            job: The job.
+            stage: SEARCH_STAGE or ENCODE_STAGE.
+            output_path: File the stage writes.
+            scratch_dir: Staging folder the stage may encode in instead.
+        """
+        with self._lock:
+            entry = self._jobs.get(job.job_id)
+            if entry is None:
+                return
+            entry.stage = stage
+            work_dir = os.path.dirname(output_path or entry.file_path)
+            entry.work_dirs.add(work_dir)
+            if scratch_dir:
+                entry.work_dirs.add(scratch_dir)
+            if output_path:
+                entry.partial_path = output_path + STAGING_COPY_SUFFIX
+            if output_path and os.path.abspath(output_path) != os.path.abspath(entry.file_path):
+                entry.output_path = output_path
+                entry.output_stat = _stat_key(output_path)
+            self._append(
+                {
+                    "op": "stage",
+                    "job": entry.key,
+                    "stage": stage,
+                    "work_dir": work_dir,
+                    "scratch_dir": scratch_dir,
+                    "output": entry.output_path,
+                    "output_stat": entry.output_stat,
+                    "partial": entry.partial_path,
+                }
+            )
+
+    def record(self, job: ConversionJob, record: FileRecord) -> None:
+        """Journal a history record before it goes into the (debounced) history index."""
+        with self._lock:
+            entry = self._jobs.get(job.job_id)
+            if entry is not None:
+                self._append({"op": "record", "job": entry.key, "record": record_to_dict(record)})
+
+    def commit(self, job: ConversionJob) -> None:
+        """Journal a job that finished with its output (or verdict) in place."""
+        with self._lock:
+            entry = self._jobs.pop(job.job_id, None)
+            if entry is not None:
+                self._append({"op": "commit", "job": entry.key})
+
+    def abort(self, job: ConversionJob) -> None:
+        """Roll back a stopped or failed job's partial output, then journal the abort."""
+        with self._lock:
+            entry = self._jobs.pop(job.job_id, None)
+        if entry is None:
+            return
+        roll_back_output(entry)
+        with self._lock:
+            self._append({"op": "abort", "job": entry.key})
+
+    def close(self) -> None:
+        """Close the journal; empty it when no job is left open.
+
+        Call after the history index has been saved: the journaled records of
+        finished jobs are only dropped here.
+        """
+        with self._lock:
+            if self._file is None:
+                return
+            clean = not self._jobs
+            with contextlib.suppress(OSError):
+                if clean:
+                    self._file.truncate(0)
+                self._file.close()
+            self._file = None
+            if clean and self._per_run:
+                with contextlib.suppress(OSError):
+                    os.remove(self.path)
+            # A journal left with open jobs keeps its lock file for recovery to take
+            self._file_lock.release(remove=clean and self._per_run)
+            self._file_lock = None
+
+
+def read_journal(path: str) -> dict[str, JournalJob]:
+    """Replay a journal file into per-job state, in start order.
+
+    Unreadable lines (e.g. the last one, torn by the crash) are skipped.
+    """
+    jobs: dict[str, JournalJob] = {}
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            try:
+                entry = json.loads(line)
+                op, key = entry["op"], entry["job"]
+                if op == "start":
+                    jobs[key] = JournalJob(key=key, file_path=entry["file"], queue_item_id=entry.get("item"))
+                    continue
+                job = jobs[key]
+                if op == "stage":
+                    job.stage = entry["stage"]
+                    job.work_dirs.add(entry["work_dir"])
+                    if entry.get("scratch_dir"):
+                        job.work_dirs.add(entry["scratch_dir"])
+                    if entry.get("output"):
+                        job.output_path = entry["output"]
+                        stat = entry.get("output_stat")
+                        job.output_stat = (stat[0], stat[1]) if stat else None
+                    if entry.get("partial"):
+                        job.partial_path = entry["partial"]
+                elif op == "record":
+                    job.record = entry["record"]
+                elif op in {"commit", "abort"}:
+                    job.finished = True
+            except (ValueError, KeyError, TypeError, IndexError):
+                logger.warning(f"Skipping unreadable job journal line {line_number}")
+    return jobs
+
+
+def _restore_record(record_dict: dict) -> bool:
+    """Upsert a journaled record unless history already has one at least as new."""
+    try:
+        record = record_from_dict(record_dict)
+    except (TypeError, ValueError, KeyError):
+        logger.warning("Ignoring malformed journaled history record", exc_info=True)
+        return False
+    index = get_history_index()
+    existing = index.get(record.path_hash)
+    if existing is not None and (existing.last_updated or "") >= (record.last_updated or ""):
+        return False
+    index.upsert(record)
+    return True
+
+
+def _open_work_dirs(path: str) -> set[str]:
+    """Work folders of the jobs a live process's journal still has open."""
+    try:
+        jobs = read_journal(path)
+    except OSError:
+        return set()
+    return set().union(*(job.work_dirs for job in jobs.values() if not job.finished))
+
+
+def recover_interrupted_jobs(path: str | None = None) -> RecoveryReport:
+    """Undo what a crashed run left behind, before the queue is loaded.
+
+    Replays the journal at path and every per-run journal beside it whose lock
+    is free (a held lock means its process is still converting). Rolls back
+    every job they show as started but never committed or aborted, restores
+    journaled records the history file is missing, saves history and deletes
+    the replayed journals. Temp folders of a live process's open jobs are
+    never swept.
+
+    Args:
+        path: Journal file; defaults to get_journal_path().
+
+    Returns:
+        What was recovered (empty when the last run ended cleanly).
+    """
+    path = path or get_journal_path()
+    report = RecoveryReport()
+    stale: list[tuple[str, JournalLock]] = []
+    live_dirs: set[str] = set()
+    candidates = [path] if os.path.exists(path) else []
+    for journal_path in candidates + _sibling_journal_paths(path):
+        file_lock = JournalLock(journal_path)
+        if file_lock.acquire():
+            stale.append((journal_path, file_lock))
+        else:
+            logger.info(f"Job journal {journal_path} belongs to a running conversion; not recovering it")
+            live_dirs |= _open_work_dirs(journal_path)
+
+    for journal_path, file_lock in stale:
+        try:
+            _recover_journal(journal_path, report, live_dirs)
+        finally:
+            file_lock.release(remove=journal_path != path)
+
+    if report.restored_records:
+        get_history_index().save()
+    if report.interrupted or report.restored_records:
+        logger.info(
+            f"Recovered from an interrupted run: {len(report.interrupted)} job(s) rolled back, "
+            f"{len(report.removed_outputs)} partial output(s) and {report.cleaned_folders} temp folder(s) removed, "
+            f"{report.restored_records} history record(s) restored"
+        )
+    return report
+
+
+def _recover_journal(path: str, report: RecoveryReport, live_dirs: set[str]) -> None:
+    """Replay one unlocked journal into report, then delete it."""
+    try:
+        jobs = read_journal(path)
+    except OSError:
+        logger.exception(f"Cannot read job journal {path}")
+        return
+
+    work_dirs: set[str] = set()
+    for job in jobs.values():
+        if job.record is not None and _restore_record(job.record):
+            report.restored_records += 1
+        if job.finished:
+            continue
+        report.interrupted.append(job.file_path)
+        logger.warning(
+            f"Rolling back interrupted job ({job.stage or 'not started'}): {anonymize_filename(job.file_path)}"
+        )
+        if roll_back_output(job):
+            report.removed_outputs.append(job.output_path)
+        work_dirs |= job.work_dirs
+    for work_dir in sorted(work_dirs - live_dirs):
+        report.cleaned_folders += _clean_work_dir(work_dir)
+
+    try:
+        os.remove(path)
+    except OSError:
+        logger.exception(f"Cannot remove job journal {path}")
@@ -0,0 +1,431 @@
+# src/conversion_engine/scheduler.py
+"""
+Concurrent job scheduling for queue conversions.
+
+The queue worker runs every file as a ConversionJob on its own thread.
+JobScheduler bounds how many jobs are in flight, limits each pipeline stage
+(CRF search, encode) to its own number of ab-av1 processes, and decides which
+job drives the single "current file" panel; QueueItemTracker serializes the
+counters that concurrent jobs of one folder item update.
+"""
+
+import itertools
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+from src.ab_av1.stats import InputProbe
+from src.config import CORES_PER_ENCODE_JOB, MAX_CONCURRENT_JOBS
+from src.models import ProgressEvent, QueueItem, QueueItemStatus
+
+logger = logging.getLogger(__name__)
+
+_SLOT_POLL_SECONDS = 0.2  # How often a thread waiting for a free slot re-checks the stop event
+
+# Pipeline stages: CRF search runs ahead on upcoming files while earlier files encode
+SEARCH_STAGE = "search"
+BATCH_SEARCH_STAGE = "batch-search"  # Searches of short clips (see batch_search.py)
+ENCODE_STAGE = "encode"
+
+
+def resolve_job_count(requested: int, cpu_count: int | None = None, cores_per_job: int = CORES_PER_ENCODE_JOB) -> int:
+    """Turn a "parallel jobs" setting into a concrete job count.
+
+    Args:
+        requested: User setting; 0 (CONCURRENT_JOBS_AUTO) derives the count from CPU cores.
+        cpu_count: Logical CPU count (defaults to os.cpu_count()).
+        cores_per_job: Cores one job of this kind keeps busy (for the automatic count).
+
+    Returns:
+        Number of jobs to run concurrently, between 1 and MAX_CONCURRENT_JOBS.
+    """
+    if requested <= 0:
+        cores = cpu_count or os.cpu_count() or 1
+        requested = cores // cores_per_job
+    return max(1, min(MAX_CONCURRENT_JOBS, requested))
+
+
+class JobCancelEvent(threading.Event):
+    """Per-job cancel flag that also reads as set once its parent event is set.
+
+    The ab-av1 runner only polls is_set(), so a single job can be cancelled on
+    its own while a global force-stop still reaches every job.
+    """
+
+    def __init__(self, parent: threading.Event | None = None):
+        super().__init__()
+        self._parent = parent
+
+    def is_set(self) -> bool:
+        return super().is_set() or (self._parent is not None and self._parent.is_set())
+
+
+@dataclass(eq=False)
+class ConversionJob:
+    """One file being processed by a scheduler thread."""
+
+    job_id: int
+    queue_item: QueueItem
+    file_index: int
+    file_path: str
+    cancel_event: JobCancelEvent
+    start_time: float = field(default_factory=time.time)
+    pids: list[int] = field(default_factory=list)  # Processes of the job's current stage (force-stop, governor)
+    stage: str | None = None  # Pipeline stage whose slot the job holds
+    borrowed_slots: int = 0  # Extra slots of that stage taken by borrow_stage_slots()
+    progress: ProgressEvent | None = None  # Latest progress, replayed when the job becomes the display job
+    original_size: int | None = None
+    probe: InputProbe | None = None  # The file's ffprobe result, handed to its search and encode
+    verify_quality: bool = False  # Quality check forced on: the file is a trial of a distrusted CRF source
+    # NOT_WORTHWHILE verdict reported through this job's file callback
+    skip_reason: str | None = None
+    min_vmaf_attempted: int | None = None
+
+
+class JobScheduler:
+    """Run conversion jobs on their own threads, at most max_jobs at a time.
+
+    Jobs move through named stages (see stage()), each with its own slot
+    limit, so a file's CRF search can run while earlier files encode without
+    oversubscribing either kind of work. max_jobs bounds how far the search
+    stage can run ahead of the encode stage.
+
+    The oldest active job is the "display job" whose progress drives the
+    current-file panel; when it finishes, on_display_change is called with the
+    next oldest so the panel follows a job that is still running.
+    """
+
+    def __init__(
+        self,
+        max_jobs: int,
+        on_display_change: Callable[[ConversionJob], Any] | None = None,
+        stage_limits: dict[str, int] | None = None,
+    ):
+        self.max_jobs = max(1, max_jobs)
+        self._on_display_change = on_display_change
+        self._slots = threading.Semaphore(self.max_jobs)
+        self._stage_limits = {name: max(1, limit) for name, limit in (stage_limits or {}).items()}
+        self._stage_slots = {name: threading.Semaphore(limit) for name, limit in self._stage_limits.items()}
+        self._held_slots = dict.fromkeys(self._stage_limits, 0)  # Slots kept from jobs by hold_stage_slots()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._active: dict[int, ConversionJob] = {}  # Insertion order = start order
+
+    def reserve(self, stop_event: threading.Event) -> bool:
+        """Block until a job slot is free.
+
+        Returns:
+            True with a slot held for the next start(), or False (no slot held)
+            if stop_event was set while waiting.
+        """
+        while not self._slots.acquire(timeout=_SLOT_POLL_SECONDS):
+            if stop_event.is_set():
+                return False
+        if stop_event.is_set():
+            self._slots.release()
+            return False
+        return True
+
+    def wait_for_free_slot(self, stop_event: threading.Event) -> bool:
+        """Block until a job slot is free, without taking it.
+
+        Lets the dispatching thread fetch work only once it can be admitted;
+        jobs only ever give slots back, so the slot is still free for the
+        reserve() that follows from the same thread.
+
+        Returns:
+            True once a slot is free, False if stop_event was set while waiting.
+        """
+        if not self.reserve(stop_event):
+            return False
+        self._slots.release()
+        return True
+
+    @contextmanager
+    def stage(self, name: str, job: ConversionJob, stop_event: threading.Event) -> Iterator[bool]:
+        """Hold one of stage name's slots for the duration of the block.
+
+        A free slot is always taken, so a job that reaches a stage with capacity
+        to spare finishes it even after a graceful stop. A job that has to wait
+        gives up when stop_event is set and the block receives False (no slot held).
+        Stages without a configured limit are unbounded.
+        """
+        slots = self._stage_slots.get(name)
+        if slots is None:
+            yield True
+            return
+        acquired = slots.acquire(blocking=False)
+        while not acquired and not stop_event.is_set():
+            acquired = slots.acquire(timeout=_SLOT_POLL_SECONDS)
+        if not acquired:
+            yield False
+            return
+        job.stage = name
+        try:
+            yield True
+        finally:
+            if job.stage == name:  # Not already given up by leave_stage()
+                self._release_stage(job, slots)
+
+    def borrow_stage_slots(self, job: ConversionJob, count: int) -> int:
+        """Take up to count more of the free slots of the stage job holds, without waiting.
+
+        Lets one job run several processes of its stage (e.g. the segment
+        encodes of a long file) while keeping the stage's limit: borrowed slots
+        are returned with the job's own slot.
+
+        Returns:
+            Number of slots borrowed (0 if none were free or job holds no slot).
+        """
+        slots = self._stage_slots.get(job.stage) if job.stage else None
+        if slots is None:
+            return 0
+        borrowed = 0
+        while borrowed < count and slots.acquire(blocking=False):
+            borrowed += 1
+        job.borrowed_slots += borrowed
+        return borrowed
+
+    def leave_stage(self, job: ConversionJob) -> None:
+        """Free the stage slot job holds (and any it borrowed) before its stage() block ends.
+
+        Called from the job's own thread, e.g. once its encoder has finished
+        and the output is only being copied, so the next encode can start.
+        """
+        name = job.stage
+        slots = self._stage_slots.get(name) if name else None
+        if slots is not None:
+            self._release_stage(job, slots)
+
+    @staticmethod
+    def _release_stage(job: ConversionJob, slots: threading.Semaphore) -> None:
+        slots.release(1 + job.borrowed_slots)
+        job.stage = None
+        job.borrowed_slots = 0
+
+    def hold_stage_slots(self, name: str, count: int) -> int:
+        """Keep count of stage name's slots away from jobs (0 gives them all back).
+
+        Used by the resource governor to lower a stage's concurrency without
+        stopping running jobs: free slots are taken at once, slots of running
+        jobs only as those jobs leave the stage, so call again (e.g. on every
+        governor sample) until the returned count reaches the target. At least
+        one slot is always left to jobs.
+
+        Returns:
+            Number of the stage's slots now held.
+        """
+        slots = self._stage_slots.get(name)
+        if slots is None:
+            return 0
+        target = max(0, min(count, self._stage_limits[name] - 1))
+        with self._lock:
+            held = self._held_slots[name]
+            while held > target:
+                slots.release()
+                held -= 1
+            while held < target and slots.acquire(blocking=False):
+                held += 1
+            self._held_slots[name] = held
+            return held
+
+    def stage_limit(self, name: str) -> int | None:
+        """Configured slot count of stage name (None: unbounded)."""
+        return self._stage_limits.get(name)
+
+    def start(
+        self,
+        queue_item: QueueItem,
+        file_index: int,
+        file_path: str,
+        cancel_parent: threading.Event | None,
+        target: Callable[[ConversionJob], Any],
+    ) -> ConversionJob:
+        """Start target(job) on a new thread, using the slot taken by reserve()."""
+        job = ConversionJob(
+            job_id=next(self._ids),
+            queue_item=queue_item,
+            file_index=file_index,
+            file_path=file_path,
+            cancel_event=JobCancelEvent(cancel_parent),
+        )
+        with self._lock:
+            self._active[job.job_id] = job
+        thread = threading.Thread(
+            target=self._run, args=(job, target), name=f"conversion-job-{job.job_id}", daemon=True
+        )
+        thread.start()
+        return job
+
+    def _run(self, job: ConversionJob, target: Callable[[ConversionJob], Any]) -> None:
+        try:
+            target(job)
+        except Exception:
+            logger.exception(f"Conversion job {job.job_id} crashed")
+        finally:
+            with self._lock:
+                was_display = self._display_job() is job
+                del self._active[job.job_id]
+                successor = self._display_job() if was_display else None
+                self._idle.notify_all()
+            self._slots.release()
+            if successor is not None and self._on_display_change:
+                self._on_display_change(successor)
+
+    def _display_job(self) -> ConversionJob | None:
+        return next(iter(self._active.values()), None)
+
+    def is_display_job(self, job: ConversionJob) -> bool:
+        """Whether job currently drives the current-file panel."""
+        with self._lock:
+            return self._display_job() is job
+
+    def active_jobs(self) -> list[ConversionJob]:
+        """Snapshot of running jobs, oldest first."""
+        with self._lock:
+            return list(self._active.values())
+
+    def wait_idle(self) -> None:
+        """Block until every started job has finished."""
+        with self._idle:
+            while self._active:
+                self._idle.wait()
+
+
+class QueueItemTracker:
+    """Thread-safe bookkeeping for the files of one queue item.
+
+    Jobs for files of the same folder item finish in any order on different
+    threads. Every counter update, and the queue_status_callback that reports
+    it, happens under one lock, so the queue tree never sees a half-applied
+    result and the item is finalized exactly once.
+    """
+
+    def __init__(self, queue_item: QueueItem, status_callback: Callable):
+        self.queue_item = queue_item
+        self._status_callback = status_callback
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._dispatch_closed = False
+        self._finalized = False
+
+    def begin(self) -> None:
+        """Reset the item's progress counters and report it as converting."""
+        with self._lock:
+            item = self.queue_item
+            item.processed_files = 0
+            item.files_succeeded = 0
+            item.files_skipped = 0
+            item.files_failed = 0
+            self._report(QueueItemStatus.CONVERTING)
+
+    def file_started(self, file_index: int) -> None:
+        """Record that a job for file_index was dispatched (call before starting it)."""
+        with self._lock:
+            self._in_flight += 1
+            self.queue_item.current_file_index = file_index
+            _set_file_status(self.queue_item, file_index, QueueItemStatus.CONVERTING)
+
+    def file_finished(
+        self,
+        file_index: int,
+        status: QueueItemStatus,
+        counter: str | None,
+        error_msg: str | None = None,
+        skip_reason: str | None = None,
+    ) -> bool:
+        """Record one file's outcome and report progress.
+
+        Args:
+            file_index: Index of the file within the queue item.
+            status: Final status for the file row.
+            counter: QueueItem outcome counter to bump ("files_succeeded",
+                "files_skipped", "files_failed"), or None for a stopped file.
+            error_msg: Error text for failed files (falls back to the item's last error).
+            skip_reason: Reason shown for skipped files.
+
+        Returns:
+            True exactly once, when this was the last outstanding file of an item
+            whose dispatch is closed; the caller then finalizes the item.
+        """
+        with self._lock:
+            item = self.queue_item
+            item.processed_files += 1
+            if counter:
+                setattr(item, counter, getattr(item, counter) + 1)
+            if counter == "files_failed":
+                error_msg = error_msg or item.last_error or "Processing failed (see logs for details)"
+                item.last_error = error_msg
+            _set_file_status(item, file_index, status, error_msg, skip_reason)
+            self._report(QueueItemStatus.CONVERTING)
+            self._in_flight -= 1
+            return self._claim_finalize()
+
+    def mark_stopped(self, from_index: int) -> int:
+        """Mark files that were never dispatched as stopped; returns how many."""
+        with self._lock:
+            remaining = self.queue_item.files[from_index:]
+            for file_item in remaining:
+                file_item.status = QueueItemStatus.STOPPED
+            return len(remaining)
+
+    def close_dispatch(self) -> bool:
+        """Record that no more files will be dispatched for this item.
+
+        Returns:
+            True if no jobs are outstanding and the caller should finalize the item.
+        """
+        with self._lock:
+            self._dispatch_closed = True
+            return self._claim_finalize()
+
+    def finalize(self, stopped: bool) -> None:
+        """Set the item's final status (STOPPED if stopped before all files finished)."""
+        with self._lock:
+            item = self.queue_item
+            if stopped and item.processed_files < item.total_files:
+                item.status = QueueItemStatus.STOPPED
+            else:
+                item.status = QueueItemStatus.COMPLETED
+            self._report(item.status)
+
+    def _claim_finalize(self) -> bool:
+        if self._dispatch_closed and self._in_flight == 0 and not self._finalized:
+            self._finalized = True
+            return True
+        return False
+
+    def _report(self, status: QueueItemStatus) -> None:
+        item = self.queue_item
+        self._status_callback(item.id, status, item.processed_files, item.total_files)
+
+
+def _set_file_status(
+    queue_item: QueueItem,
+    file_index: int,
+    status: QueueItemStatus,
+    error_msg: str | None = None,
+    skip_reason: str | None = None,
+) -> None:
+    """Update the status of a file within a folder queue item."""
+    if queue_item.is_folder and file_index < len(queue_item.files):
+        file_item = queue_item.files[file_index]
+        file_item.status = status
+        if status == QueueItemStatus.CONVERTING:
+            # Fresh processing attempt - stale outcome fields from a prior pass
+            # would mislabel the new result (e.g. a successful conversion
+            # rendered as "Skipped: ...")
+            file_item.skip_reason = None
+            file_item.error_message = None
+        if error_msg:
+            file_item.error_message = error_msg
+        if skip_reason:
+            file_item.skip_reason = skip_reason
+    elif queue_item.is_folder:
+        logger.warning(f"File index {file_index} out of range for queue item with {len(queue_item.files)} files")
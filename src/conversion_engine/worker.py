@@ -1,6 +1,21 @@
 # src/conversion_engine/worker.py
 """
-Contains the main worker thread function for sequential video conversion.
+Contains the main worker thread function for queue video conversion.
+
+The worker walks the queue and dispatches each file as a job to a
+JobScheduler. A job passes through two stages with their own limits: the
+search stage finds the file's CRF (stored as an ANALYZED record) and the
+encode stage encodes with that CRF, so the CRF search of upcoming files
+overlaps the encodes of earlier ones.
+
+Everything the worker reports goes through a ConversionEventSink
+(events.py), so the same worker drives the GUI and the headless runner.
+Each job's start, stages, history records and outcome are written ahead to a
+JobJournal (journal.py) so a crashed run can be rolled back at startup. While
+the resource governor (src/resource_governor.py) is on, it limits the
+scheduler's stages and holds new files' probes when the system is busy.
+Before queueing for an encode slot, a file reserves its predicted output size
+on the output volume (disk_budget.py).
 """
 
 # Standard library imports
@@ -9,60 +24,134 @@ import logging
 import os
 import threading
 import time
-
-# GUI-related imports (for type hinting gui object, not direct use of widgets here)
-from collections.abc import Callable  # Import Callable
+from collections.abc import Callable
+from contextlib import nullcontext
+from dataclasses import dataclass, field, replace
+from typing import Any
 
 # Project imports
-from src.ab_av1.exceptions import AbAv1CancelledError, ConversionNotWorthwhileError
+from src.ab_av1.exceptions import AbAv1CancelledError, AbAv1Error, ConversionNotWorthwhileError, OutputFileError
+from src.ab_av1.stats import CrfSearchResult, InputProbe
 from src.ab_av1.wrapper import AbAv1Wrapper
-from src.cache_helpers import converted_verdict_applies, is_file_unchanged
-from src.config import DEFAULT_ENCODING_PRESET, DEFAULT_VMAF_TARGET, HISTORY_SAVE_INTERVAL_SEC, MIN_VMAF_FALLBACK_TARGET
+from src.cache_helpers import can_reuse_crf, converted_verdict_applies, is_file_unchanged
+from src.chunked_encode import should_chunk
+from src.config import (
+    CORES_PER_SEARCH_JOB,
+    DEFAULT_ENCODING_PRESET,
+    DEFAULT_VMAF_TARGET,
+    HISTORY_SAVE_INTERVAL_SEC,
+    MIN_VMAF_FALLBACK_TARGET,
+    NOT_WORTHWHILE_SCREEN_CHECK_SAMPLES,
+    PRESET_TRANSFER_VERIFY_SAMPLES,
+)
+from src.crf_prior import get_crf_prior
 from src.hardware_accel import get_hw_decoder_for_codec, get_video_codec_from_info
 from src.history_index import compute_filename_hash, compute_path_hash, get_history_index
-from src.models import FileRecord, FileStatus, OperationType, ProgressEvent, QueueConversionConfig, QueueItemStatus
+from src.models import (
+    CrfVmafPoint,
+    FileRecord,
+    FileStatus,
+    OperationType,
+    PresetCrf,
+    ProgressEvent,
+    QueueConversionConfig,
+    QueueItemStatus,
+)
+from src.preset_transfer import carried_preset_history, get_preset_transfer
 from src.privacy import anonymize_filename
-from src.utils import format_crf, get_video_info, update_ui_safely
+from src.quality_check import (
+    CRF_SOURCE_CACHE,
+    CRF_SOURCE_SEARCH,
+    CRF_SOURCE_TRANSFER,
+    is_crf_source_trusted,
+    is_drift_trial,
+    log_quality_drift,
+    predicted_vmaf,
+)
+from src.resource_governor import get_resource_governor, wait_for_probe_clearance
+from src.sample_cache import get_sample_cache_dir, release_sample_cache, sweep_sample_cache
+from src.sample_settings import get_sample_settings, log_sample_settings_benchmark
+from src.staging import StagingArea, open_staging_area
+from src.utils import format_crf, get_video_info
 from src.video_conversion import calculate_output_path, process_video
 from src.video_metadata import extract_video_metadata
+from src.worthwhile_screen import is_flagged
 
 # Import functions/modules from the engine package
+from .batch_search import BatchSearchMeter, is_batch_clip, split_search_slots
+from .disk_budget import DiskSpaceBudget, predict_output_size
+from .events import ConversionEventSink
+from .journal import JobJournal
 from .scanner import scan_video_needs_conversion
+from .scheduler import (
+    BATCH_SEARCH_STAGE,
+    ENCODE_STAGE,
+    SEARCH_STAGE,
+    ConversionJob,
+    JobScheduler,
+    QueueItemTracker,
+    resolve_job_count,
+)
 
 logger = logging.getLogger(__name__)
 
 # THREAD SAFETY NOTE:
-# This worker runs in a dedicated thread and directly mutates QueueItem attributes.
-# This is safe because:
-# 1. Python's GIL protects simple attribute assignments (int, str, enum)
-# 2. Only ONE worker thread processes the queue sequentially
-# 3. GUI thread reads these fields infrequently via callbacks scheduled with update_ui_safely()
-# 4. Stale reads cause harmless UI lag (<100ms), not data corruption
-# 5. The queue_status_callback is read-only and does NOT write back to queue_item
+# The dispatcher thread walks the queue and starts one job thread per file; up to
+# N jobs run at once, including several files of the same queue item.
+# 1. QueueItem counters and file statuses are only written through QueueItemTracker,
+#    which holds a per-item lock around each update and the status callback it triggers
+# 2. Per-file state (PID, progress, skip verdict, input size) lives on the ConversionJob,
+#    never on sink.session, so jobs cannot overwrite each other's results
+# 3. Only the scheduler's display job writes the current-file fields of sink.session
+# 4. Session statistics are mutated via sink.call() on the sink's owner thread (Tk for the GUI)
+# 5. sink.queue_status is read-only and does NOT write back to queue_item
 #
-# DO NOT add locks here - they would serialize with Tkinter's event loop and cause deadlocks.
-# DO NOT use update_ui_safely() for every mutation - 100+ callbacks per file would tank performance.
-
-
-def _update_file_status(
-    queue_item, file_index: int, status: QueueItemStatus, error_msg: str | None = None, skip_reason: str | None = None
-) -> None:
-    """Update the status of a file within a folder queue item."""
-    if queue_item.is_folder and file_index < len(queue_item.files):
-        file_item = queue_item.files[file_index]
-        file_item.status = status
-        if status == QueueItemStatus.CONVERTING:
-            # Fresh processing attempt - stale outcome fields from a prior pass
-            # would mislabel the new result (e.g. a successful conversion
-            # rendered as "Skipped: ...")
-            file_item.skip_reason = None
-            file_item.error_message = None
-        if error_msg:
-            file_item.error_message = error_msg
-        if skip_reason:
-            file_item.skip_reason = skip_reason
-    elif queue_item.is_folder:
-        logger.warning(f"File index {file_index} out of range for queue item with {len(queue_item.files)} files")
+# DO NOT hold locks across sink.call() waits - they would serialize with Tkinter's event loop.
+# DO NOT use sink.call() for every mutation - 100+ callbacks per file would tank performance.
+
+# File events that only describe the file shown in the current-file panel
+_DISPLAY_EVENTS = frozenset({"starting", "starting_no_size", "file_info", "progress", "retrying"})
+
+
+@dataclass(frozen=True)
+class _FileResult:
+    """Outcome of one file, applied to its queue item by QueueItemTracker.file_finished()."""
+
+    status: QueueItemStatus
+    counter: str | None  # QueueItem outcome counter to bump; None for a stopped file
+    error_msg: str | None = None
+    skip_reason: str | None = None
+
+
+_SUCCEEDED = _FileResult(QueueItemStatus.COMPLETED, "files_succeeded")
+_STOPPED = _FileResult(QueueItemStatus.STOPPED, None)
+
+
+def _failed(error_msg: str | None = None) -> _FileResult:
+    return _FileResult(QueueItemStatus.ERROR, "files_failed", error_msg=error_msg)
+
+
+def _skipped(reason: str) -> _FileResult:
+    return _FileResult(QueueItemStatus.COMPLETED, "files_skipped", skip_reason=reason)
+
+
+@dataclass(eq=False)
+class _WorkerContext:
+    """State shared by the dispatcher and every job thread of one worker run."""
+
+    sink: ConversionEventSink
+    config: QueueConversionConfig
+    stop_event: threading.Event
+    cancel_event: threading.Event
+    scheduler: JobScheduler
+    journal: JobJournal
+    disk_budget: DiskSpaceBudget
+    total_files: int
+    items_total: int = 0
+    chunk_jobs: int = 1  # Most segment encodes of one long file, each in a free encode slot (1 = encode whole)
+    staging: StagingArea | None = None  # Local scratch area encodes run in (None = at the destination)
+    video_info_cache: dict = field(default_factory=dict)  # Shared across jobs; dict get/set are atomic
+    batch_meter: BatchSearchMeter = field(default_factory=BatchSearchMeter)  # Short-clip search throughput
 
 
 def _create_file_record(
@@ -76,6 +165,7 @@ def _create_file_record(
     input_height: int | None,
     # Metadata fields
     bitrate_kbps: float | None = None,
+    fps: float | None = None,
     audio_streams: list | None = None,
     # Status-specific optional fields
     output_path: str | None = None,
@@ -88,9 +178,20 @@ def _create_file_record(
     output_acodec: str | None = None,
     predicted_output_size: int | None = None,
     predicted_size_reduction: float | None = None,
+    crf_search_probes: int | None = None,
+    crf_probes_saved: int | None = None,
+    crf_curve: list[CrfVmafPoint] | None = None,
+    crf_search_samples: int | None = None,
+    crf_sample_duration_sec: float | None = None,
+    preset_history: list[PresetCrf] | None = None,
+    preset_transfer_from: int | None = None,
+    crf_source: str | None = None,
+    verified_vmaf: float | None = None,
+    sample_vmaf_error: float | None = None,
     vmaf_target_attempted: int | None = None,
     min_vmaf_attempted: int | None = None,
     skip_reason: str | None = None,
+    provisional_verdict: bool = False,
 ) -> FileRecord:
     """Create a FileRecord with common setup and status-specific fields.
 
@@ -130,6 +231,7 @@ def _create_file_record(
         width=input_width,
         height=input_height,
         bitrate_kbps=bitrate_kbps,
+        fps=fps,
         audio_streams=audio_streams or [],
         # SCANNED/ANALYZED status fields (Layer 1 and Layer 2 analysis)
         vmaf_target_when_analyzed=vmaf_target
@@ -142,10 +244,19 @@ def _create_file_record(
         else None,
         predicted_output_size=predicted_output_size,
         predicted_size_reduction=round(predicted_size_reduction, 1) if predicted_size_reduction is not None else None,
+        crf_search_probes=crf_search_probes,
+        crf_probes_saved=crf_probes_saved,
+        crf_curve=crf_curve or [],
+        crf_search_samples=crf_search_samples,
+        crf_sample_duration_sec=crf_sample_duration_sec,
+        preset_history=preset_history or [],
+        preset_transfer_from=preset_transfer_from,
+        sample_vmaf_error=round(sample_vmaf_error, 2) if sample_vmaf_error is not None else None,
         # NOT_WORTHWHILE status fields
         vmaf_target_attempted=vmaf_target_attempted,
         min_vmaf_attempted=min_vmaf_attempted,
         skip_reason=skip_reason,
+        provisional_verdict=provisional_verdict,
         # CONVERTED status fields
         output_path=output_path_str,
         output_size_bytes=output_size,
@@ -156,123 +267,230 @@ def _create_file_record(
         final_vmaf=round(final_vmaf, 2) if final_vmaf is not None and status == FileStatus.CONVERTED else None,
         vmaf_target_used=vmaf_target if status == FileStatus.CONVERTED else None,
         output_audio_codec=output_acodec.lower() if output_acodec and output_acodec != "?" else None,
+        crf_source=crf_source if status == FileStatus.CONVERTED else None,
+        verified_vmaf=round(verified_vmaf, 2) if verified_vmaf is not None else None,
         # Timestamps
         first_seen=now,
         last_updated=now,
     )
 
 
-def _save_file_record(record: FileRecord) -> None:
+def _save_file_record(ctx: _WorkerContext, job: ConversionJob, record: FileRecord) -> None:
     """Record a FileRecord in the history index; disk writes are debounced.
 
     save_if_stale keeps per-file processing from rewriting the whole multi-MB
     history JSON every time. The worker flushes unconditionally at queue-item
-    completion and on exit, so at most HISTORY_SAVE_INTERVAL_SEC of records is
-    ever at risk from a crash.
+    completion and on exit, and the record is journaled first, so a crash
+    between flushes loses nothing (startup recovery replays it).
+
+    A verdict (CONVERTED or NOT_WORTHWHILE) ends the file's processing, so its
+    sample cache is released.
     """
+    ctx.journal.record(job, record)
     index = get_history_index()
     index.upsert(record)
     index.save_if_stale(HISTORY_SAVE_INTERVAL_SEC)
+    if record.status in (FileStatus.CONVERTED, FileStatus.NOT_WORTHWHILE):
+        release_sample_cache(job.file_path)
 
 
-def sequential_conversion_worker(
-    gui,
-    config: QueueConversionConfig,
-    stop_event,
-    cancel_event,
-    file_event_callback: Callable,
-    queue_status_callback: Callable,
-    reset_ui_callback: Callable,
-    elapsed_time_callback: Callable,
-    pid_storage_callback: Callable,
-    completion_callback: Callable,
-    get_next_item_callback: Callable | None = None,
+def _job_file_callback(ctx: _WorkerContext, job: ConversionJob) -> Callable:
+    """Wrap the sink's file_event for one job.
+
+    Captures the job's own progress and NOT_WORTHWHILE verdict on the job
+    thread, fills in the job's input size for statistics, and drops
+    display-only events from jobs that are not on the current-file panel.
+    """
+
+    def job_file_callback(filename, status, info=None):
+        if status == "skipped_not_worth" and isinstance(info, dict):
+            job.skip_reason = info.get("message") or "Conversion not beneficial"
+            job.min_vmaf_attempted = info.get("min_vmaf_attempted")
+        elif status == "progress" and isinstance(info, ProgressEvent):
+            if info.original_size is None and job.original_size:
+                info = replace(info, original_size=job.original_size)
+            job.progress = info
+        elif status == "completed" and isinstance(info, dict) and not info.get("original_size"):
+            info = {**info, "original_size": job.original_size}
+
+        if status in _DISPLAY_EVENTS and not ctx.scheduler.is_display_job(job):
+            return
+        ctx.sink.file_event(filename, status, info)
+
+    return job_file_callback
+
+
+def _store_job_pid(ctx: _WorkerContext, job: ConversionJob, pid: int) -> None:
+    """Record an ab-av1/ffmpeg PID on the job (force-stop and the governor reach all of them)."""
+    job.pids.append(pid)
+    ctx.sink.process_started(pid, job.file_path)
+
+
+def _show_job(ctx: _WorkerContext, job: ConversionJob) -> None:
+    """Point the current-file display at job; called when it becomes the display job."""
+    sink = ctx.sink
+    # Set synchronously so estimation excludes the file at once (see THREAD SAFETY NOTE)
+    sink.session.current_file_path = job.file_path
+    sink.call(sink.job_shown, job)
+    if job.progress is not None:
+        # Promoted mid-run: replay the latest progress instead of waiting for the next event
+        sink.file_event(os.path.basename(job.file_path), "progress", job.progress)
+
+
+def _update_status_label(ctx: _WorkerContext, item_number: int) -> None:
+    """Refresh the status line with the running totals."""
+    sink = ctx.sink
+
+    def update_status(ic=item_number, it=ctx.items_total):
+        session = sink.session
+        base_status = f"Item {ic}/{it}"
+        converted_msg = f" ({session.successful_conversions} converted"
+
+        # Show different skip categories
+        if session.skipped_not_worth_count > 0:
+            converted_msg += f", {session.skipped_not_worth_count} inefficient"
+
+        if session.skipped_low_resolution_count > 0:
+            converted_msg += f", {session.skipped_low_resolution_count} low-res"
+
+        converted_msg += ")"
+
+        # Only show errors if there are actual errors
+        error_suffix = f" - {session.error_count} errors" if session.error_count > 0 else ""
+        sink.status(f"{base_status}{converted_msg}{error_suffix}")
+
+    sink.call(update_status)
+
+
+def _finish_queue_item(ctx: _WorkerContext, tracker: QueueItemTracker) -> None:
+    """Mark a queue item completed or stopped once its last file has finished."""
+    tracker.finalize(stopped=ctx.stop_event.is_set())
+    # Mandatory flush at the item boundary (issue #22): a completed or stopped
+    # queue item's records must reach disk regardless of the debounce interval.
+    get_history_index().save()
+
+
+def _run_job(ctx: _WorkerContext, tracker: QueueItemTracker, job: ConversionJob, item_number: int) -> None:
+    """Job thread body: process one file and apply its outcome to the queue item."""
+    ctx.journal.begin(job)
+    try:
+        result = _process_file(ctx, job)
+    except Exception as e:
+        logger.exception(f"Unhandled error in conversion job for {anonymize_filename(job.file_path)}")
+        result = _failed(f"Internal processing error: {e!s}")
+    if result.status == QueueItemStatus.COMPLETED:
+        ctx.journal.commit(job)
+    else:
+        ctx.journal.abort(job)  # Stopped or failed: remove its partial output
+
+    if tracker.file_finished(job.file_index, result.status, result.counter, result.error_msg, result.skip_reason):
+        _finish_queue_item(ctx, tracker)
+    _update_status_label(ctx, item_number)
+
+
+def queue_conversion_worker(
+    config: QueueConversionConfig, stop_event: threading.Event, cancel_event: threading.Event, sink: ConversionEventSink
 ):
-    """Process queue items sequentially, converting each eligible video.
+    """Process queue items, converting eligible videos as concurrent jobs.
 
-    This is the main worker function that runs in a separate thread to handle
-    the entire conversion process from scanning queue items to processing files.
+    This is the main worker function that runs in a separate thread. It fetches
+    queue items, dispatches each file to a JobScheduler (up to
+    config.concurrent_jobs ab-av1 processes at once), and waits for every job
+    to finish before reporting completion.
 
     Args:
-        gui: The main GUI instance (passed for accessing settings, state, and root window).
         config: QueueConversionConfig containing queue items and conversion settings.
-        stop_event: Threading event for graceful stop (finish current file, then stop).
-        cancel_event: Threading event set by force-stop; aborts the current ab-av1 run mid-process.
-        file_event_callback: Callback for file conversion events (progress, errors, completion).
-        queue_status_callback: Callback for updating queue tree (queue_item_id, status, processed, total).
-        reset_ui_callback: Callback to reset UI details for a new file.
-        elapsed_time_callback: Callback to update elapsed time display.
-        pid_storage_callback: Function to call to store the process ID (e.g., store_process_id(gui, pid, path)).
-        completion_callback: Function to call when the worker finishes (e.g., conversion_complete(gui, message)).
-        get_next_item_callback: Callback for dynamic queue item fetching (returns tuple: item, remaining, timed_out).
+        stop_event: Threading event for graceful stop (finish running files, start no new ones).
+        cancel_event: Threading event set by force-stop; aborts every running ab-av1 process.
+        sink: Receives every event of the run (file and queue progress, status,
+            completion) and supplies the next queue item.
     """
     logger.info(f"Worker started with {len(config.queue_items)} queue items")
 
-    # Capture Tkinter variable values safely from main thread (thread-safety fix)
-    anonymize_history_value = [None]  # Use list for mutability in closure
-    hw_decode_enabled_value = [None]  # Capture hardware decode setting
-    capture_complete = threading.Event()
-
-    def capture_settings():
-        anonymize_history_value[0] = gui.anonymize_history.get()
-        hw_decode_enabled_value[0] = gui.hw_decode_enabled.get()
-        capture_complete.set()
-
-    update_ui_safely(gui.root, capture_settings)
-    capture_complete.wait(timeout=1.0)  # Wait for main thread to capture settings
-
     # Initialize conversion state variables (thread-safe)
     def init_state():
-        gui.session.error_count = 0
-        gui.session.total_input_bytes_success = 0
-        gui.session.total_output_bytes_success = 0
-        gui.session.total_time_success = 0
-        gui.session.skipped_not_worth_count = 0  # Track files skipped because conversion isn't beneficial
-        gui.session.skipped_not_worth_files = []  # Track filenames of skipped files
-        gui.session.skipped_low_resolution_count = 0  # Track files skipped due to low resolution
-        gui.session.skipped_low_resolution_files = []  # Track filenames of low resolution files
-        gui.session.stopped_count = 0  # Track files skipped due to user stop request
-        gui.session.error_details = []  # Track error details for summary
-
-    update_ui_safely(gui.root, init_state)
-
-    video_info_cache = {}  # Initialize cache for this run
-
-    # Validate queue callback provided
-    if get_next_item_callback is None:
-        logger.error("Worker: No get_next_item_callback provided - dynamic queue fetch required")
-        update_ui_safely(gui.root, lambda: completion_callback(gui, "Error: Missing queue callback"))
-        return
+        session = sink.session
+        session.error_count = 0
+        session.total_input_bytes_success = 0
+        session.total_output_bytes_success = 0
+        session.total_time_success = 0
+        session.skipped_not_worth_count = 0  # Track files skipped because conversion isn't beneficial
+        session.skipped_not_worth_files = []  # Track filenames of skipped files
+        session.skipped_low_resolution_count = 0  # Track files skipped due to low resolution
+        session.skipped_low_resolution_files = []  # Track filenames of low resolution files
+        session.stopped_count = 0  # Track files skipped due to user stop request
+        session.error_details = []  # Track error details for summary
+
+    sink.call(init_state)
 
     # Determine extensions from config
     extensions = config.extensions
     if not extensions:
         logger.error("Worker: No extensions selected.")
-        update_ui_safely(gui.root, lambda: completion_callback(gui, "Error: No extensions selected"))
+        sink.call(sink.finished, "Error: No extensions selected")
         return
     logger.info(f"Worker: Processing extensions: {', '.join(extensions)}")
 
     # --- Phase 1: Count pending items and total files ---
-    update_ui_safely(gui.root, lambda: gui.status_label.config(text="Processing queue..."))
+    sink.call(sink.status, "Processing queue...")
 
     # Count pending items and total files across all pending queue items
     pending_items = [item for item in config.queue_items if item.status == QueueItemStatus.PENDING]
     items_total = len(pending_items)
     total_files_in_queue = sum(len(item.files) if item.is_folder else 1 for item in pending_items)
-    items_completed = 0
 
     logger.info(f"Total queue items to process: {items_total} ({total_files_in_queue} files)")
 
     if items_total == 0:
         logger.info("No pending items in queue.")
-        update_ui_safely(gui.root, lambda: completion_callback(gui, "No pending items in queue"))
+        sink.call(sink.finished, "No pending items in queue")
         return
 
+    encode_jobs = resolve_job_count(config.concurrent_jobs)
+    search_jobs, batch_jobs = split_search_slots(
+        resolve_job_count(config.concurrent_search_jobs, cores_per_job=CORES_PER_SEARCH_JOB), config.batch_search_jobs
+    )
+    stage_limits = {SEARCH_STAGE: search_jobs, ENCODE_STAGE: encode_jobs}
+    if batch_jobs:
+        stage_limits[BATCH_SEARCH_STAGE] = batch_jobs
+    # Admit enough jobs that each stage can stay busy: searches run ahead on
+    # upcoming files while earlier files hold the encode slots
+    scheduler = JobScheduler(
+        encode_jobs + search_jobs + batch_jobs,
+        on_display_change=lambda job: _show_job(ctx, job),
+        stage_limits=stage_limits,
+    )
+    ctx = _WorkerContext(
+        sink=sink,
+        config=config,
+        stop_event=stop_event,
+        cancel_event=cancel_event,
+        scheduler=scheduler,
+        journal=JobJournal(config.journal_path),
+        disk_budget=DiskSpaceBudget(on_change=lambda volumes: sink.call(sink.disk_budget, volumes)),
+        total_files=total_files_in_queue,
+        items_total=items_total,
+        chunk_jobs=resolve_job_count(config.chunked_encode_jobs),
+        staging=open_staging_area(config.staging_folder),
+    )
+    sink.scheduler_started(scheduler)  # Force-stop reaches every running job through it
+    governor = get_resource_governor()
+    if governor is not None:
+        governor.attach(scheduler)  # Holds back slots and lowers priorities while the system is busy
+    logger.info(
+        f"Running up to {encode_jobs} encode(s), {search_jobs} CRF search(es) and {batch_jobs} short-clip "
+        "search(es) in parallel"
+    )
+    log_sample_settings_benchmark()  # How past sampling choices traded search time for accuracy
+    log_quality_drift()  # How checked outputs compared to their predicted VMAF
+    sweep_sample_cache()  # Caches of files that never reached a verdict
+
     # Initialize overall progress tracking
-    update_ui_safely(gui.root, lambda: setattr(gui.session, "processed_files", 0))
-    update_ui_safely(gui.root, lambda: setattr(gui.session, "successful_conversions", 0))
+    sink.call(lambda: setattr(sink.session, "processed_files", 0))
+    sink.call(lambda: setattr(sink.session, "successful_conversions", 0))
 
-    # --- Phase 2: Process queue items dynamically ---
+    # --- Phase 2: Dispatch queue items dynamically ---
+    items_dispatched = 0
     global_file_index = 0  # Track overall file progress across all queue items
     retry_count = 0
     max_retries = 10
@@ -280,7 +498,7 @@ def sequential_conversion_worker(
     try:
         while not stop_event.is_set():
             # Fetch next pending item dynamically
-            queue_item, remaining_pending, timed_out = get_next_item_callback()
+            queue_item, remaining_pending, timed_out = sink.next_item()
 
             if timed_out:
                 retry_count += 1
@@ -298,15 +516,11 @@ def sequential_conversion_worker(
                 logger.info("No more pending queue items")
                 break
 
-            # Update items_total dynamically (remaining + 1 for current + completed)
-            items_total = remaining_pending + 1 + items_completed
+            # Update items_total dynamically (dispatched + current + remaining)
+            ctx.items_total = items_dispatched + 1 + remaining_pending
+            items_dispatched += 1
 
-            logger.info(f"Processing queue item {items_completed + 1}/{items_total}: {queue_item.source_path}")
-            queue_item.processed_files = 0
-            # Reset outcome counters for fresh processing
-            queue_item.files_succeeded = 0
-            queue_item.files_skipped = 0
-            queue_item.files_failed = 0
+            logger.info(f"Processing queue item {items_dispatched}/{ctx.items_total}: {queue_item.source_path}")
 
             # Get files for this item
             # For folders, use the pre-filtered files list from queue_item.files
@@ -320,7 +534,7 @@ def sequential_conversion_worker(
                 queue_item.status = QueueItemStatus.ERROR
                 queue_item.total_files = 0
                 queue_item.last_error = f"Error getting files: {e!s}"
-                queue_status_callback(
+                sink.queue_status(
                     queue_item.id, QueueItemStatus.ERROR, queue_item.processed_files, queue_item.total_files
                 )
                 continue
@@ -329,679 +543,757 @@ def sequential_conversion_worker(
             if queue_item.total_files == 0:
                 logger.info(f"Queue item {queue_item.source_path} has no eligible video files")
                 queue_item.status = QueueItemStatus.COMPLETED
-                queue_status_callback(queue_item.id, QueueItemStatus.COMPLETED, 0, 0)
-                items_completed += 1
+                sink.queue_status(queue_item.id, QueueItemStatus.COMPLETED, 0, 0)
                 continue
 
-            # Update queue status to converting with file count
-            queue_status_callback(queue_item.id, QueueItemStatus.CONVERTING, 0, queue_item.total_files)
+            # Reset outcome counters and report the item as converting
+            tracker = QueueItemTracker(queue_item, sink.queue_status)
+            tracker.begin()
 
-            # Process each file in this queue item
+            # ANALYZE runs are aborted by a graceful stop too; conversions only by force-stop
+            cancel_parent = stop_event if queue_item.operation_type == OperationType.ANALYZE else cancel_event
+
+            # Dispatch each file of this queue item as soon as a job slot frees up
             for file_index, file_path in enumerate(files):
-                if stop_event.is_set():
+                if not scheduler.reserve(stop_event):
                     logger.info("Conversion interrupted by user stop request.")
-                    # Mark remaining files as stopped and track count
-                    remaining_files = queue_item.files[file_index:]
-                    stopped_file_count = len(remaining_files)
-                    for remaining_file in remaining_files:
-                        remaining_file.status = QueueItemStatus.STOPPED
+                    # Mark files that never started as stopped and track count
+                    stopped_file_count = tracker.mark_stopped(file_index)
 
                     def increment_stopped_count(n=stopped_file_count):
-                        gui.session.stopped_count += n
+                        sink.session.stopped_count += n
 
-                    update_ui_safely(gui.root, increment_stopped_count)
+                    sink.call(increment_stopped_count)
                     break
 
                 global_file_index += 1
-
-                # Update current file index and file status
-                queue_item.current_file_index = file_index
-                _update_file_status(queue_item, file_index, QueueItemStatus.CONVERTING)
-
-                # Store current file path for estimation and callback handlers
-                # Set synchronously - thread-safe per single-writer model (see worker.py:34-44)
-                gui.session.current_file_path = file_path
-                logger.debug(f"Current file path set to: {file_path}")
-
-                filename = os.path.basename(file_path)
-                anonymized_name = anonymize_filename(file_path)
-                # Show overall file progress (filename shown separately in current_file_label)
-                update_ui_safely(
-                    gui.root,
-                    lambda idx=global_file_index, total=total_files_in_queue: (
-                        gui.status_label.config(text=f"File {idx}/{total}")
-                    ),
-                )
-                update_ui_safely(gui.root, reset_ui_callback)  # Reset UI elements for the new file
-
-                # Calculate output path using the new helper (skip for ANALYZE operations)
-                output_path = None
-                overwrite = False
-                delete_original = False
-                if queue_item.operation_type == OperationType.CONVERT:
-                    try:
-                        output_path_obj, overwrite, delete_original = calculate_output_path(
-                            input_path=file_path,
-                            output_mode=queue_item.output_mode,
-                            suffix=queue_item.output_suffix or config.default_suffix,
-                            output_folder=queue_item.output_folder,
-                            source_folder=queue_item.source_path if queue_item.is_folder else None,
-                        )
-                        output_path = str(output_path_obj)
-                    except Exception as e:
-                        logger.exception(f"Error calculating output path for {anonymized_name}")
-                        error_msg = f"Failed to calculate output path: {e!s}"
-                        file_event_callback(filename, "failed", {"message": error_msg, "type": "path_error"})
-                        queue_item.processed_files += 1
-                        queue_item.files_failed += 1
-                        queue_item.last_error = error_msg
-                        _update_file_status(queue_item, file_index, QueueItemStatus.ERROR, error_msg)
-                        queue_status_callback(
-                            queue_item.id,
-                            QueueItemStatus.CONVERTING,
-                            queue_item.processed_files,
-                            queue_item.total_files,
-                        )
-                        continue
-
-                # Check eligibility with new scanner signature (skip for ANALYZE operations)
-                if queue_item.operation_type == OperationType.CONVERT and output_path is not None:
-                    try:
-                        needs_conversion, reason, video_info = scan_video_needs_conversion(
-                            input_video_path=file_path,
-                            output_path=output_path,
-                            overwrite=overwrite,
-                            video_info_cache=video_info_cache,
-                        )
-                    except Exception as e:
-                        logger.exception(f"Error during eligibility scan for {anonymized_name}")
-                        error_msg = f"Scan error: {e!s}"
-                        file_event_callback(filename, "failed", {"message": error_msg, "type": "scan_error"})
-                        queue_item.processed_files += 1
-                        queue_item.files_failed += 1
-                        queue_item.last_error = error_msg
-                        _update_file_status(queue_item, file_index, QueueItemStatus.ERROR, error_msg)
-                        queue_status_callback(
-                            queue_item.id,
-                            QueueItemStatus.CONVERTING,
-                            queue_item.processed_files,
-                            queue_item.total_files,
-                        )
-                        continue
-                else:
-                    # ANALYZE operation - always "needs conversion" (really means "needs analysis")
-                    needs_conversion = True
-                    reason = ""
-
-                    try:
-                        video_info = video_info_cache.get(file_path) or get_video_info(file_path)
-                        if video_info and file_path not in video_info_cache:
-                            video_info_cache[file_path] = video_info
-                    except Exception as e:
-                        logger.exception(f"Error getting video info for ANALYZE operation: {anonymized_name}")
-                        error_msg = f"Video info error: {e!s}"
-                        file_event_callback(filename, "failed", {"message": error_msg, "type": "video_info_error"})
-                        queue_item.processed_files += 1
-                        queue_item.files_failed += 1
-                        queue_item.last_error = error_msg
-                        _update_file_status(queue_item, file_index, QueueItemStatus.ERROR, error_msg)
-                        queue_status_callback(
-                            queue_item.id,
-                            QueueItemStatus.CONVERTING,
-                            queue_item.processed_files,
-                            queue_item.total_files,
-                        )
-                        continue
-
-                if queue_item.operation_type == OperationType.CONVERT and not needs_conversion:
-                    # File doesn't need conversion, skip it
-                    filename_skip = os.path.basename(file_path)
-                    file_event_callback(filename_skip, "skipped", reason)
-
-                    # Check if skipped due to resolution (thread-safe)
-                    if "Below minimum resolution" in reason:
-
-                        def update_low_res_skip(fn=filename_skip):
-                            gui.session.skipped_low_resolution_count += 1
-                            gui.session.skipped_low_resolution_files.append(fn)
-
-                        update_ui_safely(gui.root, update_low_res_skip)
-
-                    queue_item.processed_files += 1
-                    queue_item.files_skipped += 1
-                    _update_file_status(
-                        queue_item, file_index, QueueItemStatus.COMPLETED, skip_reason=reason or "Skipped"
-                    )
-                    queue_status_callback(
-                        queue_item.id, QueueItemStatus.CONVERTING, queue_item.processed_files, queue_item.total_files
-                    )
-                    # Update analysis tree - "done" for already-converted, "skip" for others
-                    reason_lower = reason.lower() if reason else ""
-                    tree_status = "done" if "already converted" in reason_lower else "skip"
-                    update_ui_safely(
-                        gui.root, lambda fp=file_path, s=tree_status: gui.update_analysis_tree_for_completed_file(fp, s)
-                    )
-                    continue
-
-                # File needs conversion - proceed with processing
-                original_size = 0
-                input_vcodec = "?"
-                input_acodec = "?"
-                input_duration = 0.0
-                input_width = None
-                input_height = None
-                input_bitrate_kbps = None
-                input_audio_streams = []
-                output_acodec = "?"  # Initialize output audio codec
-
-                # --- Extract Info & Update UI ---
-                if video_info:
-                    try:
-                        meta = extract_video_metadata(video_info)
-                        input_vcodec = (meta.video_codec or "?").upper()
-                        # Get audio codec from first stream (for display purposes)
-                        input_acodec = (meta.audio_streams[0].codec if meta.audio_streams else "?").upper()
-                        input_width = meta.width
-                        input_height = meta.height
-                        input_duration = meta.duration_sec or 0.0
-                        original_size = meta.file_size_bytes or 0
-                        input_bitrate_kbps = meta.bitrate_kbps
-                        input_audio_streams = meta.audio_streams
-
-                        update_ui_safely(gui.root, lambda os=original_size: setattr(gui.session, "last_input_size", os))
-                        output_acodec = input_acodec  # Default output codec
-                    except Exception:
-                        logger.exception(f"Error extracting details from video_info for {anonymized_name}")
-                        update_ui_safely(gui.root, lambda: setattr(gui.session, "last_input_size", None))
-                        input_duration = 0.0
-                else:
-                    logger.warning(f"Cannot get pre-conversion info for {anonymized_name}.")
-                    update_ui_safely(gui.root, lambda: setattr(gui.session, "last_input_size", None))
-                    input_duration = 0.0
-
-                current_time = time.time()
-                update_ui_safely(gui.root, lambda t=current_time: setattr(gui.session, "current_file_start_time", t))
-                update_ui_safely(gui.root, lambda: setattr(gui.session, "current_file_encoding_start_time", None))
-                update_ui_safely(
-                    gui.root, elapsed_time_callback, gui.session.current_file_start_time
-                )  # Start timer UI updates
-                update_ui_safely(gui.root, lambda: setattr(gui.session, "current_process_info", None))  # Reset PID info
-
-                # --- Determine Hardware Decoder ---
-                hw_decoder = None
-                if hw_decode_enabled_value[0] and video_info:
-                    source_codec = get_video_codec_from_info(video_info)
-                    if source_codec:
-                        hw_decoder = get_hw_decoder_for_codec(source_codec)
-                        if hw_decoder:
-                            logger.info(f"Using hardware decoder {hw_decoder} for {source_codec}")
-                        else:
-                            logger.debug(f"No hardware decoder available for {source_codec}")
-
-                # --- Process Video ---
-                process_successful = False
-                file_stopped = False  # Set when the current file's run is cancelled mid-process
-                file_decided = False  # Set when a verdict was already recorded (don't overwrite with STOPPED)
-
-                # Clear skip state left over from the previous file: it is set via
-                # root.after, so it can land after that file's post-processing already
-                # ran (synchronous clear is safe per the THREAD SAFETY NOTE above)
-                gui.session.last_skip_reason = None
-                gui.session.last_min_vmaf_attempted = None
-                output_file_path = None
-                elapsed_time_file = 0
-                output_size = 0
-                final_crf = None
-                final_vmaf = None
-                final_vmaf_target = None
-
-                try:
-                    if queue_item.operation_type == OperationType.ANALYZE:
-                        # ANALYZE operation: Run CRF search only, no encoding
-
-                        # Check for cached status that should skip analysis
-                        index = get_history_index()
-                        cached_record = index.lookup_file(file_path)
-                        if cached_record:
-                            # Skip CONVERTED files - no point analyzing, conversion history is
-                            # valuable (converted_verdict_applies also covers the replace-mode
-                            # output at the input path, which would otherwise be CRF-searched)
-                            if cached_record.status == FileStatus.CONVERTED:
-                                if converted_verdict_applies(cached_record, file_path):
-                                    reason = "Already converted"
-                                    logger.info(f"Skipping {anonymized_name} - {reason}")
-                                    file_event_callback(filename, "skipped", reason)
-                                    queue_item.files_skipped += 1
-                                    _update_file_status(
-                                        queue_item, file_index, QueueItemStatus.COMPLETED, skip_reason=reason
-                                    )
-                                    queue_item.processed_files += 1
-                                    queue_status_callback(
-                                        queue_item.id,
-                                        QueueItemStatus.CONVERTING,
-                                        queue_item.processed_files,
-                                        queue_item.total_files,
-                                    )
-                                    continue  # Skip to next file
-                                # File changed since conversion - needs re-conversion, not just analysis
-                                logger.info(f"File {anonymized_name} changed since conversion, re-analyzing")
-
-                            # Skip NOT_WORTHWHILE files - already determined conversion isn't beneficial
-                            elif cached_record.status == FileStatus.NOT_WORTHWHILE:
-                                if is_file_unchanged(cached_record, file_path):
-                                    reason = cached_record.skip_reason or "Previously marked not worthwhile"
-                                    logger.info(f"Skipping {anonymized_name} - previously marked not worthwhile")
-                                    file_event_callback(filename, "skipped", reason)
-                                    queue_item.files_skipped += 1
-                                    _update_file_status(
-                                        queue_item, file_index, QueueItemStatus.COMPLETED, skip_reason=reason
-                                    )
-                                    queue_item.processed_files += 1
-                                    queue_status_callback(
-                                        queue_item.id,
-                                        QueueItemStatus.CONVERTING,
-                                        queue_item.processed_files,
-                                        queue_item.total_files,
-                                    )
-                                    continue  # Skip to next file
-                                logger.info(
-                                    f"File {anonymized_name} changed since NOT_WORTHWHILE analysis, re-analyzing"
-                                )
-
-                            # Skip ANALYZED files - already have Layer 2 data (CRF search complete)
-                            elif cached_record.status == FileStatus.ANALYZED:
-                                if is_file_unchanged(cached_record, file_path):
-                                    reason = "Already analyzed"
-                                    logger.info(f"Skipping {anonymized_name} - {reason}")
-                                    file_event_callback(filename, "skipped", reason)
-                                    queue_item.files_skipped += 1
-                                    _update_file_status(
-                                        queue_item, file_index, QueueItemStatus.COMPLETED, skip_reason=reason
-                                    )
-                                    queue_item.processed_files += 1
-                                    queue_status_callback(
-                                        queue_item.id,
-                                        QueueItemStatus.CONVERTING,
-                                        queue_item.processed_files,
-                                        queue_item.total_files,
-                                    )
-                                    continue  # Skip to next file
-                                logger.info(f"File {anonymized_name} changed since analysis, re-analyzing")
-
-                        logger.info(f"Running CRF search (analysis only) for {anonymized_name}")
-                        wrapper = AbAv1Wrapper()
-                        crf_search_start = time.time()  # Track timing for both success and NOT_WORTHWHILE
-
-                        def progress_cb(progress_pct, message, fname=filename):
-                            # Report progress as quality detection progress
-                            event = ProgressEvent(
-                                progress_quality=progress_pct,
-                                progress_encoding=0.0,
-                                phase="crf-search",
-                                message=message,
-                            )
-                            file_event_callback(fname, "progress", event)
-
-                        try:
-                            crf_result = wrapper.crf_search(
-                                input_path=file_path,
-                                vmaf_target=DEFAULT_VMAF_TARGET,
-                                preset=DEFAULT_ENCODING_PRESET,
-                                progress_callback=progress_cb,
-                                stop_event=stop_event,
-                                hw_decoder=hw_decoder,
-                                pid_callback=lambda pid, path=file_path: pid_storage_callback(gui, pid, path),
-                            )
-
-                            # Extract results from crf_search
-                            final_crf = crf_result.best_crf
-                            final_vmaf = crf_result.best_vmaf
-                            final_vmaf_target = crf_result.vmaf_target_used
-                            predicted_output_size = crf_result.predicted_output_size
-                            predicted_size_reduction = crf_result.predicted_size_reduction
-                            crf_search_time = crf_result.crf_search_time_sec
-
-                            # Update history index with Layer 2 data
-                            record = _create_file_record(
-                                file_path,
-                                anonymize_history_value[0],
-                                FileStatus.ANALYZED,
-                                original_size,
-                                input_duration,
-                                input_vcodec,
-                                input_width,
-                                input_height,
-                                bitrate_kbps=input_bitrate_kbps,
-                                audio_streams=input_audio_streams,
-                                crf_search_time_sec=crf_search_time,
-                                final_crf=final_crf,
-                                final_vmaf=final_vmaf,
-                                vmaf_target=final_vmaf_target,
-                                predicted_output_size=predicted_output_size,
-                                predicted_size_reduction=predicted_size_reduction,
-                            )
-                            _save_file_record(record)
-
-                            # Report completion via callback
-                            file_event_callback(
-                                filename,
-                                "completed",
-                                {
-                                    "message": (
-                                        f"Analysis complete (CRF {format_crf(final_crf)}, VMAF {final_vmaf:.2f})"
-                                    ),
-                                    "crf": final_crf,
-                                    "vmaf": final_vmaf,
-                                    "vmaf_target_used": final_vmaf_target,
-                                },
-                            )
-                            process_successful = True
-                            queue_item.files_succeeded += 1
-                            _update_file_status(queue_item, file_index, QueueItemStatus.COMPLETED)
-                            logger.info(
-                                f"Analysis complete for {anonymized_name}: "
-                                f"CRF {format_crf(final_crf)}, VMAF {final_vmaf:.2f}"
-                            )
-
-                            # Update analysis tree now that history is saved
-                            update_ui_safely(
-                                gui.root, lambda fp=file_path: gui.update_analysis_tree_for_completed_file(fp, "done")
-                            )
-
-                        except AbAv1CancelledError:
-                            # Stop request aborted the CRF search mid-run: the shared
-                            # stopped branch below records STOPPED and the count
-                            logger.info(f"Analysis cancelled for {anonymized_name}")
-                            file_stopped = True
-                            process_successful = False
-
-                        except ConversionNotWorthwhileError as e:
-                            # CRF search failed at all VMAF targets - record as NOT_WORTHWHILE
-                            crf_search_elapsed = time.time() - crf_search_start
-                            logger.warning(f"Analysis showed conversion not worthwhile for {anonymized_name}: {e}")
-
-                            # Record NOT_WORTHWHILE to history BEFORE callback (so folder aggregates are correct)
-                            record = _create_file_record(
-                                file_path,
-                                anonymize_history_value[0],
-                                FileStatus.NOT_WORTHWHILE,
-                                original_size,
-                                input_duration,
-                                input_vcodec,
-                                input_width,
-                                input_height,
-                                bitrate_kbps=input_bitrate_kbps,
-                                audio_streams=input_audio_streams,
-                                crf_search_time_sec=crf_search_elapsed,
-                                vmaf_target_attempted=DEFAULT_VMAF_TARGET,
-                                min_vmaf_attempted=MIN_VMAF_FALLBACK_TARGET,
-                                skip_reason=str(e),
-                            )
-                            _save_file_record(record)
-
-                            file_event_callback(
-                                filename,
-                                "skipped_not_worth",
-                                {
-                                    "message": str(e),
-                                    "original_size": original_size,
-                                    "min_vmaf_attempted": MIN_VMAF_FALLBACK_TARGET,
-                                },
-                            )
-                            queue_item.files_skipped += 1
-                            _update_file_status(queue_item, file_index, QueueItemStatus.COMPLETED, skip_reason=str(e))
-
-                            # Update analysis tree now that history is saved
-                            update_ui_safely(
-                                gui.root, lambda fp=file_path: gui.update_analysis_tree_for_completed_file(fp, "skip")
-                            )
-
-                            process_successful = False
-                            file_decided = True
-
-                    elif output_path is not None:
-                        # CONVERT operation: Full conversion with process_video
-                        result_tuple = process_video(
-                            video_path=file_path,
-                            output_path=output_path,
-                            overwrite=overwrite,
-                            delete_original=delete_original,
-                            convert_audio=config.convert_audio,
-                            audio_codec=config.audio_codec,
-                            file_info_callback=file_event_callback,
-                            pid_callback=lambda pid, path=file_path: pid_storage_callback(gui, pid, path),
-                            total_duration_seconds=input_duration,
-                            hw_decoder=hw_decoder,
-                            cancel_event=cancel_event,
-                        )
-                        if result_tuple:
-                            # Unpack tuple including timing breakdown
-                            (
-                                output_file_path,
-                                elapsed_time_file,
-                                _,
-                                output_size,
-                                final_crf,
-                                final_vmaf,
-                                final_vmaf_target,
-                                crf_search_time_file,
-                                encoding_time_file,
-                            ) = result_tuple
-                            process_successful = True
-                            update_ui_safely(
-                                gui.root, lambda os=output_size: setattr(gui.session, "last_output_size", os)
-                            )
-                            update_ui_safely(
-                                gui.root, lambda et=elapsed_time_file: setattr(gui.session, "last_elapsed_time", et)
-                            )
-                            # Determine final audio codec based on conversion settings
-                            if config.convert_audio and input_acodec.lower() not in ["aac", "opus"]:
-                                output_acodec = config.audio_codec.lower()
-                            # else: output_acodec remains input_acodec (set earlier)
-                        else:
-                            # If process_video returns None, it means failure was reported via callback
-                            update_ui_safely(gui.root, lambda: setattr(gui.session, "last_output_size", None))
-                            update_ui_safely(gui.root, lambda: setattr(gui.session, "last_elapsed_time", None))
-                            process_successful = False  # Ensure state reflects failure
-
-                except Exception as e:
-                    logger.exception(f"Critical error during processing for {anonymized_name}")
-                    # Dispatch a generic failure
-                    error_msg = f"Internal processing error: {e!s}"
-                    file_event_callback(filename, "failed", {"message": error_msg, "type": "processing_crash"})
-                    process_successful = False
-                    file_decided = True  # ERROR recorded here; don't re-count in the post-processing chain
-                    queue_item.files_failed += 1
-                    queue_item.last_error = error_msg
-                    _update_file_status(queue_item, file_index, QueueItemStatus.ERROR, error_msg)
-                    update_ui_safely(gui.root, lambda: setattr(gui.session, "last_output_size", None))
-                    update_ui_safely(gui.root, lambda: setattr(gui.session, "last_elapsed_time", None))
-
-                # --- Post-processing & History ---
-                update_ui_safely(
-                    gui.root, lambda: setattr(gui.session, "processed_files", gui.session.processed_files + 1)
-                )
-
-                # Update queue item progress
-                queue_item.processed_files += 1
-                queue_status_callback(
-                    queue_item.id, QueueItemStatus.CONVERTING, queue_item.processed_files, queue_item.total_files
+                # Show overall file progress (filename shown separately by job_shown)
+                sink.call(sink.status, f"File {global_file_index}/{total_files_in_queue}")
+                tracker.file_started(file_index)
+                scheduler.start(
+                    queue_item,
+                    file_index,
+                    file_path,
+                    cancel_parent,
+                    lambda job, t=tracker, n=items_dispatched: _run_job(ctx, t, job, n),
                 )
 
-                if process_successful:
-                    update_ui_safely(
-                        gui.root,
-                        lambda: setattr(gui.session, "successful_conversions", gui.session.successful_conversions + 1),
-                    )
-                    # Track successful file outcome
-                    if queue_item.operation_type == OperationType.CONVERT:
-                        queue_item.files_succeeded += 1
-                        _update_file_status(queue_item, file_index, QueueItemStatus.COMPLETED)
-                    # Note: For ANALYZE operations, files_succeeded is incremented earlier
-                    # Note: The "completed" callback is already dispatched by the wrapper (ab_av1/wrapper.py)
-                    # before returning, so we don't call it again here to avoid double-counting statistics.
-                    # However, we DO need to update the totals here because the wrapper's callback fires
-                    # before we have elapsed_time available (it's calculated after process_video returns).
-                    if original_size and output_size and elapsed_time_file:
-
-                        def update_totals_from_worker(
-                            inp_size=original_size, out_size=output_size, elapsed=elapsed_time_file
-                        ):
-                            gui.session.total_input_bytes_success += inp_size
-                            gui.session.total_output_bytes_success += out_size
-                            gui.session.total_time_success += elapsed
-
-                        update_ui_safely(gui.root, update_totals_from_worker)
-
-                    # Only save CONVERTED record for CONVERT operations
-                    # (ANALYZE operations save their ANALYZED record earlier in the flow)
-                    if queue_item.operation_type == OperationType.CONVERT:
-                        try:  # Record to History Index
-                            record = _create_file_record(
-                                file_path,
-                                anonymize_history_value[0],
-                                FileStatus.CONVERTED,
-                                original_size,
-                                input_duration,
-                                input_vcodec,
-                                input_width,
-                                input_height,
-                                bitrate_kbps=input_bitrate_kbps,
-                                audio_streams=input_audio_streams,
-                                output_path=output_file_path,
-                                output_size=output_size,
-                                crf_search_time_sec=crf_search_time_file,
-                                encoding_time_sec=encoding_time_file,
-                                final_crf=final_crf,
-                                final_vmaf=final_vmaf,
-                                vmaf_target=final_vmaf_target if final_vmaf_target is not None else DEFAULT_VMAF_TARGET,
-                                output_acodec=output_acodec,
-                            )
-                            _save_file_record(record)
-                            # Update analysis tree now that history is saved
-                            update_ui_safely(
-                                gui.root, lambda fp=file_path: gui.update_analysis_tree_for_completed_file(fp, "done")
-                            )
-                        except Exception:
-                            logger.exception(f"Failed to record history for {anonymized_name}")
-                elif file_decided:
-                    # Verdict (e.g. ANALYZE NOT_WORTHWHILE) already recorded in the
-                    # operation branch - don't overwrite it with STOPPED or ERROR
-                    pass
-                # Check if this was a NOT_WORTHWHILE skip and record to history.
-                # A decided verdict outranks a concurrent force-stop: checked before
-                # the stopped branch so the history record isn't dropped.
-                elif gui.session.last_skip_reason:
-                    queue_item.files_skipped += 1
-                    _update_file_status(
-                        queue_item, file_index, QueueItemStatus.COMPLETED, skip_reason=gui.session.last_skip_reason
-                    )
-
-                    # Capture skip data and timing before clearing
-                    skip_reason = gui.session.last_skip_reason
-                    min_vmaf_attempted = gui.session.last_min_vmaf_attempted
-                    # Calculate elapsed time for CRF search attempt (set at line 477)
-                    file_start = gui.session.current_file_start_time
-                    crf_search_elapsed = time.time() - file_start if file_start else None
-
-                    # Clear skip state (safe to do synchronously per THREAD SAFETY NOTE)
-                    gui.session.last_skip_reason = None
-                    gui.session.last_min_vmaf_attempted = None
-
-                    try:  # Record NOT_WORTHWHILE to History Index
-                        record = _create_file_record(
-                            file_path,
-                            anonymize_history_value[0],
-                            FileStatus.NOT_WORTHWHILE,
-                            original_size,
-                            input_duration,
-                            input_vcodec,
-                            input_width,
-                            input_height,
-                            bitrate_kbps=input_bitrate_kbps,
-                            audio_streams=input_audio_streams,
-                            crf_search_time_sec=crf_search_elapsed,
-                            vmaf_target_attempted=DEFAULT_VMAF_TARGET,
-                            min_vmaf_attempted=min_vmaf_attempted,
-                            skip_reason=skip_reason,
-                        )
-                        _save_file_record(record)
-                        logger.info(f"Recorded NOT_WORTHWHILE status to history for {anonymized_name}")
-                        # Update analysis tree now that history is saved
-                        update_ui_safely(
-                            gui.root, lambda fp=file_path: gui.update_analysis_tree_for_completed_file(fp, "skip")
-                        )
-                    except Exception:
-                        logger.exception(f"Failed to record NOT_WORTHWHILE history for {anonymized_name}")
-                elif file_stopped or cancel_event.is_set():
-                    # Force-stop (or ANALYZE stop) cancelled this file mid-run: stopped, not failed
-                    _update_file_status(queue_item, file_index, QueueItemStatus.STOPPED)
-
-                    def increment_stopped():
-                        gui.session.stopped_count += 1
-
-                    update_ui_safely(gui.root, increment_stopped)
-                else:
-                    # process_video returned None due to error (not a NOT_WORTHWHILE skip)
-                    # The error was already reported via callback, but we need to track it in queue item
-                    queue_item.files_failed += 1
-                    error_msg = queue_item.last_error or "Processing failed (see logs for details)"
-                    if not queue_item.last_error:
-                        queue_item.last_error = error_msg
-                    _update_file_status(queue_item, file_index, QueueItemStatus.ERROR, error_msg)
-
-                # Note: Original file deletion (for REPLACE mode) is handled by process_video()
-
-                def update_status(ic=items_completed + 1, it=items_total):  # Capture loop variables
-                    base_status = f"Item {ic}/{it}"
-                    converted_msg = f" ({gui.session.successful_conversions} converted"
+            # The item is finalized by whichever thread finishes its last file
+            if tracker.close_dispatch():
+                _finish_queue_item(ctx, tracker)
 
-                    # Show different skip categories
-                    if gui.session.skipped_not_worth_count > 0:
-                        converted_msg += f", {gui.session.skipped_not_worth_count} inefficient"
-
-                    if gui.session.skipped_low_resolution_count > 0:
-                        converted_msg += f", {gui.session.skipped_low_resolution_count} low-res"
-
-                    converted_msg += ")"
-
-                    # Only show errors if there are actual errors
-                    error_suffix = f" - {gui.session.error_count} errors" if gui.session.error_count > 0 else ""
-                    gui.status_label.config(text=f"{base_status}{converted_msg}{error_suffix}")
-
-                update_ui_safely(gui.root, update_status)
-
-            # Mark queue item as completed or stopped and increment counter
-            if stop_event.is_set() and queue_item.processed_files < queue_item.total_files:
-                # Stopped before completing all files
-                queue_item.status = QueueItemStatus.STOPPED
-                queue_status_callback(
-                    queue_item.id, QueueItemStatus.STOPPED, queue_item.processed_files, queue_item.total_files
-                )
-            else:
-                # Completed all files (or stopped after completing all files)
-                queue_item.status = QueueItemStatus.COMPLETED
-                queue_status_callback(
-                    queue_item.id, QueueItemStatus.COMPLETED, queue_item.processed_files, queue_item.total_files
-                )
-            # Mandatory flush at the item boundary (issue #22): a completed or stopped
-            # queue item's records must reach disk regardless of the debounce interval.
-            get_history_index().save()
-            items_completed += 1
+        # Files already running finish even after a graceful stop
+        scheduler.wait_idle()
+        if ctx.staging is not None:
+            ctx.staging.close()
+        batch_report = ctx.batch_meter.report()
+        if batch_report is not None:
+            logger.info(f"Batch search lane: {batch_report.summary()}")
 
     finally:
         # Mandatory flush on worker exit (issue #22): stop, crash, or normal
         # completion must never lose an already-processed file's record to the
         # save debounce.
         get_history_index().save()
+        ctx.journal.close()  # Only after the flush: it drops the journaled records
+        if governor is not None:
+            governor.detach(scheduler)
 
     # --- End of Processing Loop ---
     final_status_message = "Queue complete"
     if stop_event.is_set():
         final_status_message = "Queue stopped by user"
-    elif gui.session.error_count > 0:
-        final_status_message = f"Queue complete with {gui.session.error_count} errors"
+    elif sink.session.error_count > 0:
+        final_status_message = f"Queue complete with {sink.session.error_count} errors"
 
     logger.info(f"Worker finished. Status: {final_status_message}")
-    # Call the completion callback passed from the controller
-    update_ui_safely(gui.root, lambda msg=final_status_message: completion_callback(gui, msg))
+    sink.call(sink.finished, final_status_message)
+
+
+def _may_use_crf_source(job: ConversionJob, crf_source: str, record: FileRecord) -> bool:
+    """Whether job's file may take its CRF from crf_source.
+
+    A source that checked outputs of similar files no longer trust is still
+    used for the group's trial files, with the quality check forced on
+    (job.verify_quality), so the group can win its trust back.
+    """
+    if is_crf_source_trusted(crf_source, record.video_codec, record.width, record.height):
+        return True
+    if not is_drift_trial(record.path_hash):
+        return False
+    logger.info(f"Using the {crf_source} CRF for {anonymize_filename(job.file_path)} as a checked trial")
+    job.verify_quality = True
+    return True
+
+
+def _needs_crf_search(job: ConversionJob) -> bool:
+    """Whether a CONVERT file has to pass through the search stage.
+
+    Files with a reusable CRF in history, or an unchanged NOT_WORTHWHILE
+    verdict, go straight to the encode stage where process_video handles them -
+    unless checked outputs of similar files show cached CRFs missing their VMAF
+    (and the file is no trial, see _may_use_crf_source), or the verdict only
+    comes from the reduced-sample pre-screen check.
+    """
+    record = get_history_index().lookup_file(job.file_path)
+    if record is None or not is_file_unchanged(record, job.file_path):
+        return True
+    if record.status == FileStatus.NOT_WORTHWHILE:
+        return record.provisional_verdict
+    if not can_reuse_crf(record, DEFAULT_VMAF_TARGET, DEFAULT_ENCODING_PRESET):
+        return True
+    return not _may_use_crf_source(job, CRF_SOURCE_CACHE, record)
+
+
+def _search_crf(
+    ctx: _WorkerContext,
+    job: ConversionJob,
+    input_fields: dict[str, Any],
+    hw_decoder: str | None,
+    file_event_callback: Callable,
+) -> CrfSearchResult | _FileResult:
+    """Search stage: run crf-search for one file and store an ANALYZED record.
+
+    Args:
+        ctx: Worker context.
+        job: The file's job (its cancel event aborts the search).
+        input_fields: Probed input fields for _create_file_record (original_size, input_duration, ...).
+        hw_decoder: Optional hardware decoder for the sample encodes.
+        file_event_callback: The job's file callback.
+
+    Returns:
+        The search result, or a skipped result when no VMAF target makes the
+        conversion worthwhile (recorded as NOT_WORTHWHILE).
+
+    Raises:
+        AbAv1CancelledError: If the search was cancelled.
+    """
+    file_path = job.file_path
+    filename = os.path.basename(file_path)
+    anonymized_name = anonymize_filename(file_path)
+    logger.info(f"Running CRF search for {anonymized_name}")
+    wrapper = AbAv1Wrapper()
+    crf_search_start = time.time()  # Track timing for both success and NOT_WORTHWHILE
+    # Similar files' CRFs narrow the search (widened again by the wrapper if the result hits a bound)
+    codec = input_fields["input_vcodec"]
+    prior = get_crf_prior(
+        codec if codec != "?" else None,
+        input_fields["input_width"],
+        input_fields["input_height"],
+        input_fields["bitrate_kbps"],
+    )
+    # Sample count and length from the duration and how well similar files' samples predicted their outputs
+    sampling = get_sample_settings(
+        input_fields["input_duration"],
+        codec if codec != "?" else None,
+        input_fields["input_width"],
+        input_fields["input_height"],
+    )
+    sample_duration = sampling.sample_duration_sec if sampling is not None else None
+    # Shared by the quick check, every fallback attempt and a later auto-encode of the file
+    sample_cache_dir = get_sample_cache_dir(file_path, DEFAULT_ENCODING_PRESET)
+
+    # Files the Layer-1 pre-screen flagged as likely NOT_WORTHWHILE get a cheap reduced-sample search first
+    scanned = get_history_index().lookup_file(file_path)
+    unchanged = scanned is not None and is_file_unchanged(scanned, file_path)
+    quick_check = unchanged and scanned.status == FileStatus.SCANNED and is_flagged(scanned.not_worthwhile_likelihood)
+    # Results at other presets: kept on the new record, and a CRF offset between presets may stand in for the search
+    preset_history = carried_preset_history(scanned if unchanged else None, DEFAULT_ENCODING_PRESET)
+    transfer = get_preset_transfer(scanned, DEFAULT_VMAF_TARGET, DEFAULT_ENCODING_PRESET) if unchanged else None
+    if transfer is not None and not _may_use_crf_source(job, CRF_SOURCE_TRANSFER, scanned):
+        transfer = None
+
+    def progress_cb(progress_pct, message, fname=filename):
+        # Report progress as quality detection progress
+        event = ProgressEvent(progress_quality=progress_pct, progress_encoding=0.0, phase="crf-search", message=message)
+        file_event_callback(fname, "progress", event)
+
+    def search(samples: int | None) -> CrfSearchResult:
+        return wrapper.crf_search(
+            input_path=file_path,
+            vmaf_target=DEFAULT_VMAF_TARGET,
+            preset=DEFAULT_ENCODING_PRESET,
+            progress_callback=progress_cb,
+            stop_event=job.cancel_event,
+            hw_decoder=hw_decoder,
+            pid_callback=lambda pid: _store_job_pid(ctx, job, pid),
+            crf_bounds=prior.bounds if prior is not None else None,
+            samples=samples,
+            sample_duration_sec=sample_duration,
+            sample_cache_dir=sample_cache_dir,
+            probe=job.probe,
+        )
+
+    crf_result = None
+    if transfer is not None:
+        try:
+            crf_result = wrapper.verify_crf(
+                input_path=file_path,
+                crf=transfer.crf,
+                vmaf_target=DEFAULT_VMAF_TARGET,
+                preset=DEFAULT_ENCODING_PRESET,
+                samples=PRESET_TRANSFER_VERIFY_SAMPLES,
+                stop_event=job.cancel_event,
+                hw_decoder=hw_decoder,
+                pid_callback=lambda pid: _store_job_pid(ctx, job, pid),
+                sample_duration_sec=sample_duration,
+                sample_cache_dir=sample_cache_dir,
+                probe=job.probe,
+            )
+        except AbAv1CancelledError:
+            raise
+        except AbAv1Error as e:
+            logger.warning(f"Preset transfer check failed for {anonymized_name}, running a full CRF search: {e}")
+        if crf_result is None:
+            transfer = None  # Missed or failed: the full search decides
+            job.verify_quality = False  # A searched CRF is no trial
+        else:
+            logger.info(f"Preset transfer verified for {anonymized_name}; skipping the full CRF search")
+
+    try:
+        if crf_result is None and quick_check:
+            logger.info(
+                f"{anonymized_name} is likely not worthwhile ({scanned.not_worthwhile_likelihood:.0%} of similar "
+                f"files); running a {NOT_WORTHWHILE_SCREEN_CHECK_SAMPLES}-sample CRF search first"
+            )
+            search(samples=NOT_WORTHWHILE_SCREEN_CHECK_SAMPLES)
+            quick_check = False  # Passed: the full search decides
+        if crf_result is None:
+            crf_result = search(sampling.samples if sampling is not None else None)
+    except ConversionNotWorthwhileError as e:
+        # CRF search failed at all VMAF targets - record as NOT_WORTHWHILE
+        crf_search_elapsed = time.time() - crf_search_start
+        logger.warning(f"CRF search showed conversion not worthwhile for {anonymized_name}: {e}")
+        reason = f"{e} ({NOT_WORTHWHILE_SCREEN_CHECK_SAMPLES}-sample pre-screen check)" if quick_check else str(e)
+
+        # Record NOT_WORTHWHILE to history BEFORE callback (so folder aggregates are correct)
+        record = _create_file_record(
+            file_path,
+            ctx.config.anonymize_history,
+            FileStatus.NOT_WORTHWHILE,
+            **input_fields,
+            crf_search_time_sec=crf_search_elapsed,
+            vmaf_target_attempted=DEFAULT_VMAF_TARGET,
+            min_vmaf_attempted=MIN_VMAF_FALLBACK_TARGET,
+            skip_reason=reason,
+            provisional_verdict=quick_check,  # Too few samples to be final: the next CONVERT run searches in full
+        )
+        _save_file_record(ctx, job, record)
+
+        file_event_callback(
+            filename,
+            "skipped_not_worth",
+            {
+                "message": reason,
+                "original_size": input_fields["original_size"],
+                "min_vmaf_attempted": MIN_VMAF_FALLBACK_TARGET,
+            },
+        )
+
+        # Update analysis tree now that history is saved
+        ctx.sink.call(ctx.sink.file_outcome, file_path, "skip")
+        return _skipped(reason)
+
+    probes_saved = prior.probes_saved(crf_result.sample_encodes) if prior is not None and transfer is None else None
+    if probes_saved is not None:
+        logger.info(f"CRF prior saved {probes_saved} of {prior.baseline_probes} CRF probe(s) for {anonymized_name}")
+
+    # Update history index with Layer 2 data; a CONVERT encode that is stopped
+    # later still reuses this CRF on the next run
+    record = _create_file_record(
+        file_path,
+        ctx.config.anonymize_history,
+        FileStatus.ANALYZED,
+        **input_fields,
+        crf_search_time_sec=crf_result.crf_search_time_sec,
+        final_crf=crf_result.best_crf,
+        final_vmaf=crf_result.best_vmaf,
+        vmaf_target=crf_result.vmaf_target_used,
+        predicted_output_size=crf_result.predicted_output_size,
+        predicted_size_reduction=crf_result.predicted_size_reduction,
+        crf_search_probes=crf_result.sample_encodes,
+        crf_probes_saved=probes_saved,
+        crf_curve=crf_result.crf_curve,
+        crf_search_samples=PRESET_TRANSFER_VERIFY_SAMPLES
+        if transfer is not None
+        else (sampling.samples if sampling is not None else None),
+        crf_sample_duration_sec=sample_duration,
+        preset_history=preset_history,
+        preset_transfer_from=transfer.from_preset if transfer is not None else None,
+    )
+    _save_file_record(ctx, job, record)
+    return crf_result
+
+
+def _process_file(ctx: _WorkerContext, job: ConversionJob) -> _FileResult:
+    """Scan, convert or analyze one file on the job's own thread.
+
+    Session statistics, history records and analysis-tree updates happen here;
+    the returned result is applied to the queue item by the caller.
+    """
+    sink = ctx.sink
+    config = ctx.config
+    queue_item = job.queue_item
+    file_path = job.file_path
+    file_event_callback = _job_file_callback(ctx, job)
+    filename = os.path.basename(file_path)
+    anonymized_name = anonymize_filename(file_path)
+    logger.debug(f"Job {job.job_id} processing: {anonymized_name}")
+
+    # Calculate output path using the new helper (skip for ANALYZE operations)
+    output_path = None
+    overwrite = False
+    delete_original = False
+    if queue_item.operation_type == OperationType.CONVERT:
+        try:
+            output_path_obj, overwrite, delete_original = calculate_output_path(
+                input_path=file_path,
+                output_mode=queue_item.output_mode,
+                suffix=queue_item.output_suffix or config.default_suffix,
+                output_folder=queue_item.output_folder,
+                source_folder=queue_item.source_path if queue_item.is_folder else None,
+            )
+            output_path = str(output_path_obj)
+        except Exception as e:
+            logger.exception(f"Error calculating output path for {anonymized_name}")
+            error_msg = f"Failed to calculate output path: {e!s}"
+            file_event_callback(filename, "failed", {"message": error_msg, "type": "path_error"})
+            return _failed(error_msg)
+
+    # The file's probe is its first work: hold it while the resource governor throttles
+    if file_path not in ctx.video_info_cache and not wait_for_probe_clearance(
+        lambda: job.cancel_event.is_set() or ctx.stop_event.is_set()
+    ):
+        logger.info(f"Stopped while waiting for the resource governor: {anonymized_name}")
+
+        def increment_stopped():
+            sink.session.stopped_count += 1
+
+        sink.call(increment_stopped)
+        return _STOPPED
+
+    # Check eligibility with new scanner signature (skip for ANALYZE operations)
+    if queue_item.operation_type == OperationType.CONVERT and output_path is not None:
+        try:
+            needs_conversion, reason, video_info = scan_video_needs_conversion(
+                input_video_path=file_path,
+                output_path=output_path,
+                overwrite=overwrite,
+                video_info_cache=ctx.video_info_cache,
+            )
+        except Exception as e:
+            logger.exception(f"Error during eligibility scan for {anonymized_name}")
+            error_msg = f"Scan error: {e!s}"
+            file_event_callback(filename, "failed", {"message": error_msg, "type": "scan_error"})
+            return _failed(error_msg)
+    else:
+        # ANALYZE operation - always "needs conversion" (really means "needs analysis")
+        needs_conversion = True
+        reason = ""
+
+        try:
+            video_info = ctx.video_info_cache.get(file_path) or get_video_info(file_path)
+            if video_info and file_path not in ctx.video_info_cache:
+                ctx.video_info_cache[file_path] = video_info
+        except Exception as e:
+            logger.exception(f"Error getting video info for ANALYZE operation: {anonymized_name}")
+            error_msg = f"Video info error: {e!s}"
+            file_event_callback(filename, "failed", {"message": error_msg, "type": "video_info_error"})
+            return _failed(error_msg)
+
+    if queue_item.operation_type == OperationType.CONVERT and not needs_conversion:
+        # File doesn't need conversion, skip it
+        file_event_callback(filename, "skipped", reason)
+
+        # Check if skipped due to resolution (thread-safe)
+        if "Below minimum resolution" in reason:
+
+            def update_low_res_skip(fn=filename):
+                sink.session.skipped_low_resolution_count += 1
+                sink.session.skipped_low_resolution_files.append(fn)
+
+            sink.call(update_low_res_skip)
+
+        # Update analysis tree - "done" for already-converted, "skip" for others
+        reason_lower = reason.lower() if reason else ""
+        tree_status = "done" if "already converted" in reason_lower else "skip"
+        sink.call(sink.file_outcome, file_path, tree_status)
+        return _skipped(reason or "Skipped")
+
+    # File needs conversion - proceed with processing
+    original_size = 0
+    input_vcodec = "?"
+    input_acodec = "?"
+    input_duration = 0.0
+    input_width = None
+    input_height = None
+    input_bitrate_kbps = None
+    input_fps = None
+    input_audio_streams = []
+    output_acodec = "?"  # Initialize output audio codec
+
+    # --- Extract Info ---
+    if video_info:
+        try:
+            meta = extract_video_metadata(video_info)
+            input_vcodec = (meta.video_codec or "?").upper()
+            # Get audio codec from first stream (for display purposes)
+            input_acodec = (meta.audio_streams[0].codec if meta.audio_streams else "?").upper()
+            input_width = meta.width
+            input_height = meta.height
+            input_duration = meta.duration_sec or 0.0
+            original_size = meta.file_size_bytes or 0
+            input_bitrate_kbps = meta.bitrate_kbps
+            input_fps = meta.fps
+            input_audio_streams = meta.audio_streams
+            job.original_size = original_size or None
+            # Handed to the search and encode stages so neither runs ffprobe again
+            job.probe = InputProbe.of(file_path, video_info)
+            output_acodec = input_acodec  # Default output codec
+        except Exception:
+            logger.exception(f"Error extracting details from video_info for {anonymized_name}")
+            input_duration = 0.0
+    else:
+        logger.warning(f"Cannot get pre-conversion info for {anonymized_name}.")
+        input_duration = 0.0
+
+    # --- Update UI (only the display job drives the current-file panel) ---
+    job.start_time = time.time()
+    if ctx.scheduler.is_display_job(job):
+        _show_job(ctx, job)
+
+    # --- Determine Hardware Decoder ---
+    hw_decoder = None
+    if config.hw_decode_enabled and video_info:
+        source_codec = get_video_codec_from_info(video_info)
+        if source_codec:
+            hw_decoder = get_hw_decoder_for_codec(source_codec)
+            if hw_decoder:
+                logger.info(f"Using hardware decoder {hw_decoder} for {source_codec}")
+            else:
+                logger.debug(f"No hardware decoder available for {source_codec}")
+
+    # --- Process Video ---
+    process_successful = False
+    file_stopped = False  # Set when this file's run is cancelled mid-process
+    decided: _FileResult | None = None  # Verdict already recorded (don't overwrite with STOPPED)
+    output_file_path = None
+    elapsed_time_file = 0
+    output_size = 0
+    final_crf = None
+    final_vmaf = None
+    final_vmaf_target = None
+    verified_vmaf = None
+
+    input_fields = {
+        "original_size": original_size,
+        "input_duration": input_duration,
+        "input_vcodec": input_vcodec,
+        "input_width": input_width,
+        "input_height": input_height,
+        "bitrate_kbps": input_bitrate_kbps,
+        "fps": input_fps,
+        "audio_streams": input_audio_streams,
+    }
+
+    try:
+        if queue_item.operation_type == OperationType.ANALYZE:
+            # ANALYZE operation: Run CRF search only, no encoding
+
+            # Check for cached status that should skip analysis
+            index = get_history_index()
+            cached_record = index.lookup_file(file_path)
+            if cached_record:
+                # Skip CONVERTED files - no point analyzing, conversion history is
+                # valuable (converted_verdict_applies also covers the replace-mode
+                # output at the input path, which would otherwise be CRF-searched)
+                if cached_record.status == FileStatus.CONVERTED:
+                    if converted_verdict_applies(cached_record, file_path):
+                        reason = "Already converted"
+                        logger.info(f"Skipping {anonymized_name} - {reason}")
+                        file_event_callback(filename, "skipped", reason)
+                        return _skipped(reason)
+                    # File changed since conversion - needs re-conversion, not just analysis
+                    logger.info(f"File {anonymized_name} changed since conversion, re-analyzing")
+
+                # Skip NOT_WORTHWHILE files - already determined conversion isn't beneficial
+                elif cached_record.status == FileStatus.NOT_WORTHWHILE:
+                    if not is_file_unchanged(cached_record, file_path):
+                        logger.info(f"File {anonymized_name} changed since NOT_WORTHWHILE analysis, re-analyzing")
+                    elif cached_record.provisional_verdict:
+                        logger.info(f"Re-analyzing {anonymized_name} - its pre-screen verdict needs a full search")
+                    else:
+                        reason = cached_record.skip_reason or "Previously marked not worthwhile"
+                        logger.info(f"Skipping {anonymized_name} - previously marked not worthwhile")
+                        file_event_callback(filename, "skipped", reason)
+                        return _skipped(reason)
+
+                # Skip ANALYZED files - already have Layer 2 data (CRF search complete)
+                elif cached_record.status == FileStatus.ANALYZED:
+                    if is_file_unchanged(cached_record, file_path):
+                        reason = "Already analyzed"
+                        logger.info(f"Skipping {anonymized_name} - {reason}")
+                        file_event_callback(filename, "skipped", reason)
+                        return _skipped(reason)
+                    logger.info(f"File {anonymized_name} changed since analysis, re-analyzing")
+
+        # --- Search stage: find the CRF ahead of the encode stage ---
+        searched: CrfSearchResult | None = None
+        if queue_item.operation_type == OperationType.ANALYZE or _needs_crf_search(job):
+            # Short clips search in the batch lane (if the run has one), whose smaller slots keep more running at once
+            batch_clip = is_batch_clip(input_duration) and ctx.scheduler.stage_limit(BATCH_SEARCH_STAGE) is not None
+            with ctx.scheduler.stage(
+                BATCH_SEARCH_STAGE if batch_clip else SEARCH_STAGE, job, ctx.stop_event
+            ) as admitted:
+                if admitted:
+                    ctx.journal.stage(job, SEARCH_STAGE)
+                    search_start = ctx.batch_meter.clock()
+                    outcome = _search_crf(ctx, job, input_fields, hw_decoder, file_event_callback)
+                    if batch_clip:
+                        ctx.batch_meter.record(search_start, ctx.batch_meter.clock())
+                    if isinstance(outcome, _FileResult):
+                        decided = outcome  # NOT_WORTHWHILE, already recorded
+                    else:
+                        searched = outcome
+                else:
+                    file_stopped = True
+            job.pids.clear()  # The search's processes have exited
+
+        if searched is not None and queue_item.operation_type == OperationType.ANALYZE:
+            final_crf = searched.best_crf
+            final_vmaf = searched.best_vmaf
+            file_event_callback(
+                filename,
+                "completed",
+                {
+                    "message": (f"Analysis complete (CRF {format_crf(final_crf)}, VMAF {final_vmaf:.2f})"),
+                    "crf": final_crf,
+                    "vmaf": final_vmaf,
+                    "vmaf_target_used": searched.vmaf_target_used,
+                },
+            )
+            process_successful = True
+            logger.info(f"Analysis complete for {anonymized_name}: CRF {format_crf(final_crf)}, VMAF {final_vmaf:.2f}")
+
+            # Update analysis tree now that history is saved
+            sink.call(sink.file_outcome, file_path, "done")
+
+        elif output_path is not None and decided is None and not file_stopped:
+            # --- Encode stage: CONVERT with the searched (or cached) CRF ---
+            # Output space is reserved first, so a file that does not fit waits without an encode slot
+            predicted_size = predict_output_size(
+                get_history_index().lookup_file(file_path),
+                original_size,
+                searched.predicted_output_size if searched is not None else None,
+            )
+            with (
+                ctx.disk_budget.reservation(job, output_path, predicted_size, ctx.stop_event) as reserved,
+                ctx.scheduler.stage(ENCODE_STAGE, job, ctx.stop_event) if reserved else nullcontext(False) as admitted,
+            ):
+                if admitted:
+                    ctx.journal.stage(
+                        job,
+                        ENCODE_STAGE,
+                        output_path=output_path,
+                        scratch_dir=ctx.staging.root if ctx.staging is not None else None,
+                    )
+                    # Segments of a long file run in encode slots no other job is using
+                    chunk_jobs = 1
+                    if should_chunk(input_duration, ctx.chunk_jobs):
+                        chunk_jobs += ctx.scheduler.borrow_stage_slots(job, ctx.chunk_jobs - 1)
+                    result_tuple = process_video(
+                        video_path=file_path,
+                        output_path=output_path,
+                        overwrite=overwrite,
+                        delete_original=delete_original,
+                        convert_audio=config.convert_audio,
+                        audio_codec=config.audio_codec,
+                        file_info_callback=file_event_callback,
+                        pid_callback=lambda pid: _store_job_pid(ctx, job, pid),
+                        total_duration_seconds=input_duration,
+                        hw_decoder=hw_decoder,
+                        cancel_event=job.cancel_event,
+                        search_result=searched,
+                        chunk_jobs=chunk_jobs,
+                        staging=ctx.staging,
+                        # Copying a staged output needs no encode slot
+                        on_encoded=lambda: ctx.scheduler.leave_stage(job),
+                        probe=job.probe,
+                        verify_quality=config.verify_output_quality or job.verify_quality,
+                    )
+                else:
+                    file_stopped = True
+                    result_tuple = None
+            job.pids.clear()
+            if result_tuple:
+                # Unpack tuple including timing breakdown
+                (
+                    output_file_path,
+                    elapsed_time_file,
+                    _,
+                    output_size,
+                    final_crf,
+                    final_vmaf,
+                    final_vmaf_target,
+                    crf_search_time_file,
+                    encoding_time_file,
+                    verified_vmaf,
+                ) = result_tuple
+                process_successful = True
+                sink.call(setattr, sink.session, "last_output_size", output_size)
+                sink.call(setattr, sink.session, "last_elapsed_time", elapsed_time_file)
+                # Determine final audio codec based on conversion settings
+                if config.convert_audio and input_acodec.lower() not in ["aac", "opus"]:
+                    output_acodec = config.audio_codec.lower()
+                # else: output_acodec remains input_acodec (set earlier)
+            else:
+                # If process_video returns None, it means failure was reported via callback
+                sink.call(setattr, sink.session, "last_output_size", None)
+                sink.call(setattr, sink.session, "last_elapsed_time", None)
+                process_successful = False  # Ensure state reflects failure
+
+    except AbAv1CancelledError:
+        # Stop request aborted the CRF search mid-run: the shared
+        # stopped branch below records STOPPED and the count
+        logger.info(f"CRF search cancelled for {anonymized_name}")
+        file_stopped = True
+        process_successful = False
+
+    except OutputFileError as e:
+        # Refused by disk-space admission: the output cannot fit on its volume
+        logger.warning(f"Not encoding {anonymized_name}: {e.message}")
+        file_event_callback(filename, "failed", {"message": e.message, "type": e.error_type})
+        process_successful = False
+        decided = _failed(e.message)
+        sink.call(setattr, sink.session, "last_output_size", None)
+        sink.call(setattr, sink.session, "last_elapsed_time", None)
+
+    except Exception as e:
+        logger.exception(f"Critical error during processing for {anonymized_name}")
+        # Dispatch a generic failure
+        error_msg = f"Internal processing error: {e!s}"
+        file_event_callback(filename, "failed", {"message": error_msg, "type": "processing_crash"})
+        process_successful = False
+        decided = _failed(error_msg)  # ERROR recorded here; don't re-count in the post-processing chain
+        sink.call(setattr, sink.session, "last_output_size", None)
+        sink.call(setattr, sink.session, "last_elapsed_time", None)
+
+    # --- Post-processing & History ---
+    sink.call(lambda: setattr(sink.session, "processed_files", sink.session.processed_files + 1))
+
+    if process_successful:
+        sink.call(lambda: setattr(sink.session, "successful_conversions", sink.session.successful_conversions + 1))
+        # Note: The "completed" callback is already dispatched by the wrapper (ab_av1/wrapper.py)
+        # before returning, so we don't call it again here to avoid double-counting statistics.
+        # However, we DO need to update the totals here because the wrapper's callback fires
+        # before we have elapsed_time available (it's calculated after process_video returns).
+        if original_size and output_size and elapsed_time_file:
+
+            def update_totals_from_worker(inp_size=original_size, out_size=output_size, elapsed=elapsed_time_file):
+                sink.session.total_input_bytes_success += inp_size
+                sink.session.total_output_bytes_success += out_size
+                sink.session.total_time_success += elapsed
+
+            sink.call(update_totals_from_worker)
+
+        # Only save CONVERTED record for CONVERT operations
+        # (ANALYZE operations save their ANALYZED record earlier in the flow)
+        if queue_item.operation_type == OperationType.CONVERT:
+            try:  # Record to History Index
+                # The search stage's ANALYZED record holds its probe counts, curve and sampling;
+                # the file's results at other presets are kept whether or not it was searched now
+                current = get_history_index().lookup_file(file_path)
+                analyzed = current if searched is not None else None
+                if analyzed is None:
+                    crf_source = CRF_SOURCE_CACHE
+                else:
+                    crf_source = CRF_SOURCE_TRANSFER if analyzed.preset_transfer_from is not None else CRF_SOURCE_SEARCH
+                # Measured minus predicted VMAF of the output, when the quality check ran
+                predicted = predicted_vmaf(current, final_crf, final_vmaf_target)
+                vmaf_error = verified_vmaf - predicted if verified_vmaf is not None and predicted is not None else None
+                record = _create_file_record(
+                    file_path,
+                    ctx.config.anonymize_history,
+                    FileStatus.CONVERTED,
+                    original_size,
+                    input_duration,
+                    input_vcodec,
+                    input_width,
+                    input_height,
+                    bitrate_kbps=input_bitrate_kbps,
+                    fps=input_fps,
+                    audio_streams=input_audio_streams,
+                    output_path=output_file_path,
+                    output_size=output_size,
+                    crf_search_time_sec=crf_search_time_file,
+                    encoding_time_sec=encoding_time_file,
+                    final_crf=final_crf,
+                    final_vmaf=final_vmaf,
+                    vmaf_target=final_vmaf_target if final_vmaf_target is not None else DEFAULT_VMAF_TARGET,
+                    output_acodec=output_acodec,
+                    crf_search_probes=analyzed.crf_search_probes if analyzed is not None else None,
+                    crf_probes_saved=analyzed.crf_probes_saved if analyzed is not None else None,
+                    crf_curve=analyzed.crf_curve if analyzed is not None else None,
+                    crf_search_samples=analyzed.crf_search_samples if analyzed is not None else None,
+                    crf_sample_duration_sec=analyzed.crf_sample_duration_sec if analyzed is not None else None,
+                    preset_history=current.preset_history if current is not None else None,
+                    preset_transfer_from=analyzed.preset_transfer_from if analyzed is not None else None,
+                    crf_source=crf_source,
+                    verified_vmaf=verified_vmaf,
+                    sample_vmaf_error=vmaf_error,
+                )
+                _save_file_record(ctx, job, record)
+                # Update analysis tree now that history is saved
+                sink.call(sink.file_outcome, file_path, "done")
+            except Exception:
+                logger.exception(f"Failed to record history for {anonymized_name}")
+        return _SUCCEEDED
+
+    if decided is not None:
+        # Verdict (e.g. ANALYZE NOT_WORTHWHILE) already recorded in the
+        # operation branch - don't overwrite it with STOPPED or ERROR
+        return decided
+
+    # Check if this was a NOT_WORTHWHILE skip and record to history.
+    # A decided verdict outranks a concurrent force-stop: checked before
+    # the stopped branch so the history record isn't dropped.
+    if job.skip_reason:
+        crf_search_elapsed = time.time() - job.start_time
+        try:  # Record NOT_WORTHWHILE to History Index
+            record = _create_file_record(
+                file_path,
+                ctx.config.anonymize_history,
+                FileStatus.NOT_WORTHWHILE,
+                original_size,
+                input_duration,
+                input_vcodec,
+                input_width,
+                input_height,
+                bitrate_kbps=input_bitrate_kbps,
+                fps=input_fps,
+                audio_streams=input_audio_streams,
+                crf_search_time_sec=crf_search_elapsed,
+                vmaf_target_attempted=DEFAULT_VMAF_TARGET,
+                min_vmaf_attempted=job.min_vmaf_attempted,
+                skip_reason=job.skip_reason,
+            )
+            _save_file_record(ctx, job, record)
+            logger.info(f"Recorded NOT_WORTHWHILE status to history for {anonymized_name}")
+            # Update analysis tree now that history is saved
+            sink.call(sink.file_outcome, file_path, "skip")
+        except Exception:
+            logger.exception(f"Failed to record NOT_WORTHWHILE history for {anonymized_name}")
+        return _skipped(job.skip_reason)
+
+    if file_stopped or job.cancel_event.is_set():
+        # Force-stop (or ANALYZE stop) cancelled this file mid-run: stopped, not failed
+        def increment_stopped():
+            sink.session.stopped_count += 1
+
+        sink.call(increment_stopped)
+        return _STOPPED
+
+    # process_video returned None due to error (not a NOT_WORTHWHILE skip)
+    # The error was already reported via callback; the tracker records it on the queue item
+    # Note: Original file deletion (for REPLACE mode) is handled by process_video()
+    return _failed()
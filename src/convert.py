@@ -65,8 +65,11 @@ except Exception as e:
 # Main execution block
 if __name__ == "__main__":
     exit_code = 0  # Default to success
+    headless = len(sys.argv) > 1  # Command-line runs are headless batch jobs (see src/headless.py)
     try:
         run_application()  # Call the imported main function
+    except SystemExit as e:
+        exit_code = e.code  # Headless runs exit with their batch status
     except Exception as e:
         exit_code = 1  # Set error exit code
         # Catch any exceptions that might escape the main function's error handling
@@ -79,7 +82,8 @@ if __name__ == "__main__":
         # Don't exit here, let finally run
     finally:
         # This block executes whether there was an error or not
-        print("\nApplication finished.")
-        # Keep console open until a key is pressed
-        wait_for_key()
+        if not headless:  # Keep stdout machine-readable and never block a batch job
+            print("\nApplication finished.")
+            # Keep console open until a key is pressed
+            wait_for_key()
         sys.exit(exit_code)  # Exit with appropriate code after key press
@@ -0,0 +1,172 @@
+# src/crf_prior.py
+"""
+CRF search bounds seeded from history.
+
+ab-av1's crf-search starts from its whole CRF range every time, although the
+history holds the best CRF of thousands of searched files. Files with the same
+codec, resolution bucket, bitrate-per-pixel band and preset land on similar
+CRFs at the same VMAF target, so their P10-P90 range (plus CRF_PRIOR_MARGIN)
+becomes the search's --min-crf/--max-crf and the search probes fewer CRFs
+(each one a set of sample encodes). The wrapper widens a bound back to
+ab-av1's default when a result hits it, so a wrong prior costs a retry, never
+a worse CRF.
+
+Each search records how many CRFs it probed (crf_search_probes) and, when a
+prior bounded it, how many probes that saved against the median unbounded
+search (crf_probes_saved).
+"""
+
+import logging
+import math
+import statistics
+from dataclasses import dataclass
+
+from src.config import (
+    AB_AV1_DEFAULT_MAX_CRF,
+    AB_AV1_DEFAULT_MIN_CRF,
+    CRF_PRIOR_BITRATE_BANDS,
+    CRF_PRIOR_MARGIN,
+    CRF_PRIOR_MIN_SAMPLES,
+    CRF_SEARCH_BASELINE_PROBES,
+    DEFAULT_ENCODING_PRESET,
+    DEFAULT_VMAF_TARGET,
+)
+from src.estimation import get_resolution_bucket
+from src.history_index import get_history_index
+from src.models import FileRecord, FileStatus
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CrfPrior:
+    """CRF bounds for a search, from the best CRFs of similar files."""
+
+    min_crf: float
+    max_crf: float
+    samples: int  # Similar records the bounds were computed from
+    source: str  # Group key, e.g. "h264:1080p:2-4:p6"
+    baseline_probes: int  # CRFs an unbounded search is expected to probe
+
+    @property
+    def bounds(self) -> tuple[float, float]:
+        """(--min-crf, --max-crf) for AbAv1Wrapper.crf_search / auto_encode."""
+        return self.min_crf, self.max_crf
+
+    def probes_saved(self, probes: int) -> int:
+        """CRF probes this prior saved (negative if a widening retry cost more)."""
+        return self.baseline_probes - probes
+
+
+def get_bitrate_band(bitrate_kbps: float | None, width: int | None, height: int | None) -> str:
+    """Categorize bitrate per pixel (bits/s per pixel of frame area) into CRF_PRIOR_BITRATE_BANDS.
+
+    Returns:
+        Band label such as "<0.5", "2-4" or ">=8", or "unknown".
+    """
+    if not bitrate_kbps or not width or not height:
+        return "unknown"
+    per_pixel = bitrate_kbps * 1000 / (width * height)
+    lower = None
+    for edge in CRF_PRIOR_BITRATE_BANDS:
+        if per_pixel < edge:
+            return f"<{edge:g}" if lower is None else f"{lower:g}-{edge:g}"
+        lower = edge
+    return f">={lower:g}"
+
+
+def _group_key(codec: str | None, width: int | None, height: int | None, bitrate_kbps: float | None) -> str | None:
+    """Similarity group of a file ("codec:bucket:band"), or None if it cannot be grouped."""
+    bucket = get_resolution_bucket(width, height)
+    band = get_bitrate_band(bitrate_kbps, width, height)
+    if not codec or bucket == "unknown" or band == "unknown":
+        return None
+    return f"{codec.lower()}:{bucket}:{band}"
+
+
+def _searched_crf(record: FileRecord, vmaf_target: int, preset: int) -> float | None:
+    """Best CRF of a record's finished search at this VMAF target and preset."""
+    if record.preset_when_analyzed != preset:
+        return None
+    if record.status == FileStatus.ANALYZED and record.vmaf_target_when_analyzed == vmaf_target:
+        return record.best_crf
+    if record.status == FileStatus.CONVERTED and record.vmaf_target_used == vmaf_target:
+        return record.final_crf
+    return None
+
+
+def _baseline_probes(records: list[FileRecord]) -> int:
+    """Median CRF probes of unbounded searches in history (CRF_SEARCH_BASELINE_PROBES until enough)."""
+    probes = [r.crf_search_probes for r in records if r.crf_search_probes and r.crf_probes_saved is None]
+    if len(probes) < CRF_PRIOR_MIN_SAMPLES:
+        return CRF_SEARCH_BASELINE_PROBES
+    return round(statistics.median(probes))
+
+
+def compute_crf_prior(
+    records: list[FileRecord],
+    codec: str | None,
+    width: int | None,
+    height: int | None,
+    bitrate_kbps: float | None,
+    preset: int = DEFAULT_ENCODING_PRESET,
+    vmaf_target: int = DEFAULT_VMAF_TARGET,
+) -> CrfPrior | None:
+    """Compute search bounds for a file from the records of similar files.
+
+    Args:
+        records: History records to learn from.
+        codec: The file's video codec.
+        width: Video width in pixels.
+        height: Video height in pixels.
+        bitrate_kbps: The file's bitrate.
+        preset: Encoding preset the search will use.
+        vmaf_target: VMAF target the search will use.
+
+    Returns:
+        The prior, or None when the file cannot be grouped, fewer than
+        CRF_PRIOR_MIN_SAMPLES similar files were searched, or the bounds would
+        not narrow ab-av1's default range.
+    """
+    key = _group_key(codec, width, height, bitrate_kbps)
+    if key is None:
+        return None
+    crfs = []
+    for record in records:
+        crf = _searched_crf(record, vmaf_target, preset)
+        if crf is not None and _group_key(record.video_codec, record.width, record.height, record.bitrate_kbps) == key:
+            crfs.append(crf)
+    if len(crfs) < CRF_PRIOR_MIN_SAMPLES:
+        return None
+
+    deciles = statistics.quantiles(crfs, n=10)
+    min_crf = max(AB_AV1_DEFAULT_MIN_CRF, math.floor(deciles[0] - CRF_PRIOR_MARGIN))
+    max_crf = min(AB_AV1_DEFAULT_MAX_CRF, math.ceil(deciles[-1] + CRF_PRIOR_MARGIN))
+    if min_crf <= AB_AV1_DEFAULT_MIN_CRF and max_crf >= AB_AV1_DEFAULT_MAX_CRF:
+        return None
+    return CrfPrior(
+        min_crf=min_crf,
+        max_crf=max_crf,
+        samples=len(crfs),
+        source=f"{key}:p{preset}",
+        baseline_probes=_baseline_probes(records),
+    )
+
+
+def get_crf_prior(
+    codec: str | None,
+    width: int | None,
+    height: int | None,
+    bitrate_kbps: float | None,
+    preset: int = DEFAULT_ENCODING_PRESET,
+    vmaf_target: int = DEFAULT_VMAF_TARGET,
+) -> CrfPrior | None:
+    """compute_crf_prior() over the history index (one pass over its records)."""
+    prior = compute_crf_prior(
+        get_history_index().get_all_records(), codec, width, height, bitrate_kbps, preset, vmaf_target
+    )
+    if prior is not None:
+        logger.info(
+            f"CRF prior {prior.source}: CRF {prior.min_crf:g}-{prior.max_crf:g} from {prior.samples} similar files"
+        )
+    return prior
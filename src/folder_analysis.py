@@ -7,9 +7,14 @@ Provides Layer 1 (metadata-only) scanning that:
 - Checks the history index for cached data
 - Runs ffprobe only for uncached/invalid entries
 - Estimates reduction based on similar files in history
+- Flags files that similar files say will end NOT_WORTHWHILE (src/worthwhile_screen.py)
 - Estimates conversion time based on historical data
 - Returns structured results for the UI
 
+AnalysisPipeline streams files through these steps (walk -> stat -> cache
+check -> probe on miss -> record) on threads connected by bounded queues, so
+results reach the UI as they are produced and memory stays flat.
+
 This module does NOT perform VMAF analysis (Layer 2).
 """
 
@@ -17,20 +22,28 @@ import dataclasses
 import datetime
 import logging
 import os
-from collections.abc import Generator
+import queue
+import threading
+import time
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass, field
 from pathlib import Path
 from statistics import mean
 
 from src.cache_helpers import mtimes_match
-from src.config import DEFAULT_REDUCTION_ESTIMATE_PERCENT
+from src.config import ANALYSIS_PIPELINE_QUEUE_SIZE, ANALYSIS_PROBE_WORKERS, DEFAULT_REDUCTION_ESTIMATE_PERCENT
 from src.history_index import HistoryIndex, compute_filename_hash, compute_path_hash
 from src.models import FileRecord, FileStatus, VideoMetadata
+from src.resource_governor import wait_for_probe_clearance
+from src.scan_snapshot import walk_video_files
 from src.utils import format_crf, get_video_info
 from src.video_metadata import extract_video_metadata
+from src.worthwhile_screen import NotWorthwhileScreen, build_not_worthwhile_screen, is_flagged
 
 logger = logging.getLogger(__name__)
 
+_QUEUE_POLL_SECONDS = 0.1  # How often blocked pipeline stages re-check for a stop
+
 
 @dataclass(frozen=True)
 class FileAnalysisResult:
@@ -82,110 +95,343 @@ class AnalysisSummary:
     folders: list[FolderAnalysisResult] = field(default_factory=list)
 
 
-def scan_folder_fast(root_folder: str, extensions: list[str]) -> AnalysisSummary:
-    """Fast filesystem scan - no ffprobe, no metadata.
+@dataclass(frozen=True)
+class _FileStat:
+    """One stat()ed file travelling through the analysis pipeline."""
 
-    Returns folder/file structure immediately:
-    - Scans for files matching extensions
-    - Gets file size via os.stat (fast)
-    - All metadata fields set to None
-    - Status set to "pending" (not analyzed yet)
+    path: str
+    path_hash: str
+    size: int
+    mtime: float
 
-    Should complete in milliseconds for typical folders.
 
-    Args:
-        root_folder: Root folder to scan.
-        extensions: List of video extensions to look for (e.g., ["mp4", "mkv"]).
+@dataclass
+class PipelineStats:
+    """Per-stage counters for one AnalysisPipeline run, for profiling.
 
-    Returns:
-        AnalysisSummary with folder/file structure (pending analysis).
+    Counters are updated from the stage threads; *_seconds are summed busy
+    time per stage (probe time across all workers) and peak_*_queue is the
+    deepest each bounded queue got, which stays at or below the queue size.
     """
-    root_path = Path(root_folder).resolve()
 
-    # Find all video files
-    all_files = list(_find_video_files(root_folder, extensions))
+    walked: int = 0
+    stat_errors: int = 0
+    output_exists: int = 0
+    cache_hits: int = 0
+    probed: int = 0
+    recorded: int = 0
+    errors: int = 0
+    emitted: int = 0
+    stat_seconds: float = 0.0
+    probe_seconds: float = 0.0
+    record_seconds: float = 0.0
+    peak_probe_queue: int = 0
+    peak_record_queue: int = 0
+    peak_output_queue: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add(self, **deltas: float) -> None:
+        """Atomically add to one or more counters."""
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def note_queue_depth(self, name: str, depth: int) -> None:
+        """Record a queue depth observation for peak_<name>_queue."""
+        attr = f"peak_{name}_queue"
+        with self._lock:
+            if depth > getattr(self, attr):
+                setattr(self, attr, depth)
+
+    def summary(self) -> str:
+        """One-line summary for logging."""
+        return (
+            f"{self.walked} walked, {self.cache_hits} cache hits, {self.output_exists} already output, "
+            f"{self.probed} probed, {self.recorded} recorded, {self.stat_errors + self.errors} errors; "
+            f"stat {self.stat_seconds:.2f}s, probe {self.probe_seconds:.2f}s, record {self.record_seconds:.2f}s; "
+            f"peak queues probe={self.peak_probe_queue} record={self.peak_record_queue} "
+            f"output={self.peak_output_queue}"
+        )
 
-    if not all_files:
-        return AnalysisSummary(root_folder=root_folder)
 
-    # Group by folder
-    folder_results: dict[str, FolderAnalysisResult] = {}
+_DONE = object()  # End-of-stream marker passed between pipeline stages
 
-    for file_path in all_files:
-        # Get file size (fast)
-        try:
-            stat = os.stat(file_path)
-            file_size = stat.st_size
-        except OSError:
-            file_size = 0
 
-        path_hash = compute_path_hash(file_path)
+class AnalysisPipeline:
+    """Streaming walk -> stat -> cache check -> probe -> record pipeline.
 
-        # Create pending result
-        result = FileAnalysisResult(
-            path=file_path,
-            path_hash=path_hash,
-            status="pending",
-            file_size_bytes=file_size,
-            video_codec=None,
-            resolution=None,
-            duration_sec=None,
-            estimated_reduction_percent=None,
-            estimated_savings_bytes=None,
-            status_detail="Not analyzed yet",
-        )
+    Stages run on their own threads and are connected by bounded queues, so a
+    slow stage applies backpressure to the ones before it and memory stays flat
+    regardless of library size:
+
+    - source (1 thread): pulls paths lazily from the input iterable, stats
+      each file once, and answers it from the output folder or the history
+      cache when possible. Only misses go on to be probed.
+    - probe (probe_workers threads): runs ffprobe. Probes can take seconds,
+      so this is the only parallel stage.
+    - record (1 thread): writes the SCANNED record and estimate to the index,
+      so index writes from the pipeline never contend with each other.
+
+    Results are yielded by results() as soon as any stage produces them (cache
+    hits usually overtake probed files). Per-stage counters are in stats.
+    """
 
-        # Group by folder
-        folder_path = os.path.dirname(file_path)
-        if folder_path not in folder_results:
+    def __init__(
+        self,
+        file_paths: Iterable[str],
+        root_path: Path,
+        output_path: Path,
+        index: HistoryIndex,
+        anonymize: bool,
+        *,
+        probe_workers: int = ANALYSIS_PROBE_WORKERS,
+        queue_size: int = ANALYSIS_PIPELINE_QUEUE_SIZE,
+        stop_event: threading.Event | None = None,
+    ):
+        """Set up the pipeline; no work starts until results() is iterated.
+
+        Args:
+            file_paths: Paths to analyze; consumed lazily (may be a generator).
+            root_path: Root folder of the scan.
+            output_path: Output folder for conversions.
+            index: The history index for cache lookups and writes.
+            anonymize: Whether to anonymize paths in new records.
+            probe_workers: Number of parallel ffprobe workers.
+            queue_size: Capacity of each inter-stage queue.
+            stop_event: Optional event; all stages stop promptly when set.
+        """
+        self.stats = PipelineStats()
+        self._file_paths = file_paths
+        self._root_path = root_path
+        self._output_path = output_path
+        self._index = index
+        self._anonymize = anonymize
+        self._probe_workers = max(1, probe_workers)
+        self._stop_event = stop_event
+        self._halt = threading.Event()  # Set when the consumer stops early
+        self._probe_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._record_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._output_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._threads: list[threading.Thread] = []
+
+    def results(self, poll_interval: float | None = None) -> Iterator[FileAnalysisResult | None]:
+        """Start the stages and yield results as they are produced.
+
+        Closing the generator early (or setting stop_event) stops every stage;
+        the generator only returns once all stage threads have exited.
+
+        Args:
+            poll_interval: If given, yield None whenever no result arrived for
+                this many seconds, so the consumer can flush batched UI updates.
+
+        Yields:
+            FileAnalysisResult per input file (None on idle polls).
+        """
+        if self._threads:
+            raise RuntimeError("AnalysisPipeline.results() can only be iterated once")
+        self._threads = [threading.Thread(target=self._source_stage, name="analysis-source", daemon=True)]
+        self._threads += [
+            threading.Thread(target=self._probe_stage, name=f"analysis-probe-{i}", daemon=True)
+            for i in range(self._probe_workers)
+        ]
+        self._threads.append(threading.Thread(target=self._record_stage, name="analysis-record", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+        try:
+            while True:
+                try:
+                    item = self._output_queue.get(timeout=poll_interval or _QUEUE_POLL_SECONDS)
+                except queue.Empty:
+                    if self._stopped():
+                        return
+                    if poll_interval is not None:
+                        yield None
+                    continue
+                if item is _DONE:
+                    return
+                self.stats.add(emitted=1)
+                yield item
+        finally:
+            self._halt.set()
+            for thread in self._threads:
+                thread.join()
+
+    # -- Stages ----------------------------------------------------------------
+
+    def _source_stage(self) -> None:
+        """Stat each path and answer it from the output folder or cache where possible."""
+        try:
+            for file_path in self._file_paths:
+                if self._stopped():
+                    return
+                started = time.perf_counter()
+                entry = _stat_file(file_path)
+                if isinstance(entry, FileAnalysisResult):
+                    self.stats.add(walked=1, stat_errors=1, stat_seconds=time.perf_counter() - started)
+                    if not self._put(self._output_queue, entry, "output"):
+                        return
+                    continue
+
+                output_exists = _get_output_path(file_path, self._root_path, self._output_path).exists()
+                result = _output_exists_result(entry) if output_exists else _cached_result(entry, self._index)
+                self.stats.add(
+                    walked=1,
+                    output_exists=int(output_exists),
+                    cache_hits=int(result is not None and not output_exists),
+                    stat_seconds=time.perf_counter() - started,
+                )
+                if result is not None:
+                    if not self._put(self._output_queue, result, "output"):
+                        return
+                elif not self._put(self._probe_queue, entry, "probe"):
+                    return
+        except Exception:
+            logger.exception("Analysis pipeline source stage failed")
+        finally:
+            for _ in range(self._probe_workers):
+                self._put(self._probe_queue, _DONE, "probe")
+
+    def _probe_stage(self) -> None:
+        """Run ffprobe for cache misses (one of probe_workers threads)."""
+        while (entry := self._get(self._probe_queue)) is not _DONE:
+            if not wait_for_probe_clearance(self._stopped):  # Paused while the resource governor throttles
+                return
+            started = time.perf_counter()
             try:
-                relative = Path(folder_path).relative_to(root_path)
-                relative_str = str(relative) if str(relative) != "." else "(root)"
-            except ValueError:
-                relative_str = folder_path
-            folder_results[folder_path] = FolderAnalysisResult(folder_path=folder_path, relative_path=relative_str)
-
-        fr = folder_results[folder_path]
-        fr.total_files += 1
-        fr.files.append(result)
-        fr.total_size_bytes += file_size
-
-    # Build summary - sort folders and files alphabetically (case-insensitive)
-    folders = sorted(folder_results.values(), key=lambda f: f.relative_path.lower())
-    for folder in folders:
-        folder.files.sort(key=lambda f: os.path.basename(f.path).lower())
-
-    return AnalysisSummary(
-        root_folder=root_folder,
-        total_folders=len(folders),
-        total_files=sum(f.total_files for f in folders),
-        folders=folders,
-    )
+                video_info = get_video_info(entry.path)
+            except Exception:
+                logger.exception(f"Error probing {os.path.basename(entry.path)}")
+                video_info = None
+            self.stats.add(probed=1, probe_seconds=time.perf_counter() - started)
+            if not self._put(self._record_queue, (entry, video_info), "record"):
+                return
+        self._put(self._record_queue, _DONE, "record")
+
+    def _record_stage(self) -> None:
+        """Write records for probed files; ends the output once every probe worker is done."""
+        remaining_workers = self._probe_workers
+        screen = None  # Trained on the first probed file, so fully cached scans skip the pass over history
+        while remaining_workers:
+            item = self._get(self._record_queue)
+            if item is _DONE:
+                if self._stopped():
+                    return
+                remaining_workers -= 1
+                continue
+            entry, video_info = item
+            started = time.perf_counter()
+            try:
+                if screen is None:
+                    screen = build_not_worthwhile_screen(self._index)
+                result = _record_probe(entry, video_info, self._index, self._anonymize, screen)
+                self.stats.add(recorded=1)
+            except Exception as e:
+                logger.exception(f"Error analyzing {os.path.basename(entry.path)}")
+                result = _error_result(entry.path, entry.path_hash, f"Analysis failed: {e}")
+                self.stats.add(errors=1)
+            self.stats.add(record_seconds=time.perf_counter() - started)
+            if not self._put(self._output_queue, result, "output"):
+                return
+        self._put(self._output_queue, _DONE, "output")
+
+    # -- Queue helpers ---------------------------------------------------------
+
+    def _stopped(self) -> bool:
+        return self._halt.is_set() or (self._stop_event is not None and self._stop_event.is_set())
+
+    def _put(self, q: queue.Queue, item, name: str) -> bool:
+        """Blocking put that gives up when the pipeline stops. Returns False if stopped."""
+        while not self._stopped():
+            try:
+                q.put(item, timeout=_QUEUE_POLL_SECONDS)
+            except queue.Full:
+                continue
+            self.stats.note_queue_depth(name, q.qsize())
+            return True
+        return False
+
+    def _get(self, q: queue.Queue):
+        """Blocking get that returns _DONE when the pipeline stops."""
+        while not self._stopped():
+            try:
+                return q.get(timeout=_QUEUE_POLL_SECONDS)
+            except queue.Empty:
+                continue
+        return _DONE
 
 
-def _find_video_files(root: str, extensions: list[str]) -> Generator[str, None, None]:
-    """Find all video files in a directory tree.
+def iter_folder_scan(
+    root_folder: str, extensions: list[str], stop_event: threading.Event | None = None
+) -> Iterator[FolderAnalysisResult]:
+    """Fast filesystem scan, streamed one folder at a time - no ffprobe, no metadata.
 
-    Uses single-pass os.walk() instead of multiple rglob() calls for performance.
-    A directory tree is traversed once, and files are filtered by extension.
+    Walks the tree in the same alphabetical DFS order as the Analysis tab and
+    stats files during the directory listing itself, so nothing is collected
+    or sorted up front.
 
     Args:
-        root: Root directory to search.
-        extensions: List of extensions to match (without dots).
+        root_folder: Root folder to scan.
+        extensions: List of video extensions to look for (e.g., ["mp4", "mkv"]).
+        stop_event: Optional event; the walk stops early when set.
 
     Yields:
-        Absolute paths to video files.
+        FolderAnalysisResult with pending file results, for each folder that
+        directly contains video files.
     """
-    # Build set of lowercase extensions for fast lookup
-    ext_set = {ext.lower() for ext in extensions}
+    ext_set = {f".{ext.lower()}" for ext in extensions}
+    for dirpath, file_infos in walk_video_files(root_folder, ext_set, stop_event):
+        if not file_infos:
+            continue
+        relative = os.path.relpath(dirpath, root_folder)
+        folder = FolderAnalysisResult(
+            folder_path=dirpath, relative_path="(root)" if relative == os.curdir else relative
+        )
+        for filename, file_size, _mtime in file_infos:
+            file_path = os.path.join(dirpath, filename)
+            folder.files.append(
+                FileAnalysisResult(
+                    path=file_path,
+                    path_hash=compute_path_hash(file_path),
+                    status="pending",
+                    file_size_bytes=file_size,
+                    video_codec=None,
+                    resolution=None,
+                    duration_sec=None,
+                    estimated_reduction_percent=None,
+                    estimated_savings_bytes=None,
+                    status_detail="Not analyzed yet",
+                )
+            )
+            folder.total_size_bytes += file_size
+        folder.total_files = len(folder.files)
+        yield folder
+
+
+def scan_folder_fast(root_folder: str, extensions: list[str]) -> AnalysisSummary:
+    """Fast filesystem scan - no ffprobe, no metadata.
 
-    # Single-pass traversal (much faster than multiple rglob calls)
-    for dirpath, _dirnames, filenames in os.walk(root):
-        for filename in filenames:
-            # Check extension (case-insensitive)
-            ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
-            if ext in ext_set:
-                yield os.path.join(dirpath, filename)
+    Returns folder/file structure immediately:
+    - Scans for files matching extensions
+    - Gets file size from the directory listing (fast)
+    - All metadata fields set to None
+    - Status set to "pending" (not analyzed yet)
+
+    Collects iter_folder_scan(); use that directly to stream folders instead.
+
+    Args:
+        root_folder: Root folder to scan.
+        extensions: List of video extensions to look for (e.g., ["mp4", "mkv"]).
+
+    Returns:
+        AnalysisSummary with folder/file structure (pending analysis).
+    """
+    summary = AnalysisSummary(root_folder=root_folder)
+    for folder in iter_folder_scan(root_folder, extensions):
+        summary.folders.append(folder)
+        summary.total_files += folder.total_files
+    summary.total_folders = len(summary.folders)
+    return summary
 
 
 def _analyze_file(
@@ -193,6 +439,8 @@ def _analyze_file(
 ) -> FileAnalysisResult:
     """Analyze a single file, using cache where possible.
 
+    Runs the AnalysisPipeline stages inline for one file.
+
     Args:
         file_path: Path to the video file.
         root_path: Root folder of the scan.
@@ -203,58 +451,104 @@ def _analyze_file(
     Returns:
         FileAnalysisResult with analysis data.
     """
-    path_hash = compute_path_hash(file_path)
-    filename = os.path.basename(file_path)
+    entry = _stat_file(file_path)
+    if isinstance(entry, FileAnalysisResult):
+        return entry
+
+    # Check if output already exists
+    if _get_output_path(file_path, root_path, output_path).exists():
+        return _output_exists_result(entry)
+
+    # Check cache
+    cached_result = _cached_result(entry, index)
+    if cached_result is not None:
+        return cached_result
+
+    # Cache miss or stale - run ffprobe
+    return _record_probe(entry, get_video_info(file_path), index, anonymize)
+
+
+def _stat_file(file_path: str) -> _FileStat | FileAnalysisResult:
+    """Stat a file once for the rest of the pipeline.
 
-    # Get file stats
+    Returns:
+        _FileStat, or a "skipped_error" result if the file cannot be accessed.
+    """
+    path_hash = compute_path_hash(file_path)
     try:
         stat = os.stat(file_path)
-        file_size = stat.st_size
-        file_mtime = stat.st_mtime
     except OSError as e:
-        logger.warning(f"Cannot stat file {filename}: {e}")
-        return FileAnalysisResult(
-            path=file_path,
-            path_hash=path_hash,
-            status="skipped_error",
-            file_size_bytes=0,
-            video_codec=None,
-            resolution=None,
-            duration_sec=None,
-            estimated_reduction_percent=None,
-            estimated_savings_bytes=None,
-            status_detail=f"Cannot access file: {e}",
-        )
+        logger.warning(f"Cannot stat file {os.path.basename(file_path)}: {e}")
+        return _error_result(file_path, path_hash, f"Cannot access file: {e}")
+    return _FileStat(path=file_path, path_hash=path_hash, size=stat.st_size, mtime=stat.st_mtime)
 
-    # Check if output already exists
-    output_file = _get_output_path(file_path, root_path, output_path)
-    if output_file.exists():
-        return FileAnalysisResult(
-            path=file_path,
-            path_hash=path_hash,
-            status="already_done",
-            file_size_bytes=file_size,
-            video_codec=None,
-            resolution=None,
-            duration_sec=None,
-            estimated_reduction_percent=None,
-            estimated_savings_bytes=None,
-            status_detail="Output file exists",
-        )
 
-    # Check cache
-    cached = index.get(path_hash)
-    if cached and cached.file_size_bytes == file_size and mtimes_match(cached.file_mtime, file_mtime):
-        # Cache hit - use cached data
-        return _record_to_result(file_path, cached, index)
+def _error_result(file_path: str, path_hash: str, detail: str) -> FileAnalysisResult:
+    """Build a "skipped_error" result for a file that could not be analyzed."""
+    return FileAnalysisResult(
+        path=file_path,
+        path_hash=path_hash,
+        status="skipped_error",
+        file_size_bytes=0,
+        video_codec=None,
+        resolution=None,
+        duration_sec=None,
+        estimated_reduction_percent=None,
+        estimated_savings_bytes=None,
+        status_detail=detail,
+    )
 
-    # Cache miss or stale - run ffprobe
-    video_info = get_video_info(file_path)
+
+def _output_exists_result(entry: _FileStat) -> FileAnalysisResult:
+    """Build the "already_done" result for a file whose output already exists."""
+    return FileAnalysisResult(
+        path=entry.path,
+        path_hash=entry.path_hash,
+        status="already_done",
+        file_size_bytes=entry.size,
+        video_codec=None,
+        resolution=None,
+        duration_sec=None,
+        estimated_reduction_percent=None,
+        estimated_savings_bytes=None,
+        status_detail="Output file exists",
+    )
+
+
+def _cached_result(entry: _FileStat, index: HistoryIndex) -> FileAnalysisResult | None:
+    """Answer a file from the history cache if its record still matches size and mtime."""
+    cached = index.get(entry.path_hash)
+    if cached and cached.file_size_bytes == entry.size and mtimes_match(cached.file_mtime, entry.mtime):
+        return _record_to_result(entry.path, cached, index)
+    return None
+
+
+def _record_probe(
+    entry: _FileStat,
+    video_info: dict | None,
+    index: HistoryIndex,
+    anonymize: bool,
+    screen: NotWorthwhileScreen | None = None,
+) -> FileAnalysisResult:
+    """Write the record for a freshly probed file and build its result.
+
+    Args:
+        entry: The stat()ed file.
+        video_info: Output from get_video_info(), or None if the probe failed.
+        index: The history index.
+        anonymize: Whether to anonymize paths.
+        screen: NOT_WORTHWHILE pre-screen that sets the record's likelihood (None: not screened).
+
+    Returns:
+        FileAnalysisResult with analysis data.
+    """
+    file_path, path_hash, file_size, file_mtime = entry.path, entry.path_hash, entry.size, entry.mtime
+    filename = os.path.basename(file_path)
     meta = extract_video_metadata(video_info)
 
     # The remaining lookup -> upsert sequence stays atomic so two parallel scan
     # workers cannot interleave a stale re-read with each other's writes. The
-    # ffprobe above deliberately stays outside the lock - probes can take seconds
+    # ffprobe itself deliberately stays outside the lock - probes can take seconds
     # and must not serialize the other workers.
     with index.transaction():
         # Re-read under the lock: another writer may have updated this path meanwhile.
@@ -304,6 +598,8 @@ def _analyze_file(
         est_reduction, similar_count = _estimate_reduction(record, index)
         record.estimated_reduction_percent = est_reduction
         record.estimated_from_similar = similar_count
+        if screen is not None:
+            record.not_worthwhile_likelihood = screen.likelihood(record)
 
         # Save to index
         index.upsert(record)
@@ -330,9 +626,8 @@ def _analyze_file(
             duration_sec=record.duration_sec,
             estimated_reduction_percent=est_reduction,
             estimated_savings_bytes=est_savings,
-            status_detail=f"Est. based on {similar_count} similar files"
-            if similar_count
-            else "Est. (no similar files)",
+            status_detail=_screen_detail(record)
+            or (f"Est. based on {similar_count} similar files" if similar_count else "Est. (no similar files)"),
         )
 
 
@@ -392,6 +687,7 @@ def _create_scanned_record(
         width=meta.width,
         height=meta.height,
         bitrate_kbps=meta.bitrate_kbps,
+        fps=meta.fps,
         first_seen=now,
         last_updated=now,
     )
@@ -433,6 +729,7 @@ def _update_existing_record_metadata(
         width=meta.width if meta.width else existing.width,
         height=meta.height if meta.height else existing.height,
         bitrate_kbps=meta.bitrate_kbps if meta.bitrate_kbps else existing.bitrate_kbps,
+        fps=meta.fps if meta.fps else existing.fps,
         original_path=existing.original_path or (file_path if not anonymize else None),
         last_updated=now,
         # Preserve first_seen if it exists
@@ -521,7 +818,7 @@ def _record_to_result(file_path: str, record: FileRecord, index: HistoryIndex) -
                 index.upsert(record)
             if reduction and record.file_size_bytes:
                 savings = int(record.file_size_bytes * reduction / 100)
-            detail = f"Est. based on {record.estimated_from_similar or 0} similar files"
+            detail = _screen_detail(record) or f"Est. based on {record.estimated_from_similar or 0} similar files"
 
     return FileAnalysisResult(
         path=file_path,
@@ -537,6 +834,13 @@ def _record_to_result(file_path: str, record: FileRecord, index: HistoryIndex) -
     )
 
 
+def _screen_detail(record: FileRecord) -> str | None:
+    """Status detail of a file the NOT_WORTHWHILE pre-screen flagged (None if not flagged)."""
+    if not is_flagged(record.not_worthwhile_likelihood):
+        return None
+    return f"Likely not worthwhile ({record.not_worthwhile_likelihood:.0%} of similar files)"
+
+
 def _estimate_reduction(record: FileRecord, index: HistoryIndex) -> tuple[float | None, int]:
     """Estimate reduction percentage based on similar converted files.
 
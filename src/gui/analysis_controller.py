@@ -19,7 +19,14 @@ from tkinter import messagebox
 
 from src.estimation import compute_grouped_percentiles, estimate_file_time
 from src.gui import analysis_scanner
-from src.gui.tree_formatters import clear_sort_state, format_compact_time, format_efficiency, sort_analysis_tree
+from src.gui.analysis_tree import EMPTY_AGGREGATE, apply_file_aggregate, compute_file_aggregate
+from src.gui.tree_formatters import (
+    AnalysisSortKeys,
+    clear_sort_state,
+    format_compact_time,
+    format_efficiency,
+    sort_analysis_tree,
+)
 from src.history_index import get_history_index
 from src.models import FileStatus, OperationType
 from src.utils import format_crf, format_file_size
@@ -120,11 +127,12 @@ def refresh_analysis_tree(gui) -> None:
     if gui.analysis_stop_event:
         gui.analysis_stop_event.set()
 
-    # Start incremental background scan
+    # Start incremental background scan (restores from the last scan's snapshot when available).
+    # Snapshots hold plain file names, so they are not persisted when history is anonymized.
     gui._scan_stop_event = threading.Event()
     threading.Thread(
         target=analysis_scanner.incremental_scan_thread,
-        args=(gui, folder, extensions, gui._scan_stop_event),
+        args=(gui, folder, extensions, gui._scan_stop_event, not gui.anonymize_history.get()),
         daemon=True,
     ).start()
 
@@ -159,8 +167,10 @@ def prune_empty_folders(gui) -> int:
                 text = gui.analysis_tree.item(item_id, "text")
                 if "📁" in text:
                     gui.analysis_tree.delete(item_id)
-                    # Clean up cached folder aggregates
+                    # Clean up cached folder aggregates and the registry entry
                     gui.folder_aggregates.pop(item_id, None)
+                    gui.analysis_sort_keys.pop(item_id, None)
+                    gui._tree_item_map.discard_item(item_id)
                     removed_this_pass += 1
 
         total_removed += removed_this_pass
@@ -285,7 +295,7 @@ def on_ffprobe_complete(gui) -> None:
 
     # Apply default sort by efficiency (highest first) if user hasn't sorted yet
     if gui._sort_col is None:
-        sort_analysis_tree(gui, "efficiency", descending=True)
+        sort_analysis_tree(gui, "efficiency", descending=False)
 
 
 # =============================================================================
@@ -366,10 +376,7 @@ def get_file_path_for_tree_item(gui, item_id: str) -> str | None:
     Returns:
         The file path, or None if not found.
     """
-    for path, tid in gui._tree_item_map.items():
-        if tid == item_id:
-            return path
-    return None
+    return gui._tree_item_map.file_path_for_item(item_id)
 
 
 def get_analysis_tree_tooltip(gui, item_id: str) -> str | None:
@@ -482,12 +489,13 @@ def update_analysis_tree_for_completed_file(gui, file_path: str, status: str) ->
         # Clear time and efficiency for completed files
         gui.analysis_tree.set(item_id, "time", "—")
         gui.analysis_tree.set(item_id, "efficiency", "—")
+        old_keys = gui.analysis_sort_keys.get(item_id, AnalysisSortKeys())
+        gui.analysis_sort_keys[item_id] = AnalysisSortKeys(format=old_keys.format, size=old_keys.size)
 
-        # Update all ancestor folder aggregates
-        parent_id = gui.analysis_tree.parent(item_id)
-        while parent_id:
-            gui.update_folder_aggregates(parent_id)
-            parent_id = gui.analysis_tree.parent(parent_id)
+        # Push the file's new contribution (size only, once done/skipped) up its ancestors
+        record = get_history_index().lookup_file(file_path)
+        file_size = gui.file_aggregates.get(item_id, EMPTY_AGGREGATE)[0]  # Keeps the scanned size without a record
+        apply_file_aggregate(gui, item_id, compute_file_aggregate(record, compute_grouped_percentiles(), file_size))
 
         # Sync queue tags since this file is no longer "in queue" effectively
         gui.sync_queue_tags_to_analysis_tree(removed_paths={os.path.normcase(file_path)})
@@ -628,4 +636,6 @@ def clear_analysis_tree(gui) -> None:
         gui.analysis_tree.delete(item)
     gui._tree_item_map.clear()
     gui.folder_aggregates.clear()
+    gui.file_aggregates.clear()
+    gui.analysis_sort_keys.clear()
     clear_sort_state(gui)
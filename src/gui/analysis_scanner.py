@@ -9,21 +9,61 @@ import logging
 import os
 import threading
 from collections import deque
-from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 
 from src.cache_helpers import mtimes_match
 from src.config import MIN_FILES_FOR_PERCENT_UPDATES, TREE_UPDATE_BATCH_SIZE
 from src.estimation import compute_grouped_percentiles
-from src.folder_analysis import _analyze_file
-from src.gui.tree_display import compute_analysis_display_values
+from src.folder_analysis import AnalysisPipeline
+from src.gui.analysis_tree import (
+    EMPTY_AGGREGATE,
+    FolderAggregate,
+    apply_file_aggregate,
+    compute_file_aggregate,
+    render_folder_aggregates,
+)
+from src.gui.tree_display import compute_analysis_row
+from src.gui.tree_formatters import AnalysisSortKeys
 from src.history_index import get_history_index
+from src.scan_snapshot import (
+    ScanSnapshot,
+    diff_snapshots,
+    load_snapshot,
+    save_snapshot,
+    scan_directory,
+    walk_video_files,
+)
 from src.utils import format_file_size, update_ui_safely
 
 logger = logging.getLogger(__name__)
 
 
-def incremental_scan_thread(gui, folder: str, extensions: list[str], stop_event: threading.Event):
+def _file_display_values(
+    index, file_path: str, file_size: int, file_mtime: float, grouped_percentiles: dict
+) -> tuple[tuple[str, str, str, str, str], str, FolderAggregate, AnalysisSortKeys]:
+    """Compute row values for a scanned file, using the history cache when still valid.
+
+    Returns:
+        ((format, size, savings, time, efficiency), tag, folder aggregate contribution, sort keys)
+    """
+    # Check cache (use tolerance for mtime due to float precision in JSON)
+    record = index.lookup_file(file_path)
+    if record and record.file_size_bytes == file_size and mtimes_match(record.file_mtime, file_mtime):
+        # Cache hit - use cached display values
+        (format_str, size_str, savings_str, time_str, eff_str, tag), sort_keys = compute_analysis_row(
+            record, grouped_percentiles=grouped_percentiles
+        )
+        aggregate = compute_file_aggregate(record, grouped_percentiles)
+        return (format_str, size_str, savings_str, time_str, eff_str), tag, aggregate, sort_keys
+    # No valid cache - show defaults until scanned (only the size counts towards folders)
+    values = ("—", format_file_size(file_size), "—", "—", "—")
+    aggregate = compute_file_aggregate(None, grouped_percentiles, file_size)
+    return values, "", aggregate, AnalysisSortKeys(format="—", size=file_size or None)
+
+
+def incremental_scan_thread(
+    gui, folder: str, extensions: list[str], stop_event: threading.Event, persist_snapshot: bool = True
+):
     """Scan folder and populate tree incrementally from background thread.
 
     Uses depth-first traversal for optimal HDD performance - keeps disk head
@@ -31,6 +71,11 @@ def incremental_scan_thread(gui, folder: str, extensions: list[str], stop_event:
 
     Also checks HistoryIndex cache - if a file was previously analyzed,
     displays cached values immediately instead of "—".
+
+    If a snapshot of the last completed scan of this root exists, the tree is
+    rebuilt from it in one pass and the walk only revalidates it (see
+    restore_from_snapshot). A completed walk is saved as the new snapshot
+    unless persist_snapshot is False (anonymized history).
     """
     root_folder = str(Path(folder).resolve())
     ext_set = {f".{ext.lower()}" for ext in extensions}
@@ -38,30 +83,10 @@ def incremental_scan_thread(gui, folder: str, extensions: list[str], stop_event:
     folder_count = 0
     index = get_history_index()
 
-    def scan_directory(dirpath: str) -> tuple[list[str], list[tuple[str, int, float]]]:
-        """Scan a directory for subdirs and video files with stats.
-
-        Returns:
-            (subdirs, file_infos) where file_infos is list of (filename, size, mtime)
-        """
-        subdirs = []
-        file_infos = []
-        try:
-            with os.scandir(dirpath) as entries:
-                for entry in entries:
-                    if stop_event.is_set():
-                        return [], []
-                    if entry.is_dir(follow_symlinks=False):
-                        subdirs.append(entry.path)
-                    elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in ext_set:
-                        try:
-                            stat = entry.stat()
-                            file_infos.append((entry.name, stat.st_size, stat.st_mtime))
-                        except OSError:
-                            file_infos.append((entry.name, 0, 0))
-        except (PermissionError, OSError):
-            pass
-        return sorted(subdirs, key=str.lower), sorted(file_infos, key=lambda x: x[0].lower())
+    snapshot = load_snapshot(root_folder, extensions)
+    if snapshot is not None:
+        restore_from_snapshot(gui, snapshot, ext_set, stop_event, persist_snapshot)
+        return
 
     try:
         # DFS stack: (dirpath, parent_dirpath or None for root)
@@ -72,6 +97,9 @@ def incremental_scan_thread(gui, folder: str, extensions: list[str], stop_event:
         folder_tree_ids: dict[str, str] = {}
         folder_tree_ids[root_folder] = ""  # Root maps to tree root
 
+        # (dirpath, file_infos) per directory, saved as the snapshot for the next startup
+        listing: list[tuple[str, list[tuple[str, int, float]]]] = []
+
         # Pre-compute percentiles once for entire scan (history doesn't change during scan)
         grouped_percentiles = compute_grouped_percentiles()
 
@@ -79,9 +107,10 @@ def incremental_scan_thread(gui, folder: str, extensions: list[str], stop_event:
             dirpath, parent_dirpath = stack.pop()
 
             # Scan directory in background thread
-            subdirs, file_infos = scan_directory(dirpath)
+            subdirs, file_infos = scan_directory(dirpath, ext_set, stop_event)
             if stop_event.is_set():
                 break
+            listing.append((dirpath, file_infos))
 
             # Get parent tree ID
             parent_tree_id = folder_tree_ids.get(parent_dirpath or root_folder, "")
@@ -95,26 +124,10 @@ def incremental_scan_thread(gui, folder: str, extensions: list[str], stop_event:
             file_display_data = []
             for filename, file_size, file_mtime in file_infos:
                 file_path = os.path.join(dirpath, filename)
-
-                # Check cache (use tolerance for mtime due to float precision in JSON)
-                record = index.lookup_file(file_path)
-                if record and record.file_size_bytes == file_size and mtimes_match(record.file_mtime, file_mtime):
-                    # Cache hit - use cached display values
-                    format_str, size_str, savings_str, time_str, eff_str, tag = compute_analysis_display_values(
-                        record, grouped_percentiles=grouped_percentiles
-                    )
-                else:
-                    # No valid cache - show defaults until scanned
-                    format_str = "—"
-                    size_str = format_file_size(file_size)
-                    savings_str = "—"
-                    time_str = "—"
-                    eff_str = "—"
-                    tag = ""
-
-                file_display_data.append(
-                    (filename, file_path, format_str, size_str, savings_str, time_str, eff_str, tag)
+                values, tag, aggregate, sort_keys = _file_display_values(
+                    index, file_path, file_size, file_mtime, grouped_percentiles
                 )
+                file_display_data.append((filename, file_path, values, tag, aggregate, sort_keys))
 
             # Prepare UI update
             is_root = dirpath == root_folder
@@ -138,35 +151,24 @@ def incremental_scan_thread(gui, folder: str, extensions: list[str], stop_event:
                     if is_rt:
                         # Root folder: add files at tree root, no folder node
                         folder_id = ""
-                        for filename, file_path, format_str, size_str, savings_str, time_str, eff_str, tag in fdata:
-                            item_id = gui.analysis_tree.insert(
-                                "",
-                                "end",
-                                text=f"🎬 {filename}",
-                                values=(format_str, size_str, savings_str, time_str, eff_str),
-                                tags=(tag,) if tag else (),
-                            )
-                            gui.get_tree_item_map()[os.path.normcase(file_path)] = item_id
-                            file_count += 1
                     else:
                         # Non-root: create folder node and add files
                         folder_id = gui.analysis_tree.insert(
                             pid, "end", text=f"▶ 📁 {fname}", values=("", "—", "—", "—", "—"), open=False
                         )
+                        gui.get_tree_item_map().register_folder(folder_id, dp)
                         folder_count += 1
-                        for filename, file_path, format_str, size_str, savings_str, time_str, eff_str, tag in fdata:
-                            item_id = gui.analysis_tree.insert(
-                                folder_id,
-                                "end",
-                                text=f"🎬 {filename}",
-                                values=(format_str, size_str, savings_str, time_str, eff_str),
-                                tags=(tag,) if tag else (),
-                            )
-                            gui.get_tree_item_map()[os.path.normcase(file_path)] = item_id
-                            file_count += 1
-                        # Update folder aggregate from its files
-                        if fdata:
-                            gui.update_folder_aggregates(folder_id)
+                    dirty_folders: set[str] = set()
+                    for filename, file_path, values, tag, aggregate, sort_keys in fdata:
+                        item_id = gui.analysis_tree.insert(
+                            folder_id, "end", text=f"🎬 {filename}", values=values, tags=(tag,) if tag else ()
+                        )
+                        gui.get_tree_item_map()[os.path.normcase(file_path)] = item_id
+                        gui.analysis_sort_keys[item_id] = sort_keys
+                        apply_file_aggregate(gui, item_id, aggregate, dirty_folders)
+                        file_count += 1
+                    # Redraw this folder and its ancestors once for all new files
+                    render_folder_aggregates(gui, dirty_folders)
 
                     # Update scanning badge with current file count
                     file_word = "file" if file_count == 1 else "files"
@@ -187,6 +189,9 @@ def incremental_scan_thread(gui, folder: str, extensions: list[str], stop_event:
             update_ui_safely(gui.root, lambda: gui.finish_incremental_scan(stopped=True))
             return
 
+        if persist_snapshot:
+            save_snapshot(ScanSnapshot.from_listing(root_folder, extensions, listing))
+
         update_ui_safely(gui.root, lambda: gui.finish_incremental_scan(stopped=False))
 
     except PermissionError:
@@ -203,15 +208,179 @@ def incremental_scan_thread(gui, folder: str, extensions: list[str], stop_event:
             update_ui_safely(gui.root, lambda: gui.finish_incremental_scan(stopped=False))
 
 
+def restore_from_snapshot(
+    gui, snapshot: ScanSnapshot, ext_set: set[str], stop_event: threading.Event, persist_snapshot: bool
+) -> None:
+    """Rebuild the tree from a saved snapshot, then revalidate it against the disk.
+
+    Runs on the scan thread. All rows are inserted in one UI-thread pass (no
+    per-directory round trips), so a large library appears immediately. The
+    same DFS walk as a fresh scan then runs in the background and only rows
+    for added, removed, or changed files are touched afterwards.
+
+    Args:
+        gui: The VideoConverterGUI instance.
+        snapshot: Snapshot of the last completed scan of this root.
+        ext_set: Lowercase extensions including the dot.
+        stop_event: Set when a newer scan supersedes this one.
+        persist_snapshot: Whether to save the revalidated snapshot.
+    """
+    root_folder = snapshot.root
+    index = get_history_index()
+    folder_ids: dict[str, str] = {"": ""}  # Relative folder path -> tree item ID
+
+    def ensure_folder(folder_rel: str) -> str:
+        """Return the tree ID for a relative folder, creating it and its ancestors (UI thread)."""
+        folder_id = folder_ids.get(folder_rel)
+        if folder_id is None:
+            parent_id = ensure_folder(os.path.dirname(folder_rel))
+            folder_id = gui.analysis_tree.insert(
+                parent_id,
+                "end",
+                text=f"▶ 📁 {os.path.basename(folder_rel)}",
+                values=("", "—", "—", "—", "—"),
+                open=False,
+            )
+            folder_ids[folder_rel] = folder_id
+            gui.get_tree_item_map().register_folder(folder_id, os.path.join(root_folder, folder_rel))
+        return folder_id
+
+    def insert_file_row(row: tuple[str, str, tuple, str, FolderAggregate, AnalysisSortKeys], dirty: set[str]) -> None:
+        folder_rel, file_path, values, tag, aggregate, sort_keys = row
+        item_id = gui.analysis_tree.insert(
+            ensure_folder(folder_rel),
+            "end",
+            text=f"🎬 {os.path.basename(file_path)}",
+            values=values,
+            tags=(tag,) if tag else (),
+        )
+        gui.get_tree_item_map()[os.path.normcase(file_path)] = item_id
+        gui.analysis_sort_keys[item_id] = sort_keys
+        apply_file_aggregate(gui, item_id, aggregate, dirty)
+
+    def prune_empty_folders(folder_id: str) -> None:
+        """Delete folder rows left without children, walking up from folder_id (UI thread)."""
+        while folder_id and not gui.analysis_tree.get_children(folder_id):
+            parent_id = gui.analysis_tree.parent(folder_id)
+            gui.analysis_tree.delete(folder_id)
+            gui.folder_aggregates.pop(folder_id, None)
+            gui.analysis_sort_keys.pop(folder_id, None)
+            folder_path = gui.get_tree_item_map().folder_path_for_item(folder_id)
+            if folder_path is not None:
+                folder_ids.pop(os.path.relpath(folder_path, root_folder), None)  # A later added file recreates it
+            gui.get_tree_item_map().discard_item(folder_id)
+            folder_id = parent_id
+
+    def folder_rel_of(file_path: str) -> str:
+        folder_rel = os.path.relpath(os.path.dirname(file_path), root_folder)
+        return "" if folder_rel == os.curdir else folder_rel
+
+    def run_on_ui(fn) -> None:
+        """Run fn on the UI thread and wait for it (same handshake as the incremental scan)."""
+        done_event = threading.Event()
+
+        def wrapper():
+            try:
+                fn()
+            finally:
+                done_event.set()
+
+        update_ui_safely(gui.root, wrapper)
+        done_event.wait(timeout=30.0)
+
+    try:
+        # Phase 1: rebuild the tree from the snapshot in a single batched pass
+        grouped_percentiles = compute_grouped_percentiles()
+        rows = [
+            (folder_rel, path, *_file_display_values(index, path, size, mtime, grouped_percentiles))
+            for folder_rel, path, size, mtime in snapshot.iter_files()
+        ]
+        if stop_event.is_set():
+            update_ui_safely(gui.root, lambda: gui.finish_incremental_scan(stopped=True))
+            return
+
+        def insert_all():
+            dirty_folders: set[str] = set()
+            for row in rows:
+                insert_file_row(row, dirty_folders)
+            render_folder_aggregates(gui, dirty_folders)
+            gui.update_total_from_tree()
+            gui.analysis_scan_badge.config(text=f"Checking for changes... ({len(rows)} files)")
+
+        run_on_ui(insert_all)
+        logger.info(f"Restored {len(rows)} files from scan snapshot; revalidating in background")
+
+        # Phase 2: walk the disk and diff against the snapshot
+        listing = list(walk_video_files(root_folder, ext_set, stop_event))
+        if stop_event.is_set():
+            update_ui_safely(gui.root, lambda: gui.finish_incremental_scan(stopped=True))
+            return
+        current = ScanSnapshot.from_listing(root_folder, snapshot.extensions, listing)
+        diff = diff_snapshots(snapshot, current)
+
+        if not diff.is_empty:
+            logger.info(
+                f"Scan snapshot revalidated: {len(diff.added)} added, {len(diff.removed)} removed, "
+                f"{len(diff.changed)} changed"
+            )
+            # Display values are computed here, off the UI thread
+            added_rows = [
+                (folder_rel_of(path), path, *_file_display_values(index, path, size, mtime, grouped_percentiles))
+                for path, size, mtime in diff.added
+            ]
+            changed_rows = [
+                (path, *_file_display_values(index, path, size, mtime, grouped_percentiles))
+                for path, size, mtime in diff.changed
+            ]
+
+            def apply_diff():
+                dirty_folders: set[str] = set()
+                tree_item_map = gui.get_tree_item_map()
+                for path in diff.removed:
+                    item_id = tree_item_map.pop(os.path.normcase(path), None)
+                    if item_id and gui.analysis_tree.exists(item_id):
+                        # Withdraw the file's contribution while its ancestors still exist
+                        apply_file_aggregate(gui, item_id, EMPTY_AGGREGATE, dirty_folders)
+                        parent_id = gui.analysis_tree.parent(item_id)
+                        gui.analysis_tree.delete(item_id)
+                        gui.analysis_sort_keys.pop(item_id, None)
+                        prune_empty_folders(parent_id)
+                for row in added_rows:
+                    insert_file_row(row, dirty_folders)
+                for file_path, values, tag, aggregate, sort_keys in changed_rows:
+                    item_id = tree_item_map.get(os.path.normcase(file_path))
+                    if not item_id or not gui.analysis_tree.exists(item_id):
+                        continue
+                    # Preserve queue tags while replacing status tags
+                    current_tags = gui.analysis_tree.item(item_id, "tags") or ()
+                    queue_tags = [t for t in current_tags if t in ("in_queue", "partial_queue")]
+                    gui.analysis_tree.item(item_id, values=values, tags=tuple(queue_tags + ([tag] if tag else [])))
+                    gui.analysis_sort_keys[item_id] = sort_keys
+                    apply_file_aggregate(gui, item_id, aggregate, dirty_folders)
+                render_folder_aggregates(gui, dirty_folders)
+
+            run_on_ui(apply_diff)
+
+        if persist_snapshot:
+            save_snapshot(current)
+
+        update_ui_safely(gui.root, lambda: gui.finish_incremental_scan(stopped=False))
+
+    except Exception:
+        logger.exception("Error restoring analysis tree from scan snapshot")
+        if not stop_event.is_set():
+            update_ui_safely(gui.root, lambda: gui.finish_incremental_scan(stopped=False))
+
+
 def run_ffprobe_analysis(gui, file_paths: list[str], output_folder: str, input_folder: str, anonymize: bool):
-    """Run ffprobe analysis on files in parallel.
+    """Run ffprobe analysis on files through the streaming analysis pipeline.
 
     This analyzes files already in the tree using ffprobe to get metadata
     and estimate potential savings. Updates tree rows as results come in.
 
-    Files with valid cache entries return quickly (no ffprobe needed).
-    Cache checking is done inside each parallel worker, so there's no
-    blocking pre-filter step.
+    Files with valid cache entries return quickly (no ffprobe needed) and
+    stream back while slower probes are still running. Results are batched
+    into one tree update per TREE_UPDATE_BATCH_SIZE files or per poll interval.
 
     Args:
         file_paths: List of file paths to analyze.
@@ -225,89 +394,65 @@ def run_ffprobe_analysis(gui, file_paths: list[str], output_folder: str, input_f
 
     total_files = len(file_paths)
     files_completed = 0
-    cache_hits = 0
-    max_workers = min(8, max(4, total_files // 10 + 1))
+    pipeline = AnalysisPipeline(
+        file_paths,
+        root_path,
+        output_path,
+        index,
+        anonymize,
+        probe_workers=min(8, max(4, total_files // 10 + 1)),
+        stop_event=gui.analysis_stop_event,
+    )
+    completed_paths: list[str] = []
+
+    def flush_completed():
+        """Single batched UI update for all files completed since the last flush."""
+        paths_snapshot = list(completed_paths)
+        completed_paths.clear()
+        update_ui_safely(gui.root, lambda paths=paths_snapshot: gui.batch_update_tree_rows(paths))
+
+        # Update progress badge
+        pct = int(100 * files_completed / total_files)
+        text = f"Analyzing {pct}% ({files_completed}/{total_files} files)"
+        update_ui_safely(gui.root, lambda t=text: gui.analysis_scan_badge.config(text=t))
 
-    def analyze_one_file(file_path: str) -> tuple[str | None, bool]:
-        """Analyze a single file (runs in thread pool).
+    try:
+        batch_interval = TREE_UPDATE_BATCH_SIZE
+        pct_interval = max(1, total_files // 20)  # 5% increments
+        for result in pipeline.results(poll_interval=0.5):
+            if result is None:
+                # Idle poll - show whatever finished since the last flush
+                if completed_paths:
+                    flush_completed()
+                continue
 
-        Checks cache first - if valid, skips ffprobe.
+            files_completed += 1
+            completed_paths.append(result.path)
+            if len(completed_paths) >= batch_interval:
+                flush_completed()
+
+            # Update totals and save less frequently (every batch or 5% progress)
+            if files_completed % batch_interval == 0 or (
+                total_files > MIN_FILES_FOR_PERCENT_UPDATES and files_completed % pct_interval == 0
+            ):
+                update_ui_safely(gui.root, gui.update_total_from_tree)
+                index.save()
 
-        Returns:
-            Tuple of (file_path or None, was_cache_hit).
-        """
         if gui.analysis_stop_event and gui.analysis_stop_event.is_set():
-            return None, False
-
-        # Check cache first - if valid, skip ffprobe
-        try:
-            stat = os.stat(file_path)
-            cached = index.lookup_file(file_path)
-            if cached and cached.file_size_bytes == stat.st_size and mtimes_match(cached.file_mtime, stat.st_mtime):
-                return file_path, True  # Cache hit - no ffprobe needed
-        except OSError:
-            pass  # Let _analyze_file handle the error
-
-        # Cache miss - run full analysis with ffprobe
-        try:
-            _analyze_file(file_path, root_path, output_path, index, anonymize)
-            return file_path, False
-        except Exception:
-            logger.exception(f"Error analyzing {os.path.basename(file_path)}")
-            return None, False
+            logger.info("Analysis interrupted by user")
+            index.save()
+            return  # finally block will call on_ffprobe_complete
 
-    try:
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {executor.submit(analyze_one_file, fp): fp for fp in file_paths}
-            pending = set(futures.keys())
-
-            while pending:
-                # Check stop event before waiting for futures
-                if gui.analysis_stop_event and gui.analysis_stop_event.is_set():
-                    logger.info("Analysis interrupted by user")
-                    executor.shutdown(wait=True, cancel_futures=True)
-                    index.save()
-                    return  # finally block will call on_ffprobe_complete
-
-                # Wait for futures with timeout to allow periodic stop checks
-                done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
-
-                # Collect completed files for batch UI update
-                completed_paths: list[str] = []
-
-                for future in done:
-                    file_path, was_cached = future.result()
-                    files_completed += 1
-                    if was_cached:
-                        cache_hits += 1
-                    if file_path:
-                        completed_paths.append(file_path)
-
-                # Single batched UI update for all completed files in this round
-                if completed_paths:
-                    paths_snapshot = list(completed_paths)
-                    update_ui_safely(gui.root, lambda paths=paths_snapshot: gui.batch_update_tree_rows(paths))
-
-                # Update progress badge
-                pct = int(100 * files_completed / total_files)
-                text = f"Analyzing {pct}% ({files_completed}/{total_files} files)"
-                update_ui_safely(gui.root, lambda t=text: gui.analysis_scan_badge.config(text=t))
-
-                # Update totals and save less frequently (every batch or 5% progress)
-                batch_interval = TREE_UPDATE_BATCH_SIZE
-                pct_interval = max(1, total_files // 20)  # 5% increments
-                if files_completed % batch_interval == 0 or (
-                    total_files > MIN_FILES_FOR_PERCENT_UPDATES and files_completed % pct_interval == 0
-                ):
-                    update_ui_safely(gui.root, gui.update_total_from_tree)
-                    index.save()
+        if completed_paths:
+            flush_completed()
 
         # Save index after all files processed (handles remainder)
         index.save()
 
-        # Log cache efficiency
-        if cache_hits > 0:
-            logger.info(f"Analysis complete: {cache_hits}/{total_files} from cache")
+        # Log cache efficiency and per-stage counters
+        if pipeline.stats.cache_hits > 0:
+            logger.info(f"Analysis complete: {pipeline.stats.cache_hits}/{total_files} from cache")
+        logger.debug(f"Analysis pipeline: {pipeline.stats.summary()}")
     except Exception:
         logger.exception("Unexpected error during ffprobe analysis")
     finally:
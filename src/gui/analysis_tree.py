@@ -4,21 +4,89 @@ Analysis tree display and state management.
 
 Handles incremental updates to the analysis tree view, including:
 - Single row updates from history index
-- Batch row updates with folder aggregate recalculation
+- Batch row updates with incremental (delta) folder aggregates
+- The path <-> tree item registry
 - Queue tag synchronization between analysis and queue trees
 """
 
 import os
 import tkinter as tk
-from collections.abc import Iterable
+from collections.abc import Iterable, Iterator, MutableMapping
 
 from src.estimation import compute_grouped_percentiles, estimate_file_time
-from src.gui.tree_display import compute_analysis_display_values
-from src.gui.tree_formatters import format_compact_time, format_efficiency
+from src.gui.tree_display import compute_analysis_row
+from src.gui.tree_formatters import AnalysisSortKeys, format_compact_time, format_efficiency
 from src.history_index import get_history_index
 from src.models import FileStatus, QueueItem, QueueItemStatus
 from src.utils import format_file_size
 
+# (size, savings, time_sec, estimate_count) - running sums for folders, contributions for files
+FolderAggregate = tuple[int, int, float, int]
+EMPTY_AGGREGATE: FolderAggregate = (0, 0, 0.0, 0)
+
+
+class TreeItemRegistry(MutableMapping[str, str]):
+    """Bidirectional registry between Analysis tree rows and filesystem paths.
+
+    As a mapping it is normcase(file_path) -> tree item ID, the same shape as
+    the plain dict it replaces, so iteration/len/get cover files only. Writes
+    keep a reverse item ID -> path index in sync, making row -> path lookups
+    (tooltips, context menu, queue adds) O(1) instead of a scan of every file.
+
+    Folder rows are tracked in a separate reverse index so file-only consumers
+    (Analyze, Add All, totals) never see them.
+    """
+
+    def __init__(self) -> None:
+        self._item_by_path: dict[str, str] = {}
+        self._path_by_item: dict[str, str] = {}
+        self._folder_path_by_item: dict[str, str] = {}
+
+    def __getitem__(self, path: str) -> str:
+        return self._item_by_path[path]
+
+    def __setitem__(self, path: str, item_id: str) -> None:
+        previous = self._item_by_path.get(path)
+        if previous is not None:
+            self._path_by_item.pop(previous, None)
+        self._item_by_path[path] = item_id
+        self._path_by_item[item_id] = path
+
+    def __delitem__(self, path: str) -> None:
+        item_id = self._item_by_path.pop(path)
+        self._path_by_item.pop(item_id, None)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._item_by_path)
+
+    def __len__(self) -> int:
+        return len(self._item_by_path)
+
+    def file_path_for_item(self, item_id: str) -> str | None:
+        """Return the normcase file path of a file row, or None for folders/unknown rows."""
+        return self._path_by_item.get(item_id)
+
+    def register_folder(self, item_id: str, folder_path: str) -> None:
+        """Record the filesystem path of a folder row."""
+        self._folder_path_by_item[item_id] = folder_path
+
+    def folder_path_for_item(self, item_id: str) -> str | None:
+        """Return the path of a folder row, or None if it is not a registered folder."""
+        return self._folder_path_by_item.get(item_id)
+
+    def discard_item(self, item_id: str) -> None:
+        """Forget a row (file or folder) that was deleted from the tree."""
+        path = self._path_by_item.pop(item_id, None)
+        if path is not None:
+            self._item_by_path.pop(path, None)
+        self._folder_path_by_item.pop(item_id, None)
+
+    def clear(self) -> None:
+        """Forget every row (tree was cleared)."""
+        self._item_by_path.clear()
+        self._path_by_item.clear()
+        self._folder_path_by_item.clear()
+
 
 def extract_paths_from_queue_items(items: Iterable[QueueItem]) -> set[str]:
     """Extract normalized file paths from queue items.
@@ -63,10 +131,11 @@ def update_tree_row(gui, file_path: str):
     # Pre-compute percentiles once for display values and folder updates
     grouped_percentiles = compute_grouped_percentiles()
 
-    # Compute display values from record
-    format_str, size_str, savings_str, time_str, eff_str, tag = compute_analysis_display_values(
+    # Compute display values (and the raw values used for sorting) from record
+    (format_str, size_str, savings_str, time_str, eff_str, tag), sort_keys = compute_analysis_row(
         record, grouped_percentiles=grouped_percentiles
     )
+    gui.analysis_sort_keys[item_id] = sort_keys
 
     # Update tree item - preserve queue tags (in_queue, partial_queue) while updating status tags
     current_tags = list(gui.analysis_tree.item(item_id, "tags") or ())
@@ -74,19 +143,15 @@ def update_tree_row(gui, file_path: str):
     new_tags = queue_tags + ([tag] if tag else [])
     gui.analysis_tree.item(item_id, values=(format_str, size_str, savings_str, time_str, eff_str), tags=tuple(new_tags))
 
-    # Update all ancestor folder aggregates
-    parent_id = gui.analysis_tree.parent(item_id)
-    while parent_id:
-        update_folder_aggregates(gui, parent_id, grouped_percentiles=grouped_percentiles)
-        parent_id = gui.analysis_tree.parent(parent_id)
+    # Push this file's delta up the ancestor folder aggregates
+    apply_file_aggregate(gui, item_id, compute_file_aggregate(record, grouped_percentiles))
 
 
 def batch_update_tree_rows(gui, file_paths: list[str]) -> None:
-    """Update multiple tree rows efficiently without per-file folder updates.
+    """Update multiple tree rows efficiently without per-file folder redraws.
 
-    Updates file rows and collects affected folders, then updates folder
-    aggregates once at the end. Much faster than calling update_tree_row
-    for each file individually.
+    Updates file rows and pushes each file's aggregate delta up its ancestors,
+    then redraws every affected folder once at the end.
 
     Args:
         gui: The VideoConverterGUI instance.
@@ -96,7 +161,7 @@ def batch_update_tree_rows(gui, file_paths: list[str]) -> None:
         return
 
     index = get_history_index()
-    affected_folders: set[str] = set()
+    dirty_folders: set[str] = set()
 
     # Pre-compute percentiles once for all file display values and folder updates
     grouped_percentiles = compute_grouped_percentiles()
@@ -111,10 +176,11 @@ def batch_update_tree_rows(gui, file_paths: list[str]) -> None:
         if not record:
             continue
 
-        # Compute display values from record
-        format_str, size_str, savings_str, time_str, eff_str, tag = compute_analysis_display_values(
+        # Compute display values (and the raw values used for sorting) from record
+        (format_str, size_str, savings_str, time_str, eff_str, tag), sort_keys = compute_analysis_row(
             record, grouped_percentiles=grouped_percentiles
         )
+        gui.analysis_sort_keys[item_id] = sort_keys
 
         # Update tree item - preserve queue tags (in_queue, partial_queue) while updating status tags
         current_tags = list(gui.analysis_tree.item(item_id, "tags") or ())
@@ -125,96 +191,117 @@ def batch_update_tree_rows(gui, file_paths: list[str]) -> None:
             item_id, values=(format_str, size_str, savings_str, time_str, eff_str), tags=tuple(new_tags)
         )
 
-        # Track all ancestor folders for batch aggregate update
-        parent_id = gui.analysis_tree.parent(item_id)
-        while parent_id:
-            affected_folders.add(parent_id)
-            parent_id = gui.analysis_tree.parent(parent_id)
-
-    # Update folder aggregates once for all affected folders
-    # Pre-build reverse map once for all folder updates
-    if affected_folders:
-        item_to_path = {item_id: path for path, item_id in gui.get_tree_item_map().items()}
-        for folder_id in affected_folders:
-            update_folder_aggregates(gui, folder_id, item_to_path, grouped_percentiles=grouped_percentiles)
+        # Push the file's delta up its ancestors; folders are redrawn once below
+        apply_file_aggregate(gui, item_id, compute_file_aggregate(record, grouped_percentiles), dirty_folders)
 
+    render_folder_aggregates(gui, dirty_folders)
 
-def update_folder_aggregates(
-    gui, folder_id: str, item_to_path: dict[str, str] | None = None, *, grouped_percentiles: dict | None = None
-):
-    """Recalculate and update folder aggregate values.
 
-    For direct child files, reads data from history index.
-    For direct child folders (subfolders), reads their cached aggregate values.
+def compute_file_aggregate(record, grouped_percentiles: dict, file_size: int | None = None) -> FolderAggregate:
+    """Compute one file's contribution to its ancestor folders' aggregates.
 
     Args:
-        gui: The VideoConverterGUI instance.
-        folder_id: The tree item ID of the folder to update.
-        item_to_path: Optional pre-built reverse map of item_id -> file_path.
-                     If not provided, builds one (slower for batch updates).
+        record: FileRecord for the file, or None if not yet analyzed.
         grouped_percentiles: Pre-computed percentiles from compute_grouped_percentiles().
-                            If provided, skips percentile computation (for batch operations).
+        file_size: Size on disk, counted for a file without a record.
+
+    Returns:
+        (size, savings, time, estimate_count) - estimate_count is 1 when the
+        file only has ffprobe-level analysis (no CRF search). A file without
+        a record counts only its size, the same as a freshly scanned row.
     """
-    if item_to_path is None:
-        item_to_path = {item_id: path for path, item_id in gui.get_tree_item_map().items()}
+    if not record:
+        return (file_size or 0, 0, 0.0, 0)
 
-    # Pre-compute percentiles once if not provided
-    if grouped_percentiles is None:
-        grouped_percentiles = compute_grouped_percentiles()
+    # Sum size for all files
+    size = record.file_size_bytes or 0
 
-    # Get all direct children (files and subfolders)
-    children = gui.analysis_tree.get_children(folder_id)
+    # Only files that still need conversion contribute savings and time
+    if record.status not in (FileStatus.SCANNED, FileStatus.ANALYZED):
+        return (size, 0, 0.0, 0)
 
-    # Sum up size, savings and time from all children
-    total_size = 0
-    total_savings = 0
-    total_time = 0.0
-    any_estimate = False  # Track if any descendant lacks CRF search (layer 2) data
+    # Track if this file only has ffprobe-level analysis (no CRF search)
+    estimate_count = 1 if record.predicted_size_reduction is None else 0
 
-    index = get_history_index()
+    # Savings needs a reduction estimate; use Layer 2 data if
+    # available, otherwise fall back to Layer 1 estimate
+    savings = 0
+    reduction_percent = record.predicted_size_reduction or record.estimated_reduction_percent
+    if reduction_percent and record.file_size_bytes:
+        savings = int(record.file_size_bytes * reduction_percent / 100)
 
-    for child_id in children:
-        file_path = item_to_path.get(child_id)
-        if file_path:
-            # Child is a file - look up from history index
-            record = index.lookup_file(file_path)
-            if not record:
-                continue
+    # Time needs only codec/duration/resolution - independent of savings
+    time_sec = estimate_file_time(
+        codec=record.video_codec,
+        duration=record.duration_sec,
+        width=record.width,
+        height=record.height,
+        grouped_percentiles=grouped_percentiles,
+    ).best_seconds
+
+    return (size, savings, time_sec, estimate_count)
+
+
+def apply_file_aggregate(gui, item_id: str, aggregate: FolderAggregate, dirty_folders: set[str] | None = None) -> None:
+    """Set a file row's contribution and push the delta up its ancestor chain.
+
+    Folder aggregates are running sums, so a changed file costs O(depth)
+    instead of re-summing every child of every ancestor.
+
+    Must be called before the file row is deleted (with EMPTY_AGGREGATE) so
+    its contribution is withdrawn while the ancestor chain still exists.
 
-            # Sum size for all files
-            if record.file_size_bytes:
-                total_size += record.file_size_bytes
-
-            # Check if file needs conversion
-            if record.status in (FileStatus.SCANNED, FileStatus.ANALYZED):
-                # Track if this file only has ffprobe-level analysis (no CRF search)
-                if record.predicted_size_reduction is None:
-                    any_estimate = True
-
-                # Savings needs a reduction estimate; use Layer 2 data if
-                # available, otherwise fall back to Layer 1 estimate
-                reduction_percent = record.predicted_size_reduction or record.estimated_reduction_percent
-                if reduction_percent and record.file_size_bytes:
-                    total_savings += int(record.file_size_bytes * reduction_percent / 100)
-
-                # Time needs only codec/duration/resolution - independent of savings
-                total_time += estimate_file_time(
-                    codec=record.video_codec,
-                    duration=record.duration_sec,
-                    width=record.width,
-                    height=record.height,
-                    grouped_percentiles=grouped_percentiles,
-                ).best_seconds
+    Args:
+        gui: The VideoConverterGUI instance.
+        item_id: Tree item ID of the file row.
+        aggregate: New (size, savings, time, estimate_count) for the file.
+        dirty_folders: If given, touched folders are collected here for a
+                       single render_folder_aggregates() call instead of being
+                       redrawn immediately (for batch updates).
+    """
+    old = gui.file_aggregates.get(item_id, EMPTY_AGGREGATE)
+    if aggregate == old:
+        return
+    if aggregate == EMPTY_AGGREGATE:
+        gui.file_aggregates.pop(item_id, None)
+    else:
+        gui.file_aggregates[item_id] = aggregate
+
+    d_size, d_savings, d_time, d_estimates = (new - prev for new, prev in zip(aggregate, old, strict=True))
+    parent_id = gui.analysis_tree.parent(item_id)
+    while parent_id:
+        size, savings, time_sec, estimates = gui.folder_aggregates.get(parent_id, EMPTY_AGGREGATE)
+        gui.folder_aggregates[parent_id] = (
+            size + d_size,
+            savings + d_savings,
+            time_sec + d_time,
+            estimates + d_estimates,
+        )
+        if dirty_folders is None:
+            _render_folder_aggregate(gui, parent_id)
         else:
-            # Child is a subfolder - read its cached aggregates
-            folder_agg = gui.folder_aggregates.get(child_id)
-            if folder_agg:
-                child_size, child_savings, child_time, child_any_estimate = folder_agg
-                total_size += child_size
-                total_savings += child_savings
-                total_time += child_time
-                if child_any_estimate:
-                    any_estimate = True
+            dirty_folders.add(parent_id)
+        parent_id = gui.analysis_tree.parent(parent_id)
+
+
+def render_folder_aggregates(gui, folder_ids: Iterable[str]) -> None:
+    """Redraw the value columns of folders from their running sums.
+
+    Args:
+        gui: The VideoConverterGUI instance.
+        folder_ids: Folder tree item IDs to redraw; deleted folders are skipped.
+    """
+    for folder_id in folder_ids:
+        if gui.analysis_tree.exists(folder_id):
+            _render_folder_aggregate(gui, folder_id)
+
+
+def _render_folder_aggregate(gui, folder_id: str) -> None:
+    """Redraw one folder row from gui.folder_aggregates."""
+    total_size, total_savings, total_time, estimate_count = gui.folder_aggregates.get(folder_id, EMPTY_AGGREGATE)
+    # Running float sums can drift a hair below zero once every file is withdrawn
+    total_time = max(0.0, total_time)
+    any_estimate = estimate_count > 0
 
     # Update folder display (efficiency = aggregate savings / aggregate time)
     # Folders show empty format (aggregate of multiple files)
@@ -227,9 +314,7 @@ def update_folder_aggregates(
     time_str = format_compact_time(total_time, confidence=folder_confidence)
     eff_str = format_efficiency(total_savings, total_time)
     gui.analysis_tree.item(folder_id, values=("", size_str, savings_str, time_str, eff_str))
-
-    # Cache this folder's aggregates for parent folder calculations
-    gui.folder_aggregates[folder_id] = (total_size, total_savings, total_time, any_estimate)
+    gui.analysis_sort_keys[folder_id] = AnalysisSortKeys.from_totals(total_size, total_savings, total_time)
 
 
 def get_queued_file_paths(gui) -> set[str]:
@@ -148,7 +148,8 @@ def handle_completed(gui, filename, info) -> None:
     # Extract values from info dict or fall back to gui attributes
     vmaf_value = info.get("vmaf")
     crf_value = info.get("crf")
-    original_size = gui.session.last_input_size
+    # The worker fills in the job's own input size; the session value only tracks the displayed file
+    original_size = info.get("original_size") or gui.session.last_input_size
     # Get final output size directly from info (more reliable than gui attribute)
     output_size = info.get("output_size")
 
@@ -229,12 +230,7 @@ def handle_skipped_not_worth(gui, filename, info):
 
     logger.info(log_msg)
 
-    # Store data for history recording by worker.py (thread-safe)
-    def store_skip_data():
-        gui.session.last_skip_reason = skipped.message
-        gui.session.last_min_vmaf_attempted = skipped.min_vmaf_attempted
-
-    update_ui_safely(gui.root, store_skip_data)
+    # Note: The worker captures the skip reason on the job itself for history recording.
 
     # Update skipped count instead of error count (thread-safe)
     def update_skipped_count():
@@ -22,9 +22,12 @@ from tkinter import messagebox
 # Import constants from config
 from src.config import MIN_RESOLUTION_HEIGHT, MIN_RESOLUTION_WIDTH
 from src.conversion_engine.cleanup import schedule_temp_folder_cleanup  # Import cleaner scheduling
+from src.conversion_engine.disk_budget import describe_budget
+from src.conversion_engine.journal import get_journal_path
+from src.conversion_engine.scheduler import resolve_job_count
 
 # Import from the new conversion_engine package
-from src.conversion_engine.worker import sequential_conversion_worker
+from src.conversion_engine.worker import queue_conversion_worker
 
 # Import analysis tree helper for incremental sync
 from src.gui.analysis_tree import extract_paths_from_queue_items
@@ -51,8 +54,9 @@ from src.gui.gui_updates import (
     update_total_elapsed_time,
     update_total_remaining_time,
 )
+from src.gui.queue_controller import get_queue_order
 from src.gui.tree_display import QUEUE_STATUS_TAGS, format_queue_file_status
-from src.models import OutputMode, QueueConversionConfig, QueueItemStatus
+from src.models import OutputMode, QueueConversionConfig, QueueItemStatus, QueueOrder
 
 # Import from utils and other modules
 from src.platform_utils import (
@@ -62,6 +66,7 @@ from src.platform_utils import (
     terminate_process_tree,
 )
 from src.privacy import anonymize_filename
+from src.queue_order import QueueCosts, order_folder_files, pick_next_item
 from src.utils import format_crf, format_file_size, format_time, update_ui_safely
 
 # Import the single-file processing function
@@ -187,15 +192,45 @@ def create_queue_status_callback(gui):
     return queue_status_callback
 
 
+def _claim_order(gui, items: list, deadline: float, policy: QueueOrder, costs: QueueCosts):
+    """Pick the next pending item under the queue order and put its files in processing order.
+
+    Runs on the main thread and only ranks costs the worker thread already
+    cached. Falls back to queue order if ranking fails, so an estimation
+    problem never stalls the queue.
+    """
+    time_budget = deadline - time.time() if policy == QueueOrder.DEADLINE else None
+    parallelism = resolve_job_count(gui.concurrent_jobs.get())
+    try:
+        claimed_item = pick_next_item(items, policy, time_budget=time_budget, parallelism=parallelism, costs=costs)
+        if claimed_item is not None and order_folder_files(
+            claimed_item, policy, time_budget=time_budget, parallelism=parallelism, costs=costs
+        ):
+            gui.reorder_queue_file_rows(claimed_item)
+    except Exception:
+        logger.exception(f"Error ranking queue items by {policy.value}; using queue order")
+        claimed_item = next((item for item in items if item.status == QueueItemStatus.PENDING), None)
+    return claimed_item
+
+
 def create_get_next_pending_item_callback(gui):
     """Create callback for dynamic queue item fetching.
 
+    The next item (and the file order within a folder item) follows the queue
+    order policy selected on the queue tab; the deadline policy's time window
+    starts when the callback is created, i.e. when the queue starts. File
+    costs are estimated on the calling (worker) thread and cached for the
+    run, so a claim on the main thread only ranks them.
+
     Args:
         gui: The main GUI instance
 
     Returns:
         Callback returning (QueueItem or None, remaining_pending_count, timed_out)
     """
+    deadline = time.time() + gui.queue_deadline_hours.get() * 3600
+    costs = QueueCosts()
+    policy = [get_queue_order(gui)]  # Last policy seen on the main thread
 
     def get_next_pending_item():
         """Fetch next pending queue item dynamically.
@@ -203,20 +238,23 @@ def create_get_next_pending_item_callback(gui):
         Returns:
             tuple: (QueueItem or None, remaining_pending_count, timed_out)
         """
+        if policy[0] != QueueOrder.USER:
+            try:
+                costs.prime(list(gui.get_queue_items()))
+            except Exception:
+                logger.exception("Error estimating queue costs")
+
         done_event = threading.Event()
         result: list[tuple] = [(None, 0)]
 
         def fetch_on_main_thread():
             try:
-                pending_count = 0
-                claimed_item = None
-
-                for item in gui.get_queue_items():
-                    if item.status == QueueItemStatus.PENDING:
-                        if claimed_item is None:
-                            claimed_item = item
-                        else:
-                            pending_count += 1
+                items = gui.get_queue_items()
+                policy[0] = get_queue_order(gui)
+                claimed_item = _claim_order(gui, items, deadline, policy[0], costs)
+                pending_count = sum(1 for item in items if item.status == QueueItemStatus.PENDING)
+                if claimed_item is not None:
+                    pending_count -= 1
 
                 # Only set status AFTER successful iteration
                 if claimed_item is not None:
@@ -240,18 +278,81 @@ def create_get_next_pending_item_callback(gui):
     return get_next_pending_item
 
 
+class GuiConversionSink:
+    """ConversionEventSink that drives the main window from the worker thread.
+
+    Wraps the dispatcher and callbacks above; everything passed to call()
+    runs on the Tk main loop via update_ui_safely.
+    """
+
+    def __init__(self, gui):
+        self.gui = gui
+        self._file_callback = create_file_callback_dispatcher(gui)
+        self._queue_callback = create_queue_status_callback(gui)
+        self._next_item_callback = create_get_next_pending_item_callback(gui)
+
+    @property
+    def session(self):
+        return self.gui.session
+
+    def call(self, fn, *args) -> None:
+        update_ui_safely(self.gui.root, fn, *args)
+
+    def file_event(self, filename, status, info=None) -> None:
+        self._file_callback(filename, status, info)
+
+    def queue_status(self, item_id, status, processed, total) -> None:
+        self._queue_callback(item_id, status, processed, total)
+
+    def next_item(self):
+        return self._next_item_callback()
+
+    def job_shown(self, job) -> None:
+        gui = self.gui
+        reset_current_file_details(gui)
+        gui.session.last_input_size = job.original_size
+        gui.session.current_file_start_time = job.start_time
+        gui.session.current_file_encoding_start_time = None
+        gui.current_file_label.config(text=f"Processing: {os.path.basename(job.file_path)}")
+        # One timer chain at a time: the panel switches jobs as they finish
+        if gui.session.elapsed_timer_id:
+            gui.root.after_cancel(gui.session.elapsed_timer_id)
+            gui.session.elapsed_timer_id = None
+        update_elapsed_time(gui, job.start_time)
+
+    def status(self, text: str) -> None:
+        self.gui.status_label.config(text=text)
+
+    def file_outcome(self, file_path: str, outcome: str) -> None:
+        self.gui.update_analysis_tree_for_completed_file(file_path, outcome)
+
+    def disk_budget(self, volumes) -> None:
+        self.gui.disk_budget_label.config(text=describe_budget(volumes))
+
+    def process_started(self, pid: int, file_path: str) -> None:
+        store_process_id(self.gui, pid, file_path)
+
+    def scheduler_started(self, scheduler) -> None:
+        self.gui.job_scheduler = scheduler
+
+    def finished(self, message: str) -> None:
+        conversion_complete(self.gui, message)
+
+
 # --- Process Management & State ---
 
 
 def store_process_id(gui, pid: int, input_path: str) -> None:
-    """Store the current process ID and its associated input file in session state.
+    """Log a newly started ab-av1 process.
+
+    The PID itself is kept on the worker's ConversionJob (gui.job_scheduler),
+    since several jobs may run at once.
 
     Args:
         gui: The main GUI instance with session state.
         pid: Process ID of the conversion process.
         input_path: Path to the input file being processed.
     """
-    gui.session.current_process_info = {"pid": pid, "input_path": input_path}
     logger.info(f"ab-av1 process started with PID: {pid} for file {anonymize_filename(input_path)}")
 
 
@@ -318,6 +419,15 @@ def start_conversion(gui) -> None:
         convert_audio=gui.convert_audio.get(),
         audio_codec=gui.audio_codec.get(),
         default_suffix=gui.default_suffix.get(),
+        concurrent_jobs=gui.concurrent_jobs.get(),
+        concurrent_search_jobs=gui.concurrent_search_jobs.get(),
+        batch_search_jobs=gui.batch_search_jobs.get(),
+        chunked_encode_jobs=gui.chunked_encode_jobs.get(),
+        anonymize_history=gui.anonymize_history.get(),
+        hw_decode_enabled=gui.hw_decode_enabled.get(),
+        staging_folder=gui.staging_folder.get(),
+        verify_output_quality=gui.verify_output_quality.get(),
+        journal_path=get_journal_path(),
     )
 
     # Log settings
@@ -342,7 +452,6 @@ def start_conversion(gui) -> None:
     gui.session.processed_files = 0
     gui.session.successful_conversions = 0
     gui.session.error_count = 0
-    gui.session.current_process_info = None
     gui.session.total_input_bytes_success = 0
     gui.session.total_output_bytes_success = 0
     gui.session.total_time_success = 0.0
@@ -351,6 +460,7 @@ def start_conversion(gui) -> None:
     gui.session.current_file_path = None
     gui.stop_event = threading.Event()
     gui.cancel_event = threading.Event()
+    gui.job_scheduler = None
 
     # Start timers
     def start_total_timer():
@@ -373,33 +483,10 @@ def start_conversion(gui) -> None:
     # Reset UI elements
     reset_current_file_details(gui)
 
-    # Create callbacks
-    file_callback = create_file_callback_dispatcher(gui)
-    queue_callback = create_queue_status_callback(gui)
-    get_next_item_callback = create_get_next_pending_item_callback(gui)
-
-    def reset_ui_callback():
-        return reset_current_file_details(gui)
-
-    def elapsed_time_callback(start_time):
-        return update_elapsed_time(gui, start_time)
-
     # Start worker thread
     gui.conversion_thread = threading.Thread(
-        target=sequential_conversion_worker,
-        args=(
-            gui,
-            config,
-            gui.stop_event,
-            gui.cancel_event,
-            file_callback,
-            queue_callback,
-            reset_ui_callback,
-            elapsed_time_callback,
-            store_process_id,
-            conversion_complete,
-            get_next_item_callback,
-        ),
+        target=queue_conversion_worker,
+        args=(config, gui.stop_event, gui.cancel_event, GuiConversionSink(gui)),
         daemon=True,
     )
     gui.conversion_thread.start()
@@ -538,8 +625,8 @@ def force_stop_conversion(gui, confirm: bool = True) -> None:
 
     if confirm and not messagebox.askyesno(
         "Confirm Force Stop",
-        "This will immediately terminate the current process.\n"
-        "The current file will be incomplete.\n\n"
+        "This will immediately terminate all running conversions.\n"
+        "Files in progress will be incomplete.\n\n"
         "Are you sure you want to force stop?",
     ):
         logger.info("User cancelled the force stop request.")
@@ -554,17 +641,21 @@ def force_stop_conversion(gui, confirm: bool = True) -> None:
         # process tree itself; the PID kill below remains as a backstop.
         gui.cancel_event.set()
 
-    # Get process information
-    pid_to_kill = None
-    input_path_killed = None
-    if gui.session.current_process_info:
-        pid_to_kill = gui.session.current_process_info.get("pid")
-        input_path_killed = gui.session.current_process_info.get("input_path")
-
-    # Terminate the process
-    if pid_to_kill:
-        terminate_process(pid_to_kill)
-    else:
+    # Terminate every running job's process
+    jobs = gui.job_scheduler.active_jobs() if gui.job_scheduler else []
+    killed_any = False
+    for job in jobs:
+        pids = list(job.pids)  # Every process of the job (a chunked encode runs several)
+        if not pids:
+            continue
+        for pid in pids:
+            terminate_process(pid)
+        killed_any = True
+        # Clean up temporary files
+        if gui.output_folder.get():
+            cleanup_temp_file(job.file_path, gui.output_folder.get(), gui.input_folder.get())
+
+    if not killed_any:
         logger.warning("Force stop: No active process PID was recorded. Cannot target specific process.")
         # Fallback: try killing any ffmpeg process if PID wasn't known
         if sys.platform == "win32":
@@ -581,13 +672,6 @@ def force_stop_conversion(gui, confirm: bool = True) -> None:
             except Exception:
                 logger.exception("Failed fallback kill of ffmpeg processes")
 
-    # Clear the process info after termination
-    gui.session.current_process_info = None
-
-    # Clean up temporary files
-    if input_path_killed and gui.output_folder.get():
-        cleanup_temp_file(input_path_killed, gui.output_folder.get(), gui.input_folder.get())
-
     # Mark all CONVERTING items as STOPPED
     for item in gui.get_queue_items():
         if item.status == QueueItemStatus.CONVERTING:
@@ -791,6 +875,7 @@ def conversion_complete(gui, final_message="Queue complete"):
 
     # Update final UI elements
     gui.status_label.config(text=final_message)
+    gui.disk_budget_label.config(text="")  # Every reservation ended with its job
     reset_current_file_details(gui)  # Clear current file section
 
     # Restore sleep functionality if it was active
@@ -804,7 +889,7 @@ def conversion_complete(gui, final_message="Queue complete"):
     gui.conversion_thread = None
     gui.stop_event = None
     gui.cancel_event = None
-    s.current_process_info = None
+    gui.job_scheduler = None
     s.current_file_path = None
     if s.elapsed_timer_id:  # Ensure timer is stopped if still running
         gui.root.after_cancel(s.elapsed_timer_id)
@@ -16,9 +16,11 @@ from tkinter import filedialog, messagebox, ttk
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
+    from src.conversion_engine.scheduler import JobScheduler
     from src.gui.charts import BarChart, LineGraph, PieChart
 
 from src.config import CONFIG_DEFAULTS, CONFIG_FILE
+from src.conversion_engine.journal import recover_interrupted_jobs
 from src.gui import (
     analysis_controller,
     analysis_scanner,
@@ -45,12 +47,13 @@ from src.gui.tabs.convert_tab import create_convert_tab
 from src.gui.tabs.history_tab import create_history_tab
 from src.gui.tabs.settings_tab import create_settings_tab
 from src.gui.tabs.statistics_tab import create_statistics_tab
-from src.gui.tree_formatters import clear_sort_state, sort_analysis_tree, update_sort_indicators
+from src.gui.tree_formatters import AnalysisSortKeys, clear_sort_state, sort_analysis_tree, update_sort_indicators
 
 # Import from extracted modules
 from src.logging_setup import get_script_directory, setup_logging
 from src.models import ConversionSessionState, OperationType, QueueItem
-from src.utils import scrub_history_paths, scrub_log_files
+from src.resource_governor import GovernorState, configure_resource_governor
+from src.utils import scrub_history_paths, scrub_log_files, update_ui_safely
 
 logger = logging.getLogger(__name__)
 
@@ -72,10 +75,14 @@ class VideoConverterGUI:
     stop_button: ttk.Button
     force_stop_button: ttk.Button
     status_label: ttk.Label
+    throttle_label: ttk.Label
+    disk_budget_label: ttk.Label
     total_elapsed_label: ttk.Label
     total_remaining_label: ttk.Label
     queue_tree: ttk.Treeview
     queue_total_tree: ttk.Treeview
+    queue_order_combo: ttk.Combobox
+    queue_deadline_spinbox: ttk.Spinbox
     current_file_label: ttk.Label
     quality_progress: ttk.Progressbar
     quality_percent_label: ttk.Label
@@ -169,6 +176,7 @@ class VideoConverterGUI:
         self.conversion_thread: threading.Thread | None = None
         self.stop_event: threading.Event | None = None
         self.cancel_event: threading.Event | None = None
+        self.job_scheduler: JobScheduler | None = None  # Set by the worker while a queue runs
 
         # Initialize tk variables based on loaded config (needed *before* logging setup uses them)
         self.initialize_variables()
@@ -229,6 +237,7 @@ class VideoConverterGUI:
         create_settings_tab(self)
         self.initialize_conversion_state()
         self.initialize_button_states()
+        self.on_resource_governor_changed()  # Start the governor if enabled (the throttle label exists now)
 
         check_ffmpeg(self)  # Check dependencies after UI is built
 
@@ -278,7 +287,16 @@ class VideoConverterGUI:
                 "default_output_mode": self.default_output_mode.get(),
                 "default_suffix": self.default_suffix.get(),
                 "default_output_folder": self.default_output_folder.get(),
+                "staging_folder": self.staging_folder.get(),
+                "resource_governor": self.resource_governor.get(),
+                "verify_output_quality": self.verify_output_quality.get(),
                 "hw_decode_enabled": self.hw_decode_enabled.get(),
+                "concurrent_jobs": self.concurrent_jobs.get(),
+                "concurrent_search_jobs": self.concurrent_search_jobs.get(),
+                "batch_search_jobs": self.batch_search_jobs.get(),
+                "chunked_encode_jobs": self.chunked_encode_jobs.get(),
+                "queue_order": self.queue_order.get(),
+                "queue_deadline_hours": self.queue_deadline_hours.get(),
                 "queue_items": [item.to_dict() for item in self._queue_items],
             }
             temp_config_file = CONFIG_PATH + ".tmp"
@@ -357,6 +375,13 @@ class VideoConverterGUI:
         self.anonymize_history = tk.BooleanVar(value=config["anonymize_history"])
         self.audio_codec = tk.StringVar(value=config["audio_codec"])
         self.hw_decode_enabled = tk.BooleanVar(value=config["hw_decode_enabled"])
+        self.concurrent_jobs = tk.IntVar(value=config["concurrent_jobs"])
+        self.concurrent_search_jobs = tk.IntVar(value=config["concurrent_search_jobs"])
+        self.batch_search_jobs = tk.IntVar(value=config["batch_search_jobs"])
+        self.chunked_encode_jobs = tk.IntVar(value=config["chunked_encode_jobs"])
+        self.staging_folder = tk.StringVar(value=config["staging_folder"])
+        self.resource_governor = tk.BooleanVar(value=config["resource_governor"])
+        self.verify_output_quality = tk.BooleanVar(value=config["verify_output_quality"])
 
         # CPU count for display purposes
         try:
@@ -369,6 +394,8 @@ class VideoConverterGUI:
         self.default_output_mode = tk.StringVar(value=config["default_output_mode"])
         self.default_suffix = tk.StringVar(value=config["default_suffix"])
         self.default_output_folder = tk.StringVar(value=config["default_output_folder"])
+        self.queue_order = tk.StringVar(value=config["queue_order"])
+        self.queue_deadline_hours = tk.IntVar(value=config["queue_deadline_hours"])
 
         # Queue state (will be restored from config on startup)
         self._queue_items: list[QueueItem] = self._load_queue_from_config()
@@ -382,9 +409,15 @@ class VideoConverterGUI:
         # Analysis state
         self.analysis_stop_event: threading.Event | None = None
         self.analysis_thread: threading.Thread | None = None
-        self._tree_item_map: dict[str, str] = {}  # Map file_path -> tree_item_id for updates
-        # Cached folder aggregates: folder tree_item_id -> (total_size, total_savings, total_time, any_estimate)
-        self.folder_aggregates: dict[str, tuple[int, int, float, bool]] = {}
+        # normcase(file_path) <-> tree_item_id, plus folder rows (see analysis_tree.TreeItemRegistry)
+        self._tree_item_map = analysis_tree.TreeItemRegistry()
+        # Running folder sums: folder tree_item_id -> (total_size, total_savings, total_time, estimate_count).
+        # File rows push deltas up their ancestors (see analysis_tree.apply_file_aggregate).
+        self.folder_aggregates: dict[str, tuple[int, int, float, int]] = {}
+        # Each file row's current contribution to its ancestors: file tree_item_id -> same tuple
+        self.file_aggregates: dict[str, tuple[int, int, float, int]] = {}
+        # Raw per-row sort values (file and folder rows), kept next to the display strings
+        self.analysis_sort_keys: dict[str, AnalysisSortKeys] = {}
         self._refresh_timer_id: str | None = None  # Debounce timer for auto-refresh
         self._scan_stop_event: threading.Event | None = None  # Stop event for background scan
         self._scanning: bool = False  # True while background scan is running
@@ -411,7 +444,7 @@ class VideoConverterGUI:
         """Return the list of queue items."""
         return self._queue_items
 
-    def get_tree_item_map(self) -> dict[str, str]:
+    def get_tree_item_map(self) -> analysis_tree.TreeItemRegistry:
         """Return the analysis tree item map (file_path -> tree_item_id)."""
         return self._tree_item_map
 
@@ -542,6 +575,26 @@ class VideoConverterGUI:
             self.default_output_folder.set(folder)
             self.save_settings()
 
+    def on_browse_staging_folder(self):
+        """Handle browse button for the local staging folder."""
+        initial_dir = self.staging_folder.get() or os.path.expanduser("~")
+        folder = filedialog.askdirectory(initialdir=initial_dir, title="Select Local Staging Folder")
+        if folder:
+            self.staging_folder.set(folder)
+            self.save_settings()
+
+    def on_resource_governor_changed(self):
+        """Start or stop the resource governor to match its setting."""
+        governor = configure_resource_governor(
+            self.resource_governor.get(),
+            on_change=lambda state: update_ui_safely(self.root, self._show_governor_state, state),
+        )
+        self._show_governor_state(governor.state if governor is not None else GovernorState())
+
+    def _show_governor_state(self, state: GovernorState):
+        """Show the governor's throttle state next to the queue status (empty when not throttled)."""
+        self.throttle_label.config(text=state.describe())
+
     def on_open_log_folder(self):
         open_log_folder_action(self)
 
@@ -626,6 +679,8 @@ class VideoConverterGUI:
         dependency_manager.download_ffmpeg_update(self)
 
     def _load_queue_from_config(self) -> list[QueueItem]:
+        # Roll back a crashed run first so reconciliation sees its restored history records
+        recover_interrupted_jobs()
         raw_items = self.config.get("queue_items", [])
         return queue_manager.load_queue_from_config(raw_items)
 
@@ -709,6 +764,18 @@ class VideoConverterGUI:
         """Sync _queue_items order from the tree view after drag-drop reordering."""
         queue_tree.sync_queue_order_from_tree(self)
 
+    def reorder_queue_file_rows(self, queue_item):
+        """Move a folder item's file rows into its (policy-ordered) file order."""
+        queue_tree.reorder_queue_file_rows(self, queue_item)
+
+    def update_queue_order_heading(self, policy):
+        """Show the queue order policy in the queue tree heading."""
+        queue_tree.update_queue_order_heading(self, policy)
+
+    def on_queue_order_selected(self, event=None):
+        """Apply the policy picked in the queue order selector."""
+        queue_controller.on_queue_order_selected(self)
+
     # --- Analysis Tab Handlers ---
 
     def _on_folder_or_extension_changed(self, *args):
@@ -787,9 +854,6 @@ class VideoConverterGUI:
         """
         analysis_tree.update_tree_row(self, file_path)
 
-    def update_folder_aggregates(self, folder_id: str, item_to_path: dict[str, str] | None = None):
-        return analysis_tree.update_folder_aggregates(self, folder_id, item_to_path)
-
     def _get_queued_file_paths(self) -> set[str]:
         return analysis_tree.get_queued_file_paths(self)
 
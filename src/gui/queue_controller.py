@@ -8,13 +8,15 @@ Manages queue UI interactions including:
 - Removing items from queue
 - Queue selection and properties panel updates
 - Item property changes (suffix, folder)
+- Queue order policy selection
 """
 
 import os
 from tkinter import filedialog, messagebox
 
 from src.gui.analysis_tree import extract_paths_from_queue_items
-from src.models import OperationType, QueueItem, QueueItemStatus
+from src.models import OperationType, QueueItem, QueueItemStatus, QueueOrder
+from src.queue_order import QUEUE_ORDER_LABELS
 
 # =============================================================================
 # Add to Queue
@@ -293,3 +295,47 @@ def on_browse_item_output_folder(gui) -> None:
 
     gui.save_queue_to_config()
     gui.refresh_queue_tree_values()
+
+
+# =============================================================================
+# Queue Order
+# =============================================================================
+
+
+def get_queue_order(gui) -> QueueOrder:
+    """Get the selected queue order policy (unknown config values mean queue order).
+
+    Args:
+        gui: The VideoConverterGUI instance.
+    """
+    try:
+        return QueueOrder(gui.queue_order.get())
+    except ValueError:
+        return QueueOrder.USER
+
+
+def on_queue_order_selected(gui) -> None:
+    """Apply the policy picked in the queue order selector.
+
+    Takes effect for the next queue item claimed, including during a running queue.
+
+    Args:
+        gui: The VideoConverterGUI instance.
+    """
+    label = gui.queue_order_combo.get()
+    policy = next((p for p, text in QUEUE_ORDER_LABELS.items() if text == label), QueueOrder.USER)
+    gui.queue_order.set(policy.value)
+    update_queue_order_controls(gui)
+    gui.save_settings()
+
+
+def update_queue_order_controls(gui) -> None:
+    """Sync the order selector, deadline spinbox and queue tree heading with the policy.
+
+    Args:
+        gui: The VideoConverterGUI instance.
+    """
+    policy = get_queue_order(gui)
+    gui.queue_order_combo.set(QUEUE_ORDER_LABELS[policy])
+    gui.queue_deadline_spinbox.config(state="readonly" if policy == QueueOrder.DEADLINE else "disabled")
+    gui.update_queue_order_heading(policy)
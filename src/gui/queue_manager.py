@@ -9,7 +9,7 @@ import logging
 import os
 import uuid
 
-from src.cache_helpers import converted_verdict_applies, is_file_unchanged
+from src.cache_helpers import converted_verdict_applies, filter_file_for_queue, is_file_unchanged
 from src.conversion_engine.scanner import find_video_files
 from src.estimation import compute_grouped_percentiles, get_resolution_bucket
 from src.gui.analysis_tree import extract_paths_from_queue_items
@@ -176,51 +176,6 @@ def get_selected_extensions(gui) -> list[str]:
     return extensions
 
 
-def filter_file_for_queue(
-    file_path: str, operation_type: OperationType, index=None
-) -> tuple[bool, str | None]:
-    """Check if a file should be added to the queue.
-
-    Args:
-        file_path: Path to the video file.
-        operation_type: The operation type (CONVERT or ANALYZE).
-        index: Optional HistoryIndex instance (will get singleton if not provided).
-
-    Returns:
-        Tuple of (should_add, skip_reason) where:
-        - should_add: True if file passes all filters
-        - skip_reason: Reason string if skipped, None if should_add is True
-    """
-    if index is None:
-        index = get_history_index()
-
-    record = index.lookup_file(file_path)
-    if record:
-        # Already converted - skip while the verdict still describes this file
-        # (handles the replace-mode output sitting at the input path)
-        if record.status == FileStatus.CONVERTED:
-            if converted_verdict_applies(record, file_path):
-                return False, "already converted"
-            return True, None  # Content changed since conversion - re-queueable
-
-        # For other statuses the verdict/metadata only describe the analyzed
-        # file version - a changed file is re-queueable
-        if not is_file_unchanged(record, file_path):
-            return True, None
-
-        # Not worth converting - skip
-        if record.status == FileStatus.NOT_WORTHWHILE:
-            return False, "not worth converting"
-        # Already analyzed - skip for ANALYZE operations
-        if operation_type == OperationType.ANALYZE and record.status == FileStatus.ANALYZED:
-            return False, "already analyzed"
-        # Already AV1 codec - skip for CONVERT operations
-        if operation_type == OperationType.CONVERT and record.video_codec == "av1":
-            return False, "already AV1"
-
-    return True, None
-
-
 def create_queue_item(
     gui,
     path: str,
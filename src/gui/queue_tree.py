@@ -9,6 +9,7 @@ expand state, selection, and scroll position:
 - update_queue_item_row(): single item and its nested file rows
 - add_queue_items_to_tree(): append-only insertion of new items
 - remove_queue_items_from_tree(): targeted deletion with renumbering
+- reorder_queue_file_rows(): move a folder's file rows into processing order
 
 refresh_queue_tree() remains the full delete-and-rebuild path for
 structural changes (startup load, clear operations, conflict replacement)
@@ -28,7 +29,8 @@ from src.gui.queue_controller import (
 from src.gui.tree_display import format_queue_file_status, format_queue_status_display, format_stream_display
 from src.gui.tree_formatters import format_compact_time
 from src.history_index import compute_path_hash, get_history_index
-from src.models import OperationType, OutputMode, QueueItemStatus, TimeEstimate
+from src.models import OperationType, OutputMode, QueueItemStatus, QueueOrder, TimeEstimate
+from src.queue_order import QUEUE_ORDER_LABELS
 from src.utils import format_file_size
 
 logger = logging.getLogger(__name__)
@@ -259,6 +261,36 @@ def sync_queue_order_from_tree(gui) -> None:
     _renumber_queue_rows(gui)
 
 
+def reorder_queue_file_rows(gui, queue_item) -> None:
+    """Move a folder item's nested file rows to match queue_item.files.
+
+    Called when the queue order policy reorders a folder's files at claim
+    time, so the tree shows the order in which files will run.
+
+    Args:
+        gui: The VideoConverterGUI instance.
+        queue_item: The folder QueueItem whose files were reordered.
+    """
+    parent_id = gui._queue_tree_map.get(queue_item.id)
+    if not parent_id or not gui.queue_tree.exists(parent_id):
+        return
+    for position, file_item in enumerate(queue_item.files):
+        file_tree_id = gui._queue_file_tree_map.get(file_item.path)
+        if file_tree_id and gui.queue_tree.exists(file_tree_id):
+            gui.queue_tree.move(file_tree_id, parent_id, position)
+
+
+def update_queue_order_heading(gui, policy: QueueOrder) -> None:
+    """Show the active queue order policy in the name column heading.
+
+    Args:
+        gui: The VideoConverterGUI instance.
+        policy: The selected queue order policy.
+    """
+    text = "#  Name" if policy == QueueOrder.USER else f"#  Name  ·  {QUEUE_ORDER_LABELS[policy]}"
+    gui.queue_tree.heading("#0", text=text)
+
+
 # =============================================================================
 # Private Helper Functions
 # =============================================================================
@@ -128,7 +128,10 @@ def create_analysis_tab(gui):
     gui.analysis_tree.bind("<Button-1>", _on_tree_click, add=True)
 
     def _get_folder_path_from_tree_item(item_id: str) -> str:
-        """Reconstruct folder path from tree hierarchy."""
+        """Get a folder row's path from the registry, else reconstruct it from the tree hierarchy."""
+        registered = gui.get_tree_item_map().folder_path_for_item(item_id)
+        if registered:
+            return registered
         path_parts = []
         current = item_id
         while current:
@@ -142,7 +145,7 @@ def create_analysis_tab(gui):
     def _get_file_paths_under_tree_item(item_id: str) -> list[str]:
         """Recursively collect all file paths under a tree item.
 
-        Uses _tree_item_map to get paths, avoiding filesystem rescan.
+        Uses the tree item registry to get paths (O(1) per row), avoiding filesystem rescan.
         """
         file_paths: list[str] = []
         stack = [item_id]
@@ -14,7 +14,7 @@ import os
 import tkinter as tk
 from tkinter import ttk
 
-from src.config import DEFAULT_VMAF_TARGET
+from src.config import DEFAULT_VMAF_TARGET, MAX_QUEUE_DEADLINE_HOURS
 from src.gui import queue_controller
 from src.gui.base import ToolTip, TreeviewHeaderTooltip, open_in_explorer, reveal_in_explorer
 from src.gui.constants import (
@@ -24,6 +24,7 @@ from src.gui.constants import (
     COLOR_STATUS_SUCCESS,
     COLOR_STATUS_WARNING,
     COLOR_TEXT_DISABLED,
+    COLOR_TEXT_MUTED,
     SCROLLBAR_WIDTH_PADDING,
     TOOLTIP_TIME_COLUMN,
 )
@@ -36,6 +37,7 @@ from src.gui.widgets.operation_dropdown import (
 )
 from src.history_index import compute_path_hash, get_history_index
 from src.models import OperationType, OutputMode, QueueItemStatus
+from src.queue_order import QUEUE_ORDER_LABELS
 
 
 def _get_openable_path(file_path: str) -> str | None:
@@ -135,6 +137,33 @@ def create_convert_tab(gui):
     gui.clear_completed_button.pack(side="left", padx=5)
     ToolTip(gui.clear_completed_button, "Remove completed and skipped videos from queue")
 
+    # Queue order policy (applied when each queue item is claimed)
+    order_frame = ttk.Frame(controls_frame)
+    order_frame.pack(side="left", padx=(15, 0))
+
+    ttk.Label(order_frame, text="Order:").pack(side="left", padx=(0, 5))
+    gui.queue_order_combo = ttk.Combobox(
+        order_frame, values=list(QUEUE_ORDER_LABELS.values()), state="readonly", width=24
+    )
+    gui.queue_order_combo.pack(side="left")
+    gui.queue_order_combo.bind("<<ComboboxSelected>>", gui.on_queue_order_selected)
+    ToolTip(
+        gui.queue_order_combo,
+        "Which queued work runs first.\n"
+        "Savings per hour: most predicted space saved per hour of encoding.\n"
+        "Shortest first: quickest files first.\n"
+        "By deadline: most savings that finish within the time window.\n"
+        "Predictions come from analysis; files without history run last.",
+    )
+
+    ttk.Label(order_frame, text="within").pack(side="left", padx=(8, 5))
+    gui.queue_deadline_spinbox = ttk.Spinbox(
+        order_frame, from_=1, to=MAX_QUEUE_DEADLINE_HOURS, textvariable=gui.queue_deadline_hours, width=3
+    )
+    gui.queue_deadline_spinbox.pack(side="left")
+    ttk.Label(order_frame, text="h").pack(side="left", padx=(3, 0))
+    ToolTip(gui.queue_deadline_spinbox, "Time window for the deadline order, counted from Start Queue")
+
     # Right side: Conversion control buttons
     right_buttons = ttk.Frame(controls_frame)
     right_buttons.pack(side="right")
@@ -176,6 +205,8 @@ def create_convert_tab(gui):
     gui.queue_tree.heading("output", text="Output", anchor="center")
     gui.queue_tree.heading("status", text="Status", anchor="center")
 
+    queue_controller.update_queue_order_controls(gui)  # Heading shows the active queue order
+
     gui.queue_tree.column("#0", width=250, minwidth=150, stretch=True)
     gui.queue_tree.column("format", width=120, minwidth=100, stretch=False, anchor="w")
     gui.queue_tree.column("size", width=70, minwidth=55, stretch=False, anchor="e")
@@ -473,6 +504,22 @@ def create_convert_tab(gui):
     stats_frame = ttk.Frame(header_row)
     stats_frame.grid(row=0, column=1, sticky="e")
 
+    # Resource governor state (empty unless it is throttling encodes and probes)
+    gui.throttle_label = ttk.Label(stats_frame, text="", foreground=COLOR_STATUS_WARNING)
+    gui.throttle_label.pack(side="left", padx=(0, 10))
+    ToolTip(
+        gui.throttle_label,
+        "The system is busy: fewer files run at once, running encodes get a lower\n"
+        "CPU and disk priority, and new probes wait (Settings > Resource governor).",
+    )
+    # Output space reserved by running encodes (empty when none are running)
+    gui.disk_budget_label = ttk.Label(stats_frame, text="", foreground=COLOR_TEXT_MUTED)
+    gui.disk_budget_label.pack(side="left", padx=(0, 10))
+    ToolTip(
+        gui.disk_budget_label,
+        "Free space on the output disk and the space reserved for the predicted size of files\n"
+        "being encoded. Files that would not fit wait for running encodes to finish.",
+    )
     gui.status_label = ttk.Label(stats_frame, text="Ready", anchor="e")
     gui.status_label.pack(side="left")
     ttk.Label(stats_frame, text="  |  ").pack(side="left")
@@ -7,10 +7,24 @@ import logging
 from tkinter import ttk
 
 from src.ab_av1.checker import get_ab_av1_version
-from src.config import get_app_version
+from src.config import (
+    BATCH_SEARCH_MAX_DURATION_SEC,
+    CHUNKED_ENCODE_MIN_DURATION_SEC,
+    CORES_PER_ENCODE_JOB,
+    CORES_PER_SEARCH_JOB,
+    GOVERNOR_SAMPLE_INTERVAL_SEC,
+    GOVERNOR_THROTTLED_SLOTS,
+    MAX_CONCURRENT_JOBS,
+    QUALITY_CHECK_SEGMENT_SEC,
+    QUALITY_CHECK_SEGMENTS,
+    get_app_version,
+)
+from src.conversion_engine.batch_search import BATCH_SLOTS_PER_SEARCH_SLOT, split_search_slots
+from src.conversion_engine.scheduler import resolve_job_count
 from src.gui.base import ToolTip
 from src.gui.constants import COLOR_STATUS_NEUTRAL, COLOR_STATUS_SUCCESS_LIGHT, COLOR_TEXT_MUTED, FONT_SYSTEM_BOLD
 from src.hardware_accel import get_available_hw_decoders
+from src.resource_governor import GovernorPolicy, governor_supported
 from src.utils import check_ffmpeg_availability, parse_ffmpeg_version
 from src.vendor_manager import get_ab_av1_path, is_using_vendor_ffmpeg
 
@@ -70,6 +84,20 @@ def create_settings_tab(gui):
         row=3, column=2, padx=(0, 10), pady=(3, 5)
     )
 
+    # Local staging folder (encode on a fast local disk, then copy to the destination)
+    ttk.Label(output_frame, text="Local Staging Folder:").grid(row=4, column=0, sticky="w", padx=10, pady=(3, 5))
+    staging_entry = ttk.Entry(output_frame, textvariable=gui.staging_folder)
+    staging_entry.grid(row=4, column=1, sticky="ew", padx=5, pady=(3, 5))
+    ToolTip(
+        staging_entry,
+        "Optional. Encodes and their sample files are written to this local folder, and each finished\n"
+        "file is copied to its destination and verified in the background while the next one encodes.\n"
+        "Useful when outputs go to a network share. Leave empty to encode at the destination.",
+    )
+    ttk.Button(output_frame, text="Browse...", command=gui.on_browse_staging_folder).grid(
+        row=4, column=2, padx=(0, 10), pady=(3, 5)
+    )
+
     # --- Processing Options (File Processing + Hardware Acceleration) ---
     processing_frame = ttk.LabelFrame(settings_frame, text="Processing Options")
     processing_frame.grid(row=1, column=0, sticky="ew", padx=5, pady=(0, 5))
@@ -159,6 +187,109 @@ def create_settings_tab(gui):
     status_label = ttk.Label(hw_decode_row, text=status_text, foreground=status_color)
     status_label.pack(side="left", padx=(10, 0))
 
+    # Parallel conversion jobs
+    jobs_row = ttk.Frame(processing_frame)
+    jobs_row.grid(row=5, column=0, sticky="w", padx=10, pady=(0, 5))
+
+    ttk.Label(jobs_row, text="Parallel encodes:").pack(side="left", padx=(0, 5))
+    jobs_spinbox = ttk.Spinbox(
+        jobs_row, from_=0, to=MAX_CONCURRENT_JOBS, textvariable=gui.concurrent_jobs, width=4, state="readonly"
+    )
+    jobs_spinbox.pack(side="left")
+    ToolTip(
+        jobs_spinbox,
+        "Number of files encoded at the same time, each in its own ab-av1 process.\n"
+        f"0 = automatic (one encode per {CORES_PER_ENCODE_JOB} CPU cores).\n"
+        "More encodes need more memory and disk bandwidth.",
+    )
+
+    ttk.Label(jobs_row, text="CRF searches:").pack(side="left", padx=(15, 5))
+    search_jobs_spinbox = ttk.Spinbox(
+        jobs_row, from_=0, to=MAX_CONCURRENT_JOBS, textvariable=gui.concurrent_search_jobs, width=4, state="readonly"
+    )
+    search_jobs_spinbox.pack(side="left")
+    ToolTip(
+        search_jobs_spinbox,
+        "Number of CRF searches run ahead on upcoming files while earlier files encode.\n"
+        f"0 = automatic (one search per {CORES_PER_SEARCH_JOB} CPU cores).\n"
+        "A found CRF is stored in history, so the encode starts without searching again.",
+    )
+
+    ttk.Label(jobs_row, text="Short-clip searches:").pack(side="left", padx=(15, 5))
+    batch_jobs_spinbox = ttk.Spinbox(
+        jobs_row, from_=0, to=MAX_CONCURRENT_JOBS, textvariable=gui.batch_search_jobs, width=4, state="readonly"
+    )
+    batch_jobs_spinbox.pack(side="left")
+    ToolTip(
+        batch_jobs_spinbox,
+        f"Number of CRF searches of clips up to {BATCH_SEARCH_MAX_DURATION_SEC // 60} minutes run at the same time.\n"
+        f"They come out of the CRF searches above: each search slot buys {BATCH_SLOTS_PER_SEARCH_SLOT} of them,\n"
+        "and one slot is always kept for longer files (with a single search slot, clips share it).\n"
+        "0 = automatic (one search slot's worth).",
+    )
+
+    auto_encodes = resolve_job_count(0, gui.cpu_count)
+    auto_searches, auto_batch = split_search_slots(resolve_job_count(0, gui.cpu_count, CORES_PER_SEARCH_JOB), 0)
+    ttk.Label(
+        jobs_row,
+        text=f"(0 = auto: {auto_encodes} / {auto_searches} / {auto_batch} on this machine)",
+        foreground=COLOR_TEXT_MUTED,
+    ).pack(side="left", padx=(10, 0))
+
+    # Chunked encoding of long files
+    chunk_row = ttk.Frame(processing_frame)
+    chunk_row.grid(row=6, column=0, sticky="w", padx=10, pady=(0, 5))
+
+    ttk.Label(chunk_row, text="Chunks per long file:").pack(side="left", padx=(0, 5))
+    chunk_spinbox = ttk.Spinbox(
+        chunk_row, from_=0, to=MAX_CONCURRENT_JOBS, textvariable=gui.chunked_encode_jobs, width=4, state="readonly"
+    )
+    chunk_spinbox.pack(side="left")
+    ToolTip(
+        chunk_spinbox,
+        f"Files longer than {CHUNKED_ENCODE_MIN_DURATION_SEC // 60} minutes are split at keyframes and this many\n"
+        "segments are encoded at the same time, then joined without re-encoding.\n"
+        "Each segment takes an encode slot no other file is using, so the parallel encode limit still holds.\n"
+        f"0 = automatic (one segment per {CORES_PER_ENCODE_JOB} CPU cores), 1 = always encode files whole.",
+    )
+    ttk.Label(chunk_row, text=f"(0 = auto: {auto_encodes} on this machine)", foreground=COLOR_TEXT_MUTED).pack(
+        side="left", padx=(10, 0)
+    )
+
+    # Resource governor (throttle while other services need the machine)
+    governor_row = ttk.Frame(processing_frame)
+    governor_row.grid(row=7, column=0, sticky="w", padx=10, pady=(0, 5))
+
+    governor_check = ttk.Checkbutton(
+        governor_row,
+        text="Throttle when the system is busy",
+        variable=gui.resource_governor,
+        command=gui.on_resource_governor_changed,
+        state="normal" if governor_supported() else "disabled",
+    )
+    governor_check.pack(side="left")
+    ToolTip(
+        governor_check,
+        f"Checks system load every {GOVERNOR_SAMPLE_INTERVAL_SEC:g} seconds. While it is above the limits, at most\n"
+        f"{GOVERNOR_THROTTLED_SLOTS} encode and {GOVERNOR_THROTTLED_SLOTS} CRF search run, running encodes get a "
+        "lower CPU and disk priority,\nand new files are not probed - so e.g. a media server can keep streaming.",
+    )
+    policy_text = f"(at {GovernorPolicy().describe()})" if governor_supported() else "(Linux only)"
+    ttk.Label(governor_row, text=policy_text, foreground=COLOR_TEXT_MUTED).pack(side="left", padx=(10, 0))
+
+    # Post-encode quality check
+    quality_check = ttk.Checkbutton(
+        processing_frame, text="Verify output quality (VMAF spot check)", variable=gui.verify_output_quality
+    )
+    quality_check.grid(row=8, column=0, sticky="w", padx=10, pady=(0, 5))
+    ToolTip(
+        quality_check,
+        f"Scores {QUALITY_CHECK_SEGMENTS} segments of {QUALITY_CHECK_SEGMENT_SEC:g} seconds of each finished output "
+        "against the source and stores the VMAF in history.\n"
+        "When the checked outputs of similar files keep missing their predicted VMAF,\n"
+        "cached CRFs for such files are searched again instead of reused.",
+    )
+
     # --- Logging & History Settings ---
     log_hist_frame = ttk.LabelFrame(settings_frame, text="Logging & History")
     log_hist_frame.grid(row=2, column=0, sticky="ew", padx=5, pady=(0, 5))
@@ -7,7 +7,7 @@ the analysis tree and queue tree, reducing code duplication.
 """
 
 from src.estimation import compute_grouped_percentiles, estimate_file_time
-from src.gui.tree_formatters import format_compact_time, format_efficiency
+from src.gui.tree_formatters import AnalysisSortKeys, efficiency_gb_per_hour, format_compact_time, format_efficiency
 from src.models import AudioStreamInfo, FileRecord, FileStatus, QueueItemStatus
 from src.utils import format_file_size
 
@@ -163,6 +163,21 @@ def compute_analysis_display_values(
     Returns:
         Tuple of (format_str, size_str, savings_str, time_str, eff_str, tag).
     """
+    return compute_analysis_row(record, grouped_percentiles=grouped_percentiles)[0]
+
+
+def compute_analysis_row(
+    record: FileRecord, *, grouped_percentiles: dict | None = None
+) -> tuple[tuple[str, str, str, str, str, str], AnalysisSortKeys]:
+    """Compute display values plus the raw sort keys behind them for an analysis tree row.
+
+    Args:
+        record: The FileRecord from history index.
+        grouped_percentiles: Pre-computed percentiles from compute_grouped_percentiles().
+
+    Returns:
+        ((format_str, size_str, savings_str, time_str, eff_str, tag), sort keys).
+    """
     format_str = format_stream_display(record.video_codec, record.audio_streams)
     size_str = format_file_size(record.file_size_bytes) if record.file_size_bytes else "—"
     tag = get_analysis_file_tag(record.status, record.video_codec)
@@ -171,6 +186,7 @@ def compute_analysis_display_values(
     savings_str = "—"
     time_str = "—"
     eff_str = "—"
+    savings = time_sec = efficiency = None
 
     if record.status == FileStatus.CONVERTED:
         savings_str = "Done"
@@ -198,6 +214,8 @@ def compute_analysis_display_values(
         # Layer 2 = precise (no prefix), Layer 1 = use estimate confidence
         confidence = "high" if has_layer2 else time_estimate.confidence
         time_str = format_compact_time(time_estimate.best_seconds, confidence=confidence)
+        if time_estimate.best_seconds > 0:
+            time_sec = time_estimate.best_seconds
 
         if reduction_percent and record.file_size_bytes:
             file_savings = int(record.file_size_bytes * reduction_percent / 100)
@@ -205,8 +223,13 @@ def compute_analysis_display_values(
             if not has_layer2:
                 savings_str = f"~{savings_str}"
             eff_str = format_efficiency(file_savings, time_estimate.best_seconds)
+            savings = file_savings
+            efficiency = efficiency_gb_per_hour(file_savings, time_estimate.best_seconds)
 
-    return format_str, size_str, savings_str, time_str, eff_str, tag
+    sort_keys = AnalysisSortKeys(
+        format=format_str, size=record.file_size_bytes or None, savings=savings, time=time_sec, efficiency=efficiency
+    )
+    return (format_str, size_str, savings_str, time_str, eff_str, tag), sort_keys
 
 
 # =============================================================================
@@ -6,6 +6,9 @@ display strings and parsing those strings back for sorting/comparison.
 """
 
 import logging
+import os
+from bisect import bisect_left
+from dataclasses import dataclass
 
 from src.config import EFFICIENCY_DECIMAL_THRESHOLD
 from src.gui.constants import ANALYSIS_TREE_HEADINGS
@@ -49,6 +52,21 @@ def format_compact_time(seconds: float, *, confidence: str = "none") -> str:
     return f"{prefix}< 1m" if prefix else "< 1m"
 
 
+def efficiency_gb_per_hour(savings_bytes: float, time_seconds: float) -> float | None:
+    """Compute efficiency (GB saved per hour of encoding).
+
+    Args:
+        savings_bytes: Estimated savings in bytes
+        time_seconds: Estimated conversion time in seconds
+
+    Returns:
+        GB/h, or None if either input is not positive
+    """
+    if savings_bytes <= 0 or time_seconds <= 0:
+        return None
+    return (savings_bytes / 1_073_741_824) / (time_seconds / 3600)
+
+
 def format_efficiency(savings_bytes: int, time_seconds: float) -> str:
     """Format efficiency (savings per time) for display.
 
@@ -59,12 +77,10 @@ def format_efficiency(savings_bytes: int, time_seconds: float) -> str:
     Returns:
         Formatted string like "2.5 GB/h", "12 GB/h", or "—"
     """
-    if savings_bytes <= 0 or time_seconds <= 0:
+    gb_per_hr = efficiency_gb_per_hour(savings_bytes, time_seconds)
+    if gb_per_hr is None:
         return "—"
 
-    # Calculate GB saved per hour
-    gb_per_hr = (savings_bytes / 1_073_741_824) / (time_seconds / 3600)
-
     # No decimals for >= 10 GB/h
     if gb_per_hr >= EFFICIENCY_DECIMAL_THRESHOLD:
         return f"{gb_per_hr:.0f} GB/h"
@@ -170,16 +186,79 @@ def parse_efficiency_to_value(eff_str: str) -> float:
         return float("-inf")
 
 
+@dataclass(frozen=True)
+class AnalysisSortKeys:
+    """Raw values behind one Analysis tree row, kept so sorting never parses display text.
+
+    None means the column shows no value ("—", Done, Skip, AV1); such rows sort
+    last in either direction.
+    """
+
+    format: str = ""
+    size: float | None = None
+    savings: float | None = None
+    time: float | None = None
+    efficiency: float | None = None  # GB saved per hour
+
+    @classmethod
+    def from_totals(cls, size: float, savings: float, time_seconds: float) -> "AnalysisSortKeys":
+        """Build keys for an aggregate row (folder) from its running sums."""
+        return cls(
+            size=size if size > 0 else None,
+            savings=savings if savings > 0 else None,
+            time=time_seconds if time_seconds > 0 else None,
+            efficiency=efficiency_gb_per_hour(savings, time_seconds),
+        )
+
+
+def longest_increasing_run(positions: list[int]) -> set[int]:
+    """Return indices of one longest strictly increasing subsequence of positions.
+
+    Used to find the largest set of rows that are already in sorted relative
+    order and can stay where they are (patience sorting, O(n log n)).
+
+    Args:
+        positions: For each row in target order, its current position.
+
+    Returns:
+        Set of indices into positions that belong to the subsequence.
+    """
+    tail_positions: list[int] = []  # tail_positions[k] = smallest tail of an increasing run of length k+1
+    tail_indices: list[int] = []
+    previous: list[int] = [-1] * len(positions)
+    for i, pos in enumerate(positions):
+        k = bisect_left(tail_positions, pos)
+        if k > 0:
+            previous[i] = tail_indices[k - 1]
+        if k == len(tail_positions):
+            tail_positions.append(pos)
+            tail_indices.append(i)
+        else:
+            tail_positions[k] = pos
+            tail_indices[k] = i
+    result: set[int] = set()
+    i = tail_indices[-1] if tail_indices else -1
+    while i >= 0:
+        result.add(i)
+        i = previous[i]
+    return result
+
+
 def sort_analysis_tree(gui, col: str, descending: bool | None = None):
     """Sort the analysis tree by the specified column.
 
-    Sorting is done within each parent (preserves hierarchy).
-    Folders sort before files when sorting by Name.
+    Sorting is done within each parent (preserves hierarchy) on the raw values
+    kept in gui.analysis_sort_keys, never on display strings. Folders sort
+    before files; rows without a value sort last in either direction. Only
+    rows that are out of place are moved: the longest run already in sorted
+    order stays put and the rest are detached and reinserted.
+    Efficiency runs the other way, so the first (ascending) click lists the
+    highest GB/h first.
     Toggle direction on repeated clicks (when descending is None).
 
     Args:
         gui: The GUI instance (VideoConverterGUI)
-        col: Column to sort by ("#0", "size", "savings", "time", or "efficiency")
+        col: Column to sort by ("#0", "format", "size", "savings", "time", or "efficiency")
         descending: If specified, force this direction. If None, toggle on repeat click.
     """
     if descending is not None:
@@ -193,77 +272,60 @@ def sort_analysis_tree(gui, col: str, descending: bool | None = None):
         gui._sort_col = col  # noqa: SLF001 - accessing GUI internal state
         gui._sort_reverse = False  # noqa: SLF001 - accessing GUI internal state
 
-    def get_sort_key(item_id: str) -> tuple:
-        """Get sort key for an item.
-
-        Returns tuple: (is_file, sort_value)
-        - Folders always sort before files (is_file=False for folders)
-        - Sort value depends on column
-        """
-        # Check if item is a file (has parent) or folder (no parent or root)
-        parent = gui.analysis_tree.parent(item_id)
-        is_file = bool(parent)
+    tree = gui.analysis_tree
+    registry = gui.get_tree_item_map()
+    sort_keys = gui.analysis_sort_keys
+    reverse = gui._sort_reverse  # noqa: SLF001
+    if col == "efficiency":
+        reverse = not reverse  # Best first on the first click
+    empty_keys = AnalysisSortKeys()
+    moves = 0
 
+    def sort_value(item_id: str, is_file: bool) -> str | float | None:
         if col == "#0":
-            # Sort by name
-            text = gui.analysis_tree.item(item_id, "text")
-            # Remove arrows, icons, and leading spaces
-            name = text.replace("▶", "").replace("▼", "").replace("📁", "").replace("🎬", "").strip()
-            return (is_file, name.lower())
+            path = registry.file_path_for_item(item_id) if is_file else registry.folder_path_for_item(item_id)
+            if path:
+                return os.path.basename(path).lower()
+            # Unregistered row - fall back to its label without arrows and icons
+            text = tree.item(item_id, "text")
+            return text.replace("▶", "").replace("▼", "").replace("📁", "").replace("🎬", "").strip().lower()
+        keys = sort_keys.get(item_id, empty_keys)
         if col == "format":
-            # Sort by format string (values[0])
-            values = gui.analysis_tree.item(item_id, "values")
-            if values and len(values) >= 1:
-                return (is_file, values[0].lower() if values[0] else "")
-            return (is_file, "")
-        if col == "size":
-            # Sort by file size (values[1])
-            values = gui.analysis_tree.item(item_id, "values")
-            if values and len(values) >= 2:  # noqa: PLR2004 - column index bounds check
-                size_bytes = parse_size_to_bytes(values[1])
-                return (is_file, size_bytes)
-            return (is_file, float("inf"))
-        if col == "savings":
-            # Sort by estimated savings (values[2])
-            values = gui.analysis_tree.item(item_id, "values")
-            if values and len(values) >= 3:  # noqa: PLR2004 - column index bounds check
-                size_bytes = parse_size_to_bytes(values[2])
-                return (is_file, size_bytes)
-            return (is_file, float("inf"))
-        if col == "time":
-            # Sort by estimated time (values[3])
-            values = gui.analysis_tree.item(item_id, "values")
-            if values and len(values) >= 4:  # noqa: PLR2004 - column index bounds check
-                time_seconds = parse_time_to_seconds(values[3])
-                return (is_file, time_seconds)
-            return (is_file, float("inf"))
-        if col == "efficiency":
-            # Sort by efficiency (values[4], higher is better, so negate for default ascending sort)
-            values = gui.analysis_tree.item(item_id, "values")
-            if values and len(values) >= 5:  # noqa: PLR2004 - column index bounds check
-                eff_value = parse_efficiency_to_value(values[4])
-                # Negate so higher efficiency sorts first in ascending order
-                return (is_file, -eff_value)
-            return (is_file, float("inf"))
-        return (is_file, "")
+            return keys.format.lower()
+        return getattr(keys, col, None)
+
+    def ordered(items: list[tuple[str, str | float | None]]) -> list[str]:
+        present = [entry for entry in items if entry[1] is not None]
+        present.sort(key=lambda entry: entry[1], reverse=reverse)
+        return [item_id for item_id, _ in present] + [item_id for item_id, value in items if value is None]
 
     def sort_children(parent_id: str):
-        """Sort children of a parent node recursively."""
-        children = list(gui.analysis_tree.get_children(parent_id))
+        """Sort children of a parent node, then recurse into subfolders."""
+        nonlocal moves
+        children = list(tree.get_children(parent_id))
         if not children:
             return
 
-        # Sort children
-        children_sorted = sorted(children, key=get_sort_key, reverse=gui._sort_reverse)  # noqa: SLF001
-
-        # Reorder in tree
-        for index, item_id in enumerate(children_sorted):
-            gui.analysis_tree.move(item_id, parent_id, index)
-
-        # Recursively sort children of each child (for folders)
-        for child_id in children_sorted:
-            if gui.analysis_tree.get_children(child_id):  # Has children (is a folder)
-                sort_children(child_id)
+        folders = [child for child in children if registry.file_path_for_item(child) is None]
+        files = [child for child in children if registry.file_path_for_item(child) is not None]
+        target = ordered([(f, sort_value(f, False)) for f in folders]) + ordered(
+            [(f, sort_value(f, True)) for f in files]
+        )
+
+        if target != children:
+            current_pos = {item_id: pos for pos, item_id in enumerate(children)}
+            keep = longest_increasing_run([current_pos[item_id] for item_id in target])
+            to_move = [item_id for i, item_id in enumerate(target) if i not in keep]
+            # Detached rows are not counted by move's index, so after detaching the
+            # out-of-place rows, reinserting target[i] at index i is exact.
+            tree.detach(*to_move)
+            for i, item_id in enumerate(target):
+                if i not in keep:
+                    tree.move(item_id, parent_id, i)
+            moves += len(to_move)
+
+        for folder_id in folders:
+            sort_children(folder_id)
 
     # Sort root level items and their children recursively
     sort_children("")
@@ -271,7 +333,7 @@ def sort_analysis_tree(gui, col: str, descending: bool | None = None):
     # Update column headers to show sort indicator
     update_sort_indicators(gui)
 
-    logger.debug(f"Sorted analysis tree by {col}, reverse={gui._sort_reverse}")  # noqa: SLF001
+    logger.debug(f"Sorted analysis tree by {col}, reverse={reverse} ({moves} rows moved)")
 
 
 def update_sort_indicators(gui):
@@ -0,0 +1,816 @@
+# src/headless.py
+"""
+Headless batch runner: convert or analyze a queue without the GUI.
+
+Drives the same queue conversion worker as the GUI through a
+ConversionEventSink that writes one JSON object per line to stdout, so
+servers and scripts can run batches and follow progress:
+
+    python -m src.convert /videos/incoming --mode suffix --jobs 2
+    python -m src.convert --queue ab_av1_gui_config.json
+
+Inputs are files or folders (folders are scanned for the selected
+extensions and filtered against history like the GUI queue), and/or a queue
+file: a JSON list of queue items, or a GUI config file whose "queue_items"
+are taken. SIGTERM/SIGINT stops gracefully (running files finish); a second
+signal force-stops every running ab-av1 process.
+
+Several machines can share one queue. The coordinator serves it as file jobs
+(src/conversion_engine/broker.py) and merges the nodes' results into its
+history; nodes claim jobs, encode them locally and report back:
+
+    python -m src.convert /videos --serve 0.0.0.0:8765 --broker-secret S
+    python -m src.convert --join http://coordinator:8765 --path-map //nas/videos=/mnt/videos
+
+Exit status: 0 when the queue completed, 1 on errors, 2 on usage errors,
+3 when stopped by a signal.
+"""
+
+import argparse
+import contextlib
+import dataclasses
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from enum import Enum
+from typing import Any, TextIO
+
+from src.cache_helpers import filter_file_for_queue
+from src.config import BROKER_DEFAULT_PORT, BROKER_HEARTBEAT_SEC, BROKER_LEASE_SEC, BROKER_POLL_SEC, CONFIG_DEFAULTS
+from src.conversion_engine.broker import (
+    OUTCOME_FAILED,
+    OUTCOME_SKIPPED,
+    OUTCOME_STOPPED,
+    OUTCOME_SUCCEEDED,
+    BrokerClient,
+    BrokerError,
+    BrokerServer,
+    JobBroker,
+    PathMapper,
+    jobs_from_queue,
+)
+from src.conversion_engine.journal import get_journal_path, recover_interrupted_jobs
+from src.conversion_engine.scanner import find_video_files
+from src.conversion_engine.scheduler import resolve_job_count
+from src.conversion_engine.worker import queue_conversion_worker
+from src.history_index import get_history_index, record_to_dict
+from src.logging_setup import setup_logging
+from src.models import (
+    BrokerJobState,
+    ConversionSessionState,
+    OperationType,
+    OutputMode,
+    QueueConversionConfig,
+    QueueFileItem,
+    QueueItem,
+    QueueItemStatus,
+    QueueOrder,
+)
+from src.platform_utils import allow_sleep_mode, prevent_sleep_mode
+from src.queue_order import QueueCosts, order_folder_files, pick_next_item
+from src.resource_governor import configure_resource_governor
+from src.utils import check_ffmpeg_availability
+from src.vendor_manager import get_ab_av1_path
+
+logger = logging.getLogger(__name__)
+
+EXIT_OK = 0
+EXIT_ERRORS = 1  # 2 is argparse's own status for usage errors
+EXIT_STOPPED = 3
+
+ALL_EXTENSIONS = ("mp4", "mkv", "avi", "wmv")
+BROKER_SECRET_ENV = "AB_AV1_BROKER_SECRET"  # noqa: S105 - environment variable name
+_ERROR_STATUSES = frozenset({"warning", "error", "failed"})  # Counted as errors, like the GUI handlers
+
+
+def _json_default(value: Any) -> Any:
+    """Serialize dataclasses and enums found in event payloads."""
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
+
+class JsonLinesSink:
+    """ConversionEventSink that prints every event as one JSON line.
+
+    There is no UI thread: call() runs the function at once under a lock,
+    which keeps session statistics consistent across job threads. Lines are
+    written whole and flushed, so a reader can parse the stream as it arrives.
+    """
+
+    def __init__(
+        self,
+        queue_items: list[QueueItem],
+        order: QueueOrder = QueueOrder.USER,
+        deadline_hours: float = CONFIG_DEFAULTS["queue_deadline_hours"],
+        parallelism: int = 1,
+        stream: TextIO | None = None,
+    ):
+        self.queue_items = queue_items
+        self.order = order
+        self.parallelism = parallelism
+        self.scheduler = None
+        self.final_message: str | None = None
+        self._session = ConversionSessionState(running=True, total_start_time=time.time())
+        self._deadline = time.time() + deadline_hours * 3600
+        self._costs = QueueCosts()  # File costs for the run, estimated once
+        self._stream = stream or sys.stdout
+        self._lock = threading.RLock()  # Session updates may emit events themselves
+        self._write_lock = threading.Lock()
+
+    @property
+    def session(self) -> ConversionSessionState:
+        return self._session
+
+    def emit(self, event: str, **fields: Any) -> None:
+        """Write one event line ({"event": ..., "time": ..., **fields})."""
+        line = json.dumps({"event": event, "time": round(time.time(), 3), **fields}, default=_json_default)
+        with self._write_lock:
+            self._stream.write(line + "\n")
+            self._stream.flush()
+
+    def call(self, fn: Callable[..., Any], *args: Any) -> None:
+        with self._lock:
+            try:
+                fn(*args)
+            except Exception:
+                logger.exception(f"Error in sink call {getattr(fn, '__name__', 'lambda')}")
+
+    def file_event(self, filename: str, status: str, info: Any = None) -> None:
+        if status in _ERROR_STATUSES:
+            message = info.get("message") if isinstance(info, dict) else info
+
+            def count_error():
+                self._session.error_count += 1
+                self._session.error_details.append({"filename": filename, "message": message})
+
+            self.call(count_error)
+        elif status == "skipped_not_worth":
+
+            def count_skip():
+                self._session.skipped_not_worth_count += 1
+                self._session.skipped_not_worth_files.append(filename)
+
+            self.call(count_skip)
+        self.emit("file", file=filename, status=status, info=info)
+
+    def queue_status(self, item_id: str, status: QueueItemStatus, processed: int, total: int) -> None:
+        self.emit("item", id=item_id, status=status, processed=processed, total=total)
+
+    def next_item(self) -> tuple[QueueItem | None, int, bool]:
+        with self._lock:
+            time_budget = self._deadline - time.time() if self.order == QueueOrder.DEADLINE else None
+            try:
+                item = pick_next_item(
+                    self.queue_items,
+                    self.order,
+                    time_budget=time_budget,
+                    parallelism=self.parallelism,
+                    costs=self._costs,
+                )
+                if item is not None:
+                    order_folder_files(
+                        item, self.order, time_budget=time_budget, parallelism=self.parallelism, costs=self._costs
+                    )
+            except Exception:
+                logger.exception(f"Error ranking queue items by {self.order.value}; using queue order")
+                item = next((i for i in self.queue_items if i.status == QueueItemStatus.PENDING), None)
+            if item is not None:
+                item.status = QueueItemStatus.CONVERTING
+            remaining = sum(1 for i in self.queue_items if i.status == QueueItemStatus.PENDING)
+        return item, remaining, False
+
+    def job_shown(self, job) -> None:
+        self._session.current_file_start_time = job.start_time
+        self.emit("current", file=job.file_path, job=job.job_id)
+
+    def status(self, text: str) -> None:
+        self.emit("status", text=text)
+
+    def file_outcome(self, file_path: str, outcome: str) -> None:
+        self.emit("outcome", file=file_path, outcome=outcome)
+
+    def disk_budget(self, volumes) -> None:
+        self.emit("disk_budget", volumes=[dataclasses.asdict(volume) for volume in volumes])
+
+    def process_started(self, pid: int, file_path: str) -> None:
+        self.emit("process", pid=pid, file=file_path)
+
+    def scheduler_started(self, scheduler) -> None:
+        self.scheduler = scheduler
+
+    def finished(self, message: str) -> None:
+        session = self._session
+        session.running = False
+        self.final_message = message
+        self.emit(
+            "finished",
+            message=message,
+            processed=session.processed_files,
+            succeeded=session.successful_conversions,
+            not_worthwhile=session.skipped_not_worth_count,
+            low_resolution=session.skipped_low_resolution_count,
+            stopped=session.stopped_count,
+            errors=session.error_count,
+            input_bytes=session.total_input_bytes_success,
+            output_bytes=session.total_output_bytes_success,
+            elapsed_sec=round(time.time() - (session.total_start_time or time.time()), 1),
+        )
+
+
+class NodeSink(JsonLinesSink):
+    """JsonLinesSink of an encode node: the queue lives on a coordinator.
+
+    next_item() claims the coordinator's next job (waiting while other nodes
+    hold the rest) and turns it into a one-file queue item with local paths.
+    It claims only once the scheduler has a free job slot, so a busy node
+    never sits on leases that idle nodes could run.
+    When the item finishes, queue_status() reports the outcome and the file's
+    history record. A heartbeat thread renews the lease of every job the node
+    holds; if the coordinator has given a job away meanwhile, the job is
+    cancelled and its result is not reported.
+    """
+
+    def __init__(
+        self,
+        client: BrokerClient,
+        mapper: PathMapper,
+        node_name: str,
+        stop_event: threading.Event,
+        stream: TextIO | None = None,
+    ):
+        super().__init__([], stream=stream)
+        self.client = client
+        self.mapper = mapper
+        self.node_name = node_name
+        self.coordinator_lost = False
+        self._stop_event = stop_event
+        self._lease_sec = BROKER_LEASE_SEC
+        self._prefetched: QueueItem | None = None
+        self._leases: dict[str, tuple[str, QueueItem]] = {}  # job id -> (lease token, local queue item)
+        self._leases_lock = threading.Lock()  # Not self._lock: claims block while waiting for jobs
+
+    def claim(self) -> QueueItem | None:
+        """Claim the next job, waiting while other nodes hold the remaining ones.
+
+        Returns:
+            The job as a pending queue item, or None once every job is finished,
+            the node is stopping, or the coordinator stayed unreachable for a
+            whole lease period.
+        """
+        unreachable_since = None
+        while not self._stop_event.is_set():
+            try:
+                reply = self.client.claim(self.node_name)
+            except BrokerError as e:
+                now = time.monotonic()
+                if unreachable_since is None:
+                    unreachable_since = now
+                if now - unreachable_since > self._lease_sec:
+                    self.coordinator_lost = True
+                    self.emit("error", message=str(e))
+                    return None
+                logger.warning(f"{e}; retrying")
+                self._stop_event.wait(BROKER_POLL_SEC)
+                continue
+            unreachable_since = None
+            if reply.get("state") == "job":
+                self._lease_sec = reply.get("lease_sec", self._lease_sec)
+                return self._queue_item(reply["job"])
+            if reply.get("state") == "done":
+                return None
+            self._stop_event.wait(BROKER_POLL_SEC)  # Other nodes hold the remaining jobs
+        return None
+
+    def _queue_item(self, job: dict[str, Any]) -> QueueItem:
+        local_path = self.mapper.to_local(job["path"])
+        try:
+            size = os.path.getsize(local_path)
+        except OSError:
+            size = 0  # Reported as a scan error when processed (e.g. a missing --path-map)
+        output_folder = job.get("output_folder")
+        item = QueueItem(
+            id=job["job_id"],
+            source_path=self.mapper.to_local(job["source_folder"]),
+            is_folder=True,
+            output_mode=OutputMode(job["output_mode"]),
+            output_suffix=job.get("output_suffix"),
+            output_folder=self.mapper.to_local(output_folder) if output_folder else None,
+            operation_type=OperationType(job["operation_type"]),
+            files=[QueueFileItem(path=local_path, size_bytes=size)],
+            total_files=1,
+        )
+        with self._leases_lock:
+            self._leases[item.id] = (job["token"], item)
+        self.emit("claimed", job=item.id, file=local_path)
+        return item
+
+    def prefetch(self) -> QueueItem | None:
+        """Claim the first job before the worker starts (it needs one pending item to run)."""
+        self._prefetched = self.claim()
+        if self._prefetched is not None:
+            self.queue_items = [self._prefetched]
+        return self._prefetched
+
+    def next_item(self) -> tuple[QueueItem | None, int, bool]:
+        item, self._prefetched = self._prefetched, None
+        if item is None:
+            if self.scheduler is not None and not self.scheduler.wait_for_free_slot(self._stop_event):
+                return None, 0, False
+            item = self.claim()
+        if item is not None:
+            item.status = QueueItemStatus.CONVERTING
+        return item, 0, False
+
+    def queue_status(self, item_id: str, status: QueueItemStatus, processed: int, total: int) -> None:
+        super().queue_status(item_id, status, processed, total)
+        if status in (QueueItemStatus.COMPLETED, QueueItemStatus.STOPPED, QueueItemStatus.ERROR):
+            with self._leases_lock:
+                token, item = self._leases.pop(item_id, (None, None))
+            if item is not None:
+                self._report(item_id, token, item, status)
+
+    def _report(self, job_id: str, token: str, item: QueueItem, status: QueueItemStatus) -> None:
+        file_item = item.files[0]
+        record = None
+        message = item.last_error
+        if status == QueueItemStatus.ERROR or item.files_failed:
+            outcome = OUTCOME_FAILED
+        elif status == QueueItemStatus.STOPPED or item.processed_files < item.total_files:
+            outcome = OUTCOME_STOPPED
+        else:
+            outcome = OUTCOME_SKIPPED if item.files_skipped else OUTCOME_SUCCEEDED
+            message = file_item.skip_reason
+            file_record = get_history_index().lookup_file(file_item.path)
+            if file_record is not None:
+                record = record_to_dict(file_record)
+                if file_record.output_path and file_record.original_path is not None:
+                    record["output_path"] = self.mapper.to_coordinator(file_record.output_path)
+        try:
+            accepted = self.client.complete(job_id, token, outcome, record, message)
+        except BrokerError as e:
+            accepted = False
+            self.call(self._count_report_error, file_item.path, str(e))
+        self.emit("reported", job=job_id, file=file_item.path, outcome=outcome, accepted=accepted)
+
+    def _count_report_error(self, file_path: str, message: str) -> None:
+        self._session.error_count += 1
+        self._session.error_details.append({"filename": file_path, "message": message})
+
+    def renew_leases(self) -> None:
+        """Send one heartbeat (with progress) for every job this node holds."""
+        with self._leases_lock:
+            leases = {job_id: token for job_id, (token, _item) in self._leases.items()}
+        running = self.scheduler.active_jobs() if self.scheduler is not None else []
+        for job_id, token in leases.items():
+            jobs = [job for job in running if job.queue_item.id == job_id]
+            progress = jobs[0].progress if jobs else None
+            try:
+                renewed = self.client.heartbeat(
+                    job_id,
+                    token,
+                    {
+                        "phase": progress.phase,
+                        "quality": progress.progress_quality,
+                        "encoding": progress.progress_encoding,
+                    }
+                    if progress is not None
+                    else None,
+                )
+            except BrokerError as e:
+                logger.warning(f"Heartbeat for job {job_id} failed: {e}")  # The lease outlives a few misses
+                continue
+            if not renewed:
+                with self._leases_lock:
+                    self._leases.pop(job_id, None)
+                logger.warning(f"Lease of job {job_id} was lost; cancelling it")
+                self.emit("lease_lost", job=job_id)
+                for job in jobs:
+                    job.cancel_event.set()
+
+    def heartbeat_loop(self, done: threading.Event) -> None:
+        """Renew leases every BROKER_HEARTBEAT_SEC until done is set."""
+        while not done.wait(BROKER_HEARTBEAT_SEC):
+            self.renew_leases()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Command-line options; defaults mirror the GUI settings defaults."""
+    parser = argparse.ArgumentParser(
+        prog="av1-converter",
+        description="Convert or analyze videos without the GUI, printing JSON-lines progress to stdout.",
+        epilog="Without arguments the GUI starts. SIGTERM/Ctrl+C stops after running files; a second one force-stops.",
+    )
+    parser.add_argument("paths", nargs="*", help="Video files or folders to process")
+    parser.add_argument("--queue", metavar="FILE", help="JSON queue file (list of queue items, or a GUI config file)")
+    parser.add_argument("--analyze", action="store_true", help="Only run the CRF search (no encoding)")
+    parser.add_argument(
+        "--mode",
+        choices=[m.value for m in OutputMode],
+        default=CONFIG_DEFAULTS["default_output_mode"],
+        help="Where converted files go (default: %(default)s)",
+    )
+    parser.add_argument("--suffix", default=CONFIG_DEFAULTS["default_suffix"], help="Suffix for --mode suffix")
+    parser.add_argument("--output-folder", help="Output folder for --mode separate_folder")
+    parser.add_argument(
+        "--staging-folder",
+        default=CONFIG_DEFAULTS["staging_folder"],
+        help="Local scratch folder to encode in; outputs are copied to their destination afterwards",
+    )
+    parser.add_argument(
+        "--extensions",
+        default=",".join(ALL_EXTENSIONS),
+        help="Comma-separated extensions scanned in folders (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--audio-codec", default=CONFIG_DEFAULTS["audio_codec"], help="Audio codec for non-AAC/Opus audio"
+    )
+    parser.add_argument("--no-audio-convert", action="store_true", help="Copy audio streams unchanged")
+    parser.add_argument(
+        "--jobs", type=int, default=CONFIG_DEFAULTS["concurrent_jobs"], help="Parallel encodes (0 = auto)"
+    )
+    parser.add_argument(
+        "--search-jobs",
+        type=int,
+        default=CONFIG_DEFAULTS["concurrent_search_jobs"],
+        help="Parallel CRF searches (0 = auto)",
+    )
+    parser.add_argument(
+        "--batch-search-jobs",
+        type=int,
+        default=CONFIG_DEFAULTS["batch_search_jobs"],
+        help="Parallel CRF searches of short clips, taken from the --search-jobs slots (0 = auto)",
+    )
+    parser.add_argument(
+        "--chunk-jobs",
+        type=int,
+        default=CONFIG_DEFAULTS["chunked_encode_jobs"],
+        help="Segments of one long file encoded at once (0 = auto, 1 = never chunk)",
+    )
+    parser.add_argument(
+        "--order",
+        choices=[o.value for o in QueueOrder],
+        default=CONFIG_DEFAULTS["queue_order"],
+        help="Queue order policy (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--deadline-hours",
+        type=float,
+        default=CONFIG_DEFAULTS["queue_deadline_hours"],
+        help="Time window for --order deadline",
+    )
+    parser.add_argument("--no-hw-decode", action="store_true", help="Never use a hardware decoder")
+    parser.add_argument(
+        "--verify-quality",
+        action="store_true",
+        default=CONFIG_DEFAULTS["verify_output_quality"],
+        help="Score segments of each output against its source (VMAF)",
+    )
+    parser.add_argument("--anonymize-history", action="store_true", help="Store hashed paths in history")
+    parser.add_argument(
+        "--governor",
+        action="store_true",
+        default=CONFIG_DEFAULTS["resource_governor"],
+        help="Throttle encodes and probes while the system is busy (Linux; emits throttle events)",
+    )
+    parser.add_argument("--log-folder", help="Log directory (default: logs/ next to the application)")
+    distributed = parser.add_argument_group("distributed encoding")
+    distributed.add_argument(
+        "--serve",
+        nargs="?",
+        const=str(BROKER_DEFAULT_PORT),
+        metavar="[HOST:]PORT",
+        help=f"Hand the queue out to --join nodes instead of encoding here (default 127.0.0.1:{BROKER_DEFAULT_PORT})",
+    )
+    distributed.add_argument("--join", metavar="URL", help="Encode jobs of the coordinator at URL")
+    distributed.add_argument(
+        "--path-map",
+        action="append",
+        default=[],
+        metavar="COORDINATOR=LOCAL",
+        help="With --join: local mount of a coordinator path prefix (repeatable)",
+    )
+    distributed.add_argument(
+        "--node-name", default=socket.gethostname(), help="With --join: name shown to the coordinator"
+    )
+    distributed.add_argument(
+        "--broker-secret",
+        default=os.environ.get(BROKER_SECRET_ENV),
+        help=f"Shared secret between coordinator and nodes (default: ${BROKER_SECRET_ENV})",
+    )
+    return parser
+
+
+def build_queue_items(args: argparse.Namespace, extensions: list[str], emit: Callable[..., Any]) -> list[QueueItem]:
+    """Turn the queue file and path arguments into pending queue items.
+
+    Files that history says need no work are reported with a "filtered"
+    event and left out, as when adding them to the GUI queue.
+    """
+    items: list[QueueItem] = []
+    if args.queue:
+        with open(args.queue, encoding="utf-8") as f:
+            data = json.load(f)
+        raw_items = data.get("queue_items", []) if isinstance(data, dict) else data
+        for raw in raw_items:
+            item = QueueItem.from_dict(raw)
+            if item.status in (QueueItemStatus.CONVERTING, QueueItemStatus.STOPPED):
+                item.status = QueueItemStatus.PENDING  # Interrupted last time: retry
+            if item.status == QueueItemStatus.PENDING:
+                items.append(item)
+
+    operation = OperationType.ANALYZE if args.analyze else OperationType.CONVERT
+    output_mode = OutputMode(args.mode)
+    index = get_history_index()
+    for raw_path in args.paths:
+        path = os.path.abspath(raw_path)
+        is_folder = os.path.isdir(path)
+        if is_folder:
+            candidates = find_video_files(path, extensions)
+        elif os.path.isfile(path):
+            candidates = [path]
+        else:
+            raise FileNotFoundError(f"No such file or folder: {path}")
+
+        files = []
+        for file_path in candidates:
+            should_add, reason = filter_file_for_queue(file_path, operation, index)
+            if should_add:
+                files.append(QueueFileItem(path=file_path, size_bytes=os.path.getsize(file_path)))
+            else:
+                emit("filtered", file=file_path, reason=reason)
+        if not files:
+            continue
+        items.append(
+            QueueItem(
+                id=str(uuid.uuid4()),
+                source_path=path,
+                is_folder=is_folder,
+                output_mode=output_mode,
+                output_suffix=args.suffix if output_mode == OutputMode.SUFFIX else None,
+                output_folder=args.output_folder if output_mode == OutputMode.SEPARATE_FOLDER else None,
+                operation_type=operation,
+                files=files if is_folder else [],
+                total_files=len(files),
+            )
+        )
+    return items
+
+
+def _check_dependencies() -> str | None:
+    """Return an error message if ffmpeg (with SVT-AV1) or ab-av1 is missing."""
+    ffmpeg_available, svt_av1_available, _, error = check_ffmpeg_availability()
+    if not ffmpeg_available:
+        return error or "ffmpeg not found"
+    if not svt_av1_available:
+        return "ffmpeg was built without libsvtav1"
+    if get_ab_av1_path() is None:
+        return "ab-av1 not found (not in vendor/ or PATH)"
+    return None
+
+
+def _parse_listen_address(value: str) -> tuple[str, int]:
+    """Split "[HOST:]PORT" (host defaults to loopback)."""
+    host, _, port = value.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def _install_stop_signals(
+    sink: JsonLinesSink, stop_event: threading.Event, cancel_event: threading.Event
+) -> Callable[[], None]:
+    """Route SIGINT/SIGTERM to stop_event, and a second signal to cancel_event (force-stop).
+
+    Returns:
+        A function that reinstates the previous handlers.
+    """
+
+    def on_signal(signum, _frame):
+        name = signal.Signals(signum).name
+        if stop_event.is_set():
+            logger.warning(f"{name} received again - force-stopping running jobs")
+            cancel_event.set()
+            sink.emit("stopping", signal=name, force=True)
+        else:
+            logger.info(f"{name} received - finishing running files, starting no new ones")
+            stop_event.set()
+            sink.emit("stopping", signal=name, force=False)
+
+    previous_handlers = {
+        sig: signal.signal(sig, on_signal) for sig in (signal.SIGINT, getattr(signal, "SIGTERM", signal.SIGINT))
+    }
+
+    def restore():
+        for sig, handler in previous_handlers.items():
+            signal.signal(sig, handler)
+
+    return restore
+
+
+def _build_config(
+    args: argparse.Namespace, extensions: list[str], queue_items: list[QueueItem]
+) -> QueueConversionConfig:
+    return QueueConversionConfig(
+        queue_items=queue_items,
+        extensions=extensions,
+        convert_audio=not args.no_audio_convert,
+        audio_codec=args.audio_codec,
+        default_suffix=args.suffix,
+        concurrent_jobs=args.jobs,
+        concurrent_search_jobs=args.search_jobs,
+        batch_search_jobs=args.batch_search_jobs,
+        chunked_encode_jobs=args.chunk_jobs,
+        anonymize_history=args.anonymize_history,
+        hw_decode_enabled=not args.no_hw_decode,
+        staging_folder=args.staging_folder,
+        verify_output_quality=args.verify_quality,
+        journal_path=get_journal_path(),
+    )
+
+
+def _run_worker(
+    config: QueueConversionConfig,
+    sink: JsonLinesSink,
+    stop_event: threading.Event,
+    cancel_event: threading.Event,
+    governor: bool = False,
+) -> None:
+    """Run the queue worker to completion, keeping the main thread free for signals.
+
+    With governor set, the resource governor runs alongside and its throttle
+    state changes are emitted as "throttle" events.
+    """
+    sleep_prevented = prevent_sleep_mode()
+    running_governor = configure_resource_governor(
+        governor, on_change=lambda state: sink.emit("throttle", throttled=state.throttled, reasons=list(state.reasons))
+    )
+    worker = threading.Thread(
+        target=queue_conversion_worker, args=(config, stop_event, cancel_event, sink), name="queue-worker"
+    )
+    try:
+        worker.start()
+        while worker.is_alive():
+            worker.join(timeout=0.5)  # Short joins keep the main thread free to run signal handlers
+    finally:
+        if running_governor is not None:
+            configure_resource_governor(False)
+        if sleep_prevented:
+            allow_sleep_mode()
+
+
+def _worker_exit_status(sink: JsonLinesSink, stop_event: threading.Event) -> int:
+    if stop_event.is_set():
+        return EXIT_STOPPED
+    if sink.final_message is None or sink.final_message.startswith("Error") or sink.session.error_count:
+        return EXIT_ERRORS
+    return EXIT_OK
+
+
+def run_coordinator(args: argparse.Namespace, extensions: list[str]) -> int:
+    """Serve the queue to encode nodes until every job is finished."""
+    host, port = _parse_listen_address(args.serve)
+    sink = JsonLinesSink([])
+    try:
+        queue_items = build_queue_items(args, extensions, sink.emit)
+    except (OSError, ValueError, KeyError) as e:
+        sink.emit("error", message=f"Could not build the queue: {e}")
+        return EXIT_ERRORS
+
+    broker = JobBroker(jobs_from_queue(queue_items), on_event=sink.emit)
+    if host not in ("127.0.0.1", "localhost", "::1") and not args.broker_secret:
+        logger.warning(f"Serving jobs on {host} without --broker-secret; anyone on the network can claim them")
+    try:
+        server = BrokerServer(broker, host, port, secret=args.broker_secret).start()
+    except OSError as e:
+        sink.emit("error", message=f"Could not listen on {host}:{port}: {e}")
+        return EXIT_ERRORS
+    sink.emit("serving", url=server.url, jobs=broker.summary()["counts"][BrokerJobState.PENDING.value])
+
+    stop_event = threading.Event()
+    restore_signals = _install_stop_signals(sink, stop_event, threading.Event())
+    try:
+        # Expiry also runs on every claim; this pass catches leases of nodes that all went silent
+        while not stop_event.is_set() and not broker.wait_finished(timeout=1.0):
+            broker.expire()
+    finally:
+        server.stop()
+        restore_signals()
+        get_history_index().save()  # Merged node results are saved with a debounce
+
+    summary = broker.summary()
+    sink.emit("finished", **summary)
+    if stop_event.is_set():
+        return EXIT_STOPPED
+    return EXIT_ERRORS if summary["counts"][BrokerJobState.FAILED.value] else EXIT_OK
+
+
+def run_node(args: argparse.Namespace, extensions: list[str]) -> int:
+    """Claim and encode the coordinator's jobs until its queue is finished."""
+    try:
+        mapper = PathMapper.parse(args.path_map)
+    except ValueError as e:
+        JsonLinesSink([]).emit("error", message=str(e))
+        return EXIT_ERRORS
+    stop_event = threading.Event()
+    cancel_event = threading.Event()
+    sink = NodeSink(BrokerClient(args.join, secret=args.broker_secret), mapper, args.node_name, stop_event)
+
+    missing = _check_dependencies()
+    if missing:
+        sink.emit("error", message=missing)
+        return EXIT_ERRORS
+
+    restore_signals = _install_stop_signals(sink, stop_event, cancel_event)
+    try:
+        if sink.prefetch() is None:
+            sink.emit("finished", message="No jobs to claim")
+            if sink.coordinator_lost:
+                return EXIT_ERRORS
+            return EXIT_STOPPED if stop_event.is_set() else EXIT_OK
+        heartbeats_done = threading.Event()
+        threading.Thread(
+            target=sink.heartbeat_loop, args=(heartbeats_done,), name="broker-heartbeat", daemon=True
+        ).start()
+        try:
+            _run_worker(
+                _build_config(args, extensions, sink.queue_items), sink, stop_event, cancel_event, args.governor
+            )
+        finally:
+            heartbeats_done.set()
+    finally:
+        restore_signals()
+
+    if sink.coordinator_lost:
+        return EXIT_ERRORS
+    return _worker_exit_status(sink, stop_event)
+
+
+def run_headless(argv: list[str]) -> int:
+    """Run one headless batch; returns the process exit status."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.join:
+        if args.paths or args.queue or args.serve:
+            parser.error("--join takes its queue from the coordinator; drop paths, --queue and --serve")
+    elif not args.paths and not args.queue:
+        parser.error("give at least one file or folder, or --queue FILE")
+    if args.serve is not None:
+        try:
+            _parse_listen_address(args.serve)
+        except ValueError:
+            parser.error(f"--serve expects [HOST:]PORT, got {args.serve!r}")
+
+    # Keep stdout machine-readable: setup_logging prints its notes, and logs go to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        setup_logging(args.log_folder, anonymize=CONFIG_DEFAULTS["anonymize_logs"])
+    logger.info(f"=== Starting AB-AV1 headless run === (Python {sys.version.split()[0]}, {sys.platform})")
+
+    extensions = [ext.strip().lower().lstrip(".") for ext in args.extensions.split(",") if ext.strip()]
+    if not extensions:
+        parser.error("--extensions must name at least one extension")
+    recover_interrupted_jobs()  # Before history filtering builds the queue
+    if args.join:
+        return run_node(args, extensions)
+    if args.mode == OutputMode.SEPARATE_FOLDER.value:
+        if not args.output_folder:
+            parser.error("--mode separate_folder needs --output-folder")
+        os.makedirs(args.output_folder, exist_ok=True)
+    if args.serve is not None:
+        return run_coordinator(args, extensions)
+
+    sink = JsonLinesSink(
+        [], order=QueueOrder(args.order), deadline_hours=args.deadline_hours, parallelism=resolve_job_count(args.jobs)
+    )
+    try:
+        sink.queue_items = build_queue_items(args, extensions, sink.emit)
+    except (OSError, ValueError, KeyError) as e:
+        sink.emit("error", message=f"Could not build the queue: {e}")
+        return EXIT_ERRORS
+
+    missing = _check_dependencies()
+    if missing:
+        sink.emit("error", message=missing)
+        return EXIT_ERRORS
+
+    config = _build_config(args, extensions, sink.queue_items)
+    sink.emit(
+        "queued",
+        items=[{"id": item.id, "path": item.source_path, "files": item.total_files} for item in sink.queue_items],
+    )
+
+    stop_event = threading.Event()
+    cancel_event = threading.Event()
+    restore_signals = _install_stop_signals(sink, stop_event, cancel_event)
+    try:
+        _run_worker(config, sink, stop_event, cancel_event, args.governor)
+    finally:
+        restore_signals()
+    return _worker_exit_status(sink, stop_event)
@@ -16,7 +16,7 @@ import time
 
 from src.config import HISTORY_FILE, HISTORY_SCHEMA_VERSION, MAX_CRF_VALUE, MAX_VMAF_VALUE, RESOLUTION_TOLERANCE_PERCENT
 from src.logging_setup import get_script_directory
-from src.models import AudioStreamInfo, FileRecord, FileStatus
+from src.models import AudioStreamInfo, CrfVmafPoint, FileRecord, FileStatus, PresetCrf
 from src.privacy import compute_hash, normalize_path
 
 logger = logging.getLogger(__name__)
@@ -101,6 +101,43 @@ def compute_filename_hash(file_path: str) -> str:
     return compute_hash(filename, length=12)
 
 
+def record_to_dict(record: FileRecord) -> dict:
+    """Serialize a FileRecord to a JSON-ready dict (history file and broker wire format)."""
+    record_dict = dataclasses.asdict(record)
+    # Convert enum to string for JSON serialization
+    record_dict["status"] = record.status.value
+    return record_dict
+
+
+def record_from_dict(record_dict: dict) -> FileRecord:
+    """Build a FileRecord from record_to_dict() output.
+
+    Raises:
+        TypeError, ValueError: If the dict does not describe a valid record.
+    """
+    record_dict = dict(record_dict)
+    # Convert status string back to enum
+    if "status" in record_dict:
+        record_dict["status"] = FileStatus(record_dict["status"])
+
+    # Convert audio_streams dicts to AudioStreamInfo objects
+    audio_streams_data = record_dict.get("audio_streams")
+    if audio_streams_data:
+        record_dict["audio_streams"] = [AudioStreamInfo.from_dict(s) for s in audio_streams_data]
+
+    # Convert crf_curve dicts to CrfVmafPoint objects
+    crf_curve_data = record_dict.get("crf_curve")
+    if crf_curve_data:
+        record_dict["crf_curve"] = [CrfVmafPoint.from_dict(p) for p in crf_curve_data]
+
+    # Convert preset_history dicts to PresetCrf objects
+    preset_history_data = record_dict.get("preset_history")
+    if preset_history_data:
+        record_dict["preset_history"] = [PresetCrf.from_dict(p) for p in preset_history_data]
+
+    return FileRecord(**record_dict)
+
+
 def get_history_path() -> str:
     """Get the path to the history file.
 
@@ -353,16 +390,7 @@ class HistoryIndex:
             self._records = {}
             for record_dict in data["records"]:
                 try:
-                    # Convert status string back to enum
-                    if "status" in record_dict:
-                        record_dict["status"] = FileStatus(record_dict["status"])
-
-                    # Convert audio_streams dicts to AudioStreamInfo objects
-                    audio_streams_data = record_dict.get("audio_streams")
-                    if audio_streams_data:
-                        record_dict["audio_streams"] = [AudioStreamInfo.from_dict(s) for s in audio_streams_data]
-
-                    record = FileRecord(**record_dict)
+                    record = record_from_dict(record_dict)
                     # Validate record fields
                     if not _validate_record(record):
                         logger.warning(f"Skipping record with invalid field values: {record.path_hash}")
@@ -388,12 +416,7 @@ class HistoryIndex:
 
         try:
             # Convert records to dictionaries
-            records_list = []
-            for record in self._records.values():
-                record_dict = dataclasses.asdict(record)
-                # Convert enum to string for JSON serialization
-                record_dict["status"] = record.status.value
-                records_list.append(record_dict)
+            records_list = [record_to_dict(record) for record in self._records.values()]
 
             # Write to temp file
             with open(temp_path, "w", encoding="utf-8") as f:
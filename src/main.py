@@ -2,15 +2,15 @@
 """
 Main application logic module for the AV1 Video Converter application.
 Defines the main() function to be called by the launcher.
+
+With command-line arguments the headless runner (src/headless.py) takes
+over; Tkinter and the GUI are only imported when the GUI actually starts,
+so headless runs work on servers without a display or Tk.
 """
 
 import logging
 import sys
-import tkinter as tk
-from tkinter import messagebox
 
-# Project imports needed within main() or for GUI class
-from src.gui.main_window import VideoConverterGUI
 from src.logging_setup import setup_logging
 
 logger = logging.getLogger(__name__)
@@ -18,6 +18,17 @@ logger = logging.getLogger(__name__)
 
 def main():
     """Initializes and runs the AV1 Video Converter application."""
+    # Command line arguments: headless batch run instead of the GUI
+    if len(sys.argv) > 1:
+        from src.headless import run_headless  # noqa: PLC0415
+
+        sys.exit(run_headless(sys.argv[1:]))
+
+    import tkinter as tk  # noqa: PLC0415
+    from tkinter import messagebox  # noqa: PLC0415
+
+    from src.gui.main_window import VideoConverterGUI  # noqa: PLC0415
+
     # Setup logging early
     log_file = None
     try:
@@ -37,12 +48,6 @@ def main():
             print(f"Could not display Tkinter error message: {tk_e}", file=sys.stderr)
         sys.exit(1)
 
-    # Check for command line arguments (GUI only)
-    if len(sys.argv) > 1:
-        print("Command line mode is not supported. Please run without arguments.", file=sys.stderr)
-        logger.warning("Attempted run with command line arguments (not supported). Exiting.")
-        sys.exit(1)
-
     # Create the root window
     root = tk.Tk()
     app = None  # Initialize app
@@ -41,6 +41,42 @@ class AudioStreamInfo:
         )
 
 
+@dataclass
+class CrfVmafPoint:
+    """One CRF a crf-search probed, with the VMAF and predicted size its samples reached.
+
+    Serialization: Use dataclasses.asdict() to convert to dict.
+    Deserialization: Use CrfVmafPoint.from_dict() to create from dict.
+    """
+
+    crf: float
+    vmaf: float
+    size_percent: float | None = None  # Predicted video stream size, % of the input's
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "CrfVmafPoint":
+        """Create from dict (for JSON deserialization)."""
+        return cls(crf=d["crf"], vmaf=d["vmaf"], size_percent=d.get("size_percent"))
+
+
+@dataclass
+class PresetCrf:
+    """A file's searched CRF at one preset and VMAF target, kept when it is searched at another preset.
+
+    Serialization: Use dataclasses.asdict() to convert to dict.
+    Deserialization: Use PresetCrf.from_dict() to create from dict.
+    """
+
+    preset: int
+    vmaf_target: int
+    crf: float
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "PresetCrf":
+        """Create from dict (for JSON deserialization)."""
+        return cls(preset=d["preset"], vmaf_target=d["vmaf_target"], crf=d["crf"])
+
+
 @dataclass(frozen=True)
 class TimeEstimate:
     """Time estimation with confidence level and optional range.
@@ -172,6 +208,15 @@ class OperationType(str, Enum):
     ANALYZE = "analyze"  # CRF search only, no encoding
 
 
+class QueueOrder(str, Enum):
+    """Policy for the order in which pending queue work is processed."""
+
+    USER = "user"  # Queue order as arranged by the user
+    SAVINGS_RATE = "savings_rate"  # Most predicted bytes saved per encode-hour first
+    SHORTEST_FIRST = "shortest_first"  # Shortest estimated processing time first
+    DEADLINE = "deadline"  # Most savings that finish within the time window first
+
+
 class QueueItemStatus(str, Enum):
     """Status of a queue item.
 
@@ -185,6 +230,15 @@ class QueueItemStatus(str, Enum):
     STOPPED = "stopped"  # Interrupted by user stop
 
 
+class BrokerJobState(str, Enum):
+    """State of one file job handed out by the distributed-encoding coordinator."""
+
+    PENDING = "pending"  # Waiting for a node to claim it
+    LEASED = "leased"  # Claimed by a node; the lease must be renewed by heartbeat
+    DONE = "done"  # Finished (converted, analyzed or skipped)
+    FAILED = "failed"  # Failed on a node, or its lease expired too often
+
+
 @dataclass
 class QueueFileItem:
     """Individual file within a folder QueueItem."""
@@ -327,6 +381,15 @@ class QueueConversionConfig:
     convert_audio: bool
     audio_codec: str  # e.g., "opus", "aac"
     default_suffix: str = "_av1"
+    concurrent_jobs: int = 0  # Parallel encodes (encode stage); 0 = auto from CPU cores
+    concurrent_search_jobs: int = 0  # Parallel CRF searches (search stage); 0 = auto from CPU cores
+    batch_search_jobs: int = 0  # Parallel CRF searches of short clips (batch lane), from the search slots; 0 = auto
+    chunked_encode_jobs: int = 1  # Concurrent segment encodes for one long file; 0 = auto, 1 = never chunk
+    anonymize_history: bool = False  # Store hashed paths instead of full paths in history records
+    hw_decode_enabled: bool = True  # Use a hardware decoder for the source codec when one is available
+    staging_folder: str = ""  # Local scratch folder encodes run in before a verified copy; "" = off
+    verify_output_quality: bool = False  # Score a few segments of each output against the source (VMAF)
+    journal_path: str | None = None  # Write-ahead job journal for crash recovery; None = not journaled
 
 
 @dataclass
@@ -358,11 +421,13 @@ class FileRecord:
     width: int | None = None
     height: int | None = None
     bitrate_kbps: float | None = None
+    fps: float | None = None  # Frames per second (None in records scanned before it was stored)
     audio_streams: list[AudioStreamInfo] = field(default_factory=list)
 
     # === Estimation (Layer 1) ===
     estimated_reduction_percent: float | None = None  # Based on similar files
     estimated_from_similar: int | None = None  # Count of similar files used for estimate
+    not_worthwhile_likelihood: float | None = None  # Share of similar files that ended NOT_WORTHWHILE (pre-screen)
 
     # === VMAF Analysis (Layer 2 - CRF search results) ===
     vmaf_target_when_analyzed: int | None = None  # VMAF target achieved (may be lower than requested due to fallback)
@@ -371,11 +436,20 @@ class FileRecord:
     best_vmaf_achieved: float | None = None  # Best VMAF score we could achieve (from crf-search)
     predicted_output_size: int | None = None  # Predicted output size in bytes (from crf-search)
     predicted_size_reduction: float | None = None  # Predicted size reduction % (from crf-search)
+    crf_search_probes: int | None = None  # CRFs the crf-search tried (each encodes ab-av1's samples)
+    crf_probes_saved: int | None = None  # CRF probes a history CRF prior saved (None: search was unbounded)
+    crf_curve: list[CrfVmafPoint] = field(default_factory=list)  # Every CRF the search probed, by CRF
+    crf_search_samples: int | None = None  # --samples the search ran with (None: ab-av1's default)
+    crf_sample_duration_sec: float | None = None  # --sample-duration the search ran with
+    sample_vmaf_error: float | None = None  # Output's measured VMAF minus the search's prediction (once scored)
+    preset_history: list[PresetCrf] = field(default_factory=list)  # The file's results at other presets
+    preset_transfer_from: int | None = None  # CRF predicted from this preset's result, then verified (no search)
 
     # === For not_worthwhile status (failed CRF search) ===
     vmaf_target_attempted: int | None = None  # Target VMAF we tried to achieve
     min_vmaf_attempted: int | None = None  # Lowest VMAF target we tried (e.g., 90)
     skip_reason: str | None = None  # Why conversion was skipped
+    provisional_verdict: bool = False  # Reached by the reduced-sample pre-screen check; a full search re-checks it
 
     # === Conversion Results (for converted status) ===
     output_path: str | None = None  # Path or hash depending on anonymization
@@ -387,6 +461,8 @@ class FileRecord:
     final_vmaf: float | None = None
     vmaf_target_used: int | None = None
     output_audio_codec: str | None = None
+    crf_source: str | None = None  # Where the output's CRF came from: "search", "cache" or "transfer"
+    verified_vmaf: float | None = None  # Output's VMAF measured by the post-encode quality check
 
     # === Timestamps ===
     first_seen: str | None = None  # ISO timestamp when first scanned
@@ -521,13 +597,10 @@ class ConversionSessionState:
     last_eta_timestamp: float | None = None
 
     # === Per-File State ===
-    current_file_path: str | None = None
-    current_process_info: dict[str, Any] | None = None
+    current_file_path: str | None = None  # File shown in the current-file panel (one of the running jobs)
     last_input_size: int | None = None
     last_output_size: int | None = None
     last_elapsed_time: float | None = None
-    last_skip_reason: str | None = None
-    last_min_vmaf_attempted: int | None = None
 
     # === Statistics Accumulators ===
     vmaf_scores: list[float] = field(default_factory=list)
@@ -0,0 +1,132 @@
+# src/preset_transfer.py
+"""
+CRF transfer between encoding presets.
+
+A cached CRF only answers the preset it was searched at (reusable_crf), so a
+library analyzed at preset 6 had to be searched again in full to encode at
+preset 4. The CRF that reaches a VMAF target shifts by a fairly steady
+amount between two presets, and the history can measure that shift: when a
+file is searched at a new preset, its results at earlier presets are kept
+on the record (preset_history), and every such file contributes one
+(from preset, to preset) CRF offset at a shared VMAF target.
+
+With PRESET_TRANSFER_MIN_SAMPLES offsets for a pair of presets, a file
+searched only at the other preset gets a predicted CRF (its CRF plus the
+median offset). The worker confirms it with a PRESET_TRANSFER_VERIFY_SAMPLES
+sample encode and uses it if the target VMAF is reached; otherwise the full
+search runs as before.
+"""
+
+import logging
+import math
+import statistics
+from dataclasses import dataclass
+
+from src.cache_helpers import reusable_crf
+from src.config import AB_AV1_DEFAULT_MAX_CRF, AB_AV1_DEFAULT_MIN_CRF, CRF_CURVE_STEP, PRESET_TRANSFER_MIN_SAMPLES
+from src.history_index import get_history_index
+from src.models import FileRecord, FileStatus, PresetCrf
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PresetTransfer:
+    """A CRF for one preset predicted from a file's result at another."""
+
+    crf: float
+    from_preset: int
+    from_crf: float
+    offset: float  # Median CRF(to) - CRF(from) over files searched at both presets
+    samples: int  # Files the offset was measured on
+
+
+def searched_result(record: FileRecord) -> PresetCrf | None:
+    """The record's own finished search (ANALYZED best CRF or CONVERTED final CRF)."""
+    if record.preset_when_analyzed is None:
+        return None
+    if record.status == FileStatus.ANALYZED and record.best_crf is not None and record.vmaf_target_when_analyzed:
+        return PresetCrf(record.preset_when_analyzed, record.vmaf_target_when_analyzed, record.best_crf)
+    if record.status == FileStatus.CONVERTED and record.final_crf is not None and record.vmaf_target_used:
+        return PresetCrf(record.preset_when_analyzed, record.vmaf_target_used, record.final_crf)
+    return None
+
+
+def carried_preset_history(previous: FileRecord | None, preset: int) -> list[PresetCrf]:
+    """Results of the file's previous record at presets other than the one now searched.
+
+    Args:
+        previous: The file's record before the new search (None if changed or unknown).
+        preset: Preset of the new search.
+
+    Returns:
+        One result per (preset, VMAF target), the previous record's own result winning.
+    """
+    if previous is None:
+        return []
+    results = {(r.preset, r.vmaf_target): r for r in previous.preset_history}
+    own = searched_result(previous)
+    if own is not None:
+        results[(own.preset, own.vmaf_target)] = own
+    return [r for r in results.values() if r.preset != preset]
+
+
+class PresetTransferModel:
+    """CRF offsets between presets, measured on files searched at more than one."""
+
+    def __init__(self, records: list[FileRecord]):
+        self._offsets: dict[tuple[int, int], list[float]] = {}
+        for record in records:
+            current = searched_result(record)
+            if current is None or record.preset_transfer_from is not None:
+                continue  # A transferred CRF would only measure the model itself
+            for earlier in record.preset_history:
+                if earlier.vmaf_target != current.vmaf_target or earlier.preset == current.preset:
+                    continue
+                offset = current.crf - earlier.crf
+                self._offsets.setdefault((earlier.preset, current.preset), []).append(offset)
+                self._offsets.setdefault((current.preset, earlier.preset), []).append(-offset)
+
+    def offset(self, from_preset: int, to_preset: int) -> tuple[float, int] | None:
+        """(Median CRF offset, files measured) from one preset to another, or None with too few files."""
+        offsets = self._offsets.get((from_preset, to_preset), [])
+        if len(offsets) < PRESET_TRANSFER_MIN_SAMPLES:
+            return None
+        return statistics.median(offsets), len(offsets)
+
+    def predict(self, record: FileRecord, vmaf_target: int, preset: int) -> PresetTransfer | None:
+        """Predict the CRF that reaches vmaf_target at preset from the record's results at other presets.
+
+        Returns:
+            The prediction, or None when the record has no result at this target
+            for a preset with a measured offset.
+        """
+        candidates = []
+        own = searched_result(record)
+        if own is not None and own.preset != preset:
+            # The curve of an ANALYZED record also answers other targets
+            crf = own.crf if own.vmaf_target == vmaf_target else reusable_crf(record, vmaf_target, own.preset)
+            if crf is not None:
+                candidates.append((own.preset, crf))
+        candidates += [(r.preset, r.crf) for r in record.preset_history if r.vmaf_target == vmaf_target]
+        for from_preset, from_crf in candidates:
+            if from_preset == preset or (measured := self.offset(from_preset, preset)) is None:
+                continue
+            offset, samples = measured
+            crf = math.floor((from_crf + offset) / CRF_CURVE_STEP) * CRF_CURVE_STEP
+            crf = min(AB_AV1_DEFAULT_MAX_CRF, max(AB_AV1_DEFAULT_MIN_CRF, crf))
+            return PresetTransfer(crf=crf, from_preset=from_preset, from_crf=from_crf, offset=offset, samples=samples)
+        return None
+
+
+def get_preset_transfer(record: FileRecord | None, vmaf_target: int, preset: int) -> PresetTransfer | None:
+    """PresetTransferModel.predict() with offsets from the history index (one pass over its records)."""
+    if record is None or (not record.preset_history and searched_result(record) is None):
+        return None
+    transfer = PresetTransferModel(get_history_index().get_all_records()).predict(record, vmaf_target, preset)
+    if transfer is not None:
+        logger.info(
+            f"Preset transfer: CRF {transfer.from_crf:g} at preset {transfer.from_preset} -> CRF {transfer.crf:g} "
+            f"at preset {preset} (offset {transfer.offset:+.2f} from {transfer.samples} files)"
+        )
+    return transfer
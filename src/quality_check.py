@@ -0,0 +1,238 @@
+# src/quality_check.py
+"""
+Post-encode VMAF spot checks and quality drift per file group.
+
+An encode with a cached CRF (or one carried over from another preset) never
+measured the VMAF of its output, so a stale cache could miss the target
+without anyone noticing. With verify_output_quality on, process_video()
+scores QUALITY_CHECK_SEGMENTS segments of QUALITY_CHECK_SEGMENT_SEC each of
+the finished output against the source (ffmpeg libvmaf), before the
+original can be deleted. The CONVERTED record stores the mean as
+verified_vmaf, sample_vmaf_error as verified_vmaf minus the VMAF the CRF was
+predicted to reach, and crf_source (a fresh search, the cache, or a preset
+transfer).
+
+QualityDriftModel groups those errors by codec, resolution bucket and CRF
+source. Once a group has QUALITY_DRIFT_MIN_RECORDS checked outputs and their
+median missed the prediction by more than QUALITY_DRIFT_MAX_MISS VMAF, that
+source is no longer trusted for similar files: the worker re-searches
+instead of reusing a cached CRF, or skips the preset transfer. Without
+checked outputs every source stays trusted.
+
+Distrust is not permanent. Only the group's latest QUALITY_DRIFT_WINDOW checks
+count, and QUALITY_DRIFT_TRIAL_PERCENT of its files (is_drift_trial) still use
+the distrusted source with the quality check forced on, so fresh checks keep
+arriving and replace the old misses once the source is accurate again.
+"""
+
+import logging
+import os
+import re
+import statistics
+import zlib
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from src.ab_av1.exceptions import AbAv1CancelledError
+from src.ab_av1.runner import run_ab_av1
+from src.config import (
+    QUALITY_CHECK_SEGMENT_SEC,
+    QUALITY_CHECK_SEGMENTS,
+    QUALITY_DRIFT_MAX_MISS,
+    QUALITY_DRIFT_MIN_RECORDS,
+    QUALITY_DRIFT_TRIAL_PERCENT,
+    QUALITY_DRIFT_WINDOW,
+)
+from src.estimation import get_resolution_bucket
+from src.history_index import get_history_index
+from src.models import FileRecord
+from src.privacy import anonymize_filename
+from src.vendor_manager import get_ffmpeg_path
+
+logger = logging.getLogger(__name__)
+
+# Where the CRF of a CONVERTED record came from (FileRecord.crf_source)
+CRF_SOURCE_SEARCH = "search"
+CRF_SOURCE_CACHE = "cache"
+CRF_SOURCE_TRANSFER = "transfer"
+
+_VMAF_4K_MIN_WIDTH = 2560  # ab-av1 scores wider inputs with the 4k model; the check must match its predictions
+_RE_VMAF_SCORE = re.compile(r"VMAF score:\s*(\d+(?:\.\d+)?)")
+
+
+def segment_starts(duration_sec: float, segments: int, segment_sec: float) -> list[float]:
+    """Start times of evenly spaced segments, each centred in its share of the file."""
+    if duration_sec <= segment_sec:
+        return [0.0]
+    segments = max(1, min(segments, int(duration_sec // segment_sec)))
+    share = duration_sec / segments
+    return [round(i * share + (share - segment_sec) / 2, 3) for i in range(segments)]
+
+
+def build_vmaf_command(
+    ffmpeg: str, source_path: str, output_path: str, start: float, length: float, *, width: int | None = None
+) -> list[str]:
+    """ffmpeg command scoring one segment of the output against the same segment of the source."""
+    model = ":model=version=vmaf_4k_v0.6.1" if width and width > _VMAF_4K_MIN_WIDTH else ""
+    lavfi = (
+        "[0:v]setpts=PTS-STARTPTS,format=yuv420p10le[dis];"
+        "[1:v]setpts=PTS-STARTPTS,format=yuv420p10le[ref];"
+        f"[dis][ref]libvmaf=n_threads={os.cpu_count() or 1}{model}"
+    )
+    seek = ["-ss", f"{start:g}", "-t", f"{length:g}"]
+    return [
+        ffmpeg,
+        "-hide_banner",
+        "-nostdin",
+        "-stats",  # Keeps output flowing for the runner's hang detection
+        *seek,
+        "-i",
+        output_path,
+        *seek,
+        "-i",
+        source_path,
+        "-lavfi",
+        lavfi,
+        "-an",
+        "-f",
+        "null",
+        "-",
+    ]
+
+
+def parse_vmaf_score(output: str) -> float | None:
+    """The pooled VMAF libvmaf logged at the end of a run, or None."""
+    scores = _RE_VMAF_SCORE.findall(output)
+    return float(scores[-1]) if scores else None
+
+
+def score_output(
+    source_path: str,
+    output_path: str,
+    duration_sec: float | None,
+    *,
+    width: int | None = None,
+    cancel_event: Any | None = None,
+    pid_callback: Callable[..., Any] | None = None,
+) -> float | None:
+    """Mean VMAF of the output over QUALITY_CHECK_SEGMENTS segments of the source.
+
+    Returns:
+        The measured VMAF, or None when it could not be measured (no ffmpeg,
+        unknown duration, or a failed run - the check never fails a conversion).
+
+    Raises:
+        AbAv1CancelledError: If cancel_event was set during the check.
+    """
+    ffmpeg = get_ffmpeg_path()
+    if ffmpeg is None or not duration_sec:
+        return None
+    anonymized = anonymize_filename(output_path)
+    scores = []
+    for start in segment_starts(duration_sec, QUALITY_CHECK_SEGMENTS, QUALITY_CHECK_SEGMENT_SEC):
+        cmd = build_vmaf_command(str(ffmpeg), source_path, output_path, start, QUALITY_CHECK_SEGMENT_SEC, width=width)
+        try:
+            result = run_ab_av1(
+                cmd,
+                cwd=os.path.dirname(output_path) or os.getcwd(),
+                env=os.environ.copy(),
+                cancel_event=cancel_event,
+                pid_callback=pid_callback,
+            )
+        except OSError:
+            logger.exception(f"Could not start ffmpeg to check the quality of {anonymized}")
+            return None
+        if result.cancelled:
+            raise AbAv1CancelledError("Cancelled by user", error_type="cancelled")
+        score = parse_vmaf_score(result.output) if result.return_code == 0 and not result.silence_timeout else None
+        if score is None:
+            tail = result.output.splitlines()[-3:] if result.output else []
+            logger.warning(f"Quality check of {anonymized} failed at {start:g}s: {' | '.join(tail)}")
+            return None
+        scores.append(score)
+    return statistics.mean(scores)
+
+
+def predicted_vmaf(record: FileRecord | None, crf: float | None, vmaf_target: int | None) -> float | None:
+    """The VMAF the search predicted for the CRF an output was encoded with.
+
+    The record's best CRF carries its measured sample VMAF; any other CRF
+    (interpolated from the curve, or a fallback) was chosen for vmaf_target.
+    """
+    if record is not None and crf is not None and crf == record.best_crf and record.best_vmaf_achieved is not None:
+        return record.best_vmaf_achieved
+    return float(vmaf_target) if vmaf_target is not None else None
+
+
+@dataclass(frozen=True)
+class QualityDrift:
+    """Checked outputs of one group: codec, resolution bucket and CRF source."""
+
+    codec: str
+    resolution: str
+    crf_source: str
+    checked: int
+    median_error: float  # Measured minus predicted VMAF
+    worst_error: float
+
+    @property
+    def trusted(self) -> bool:
+        return self.checked < QUALITY_DRIFT_MIN_RECORDS or self.median_error >= -QUALITY_DRIFT_MAX_MISS
+
+
+class QualityDriftModel:
+    """Predicted-vs-achieved VMAF of each group's latest checked outputs."""
+
+    def __init__(self, records: list[FileRecord]):
+        self._errors: dict[tuple[str, str, str], list[float]] = {}
+        checked = [r for r in records if r.sample_vmaf_error is not None and r.crf_source and r.video_codec]
+        for record in sorted(checked, key=lambda r: r.last_updated or ""):
+            key = (record.video_codec.lower(), get_resolution_bucket(record.width, record.height), record.crf_source)
+            self._errors.setdefault(key, []).append(record.sample_vmaf_error)
+        for errors in self._errors.values():
+            del errors[:-QUALITY_DRIFT_WINDOW]  # Older checks age out
+
+    def drift(self, crf_source: str, codec: str | None, width: int | None, height: int | None) -> QualityDrift | None:
+        """The group's drift, or None when no output of the group was checked."""
+        if not codec:
+            return None
+        key = (codec.lower(), get_resolution_bucket(width, height), crf_source)
+        errors = self._errors.get(key)
+        if not errors:
+            return None
+        return QualityDrift(*key, checked=len(errors), median_error=statistics.median(errors), worst_error=min(errors))
+
+    def all_drifts(self) -> list[QualityDrift]:
+        """Every group's drift, most checked first."""
+        drifts = [
+            QualityDrift(*key, checked=len(e), median_error=statistics.median(e), worst_error=min(e))
+            for key, e in self._errors.items()
+        ]
+        return sorted(drifts, key=lambda d: d.checked, reverse=True)
+
+
+def is_crf_source_trusted(crf_source: str, codec: str | None, width: int | None, height: int | None) -> bool:
+    """Whether CRFs from crf_source still reach their predicted VMAF on files like this (history index)."""
+    drift = QualityDriftModel(get_history_index().get_all_records()).drift(crf_source, codec, width, height)
+    if drift is None or drift.trusted:
+        return True
+    logger.info(
+        f"Not trusting {crf_source} CRFs for {drift.codec} {drift.resolution}: checked outputs missed their "
+        f"predicted VMAF by {-drift.median_error:.1f} (median of {drift.checked})"
+    )
+    return False
+
+
+def is_drift_trial(path_hash: str) -> bool:
+    """Whether a file of a distrusted group still uses the group's CRF source, checked (stable across runs)."""
+    return zlib.crc32(path_hash.encode()) % 100 < QUALITY_DRIFT_TRIAL_PERCENT
+
+
+def log_quality_drift() -> None:
+    """Log the drift of every group with checked outputs, one line per group."""
+    for d in QualityDriftModel(get_history_index().get_all_records()).all_drifts():
+        logger.info(
+            f"Quality drift {d.codec} {d.resolution} ({d.crf_source}): {d.checked} checked, median "
+            f"{d.median_error:+.2f} VMAF, worst {d.worst_error:+.2f}{'' if d.trusted else ' - not trusted'}"
+        )
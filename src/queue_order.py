@@ -0,0 +1,242 @@
+# src/queue_order.py
+"""
+Queue ordering policies: which pending queue item runs next, and in which
+order a folder item's files are dispatched.
+
+Each file is reduced to a FileCost - predicted bytes saved and estimated
+processing time, both from history (Layer 1/2 predictions and the
+estimate_file_time percentiles). Policies rank those costs:
+
+- USER: queue order as arranged by the user (no reordering)
+- SAVINGS_RATE: most predicted bytes saved per hour of processing first
+- SHORTEST_FIRST: shortest estimated processing time first
+- DEADLINE: savings-rate order restricted to what fits in the time window;
+  files that would not finish in time are deferred to the end
+
+Files without an estimate (no history yet) always sort after ranked ones, in
+their original order.
+
+Costs need a history lookup and a time estimate per file, so a run keeps them
+in a QueueCosts cache: prime() fills it off the UI thread and each claim only
+ranks cached costs.
+"""
+
+import logging
+import threading
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from src.estimation import compute_grouped_percentiles, estimate_file_time
+from src.history_index import get_history_index
+from src.models import FileRecord, OperationType, QueueItem, QueueItemStatus, QueueOrder
+
+logger = logging.getLogger(__name__)
+
+# Short labels for the order selector and the queue tree heading
+QUEUE_ORDER_LABELS: dict[QueueOrder, str] = {
+    QueueOrder.USER: "Queue order",
+    QueueOrder.SAVINGS_RATE: "Most savings per hour",
+    QueueOrder.SHORTEST_FIRST: "Shortest first",
+    QueueOrder.DEADLINE: "Most savings by deadline",
+}
+
+
+@dataclass(frozen=True)
+class FileCost:
+    """Predicted benefit and cost of processing one file (None = unknown)."""
+
+    key: str  # File path, or queue item id for an item's totals
+    savings_bytes: float | None
+    seconds: float | None
+
+    @property
+    def savings_rate(self) -> float | None:
+        """Predicted bytes saved per second of processing."""
+        if self.savings_bytes is None or not self.seconds:
+            return None
+        return self.savings_bytes / self.seconds
+
+
+def predicted_savings(record: FileRecord | None) -> float | None:
+    """Predicted bytes saved by converting a file, best prediction first.
+
+    Prefers the crf-search prediction (Layer 2) over the Layer 1 estimate
+    based on similar files.
+    """
+    if record is None or not record.file_size_bytes:
+        return None
+    size = record.file_size_bytes
+    if record.predicted_output_size is not None:
+        return max(0.0, size - record.predicted_output_size)
+    for percent in (record.predicted_size_reduction, record.estimated_reduction_percent):
+        if percent is not None:
+            return max(0.0, size * percent / 100)
+    return None
+
+
+def estimate_file_cost(
+    file_path: str, operation_type: OperationType | None, grouped_percentiles: dict | None = None
+) -> FileCost:
+    """Build a FileCost from the file's history record and the time estimator."""
+    record = get_history_index().lookup_file(file_path)
+    if record is None:
+        return FileCost(file_path, None, None)
+    estimate = estimate_file_time(
+        codec=record.video_codec,
+        duration=record.duration_sec,
+        width=record.width,
+        height=record.height,
+        operation_type=operation_type,
+        grouped_percentiles=grouped_percentiles,
+    )
+    seconds = estimate.best_seconds if estimate.confidence != "none" and estimate.best_seconds > 0 else None
+    return FileCost(file_path, predicted_savings(record), seconds)
+
+
+def order_costs(
+    costs: Iterable[FileCost], policy: QueueOrder, *, time_budget: float | None = None, parallelism: int = 1
+) -> list[FileCost]:
+    """Rank costs under policy (stable: equal keys keep their input order).
+
+    Args:
+        costs: Costs in their current (user) order.
+        policy: Ordering policy.
+        time_budget: Seconds left in the window (DEADLINE only; None = unbounded).
+        parallelism: Jobs running side by side; the window holds this many
+            seconds of work per wall-clock second.
+
+    Returns:
+        The costs in processing order.
+    """
+    costs = list(costs)
+    if policy == QueueOrder.USER:
+        return costs
+    if policy == QueueOrder.SHORTEST_FIRST:
+        return sorted(costs, key=lambda c: (c.seconds is None, c.seconds or 0.0))
+
+    by_rate = sorted(costs, key=lambda c: (c.savings_rate is None, -(c.savings_rate or 0.0)))
+    if policy == QueueOrder.SAVINGS_RATE or time_budget is None:
+        return by_rate
+
+    # DEADLINE: greedy by savings rate, deferring whatever no longer fits the window
+    capacity = max(0.0, time_budget) * max(1, parallelism)
+    used = 0.0
+    fitting: list[FileCost] = []
+    deferred: list[FileCost] = []
+    for cost in by_rate:
+        if cost.seconds is not None and cost.savings_rate is not None and used + cost.seconds <= capacity:
+            used += cost.seconds
+            fitting.append(cost)
+        else:
+            deferred.append(cost)
+    return fitting + deferred
+
+
+def _item_paths(queue_item: QueueItem) -> list[str]:
+    return [f.path for f in queue_item.files] if queue_item.is_folder else [queue_item.source_path]
+
+
+class QueueCosts:
+    """File costs for one queue run, computed once per (file, operation).
+
+    History predictions barely move during a run, so ranking at every claim
+    reuses these instead of repeating a lookup and time estimate for every
+    file of every pending item. Thread-safe: prime() runs on a worker thread
+    while claims read the cache.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._costs: dict[tuple[str, OperationType | None], FileCost] = {}
+        self._percentiles: dict[OperationType | None, dict] = {}
+
+    def file_cost(self, file_path: str, operation_type: OperationType | None) -> FileCost:
+        """The file's cost, estimated on first use."""
+        key = (file_path, operation_type)
+        with self._lock:
+            cost = self._costs.get(key)
+            percentiles = self._percentiles.get(operation_type)
+        if cost is not None:
+            return cost
+        if percentiles is None:
+            percentiles = compute_grouped_percentiles(operation_type)
+        cost = estimate_file_cost(file_path, operation_type, percentiles)
+        with self._lock:
+            self._percentiles.setdefault(operation_type, percentiles)
+            return self._costs.setdefault(key, cost)
+
+    def item_cost(self, queue_item: QueueItem) -> FileCost:
+        """Sum of the item's file costs; unknown parts only count if nothing is known."""
+        costs = [self.file_cost(p, queue_item.operation_type) for p in _item_paths(queue_item)]
+        savings = [c.savings_bytes for c in costs if c.savings_bytes is not None]
+        seconds = [c.seconds for c in costs if c.seconds is not None]
+        return FileCost(queue_item.id, sum(savings) if savings else None, sum(seconds) if seconds else None)
+
+    def prime(self, items: Iterable[QueueItem]) -> None:
+        """Estimate every file of the pending items not cached yet (call off the UI thread)."""
+        for item in items:
+            if item.status == QueueItemStatus.PENDING:
+                self.item_cost(item)
+
+
+def pick_next_item(
+    items: Iterable[QueueItem],
+    policy: QueueOrder,
+    *,
+    time_budget: float | None = None,
+    parallelism: int = 1,
+    costs: QueueCosts | None = None,
+) -> QueueItem | None:
+    """Choose the pending queue item to process next under policy.
+
+    Args:
+        items: Queue items in user order.
+        policy: Ordering policy.
+        time_budget: Seconds left in the window (DEADLINE only).
+        parallelism: Jobs running side by side.
+        costs: The run's cost cache (a fresh one if None).
+
+    Returns:
+        The chosen PENDING item, or None if nothing is pending.
+    """
+    pending = [item for item in items if item.status == QueueItemStatus.PENDING]
+    if not pending or policy == QueueOrder.USER:
+        return pending[0] if pending else None
+
+    costs = costs or QueueCosts()
+    by_id = {item.id: item for item in pending}
+    ranked = order_costs(
+        (costs.item_cost(item) for item in pending), policy, time_budget=time_budget, parallelism=parallelism
+    )
+    return by_id[ranked[0].key]
+
+
+def order_folder_files(
+    queue_item: QueueItem,
+    policy: QueueOrder,
+    *,
+    time_budget: float | None = None,
+    parallelism: int = 1,
+    costs: QueueCosts | None = None,
+) -> bool:
+    """Reorder a folder item's files in place into processing order.
+
+    Returns:
+        True if the order changed.
+    """
+    if policy == QueueOrder.USER or not queue_item.is_folder or len(queue_item.files) <= 1:
+        return False
+    costs = costs or QueueCosts()
+    by_path = {f.path: f for f in queue_item.files}
+    ranked = order_costs(
+        (costs.file_cost(f.path, queue_item.operation_type) for f in queue_item.files),
+        policy,
+        time_budget=time_budget,
+        parallelism=parallelism,
+    )
+    new_files = [by_path[cost.key] for cost in ranked]
+    if all(a is b for a, b in zip(new_files, queue_item.files, strict=True)):
+        return False
+    queue_item.files = new_files
+    logger.debug(f"Reordered {len(new_files)} files of queue item {queue_item.id} by {policy.value}")
+    return True
@@ -0,0 +1,394 @@
+# src/resource_governor.py
+"""
+System resource governor for encodes and probes (Linux).
+
+A full-speed encode plus a burst of parallel ffprobes can starve other
+services on the same machine, e.g. a media server transcoding for playback.
+While enabled, the governor samples /proc every GOVERNOR_SAMPLE_INTERVAL_SEC:
+
+- 1-minute load average per logical CPU (/proc/loadavg)
+- available memory, MemAvailable / MemTotal (/proc/meminfo)
+- busy time of the busiest disk between two samples (/proc/diskstats)
+
+When a metric crosses its GovernorPolicy limit the governor throttles until
+every metric is back within GOVERNOR_RELEASE_RATIO of its limit:
+
+1. attached JobSchedulers keep only GOVERNOR_THROTTLED_SLOTS encode and CRF
+   search slots for jobs (running jobs finish; new ones wait)
+2. running ab-av1 process groups are reniced to GOVERNOR_THROTTLED_NICE and
+   moved to the idle I/O class - ab-av1 is started as a session leader, so its
+   ffmpeg children share its process group
+3. new ffprobes wait in wait_for_probe_clearance()
+
+The governor is process-wide (configure_resource_governor()), so probes of the
+Analysis tab are paused as well as those of a conversion run.
+"""
+
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from src.config import (
+    GOVERNOR_MAX_DISK_BUSY,
+    GOVERNOR_MAX_LOAD_PER_CORE,
+    GOVERNOR_MIN_AVAILABLE_MEMORY,
+    GOVERNOR_RELEASE_RATIO,
+    GOVERNOR_SAMPLE_INTERVAL_SEC,
+    GOVERNOR_THROTTLED_NICE,
+    GOVERNOR_THROTTLED_SLOTS,
+)
+from src.conversion_engine.scheduler import BATCH_SEARCH_STAGE, ENCODE_STAGE, SEARCH_STAGE
+
+if TYPE_CHECKING:
+    from src.conversion_engine.scheduler import JobScheduler
+
+logger = logging.getLogger(__name__)
+
+_GOVERNED_STAGES = (ENCODE_STAGE, SEARCH_STAGE, BATCH_SEARCH_STAGE)
+_PROBE_POLL_SEC = 0.5  # How often a paused probe re-checks its stop condition
+_IONICE_TIMEOUT_SEC = 5
+# Block devices that never carry the video files (loop mounts, RAM disks, optical drives)
+_IGNORED_DISK_PREFIXES = ("loop", "ram", "zram", "sr", "fd")
+_DISKSTATS_NAME_FIELD = 2
+_DISKSTATS_IO_TICKS_FIELD = 12  # "time spent doing I/Os (ms)"
+
+
+@dataclass(frozen=True)
+class SystemSample:
+    """One reading of the metrics the governor watches."""
+
+    load_per_core: float
+    available_memory: float  # Fraction of MemTotal
+    disk_busy: float  # Fraction of the last interval the busiest disk was busy (0.0 on the first reading)
+
+
+def read_load_per_core(path: str = "/proc/loadavg", cpu_count: int | None = None) -> float:
+    """1-minute load average divided by the logical CPU count."""
+    with open(path, encoding="ascii") as f:
+        load = float(f.read().split()[0])
+    return load / (cpu_count or os.cpu_count() or 1)
+
+
+def read_available_memory(path: str = "/proc/meminfo") -> float:
+    """MemAvailable as a fraction of MemTotal."""
+    fields = {}
+    with open(path, encoding="ascii") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            fields[name] = int(value.split()[0])
+    return fields["MemAvailable"] / fields["MemTotal"]
+
+
+def read_disk_io_ticks(path: str = "/proc/diskstats") -> dict[str, int]:
+    """Milliseconds each block device has spent doing I/O since boot."""
+    ticks = {}
+    with open(path, encoding="ascii") as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) > _DISKSTATS_IO_TICKS_FIELD and not fields[_DISKSTATS_NAME_FIELD].startswith(
+                _IGNORED_DISK_PREFIXES
+            ):
+                ticks[fields[_DISKSTATS_NAME_FIELD]] = int(fields[_DISKSTATS_IO_TICKS_FIELD])
+    return ticks
+
+
+class SystemSampler:
+    """Reads SystemSamples from /proc; disk busy time is measured between calls."""
+
+    def __init__(self, proc_root: str = "/proc", clock: Callable[[], float] = time.monotonic):
+        self._proc_root = proc_root
+        self._clock = clock
+        self._last_ticks: dict[str, int] = {}
+        self._last_time: float | None = None
+
+    def sample(self) -> SystemSample:
+        """Take a reading.
+
+        Raises:
+            OSError: If a /proc file cannot be read.
+            ValueError: If a /proc file cannot be parsed.
+        """
+        now = self._clock()
+        ticks = read_disk_io_ticks(os.path.join(self._proc_root, "diskstats"))
+        disk_busy = 0.0
+        if self._last_time is not None and now > self._last_time:
+            interval_ms = (now - self._last_time) * 1000
+            deltas = [ticks[disk] - self._last_ticks[disk] for disk in ticks.keys() & self._last_ticks.keys()]
+            disk_busy = min(1.0, max(deltas, default=0) / interval_ms)
+        self._last_ticks, self._last_time = ticks, now
+        return SystemSample(
+            load_per_core=read_load_per_core(os.path.join(self._proc_root, "loadavg")),
+            available_memory=read_available_memory(os.path.join(self._proc_root, "meminfo")),
+            disk_busy=disk_busy,
+        )
+
+
+@dataclass(frozen=True)
+class GovernorPolicy:
+    """Limits above which the governor throttles."""
+
+    max_load_per_core: float = GOVERNOR_MAX_LOAD_PER_CORE
+    min_available_memory: float = GOVERNOR_MIN_AVAILABLE_MEMORY
+    max_disk_busy: float = GOVERNOR_MAX_DISK_BUSY
+
+    def exceeded(self, sample: SystemSample, ratio: float = 1.0) -> list[str]:
+        """Describe every metric of sample outside its limit.
+
+        Args:
+            sample: The reading.
+            ratio: Scales the limits inwards (GOVERNOR_RELEASE_RATIO checks
+                whether throttling may end).
+
+        Returns:
+            Short reasons like "load 2.1/core"; empty when within every limit.
+        """
+        reasons = []
+        if sample.load_per_core > self.max_load_per_core * ratio:
+            reasons.append(f"load {sample.load_per_core:.1f}/core")
+        if sample.available_memory < self.min_available_memory / ratio:
+            reasons.append(f"{sample.available_memory:.0%} memory available")
+        if sample.disk_busy > self.max_disk_busy * ratio:
+            reasons.append(f"disk {sample.disk_busy:.0%} busy")
+        return reasons
+
+    def describe(self) -> str:
+        return (
+            f"load above {self.max_load_per_core:g}/core, available memory below "
+            f"{self.min_available_memory:.0%}, disk busy above {self.max_disk_busy:.0%}"
+        )
+
+
+@dataclass(frozen=True)
+class GovernorState:
+    """Throttle state reported to listeners (the UI) on every change."""
+
+    throttled: bool = False
+    reasons: tuple[str, ...] = ()
+
+    def describe(self) -> str:
+        return f"Throttled: {', '.join(self.reasons)}" if self.throttled else ""
+
+
+def _set_group_priority(pgid: int, niceness: int, io_class: str) -> None:
+    """Set the CPU niceness and I/O scheduling class of a process group (best effort).
+
+    Raising niceness is always allowed; lowering it back needs CAP_SYS_NICE, so
+    a throttled encode may keep its lower CPU priority until it ends.
+    """
+    try:
+        os.setpriority(os.PRIO_PGRP, pgid, niceness)
+    except OSError as e:
+        logger.debug(f"Cannot set niceness {niceness} for process group {pgid}: {e}")
+    ionice = shutil.which("ionice")
+    if ionice is None:
+        return
+    try:
+        subprocess.run(
+            [ionice, "-c", io_class, "-P", str(pgid)], capture_output=True, timeout=_IONICE_TIMEOUT_SEC, check=False
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.debug(f"Cannot set I/O class for process group {pgid}: {e}")
+
+
+class ResourceGovernor:
+    """Samples system load on its own thread and throttles while it is too high.
+
+    Thread-safe: schedulers attach and detach from worker threads, probes
+    wait on analysis and job threads, and listeners are called on the
+    governor thread.
+    """
+
+    def __init__(
+        self,
+        policy: GovernorPolicy | None = None,
+        sampler: SystemSampler | None = None,
+        interval: float = GOVERNOR_SAMPLE_INTERVAL_SEC,
+    ):
+        self.policy = policy or GovernorPolicy()
+        self.state = GovernorState()
+        self._sampler = sampler or SystemSampler()
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._probes_clear = threading.Event()  # Set while probes may run
+        self._probes_clear.set()
+        self._schedulers: list[JobScheduler] = []
+        self._reniced: set[int] = set()  # Process groups lowered while throttled
+        self._listeners: list[Callable[[GovernorState], Any]] = []
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Start sampling on a background thread."""
+        logger.info(f"Resource governor on: throttles at {self.policy.describe()}")
+        self._thread = threading.Thread(target=self._run, name="resource-governor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and lift any throttling."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            if self.state.throttled:
+                self._set_state(GovernorState())
+                self._release()
+        logger.info("Resource governor off")
+
+    def add_listener(self, listener: Callable[[GovernorState], Any]) -> None:
+        """Call listener(state) whenever the throttle state changes."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def attach(self, scheduler: "JobScheduler") -> None:
+        """Let the governor limit scheduler's stages while throttled."""
+        with self._lock:
+            self._schedulers.append(scheduler)
+            if self.state.throttled:
+                self._throttle_scheduler(scheduler)
+
+    def detach(self, scheduler: "JobScheduler") -> None:
+        """Give scheduler's held slots back and stop governing it."""
+        with self._lock:
+            if scheduler in self._schedulers:
+                self._schedulers.remove(scheduler)
+                for name in _GOVERNED_STAGES:
+                    scheduler.hold_stage_slots(name, 0)
+
+    def wait_for_probe(self, should_stop: Callable[[], bool] | None = None) -> bool:
+        """Block while throttled.
+
+        Returns:
+            True when the probe may run, False if should_stop() became true while waiting.
+        """
+        while not self._probes_clear.wait(_PROBE_POLL_SEC):
+            if should_stop is not None and should_stop():
+                return False
+        return True
+
+    def update(self, sample: SystemSample) -> GovernorState:
+        """Apply one reading: start, keep up or lift throttling.
+
+        Returns:
+            The state after the reading.
+        """
+        with self._lock:
+            if self.state.throttled:
+                reasons = self.policy.exceeded(sample, GOVERNOR_RELEASE_RATIO)
+                if not reasons:
+                    self._set_state(GovernorState())
+                    self._release()
+                    logger.info("Resource governor: system load back to normal, throttling lifted")
+                    return self.state
+            else:
+                reasons = self.policy.exceeded(sample)
+                if not reasons:
+                    return self.state
+                logger.warning(
+                    f"Resource governor: throttling ({', '.join(reasons)}) - holding back job slots, "
+                    "lowering encode priority and pausing probes"
+                )
+            if tuple(reasons) != self.state.reasons:
+                self._set_state(GovernorState(throttled=True, reasons=tuple(reasons)))
+            self._probes_clear.clear()
+            for scheduler in self._schedulers:
+                self._throttle_scheduler(scheduler)  # Repeated: slots free up and new jobs start over time
+            return self.state
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            try:
+                sample = self._sampler.sample()
+            except (OSError, ValueError, KeyError, IndexError):
+                logger.warning("Resource governor cannot read system load", exc_info=True)
+                continue
+            self.update(sample)
+
+    def _set_state(self, state: GovernorState) -> None:
+        self.state = state
+        for listener in self._listeners:
+            try:
+                listener(state)
+            except Exception:
+                logger.exception("Resource governor listener failed")
+
+    def _throttle_scheduler(self, scheduler: "JobScheduler") -> None:
+        for name in _GOVERNED_STAGES:
+            limit = scheduler.stage_limit(name)
+            if limit is not None:
+                scheduler.hold_stage_slots(name, limit - GOVERNOR_THROTTLED_SLOTS)
+        if sys.platform == "win32":
+            return
+        for job in scheduler.active_jobs():
+            for pid in list(job.pids):  # Every process of the job, e.g. each segment of a chunked encode
+                if pid not in self._reniced:
+                    self._reniced.add(pid)
+                    _set_group_priority(pid, GOVERNOR_THROTTLED_NICE, "3")
+
+    def _release(self) -> None:
+        for scheduler in self._schedulers:
+            for name in _GOVERNED_STAGES:
+                scheduler.hold_stage_slots(name, 0)
+        for pgid in self._reniced:
+            _set_group_priority(pgid, 0, "2")
+        self._reniced.clear()
+        self._probes_clear.set()
+
+
+_governor: ResourceGovernor | None = None
+_governor_lock = threading.Lock()
+
+
+def governor_supported() -> bool:
+    """Whether this system exposes the /proc metrics the governor reads."""
+    return sys.platform.startswith("linux") and os.path.exists("/proc/loadavg")
+
+
+def configure_resource_governor(
+    enabled: bool, on_change: Callable[[GovernorState], Any] | None = None
+) -> ResourceGovernor | None:
+    """Start or stop the process-wide governor (on startup and when the setting changes).
+
+    Args:
+        enabled: The resource_governor setting.
+        on_change: Listener for throttle state changes (called on the governor thread).
+
+    Returns:
+        The running governor, or None if disabled or unsupported on this system.
+    """
+    global _governor  # noqa: PLW0603 - process-wide singleton like the history index
+    with _governor_lock:
+        if _governor is not None:
+            _governor.stop()
+            _governor = None
+        if not enabled:
+            return None
+        if not governor_supported():
+            logger.warning("Resource governor needs Linux /proc metrics; not available on this system")
+            return None
+        _governor = ResourceGovernor()
+        if on_change is not None:
+            _governor.add_listener(on_change)
+        _governor.start()
+        return _governor
+
+
+def get_resource_governor() -> ResourceGovernor | None:
+    """The running governor, or None."""
+    return _governor
+
+
+def wait_for_probe_clearance(should_stop: Callable[[], bool] | None = None) -> bool:
+    """Block a new ffprobe while the governor throttles (returns at once if it is off).
+
+    Returns:
+        True when the probe may run, False if should_stop() became true while waiting.
+    """
+    governor = _governor
+    return governor.wait_for_probe(should_stop) if governor is not None else True
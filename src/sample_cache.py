@@ -0,0 +1,124 @@
+# src/sample_cache.py
+"""
+Per-file sample-encode cache directories for crf-search.
+
+ab-av1 remembers the VMAF and size of every sample it encoded in a cache
+keyed by input and encoder arguments, so a later process probing the same
+CRF skips the encode. The wrapper points each search of a file at its own
+directory here (--temp-dir, and XDG_CACHE_HOME where ab-av1 honours it), so
+that cache survives every VMAF fallback attempt of the file and the
+ANALYZE-then-CONVERT sequence, while the temp folders next to the input are
+still swept after each attempt.
+
+A file's directories (one per preset) are deleted when its CONVERTED or
+NOT_WORTHWHILE record is saved. Files that never get a verdict (stopped,
+failed, analyzed but never converted) are left to sweep_sample_cache(),
+which the worker runs at start: directories unused for
+SAMPLE_CACHE_MAX_AGE_DAYS go, then the least recently used ones until the
+total is under SAMPLE_CACHE_MAX_BYTES. Directories of a running ab-av1
+process are never deleted.
+"""
+
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+
+from src.ab_av1.cleaner import is_run_active
+from src.config import SAMPLE_CACHE_DIR, SAMPLE_CACHE_MAX_AGE_DAYS, SAMPLE_CACHE_MAX_BYTES
+from src.history_index import compute_path_hash
+from src.logging_setup import get_script_directory
+from src.utils import format_file_size
+
+logger = logging.getLogger(__name__)
+
+
+def get_sample_cache_root() -> str:
+    """Get the directory holding every file's sample cache."""
+    return os.path.join(get_script_directory(), SAMPLE_CACHE_DIR)
+
+
+def get_sample_cache_dir(file_path: str, preset: int) -> str:
+    """Get the sample cache directory of a file at one preset (created by the wrapper when a run starts)."""
+    return os.path.join(get_sample_cache_root(), f"{compute_path_hash(file_path)}-p{preset}")
+
+
+def _remove(path: Path) -> bool:
+    """Delete one cache directory unless a running ab-av1 process uses it."""
+    if is_run_active(str(path)):
+        logger.debug(f"Keeping sample cache {path.name}: an ab-av1 run is still using it")
+        return False
+    try:
+        shutil.rmtree(path)
+    except OSError as e:
+        logger.warning(f"Failed to remove sample cache {path.name}: {e}")
+        return False
+    return True
+
+
+def release_sample_cache(file_path: str) -> int:
+    """Delete a file's sample cache directories (all presets) once its verdict is recorded.
+
+    Returns:
+        Number of directories removed.
+    """
+    root = Path(get_sample_cache_root())
+    if not root.is_dir():
+        return 0
+    removed = sum(_remove(path) for path in root.glob(f"{compute_path_hash(file_path)}-p*") if path.is_dir())
+    if removed:
+        logger.debug(f"Released {removed} sample cache director{'y' if removed == 1 else 'ies'}")
+    return removed
+
+
+def _usage(path: Path) -> tuple[int, float]:
+    """(Total bytes, newest modification time) of a directory tree."""
+    size = 0
+    last_used = path.stat().st_mtime
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                stat = os.stat(os.path.join(dirpath, name))
+            except OSError:
+                continue
+            size += stat.st_size
+            last_used = max(last_used, stat.st_mtime)
+    return size, last_used
+
+
+def sweep_sample_cache(max_bytes: int = SAMPLE_CACHE_MAX_BYTES, max_age_days: float = SAMPLE_CACHE_MAX_AGE_DAYS) -> int:
+    """Delete stale sample caches: unused for max_age_days, then least recently used above max_bytes.
+
+    Returns:
+        Number of directories removed.
+    """
+    root = Path(get_sample_cache_root())
+    if not root.is_dir():
+        return 0
+    entries = []
+    for path in root.iterdir():
+        if not path.is_dir():
+            continue
+        try:
+            size, last_used = _usage(path)
+        except OSError:
+            continue
+        entries.append((last_used, size, path))
+
+    entries.sort(key=lambda entry: entry[0], reverse=True)  # Most recently used first
+    cutoff = time.time() - max_age_days * 86400
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    freed = 0
+    # Walk from the least recently used end, deleting while stale or over the cap
+    for last_used, size, path in reversed(entries):
+        if last_used >= cutoff and total <= max_bytes:
+            break
+        if _remove(path):
+            removed += 1
+            freed += size
+            total -= size
+    if removed:
+        logger.info(f"Swept {removed} stale sample cache(s), freed {format_file_size(freed)}")
+    return removed
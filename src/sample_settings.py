@@ -0,0 +1,152 @@
+# src/sample_settings.py
+"""
+Sample count and sample duration for crf-search.
+
+ab-av1 samples every file the same way unless told otherwise, so a 5-minute
+clip and a 3-hour film got the same strategy. choose_sample_settings() scales
+--samples with the duration (one per CRF_SAMPLE_EVERY_SEC, clamped to
+CRF_SAMPLES_MIN-CRF_SAMPLES_MAX) and shortens --sample-duration on short files
+so the samples cover at most CRF_SAMPLE_MAX_COVERAGE of them.
+
+Past searches of similar files (same codec and resolution bucket) adjust the
+count: records store the settings their search used and, once the output was
+scored, sample_vmaf_error (measured VMAF minus the search's prediction). A
+group whose searches missed by more than CRF_SAMPLE_ERROR_HIGH gets more
+samples; one that stayed within CRF_SAMPLE_ERROR_LOW gets fewer.
+sample_settings_benchmark() summarizes search time and error per setting, to
+tune the speed/accuracy tradeoff on real history.
+"""
+
+import logging
+import math
+import statistics
+from dataclasses import dataclass
+
+from src.config import (
+    CRF_SAMPLE_DURATION_SEC,
+    CRF_SAMPLE_ERROR_HIGH,
+    CRF_SAMPLE_ERROR_LOW,
+    CRF_SAMPLE_EVERY_SEC,
+    CRF_SAMPLE_MAX_COVERAGE,
+    CRF_SAMPLE_MIN_DURATION_SEC,
+    CRF_SAMPLE_STABILITY_MIN_RECORDS,
+    CRF_SAMPLES_MAX,
+    CRF_SAMPLES_MIN,
+)
+from src.estimation import get_resolution_bucket
+from src.history_index import get_history_index
+from src.models import FileRecord
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SampleSettings:
+    """--samples and --sample-duration for one crf-search."""
+
+    samples: int
+    sample_duration_sec: float
+    reason: str  # How the settings were chosen, for the log
+
+
+@dataclass(frozen=True)
+class SampleBenchmark:
+    """Searches of history that ran with one sample setting."""
+
+    samples: int
+    sample_duration_sec: float
+    searches: int
+    mean_search_time_sec: float | None
+    verified: int  # Searches whose output was scored
+    mean_abs_vmaf_error: float | None  # Over the verified searches
+
+
+def _similar_errors(records: list[FileRecord], codec: str | None, width: int | None, height: int | None) -> list[float]:
+    """|sample_vmaf_error| of scored searches of files with the same codec and resolution bucket."""
+    if not codec:
+        return []
+    bucket = get_resolution_bucket(width, height)
+    return [
+        abs(r.sample_vmaf_error)
+        for r in records
+        if r.sample_vmaf_error is not None
+        and (r.video_codec or "").lower() == codec.lower()
+        and get_resolution_bucket(r.width, r.height) == bucket
+    ]
+
+
+def choose_sample_settings(
+    duration_sec: float | None, similar_errors: list[float] | None = None
+) -> SampleSettings | None:
+    """Choose crf-search sampling for a file.
+
+    Args:
+        duration_sec: The file's duration.
+        similar_errors: |Measured - predicted VMAF| of similar files' searches.
+
+    Returns:
+        The settings, or None when the duration is unknown (ab-av1's defaults apply).
+    """
+    if not duration_sec:
+        return None
+    samples = min(CRF_SAMPLES_MAX, max(CRF_SAMPLES_MIN, math.ceil(duration_sec / CRF_SAMPLE_EVERY_SEC)))
+    reason = f"{duration_sec / 60:.0f} min"
+    if similar_errors and len(similar_errors) >= CRF_SAMPLE_STABILITY_MIN_RECORDS:
+        error = statistics.median(similar_errors)
+        if error > CRF_SAMPLE_ERROR_HIGH:
+            samples = min(CRF_SAMPLES_MAX, math.ceil(samples * 1.5))
+            reason += f", similar searches missed by {error:.1f} VMAF"
+        elif error < CRF_SAMPLE_ERROR_LOW:
+            samples = max(CRF_SAMPLES_MIN, math.floor(samples * 0.75))
+            reason += f", similar searches within {error:.1f} VMAF"
+    sample_duration = CRF_SAMPLE_DURATION_SEC
+    if samples * sample_duration > duration_sec * CRF_SAMPLE_MAX_COVERAGE:
+        sample_duration = max(CRF_SAMPLE_MIN_DURATION_SEC, round(duration_sec * CRF_SAMPLE_MAX_COVERAGE / samples))
+    return SampleSettings(samples=samples, sample_duration_sec=sample_duration, reason=reason)
+
+
+def get_sample_settings(
+    duration_sec: float | None, codec: str | None, width: int | None, height: int | None
+) -> SampleSettings | None:
+    """choose_sample_settings() with the errors of similar files in the history index."""
+    errors = _similar_errors(get_history_index().get_all_records(), codec, width, height)
+    settings = choose_sample_settings(duration_sec, errors)
+    if settings is not None:
+        logger.info(
+            f"crf-search sampling: {settings.samples} x {settings.sample_duration_sec:g}s samples ({settings.reason})"
+        )
+    return settings
+
+
+def sample_settings_benchmark(records: list[FileRecord]) -> list[SampleBenchmark]:
+    """Search time and VMAF error of history's searches, per sample setting (most used first)."""
+    by_setting: dict[tuple[int, float], list[FileRecord]] = {}
+    for record in records:
+        if record.crf_search_samples and record.crf_sample_duration_sec:
+            by_setting.setdefault((record.crf_search_samples, record.crf_sample_duration_sec), []).append(record)
+    benchmarks = []
+    for (samples, duration), group in by_setting.items():
+        times = [r.crf_search_time_sec for r in group if r.crf_search_time_sec]
+        errors = [abs(r.sample_vmaf_error) for r in group if r.sample_vmaf_error is not None]
+        benchmarks.append(
+            SampleBenchmark(
+                samples=samples,
+                sample_duration_sec=duration,
+                searches=len(group),
+                mean_search_time_sec=statistics.mean(times) if times else None,
+                verified=len(errors),
+                mean_abs_vmaf_error=statistics.mean(errors) if errors else None,
+            )
+        )
+    return sorted(benchmarks, key=lambda b: b.searches, reverse=True)
+
+
+def log_sample_settings_benchmark() -> None:
+    """Log sample_settings_benchmark() over the history index, one line per setting."""
+    for b in sample_settings_benchmark(get_history_index().get_all_records()):
+        time_text = f"{b.mean_search_time_sec:.0f}s" if b.mean_search_time_sec is not None else "n/a"
+        error_text = f"{b.mean_abs_vmaf_error:.2f}" if b.mean_abs_vmaf_error is not None else "n/a"
+        logger.info(
+            f"Sampling {b.samples} x {b.sample_duration_sec:g}s: {b.searches} searches, mean {time_text}, "
+            f"mean VMAF error {error_text} over {b.verified} verified"
+        )
@@ -0,0 +1,295 @@
+# src/scan_snapshot.py
+"""
+Persistent snapshots of Analysis-tab folder scans.
+
+A snapshot records the folder structure of the last completed scan of a root
+folder plus the size and mtime of every video file in it. At startup the
+Analysis tree is rebuilt from the snapshot in a single batched pass; a
+background walk then revalidates it and only rows that actually changed are
+touched (see analysis_scanner).
+
+On-disk format, one compact JSON file per root named by the root's path hash:
+    {"schema_version": 1, "root": "...", "extensions": ["mkv", "mp4"],
+     "folders": ["", "Season 1", ...],
+     "files": [[folder_index, name, size, mtime], ...]}
+
+Folder paths are relative to the root ("" is the root itself) and only folders
+that directly contain video files are listed; their ancestors are implied.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import threading
+from collections import deque
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+
+from src.cache_helpers import mtimes_match
+from src.config import SCAN_SNAPSHOT_DIR, SCAN_SNAPSHOT_MAX_ROOTS, SCAN_SNAPSHOT_SCHEMA_VERSION
+from src.history_index import compute_path_hash
+from src.logging_setup import get_script_directory
+
+logger = logging.getLogger(__name__)
+
+# (filename, size, mtime) for one video file inside a directory
+FileInfo = tuple[str, int, float]
+
+
+@dataclass
+class SnapshotDiff:
+    """Differences between a snapshot and the current state of the disk.
+
+    Entries are (absolute_path, size, mtime) for added/changed files and
+    absolute paths for removed files.
+    """
+
+    added: list[tuple[str, int, float]] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    changed: list[tuple[str, int, float]] = field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        """True if the snapshot still matches the disk exactly."""
+        return not (self.added or self.removed or self.changed)
+
+
+@dataclass
+class ScanSnapshot:
+    """Folder structure and file stats of one completed scan."""
+
+    root: str
+    extensions: list[str]
+    folders: list[str] = field(default_factory=list)  # Relative to root, "" is the root
+    files: list[tuple[int, str, int, float]] = field(default_factory=list)  # (folder index, name, size, mtime)
+
+    @classmethod
+    def from_listing(cls, root: str, extensions: list[str], listing: Iterable[tuple[str, list[FileInfo]]]):
+        """Build a snapshot from (dirpath, file_infos) pairs in scan order.
+
+        Args:
+            root: Absolute root folder that was scanned.
+            extensions: Extensions (without dot) the scan was filtered by.
+            listing: (dirpath, [(filename, size, mtime), ...]) per scanned directory.
+
+        Returns:
+            ScanSnapshot covering every directory that contains at least one file.
+        """
+        snapshot = cls(root=root, extensions=sorted(ext.lower() for ext in extensions))
+        for dirpath, file_infos in listing:
+            if not file_infos:
+                continue
+            rel = os.path.relpath(dirpath, root)
+            snapshot.folders.append("" if rel == os.curdir else rel)
+            folder_index = len(snapshot.folders) - 1
+            snapshot.files.extend((folder_index, name, size, mtime) for name, size, mtime in file_infos)
+        return snapshot
+
+    def iter_files(self) -> Iterator[tuple[str, str, int, float]]:
+        """Yield (folder_rel, absolute_path, size, mtime) for every file in scan order."""
+        for folder_index, name, size, mtime in self.files:
+            folder_rel = self.folders[folder_index]
+            yield folder_rel, os.path.join(self.root, folder_rel, name), size, mtime
+
+    def to_dict(self) -> dict:
+        """Serialize to the compact on-disk representation."""
+        return {
+            "schema_version": SCAN_SNAPSHOT_SCHEMA_VERSION,
+            "root": self.root,
+            "extensions": self.extensions,
+            "folders": self.folders,
+            "files": [list(entry) for entry in self.files],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ScanSnapshot":
+        """Deserialize from the on-disk representation.
+
+        Raises:
+            ValueError: If the data is not a snapshot of the current schema version.
+        """
+        if not isinstance(data, dict) or data.get("schema_version") != SCAN_SNAPSHOT_SCHEMA_VERSION:
+            raise ValueError("Unsupported scan snapshot schema")
+        files = [(int(idx), str(name), int(size), float(mtime)) for idx, name, size, mtime in data["files"]]
+        return cls(root=data["root"], extensions=list(data["extensions"]), folders=list(data["folders"]), files=files)
+
+
+# =============================================================================
+# Directory Walking
+# =============================================================================
+
+
+def scan_directory(
+    dirpath: str, ext_set: set[str], stop_event: threading.Event | None = None
+) -> tuple[list[str], list[FileInfo]]:
+    """Scan a directory for subdirs and video files with stats.
+
+    Args:
+        dirpath: Directory to list.
+        ext_set: Lowercase extensions including the dot (e.g. {".mkv"}).
+        stop_event: Optional event; listing stops early (and returns empty) when set.
+
+    Returns:
+        (subdirs, file_infos) sorted case-insensitively, where file_infos is a
+        list of (filename, size, mtime).
+    """
+    subdirs = []
+    file_infos = []
+    try:
+        with os.scandir(dirpath) as entries:
+            for entry in entries:
+                if stop_event is not None and stop_event.is_set():
+                    return [], []
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in ext_set:
+                    try:
+                        stat = entry.stat()
+                        file_infos.append((entry.name, stat.st_size, stat.st_mtime))
+                    except OSError:
+                        file_infos.append((entry.name, 0, 0))
+    except (PermissionError, OSError):
+        pass
+    return sorted(subdirs, key=str.lower), sorted(file_infos, key=lambda x: x[0].lower())
+
+
+def walk_video_files(
+    root: str, ext_set: set[str], stop_event: threading.Event | None = None
+) -> Iterator[tuple[str, list[FileInfo]]]:
+    """Depth-first walk yielding (dirpath, file_infos) for every directory under root.
+
+    Same traversal order as the incremental Analysis scan (alphabetical DFS),
+    which keeps an HDD head within one subtree at a time.
+    """
+    stack: deque[str] = deque([root])
+    while stack:
+        if stop_event is not None and stop_event.is_set():
+            return
+        dirpath = stack.pop()
+        subdirs, file_infos = scan_directory(dirpath, ext_set, stop_event)
+        stack.extend(reversed(subdirs))
+        yield dirpath, file_infos
+
+
+def diff_snapshots(old: ScanSnapshot, new: ScanSnapshot) -> SnapshotDiff:
+    """Compare two snapshots of the same root.
+
+    Files are matched by normcase path; a file counts as changed when its size
+    differs or its mtime differs beyond the JSON round-trip tolerance.
+
+    Args:
+        old: Snapshot the tree was rebuilt from.
+        new: Snapshot of the current disk state.
+
+    Returns:
+        SnapshotDiff in the new snapshot's scan order.
+    """
+    old_files = {os.path.normcase(path): (path, size, mtime) for _, path, size, mtime in old.iter_files()}
+    diff = SnapshotDiff()
+    for _, path, size, mtime in new.iter_files():
+        previous = old_files.pop(os.path.normcase(path), None)
+        if previous is None:
+            diff.added.append((path, size, mtime))
+        elif previous[1] != size or not mtimes_match(previous[2], mtime):
+            diff.changed.append((path, size, mtime))
+    diff.removed = [path for path, _, _ in old_files.values()]
+    return diff
+
+
+# =============================================================================
+# Persistence
+# =============================================================================
+
+
+def get_snapshot_dir() -> str:
+    """Get the directory holding per-root scan snapshots."""
+    return os.path.join(get_script_directory(), SCAN_SNAPSHOT_DIR)
+
+
+def get_snapshot_path(root: str) -> str:
+    """Get the snapshot file path for a root folder."""
+    return os.path.join(get_snapshot_dir(), f"{compute_path_hash(root)}.json")
+
+
+def load_snapshot(root: str, extensions: list[str]) -> ScanSnapshot | None:
+    """Load the snapshot for a root if it matches the current extension filter.
+
+    Args:
+        root: Absolute root folder.
+        extensions: Extensions (without dot) currently selected.
+
+    Returns:
+        The snapshot, or None if missing, unreadable, or taken with different extensions.
+    """
+    path = get_snapshot_path(root)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            snapshot = ScanSnapshot.from_dict(json.load(f))
+    except (OSError, ValueError, KeyError, TypeError):
+        logger.warning(f"Ignoring unreadable scan snapshot: {path}")
+        return None
+    if snapshot.extensions != sorted(ext.lower() for ext in extensions):
+        logger.debug("Scan snapshot extensions differ from current selection - ignoring")
+        return None
+    return snapshot
+
+
+def save_snapshot(snapshot: ScanSnapshot) -> None:
+    """Persist a snapshot with an atomic write and prune the oldest extra roots.
+
+    Args:
+        snapshot: Snapshot to write.
+    """
+    path = get_snapshot_path(snapshot.root)
+    temp_path = path + ".tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot.to_dict(), f, separators=(",", ":"))
+        os.replace(temp_path, path)
+        logger.debug(f"Saved scan snapshot ({len(snapshot.files)} files) to {path}")
+    except OSError:
+        logger.exception(f"Failed to save scan snapshot: {path}")
+        with contextlib.suppress(OSError):
+            os.remove(temp_path)
+        return
+    _prune_old_snapshots()
+
+
+def remove_snapshot(root: str) -> None:
+    """Delete the snapshot for a root folder, if any."""
+    with contextlib.suppress(OSError):
+        os.remove(get_snapshot_path(root))
+
+
+def clear_all_snapshots() -> int:
+    """Delete every stored snapshot (they contain plain file names).
+
+    Returns:
+        Number of snapshot files removed.
+    """
+    removed = 0
+    with contextlib.suppress(OSError), os.scandir(get_snapshot_dir()) as entries:
+        for entry in entries:
+            if entry.name.endswith(".json"):
+                with contextlib.suppress(OSError):
+                    os.remove(entry.path)
+                    removed += 1
+    return removed
+
+
+def _prune_old_snapshots() -> None:
+    """Keep only the SCAN_SNAPSHOT_MAX_ROOTS most recently written snapshots."""
+    snapshot_dir = get_snapshot_dir()
+    try:
+        with os.scandir(snapshot_dir) as entries:
+            snapshots = [(entry.stat().st_mtime, entry.path) for entry in entries if entry.name.endswith(".json")]
+    except OSError:
+        return
+    snapshots.sort(reverse=True)
+    for _, stale_path in snapshots[SCAN_SNAPSHOT_MAX_ROOTS:]:
+        with contextlib.suppress(OSError):
+            os.remove(stale_path)
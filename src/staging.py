@@ -0,0 +1,240 @@
+# src/staging.py
+"""
+Local scratch staging for encodes whose output lives on a network share.
+
+ab-av1 writes its temp folders and sample encodes next to the output, so
+encoding straight onto a NAS sends all of that I/O over the network. With a
+staging folder set, process_video() encodes into a per-file folder on the
+fast local disk and a StagingArea's mover thread copies the finished file to
+its destination:
+
+1. reserve() checks the scratch disk has room for the file and creates its folder
+2. the encode (and its samples) runs there; the job then gives up its encode
+   slot, so the next file's encode starts while the copy runs
+3. the mover copies to "<destination>.partial", fsyncs it and verifies size and
+   BLAKE2b hash against the staged file - one copy at a time, so copies do not
+   compete for the link
+4. process_video() renames the verified copy into place and runs its usual
+   post-conversion checks
+"""
+
+import contextlib
+import hashlib
+import logging
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Any
+
+from src.ab_av1.exceptions import AbAv1CancelledError, OutputFileError
+from src.config import (
+    STAGING_COPY_CHUNK_BYTES,
+    STAGING_COPY_SUFFIX,
+    STAGING_DIR_PREFIX,
+    STAGING_MIN_FREE_BYTES,
+    STAGING_SPACE_FACTOR,
+)
+from src.privacy import anonymize_filename
+from src.utils import format_file_size
+
+logger = logging.getLogger(__name__)
+
+_CANCEL_POLL_SEC = 0.5
+
+
+@dataclass(eq=False)
+class _MoveRequest:
+    staged_path: str
+    partial_path: str
+    cancelled: threading.Event = field(default_factory=threading.Event)
+    future: Future = field(default_factory=Future)
+
+
+def _hash_file(path: str, cancelled: threading.Event) -> str:
+    digest = hashlib.blake2b()
+    with open(path, "rb") as f:
+        while chunk := f.read(STAGING_COPY_CHUNK_BYTES):
+            if cancelled.is_set():
+                raise AbAv1CancelledError("Cancelled by user", error_type="cancelled")
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _folder_bytes(folder: str) -> int:
+    """Bytes already written under a scratch folder (0 if it is gone)."""
+    total = 0
+    for dirpath, _dirnames, filenames in os.walk(folder):
+        for name in filenames:
+            with contextlib.suppress(OSError):
+                total += os.path.getsize(os.path.join(dirpath, name))
+    return total
+
+
+def copy_verified(source: str, destination: str, cancelled: threading.Event) -> None:
+    """Copy source to destination, fsync it, and read it back to verify.
+
+    Raises:
+        OutputFileError: If the copy's size or hash differs from the source.
+        AbAv1CancelledError: If cancelled is set mid-copy.
+        OSError: If reading or writing fails.
+    """
+    digest = hashlib.blake2b()
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        while chunk := src.read(STAGING_COPY_CHUNK_BYTES):
+            if cancelled.is_set():
+                raise AbAv1CancelledError("Cancelled by user", error_type="cancelled")
+            digest.update(chunk)
+            dst.write(chunk)
+        dst.flush()
+        os.fsync(dst.fileno())
+    source_size = os.path.getsize(source)
+    copied_size = os.path.getsize(destination)
+    if copied_size != source_size:
+        raise OutputFileError(
+            f"Copy is {copied_size} bytes, staged output {source_size}", error_type="staging_verify_failed"
+        )
+    if _hash_file(destination, cancelled) != digest.hexdigest():
+        raise OutputFileError("Copy does not match the staged output", error_type="staging_verify_failed")
+
+
+class StagingArea:
+    """Per-file scratch folders under a local root, plus the background mover.
+
+    Thread-safe: every job of a worker run shares one StagingArea. close() stops
+    the mover once the run's jobs have finished. Space promised to folders that
+    have not filled up yet counts as used, so jobs starting together cannot
+    all claim the same free space.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self._lock = threading.Lock()
+        self._reserved: dict[str, int] = {}  # Scratch folder -> bytes reserved for it
+        self._requests: queue.Queue[_MoveRequest | None] = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="staging-mover", daemon=True)
+        self._thread.start()
+
+    def reserve(self, input_size: int) -> str | None:
+        """Create a scratch folder for one file if the scratch disk has room.
+
+        Needs STAGING_SPACE_FACTOR times the input size (a chunked encode holds
+        the split source and the encoded segments) on top of STAGING_MIN_FREE_BYTES
+        and the unwritten part of the other folders' reservations.
+
+        Returns:
+            The folder to encode into, or None to encode at the destination.
+        """
+        needed = int(input_size * STAGING_SPACE_FACTOR)
+        try:
+            # Disk reads happen outside the lock; only the comparison and bookkeeping are under it
+            with self._lock:
+                reserved = dict(self._reserved)
+            pending = sum(max(0, size - _folder_bytes(folder)) for folder, size in reserved.items())
+            free = shutil.disk_usage(self.root).free
+            folder = tempfile.mkdtemp(prefix=STAGING_DIR_PREFIX, dir=self.root)
+        except OSError:
+            logger.warning(f"Staging folder {self.root} is not usable - encoding at the destination", exc_info=True)
+            return None
+        with self._lock:
+            # Reservations made since the snapshot have not written anything yet
+            pending += sum(size for other, size in self._reserved.items() if other not in reserved)
+            available = free - pending
+            fits = available - needed >= STAGING_MIN_FREE_BYTES
+            if fits:
+                self._reserved[folder] = needed
+        if not fits:
+            shutil.rmtree(folder, ignore_errors=True)
+            logger.info(
+                f"Staging folder has {format_file_size(available)} free after other reservations, "
+                f"needs {format_file_size(needed)} plus reserve - encoding at the destination"
+            )
+            return None
+        return folder
+
+    def move(self, staged_path: str, output_path: str, cancel_event: Any | None = None) -> str:
+        """Have the mover copy a staged output next to its destination.
+
+        Blocks until the copy is verified. The caller renames the returned
+        "<output>.partial" file into place; on failure nothing is left behind.
+
+        Raises:
+            OutputFileError: If the copy failed or did not verify.
+            AbAv1CancelledError: If cancel_event was set before the copy finished.
+        """
+        request = _MoveRequest(staged_path=staged_path, partial_path=output_path + STAGING_COPY_SUFFIX)
+        self._requests.put(request)
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                request.cancelled.set()  # The mover drops it and removes any partial copy
+            try:
+                partial_path = request.future.result(timeout=_CANCEL_POLL_SEC)
+            except FutureTimeoutError:
+                continue
+            if request.cancelled.is_set():  # Finished just as it was cancelled
+                with contextlib.suppress(OSError):
+                    os.remove(partial_path)
+                raise AbAv1CancelledError("Cancelled by user", error_type="cancelled")
+            return partial_path
+
+    def release(self, folder: str) -> None:
+        """Remove a scratch folder returned by reserve() and free its reservation."""
+        shutil.rmtree(folder, ignore_errors=True)
+        with self._lock:
+            self._reserved.pop(folder, None)
+
+    def close(self) -> None:
+        """Stop the mover after the queued copies (call once no job is running)."""
+        self._requests.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while (request := self._requests.get()) is not None:
+            self._copy(request)
+
+    def _copy(self, request: _MoveRequest) -> None:
+        anonymized = anonymize_filename(request.partial_path)
+        error: Exception | None = None
+        try:
+            if request.cancelled.is_set():
+                raise AbAv1CancelledError("Cancelled by user", error_type="cancelled")
+            logger.info(f"Copying staged output to {anonymized}")
+            copy_verified(request.staged_path, request.partial_path, request.cancelled)
+        except OSError as e:
+            error = OutputFileError(f"Copying the staged output failed: {e}", error_type="staging_copy_failed")
+        except (OutputFileError, AbAv1CancelledError) as e:
+            error = e
+        if error is None:
+            logger.info(f"Staged output copied and verified: {anonymized}")
+            request.future.set_result(request.partial_path)
+            return
+        try:
+            if os.path.exists(request.partial_path):
+                os.remove(request.partial_path)
+        except OSError:
+            logger.warning(f"Could not remove partial copy {anonymized}", exc_info=True)
+        request.future.set_exception(error)
+
+
+def open_staging_area(folder: str) -> StagingArea | None:
+    """Start a StagingArea for a configured staging folder ("" = staging off).
+
+    Returns:
+        The staging area, or None if staging is off or the folder is unusable.
+    """
+    if not folder:
+        return None
+    try:
+        os.makedirs(folder, exist_ok=True)
+    except OSError:
+        logger.warning(f"Cannot create staging folder {folder} - encoding at the destination", exc_info=True)
+        return None
+    if not os.access(folder, os.W_OK):
+        logger.warning(f"Staging folder {folder} is not writable - encoding at the destination")
+        return None
+    logger.info(f"Staging encodes in {folder}")
+    return StagingArea(folder)
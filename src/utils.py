@@ -14,10 +14,9 @@ import logging
 import os
 import re
 import subprocess
-import tkinter as tk
 import urllib.request
 from collections.abc import Callable
-from typing import Any
+from typing import TYPE_CHECKING, Any
 from urllib.error import URLError
 
 from src.logging_setup import get_script_directory
@@ -25,6 +24,9 @@ from src.platform_utils import get_windows_subprocess_startupinfo
 from src.privacy import PATH_PATTERNS, _anonymize_path_match, anonymize_filename
 from src.vendor_manager import get_ffmpeg_path, get_ffprobe_path
 
+if TYPE_CHECKING:
+    import tkinter as tk  # Annotation only: the engine and headless runner must import without Tk
+
 # Logging setup
 logger = logging.getLogger(__name__)
 
@@ -488,7 +490,7 @@ def check_ffmpeg_latest_btbn() -> tuple[str | None, str | None, str]:
 
 
 # For UI updates
-def update_ui_safely(root: tk.Tk, update_function: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+def update_ui_safely(root: "tk.Tk", update_function: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
     """Thread-safe UI update with extra safety checks and logging.
 
     Args:
@@ -597,6 +599,10 @@ def scrub_history_paths() -> tuple[int, int]:
     """
     # Import here to avoid circular imports (history_index imports from utils)
     from src.history_index import get_history_index  # noqa: PLC0415
+    from src.scan_snapshot import clear_all_snapshots  # noqa: PLC0415
+
+    # Scan snapshots store plain file names for the Analysis tree - drop them too
+    clear_all_snapshots()
 
     index = get_history_index()
     all_records = index.get_all_records()
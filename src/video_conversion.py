@@ -6,6 +6,7 @@ This module provides functions to convert videos to AV1 format using ab-av1.
 """
 
 import logging
+import os
 import time
 import traceback
 from collections.abc import Callable
@@ -19,14 +20,20 @@ from src.ab_av1.exceptions import (
     InputFileError,
     OutputFileError,
 )
+from src.ab_av1.stats import CrfSearchResult, InputProbe
 from src.ab_av1.wrapper import AbAv1Wrapper
 
 # Import constants from config
-from src.cache_helpers import can_reuse_crf, is_file_unchanged
+from src.cache_helpers import is_file_unchanged, reusable_crf
+from src.chunked_encode import ChunkedEncodeError, encode_chunked, should_chunk
 from src.config import DEFAULT_ENCODING_PRESET, DEFAULT_VMAF_TARGET, MIN_OUTPUT_FILE_SIZE
+from src.crf_prior import get_crf_prior
 from src.history_index import get_history_index
 from src.models import FileStatus, OutputMode
 from src.privacy import anonymize_filename
+from src.quality_check import score_output
+from src.sample_cache import get_sample_cache_dir
+from src.staging import StagingArea
 from src.utils import (
     format_crf,
     format_file_size,
@@ -35,6 +42,7 @@ from src.utils import (
     log_conversion_result,
     log_video_properties,
 )
+from src.video_metadata import extract_video_metadata
 
 logger = logging.getLogger(__name__)
 
@@ -126,7 +134,13 @@ def process_video(
     total_duration_seconds: float = 0.0,
     hw_decoder: str | None = None,
     cancel_event: Any | None = None,
-) -> tuple[str, float, int, int, float | None, float | None, int | None, float, float] | None:
+    search_result: CrfSearchResult | None = None,
+    chunk_jobs: int = 1,
+    staging: StagingArea | None = None,
+    on_encoded: Callable[[], Any] | None = None,
+    probe: InputProbe | None = None,
+    verify_quality: bool = False,
+) -> tuple[str, float, int, int, float | None, float | None, int | None, float, float, float | None] | None:
     """
     Process a single video file using ab-av1 with hardcoded quality settings.
 
@@ -142,10 +156,23 @@ def process_video(
         total_duration_seconds: Total duration of the input video in seconds (for progress calc)
         hw_decoder: Optional hardware decoder name (e.g., "h264_cuvid", "hevc_qsv")
         cancel_event: Optional threading.Event; set by force-stop to abort mid-encode
+        search_result: CRF already found by the worker's search stage; the file is
+            encoded with it directly (encode stage only) instead of auto-encoding
+        chunk_jobs: Concurrent segment encodes for files long enough to chunk
+            (see chunked_encode.should_chunk); 1 always encodes the file whole
+        staging: Local scratch area; when it has room, the encode runs there and the
+            finished file is copied to output_path and verified before the rename
+        on_encoded: Called once the encoder has finished, before the output is
+            copied and checked (the worker frees the file's encode slot here)
+        probe: The worker's probe of the file; while the file is unchanged it stands
+            in for ffprobe here and in the wrapper
+        verify_quality: Score segments of the encoded output against the source
+            (src/quality_check.py) before the output is moved and the original deleted
 
     Returns:
         tuple: (output_path, elapsed_time, input_size, output_size, final_crf, final_vmaf,
-                final_vmaf_target, crf_search_time_sec, encoding_time_sec) on success, None otherwise.
+                final_vmaf_target, crf_search_time_sec, encoding_time_sec, verified_vmaf)
+                on success, None otherwise. verified_vmaf is None unless the check measured it.
     """
     input_path = Path(video_path).resolve()
     output_path_obj = Path(output_path).resolve()
@@ -178,7 +205,10 @@ def process_video(
     video_info = None
     input_size = 0
     try:
-        video_info = get_video_info(str(input_path))
+        if probe is not None and probe.is_current(str(input_path)):
+            video_info = probe.video_info
+        else:
+            video_info = get_video_info(str(input_path))
         if not video_info:
             if file_info_callback:
                 file_info_callback(
@@ -231,17 +261,31 @@ def process_video(
                 return None
             logger.info(f"File {anonymized_input_name} changed since NOT_WORTHWHILE analysis, re-attempting")
 
-        # Check if we can reuse cached CRF
-        if is_file_unchanged(record, str(input_path)) and can_reuse_crf(
-            record, DEFAULT_VMAF_TARGET, DEFAULT_ENCODING_PRESET
-        ):
-            use_cached_crf = True
-            cached_crf = record.best_crf
+        # Check if we can reuse cached CRF (the best CRF, or one interpolated from the stored curve)
+        if is_file_unchanged(record, str(input_path)):
+            cached_crf = reusable_crf(record, DEFAULT_VMAF_TARGET, DEFAULT_ENCODING_PRESET)
+            use_cached_crf = cached_crf is not None
+        if use_cached_crf:
             logger.info(
                 f"Using cached CRF {format_crf(cached_crf)} for {anonymized_input_name} "
-                f"(VMAF {record.vmaf_target_when_analyzed}, preset {record.preset_when_analyzed})"
+                f"(analyzed at VMAF {record.vmaf_target_when_analyzed}, preset {record.preset_when_analyzed})"
             )
 
+    if search_result is not None:
+        # Search stage already ran for this file (possibly at a fallback VMAF target)
+        use_cached_crf = True
+        cached_crf = search_result.best_crf
+        logger.info(
+            f"Using searched CRF {format_crf(cached_crf)} for {anonymized_input_name} "
+            f"(VMAF {search_result.vmaf_target_used})"
+        )
+
+    # --- Choose where the encoder writes (local scratch when staging) ---
+    staged_dir = staging.reserve(input_size) if staging is not None else None
+    encode_path = os.path.join(staged_dir, output_path_obj.name) if staged_dir else str(output_path_obj)
+    if staged_dir:
+        logger.info(f"Encoding {anonymized_input_name} in staging folder {staged_dir}")
+
     # --- Execute Conversion ---
     conversion_start_time = time.time()
     result_stats = None
@@ -252,12 +296,33 @@ def process_video(
     try:
         ab_av1 = AbAv1Wrapper()
 
-        if use_cached_crf and cached_crf is not None:
+        if use_cached_crf and cached_crf is not None and should_chunk(total_duration_seconds, chunk_jobs):
+            logger.info(f"Starting chunked encode ({chunk_jobs} at a time) for {anonymized_input_name}")
+            try:
+                result_stats = encode_chunked(
+                    input_path=str(input_path),
+                    output_path=encode_path,
+                    crf=cached_crf,
+                    jobs=chunk_jobs,
+                    video_info=video_info,
+                    preset=DEFAULT_ENCODING_PRESET,
+                    convert_audio=convert_audio,
+                    audio_codec=audio_codec,
+                    file_info_callback=file_info_callback,
+                    pid_callback=pid_callback,
+                    hw_decoder=hw_decoder,
+                    cancel_event=cancel_event,
+                )
+            except ChunkedEncodeError as e:
+                # The output path is untouched; fall back to the whole-file encode below
+                logger.warning(f"Chunked encode failed for {anonymized_input_name} ({e.message}); encoding it whole")
+
+        if result_stats is None and use_cached_crf and cached_crf is not None:
             # Use cached CRF - skip CRF search phase
             logger.info(f"Starting ab-av1 encode (cached CRF) for {anonymized_input_name} -> {anonymized_output_name}")
             result_stats = ab_av1.encode_with_crf(
                 input_path=str(input_path),
-                output_path=str(output_path_obj),
+                output_path=encode_path,
                 crf=cached_crf,
                 preset=DEFAULT_ENCODING_PRESET,
                 file_info_callback=file_info_callback,
@@ -265,19 +330,30 @@ def process_video(
                 total_duration_seconds=total_duration_seconds,
                 hw_decoder=hw_decoder,
                 cancel_event=cancel_event,
+                probe=probe,
             )
-        else:
-            # No cache - run full auto-encode with CRF search
+        elif result_stats is None:
+            # No cache - run full auto-encode with CRF search, bounded by similar files' CRFs
             logger.info(f"Starting ab-av1 auto-encode for {anonymized_input_name} -> {anonymized_output_name}")
+            meta = extract_video_metadata(video_info)
+            prior = get_crf_prior(meta.video_codec, meta.width, meta.height, meta.bitrate_kbps)
             result_stats = ab_av1.auto_encode(
                 input_path=str(input_path),
-                output_path=str(output_path_obj),
+                output_path=encode_path,
                 file_info_callback=file_info_callback,
                 pid_callback=pid_callback,
                 total_duration_seconds=total_duration_seconds,
                 hw_decoder=hw_decoder,
                 cancel_event=cancel_event,
+                crf_bounds=prior.bounds if prior is not None else None,
+                sample_cache_dir=get_sample_cache_dir(str(input_path), DEFAULT_ENCODING_PRESET),
+                probe=probe,
             )
+            if prior is not None:
+                saved = prior.probes_saved(result_stats.sample_encodes)
+                logger.info(
+                    f"CRF prior saved {saved} of {prior.baseline_probes} CRF probe(s) for {anonymized_input_name}"
+                )
 
         conversion_elapsed_time = time.time() - conversion_start_time
         cache_note = " (cached CRF)" if use_cached_crf else ""
@@ -285,6 +361,35 @@ def process_video(
             f"ab-av1 finished{cache_note} for {anonymized_input_name} in {format_time(conversion_elapsed_time)}."
         )
 
+        verified_vmaf = None
+        if verify_quality and os.path.abspath(encode_path) != str(input_path):
+            # Scored in the encode slot, while the source is still there
+            meta = extract_video_metadata(video_info)
+            verified_vmaf = score_output(
+                str(input_path),
+                encode_path,
+                meta.duration_sec or total_duration_seconds,
+                width=meta.width,
+                cancel_event=cancel_event,
+                pid_callback=pid_callback,
+            )
+            if verified_vmaf is not None:
+                logger.info(f"Quality check of {anonymized_output_name}: VMAF {verified_vmaf:.2f}")
+        elif verify_quality:
+            logger.info(f"Skipping quality check of {anonymized_output_name}: the output replaced its source")
+
+        if on_encoded:
+            on_encoded()
+        if staged_dir:
+            # The mover copies and verifies beside the destination (not counted as encode time); the rename is ours
+            try:
+                partial_path = staging.move(encode_path, str(output_path_obj), cancel_event)
+            except OutputFileError as e:
+                if file_info_callback:
+                    file_info_callback(input_path.name, "failed", {"message": e.message, "type": e.error_type})
+                raise
+            os.replace(partial_path, output_path_obj)
+
         # --- Post-Conversion Verification & Stat Gathering ---
         if not output_path_obj.exists():
             raise OutputFileError(f"Output missing: {anonymized_output_name}", error_type="missing_output")
@@ -301,8 +406,13 @@ def process_video(
 
         final_vmaf = result_stats.vmaf
         final_crf = result_stats.crf
-        if use_cached_crf and record and record.vmaf_target_when_analyzed is not None:
-            final_vmaf_target = record.vmaf_target_when_analyzed
+        if search_result is not None:
+            final_vmaf_target = search_result.vmaf_target_used
+        elif use_cached_crf and record and record.vmaf_target_when_analyzed is not None:
+            # The record's best CRF met its analyzed target; a CRF interpolated from its curve aims at ours
+            final_vmaf_target = (
+                record.vmaf_target_when_analyzed if cached_crf == record.best_crf else DEFAULT_VMAF_TARGET
+            )
         else:
             final_vmaf_target = result_stats.vmaf_target_used
         logger.info(
@@ -334,6 +444,10 @@ def process_video(
         # Extract timing breakdown from result_stats
         crf_search_time = result_stats.crf_search_time_sec
         encoding_time = result_stats.encoding_time_sec
+        if search_result is not None:
+            # Attribute the search stage's time to this file, as auto_encode would have
+            crf_search_time = search_result.crf_search_time_sec
+            conversion_elapsed_time += crf_search_time
 
         # Return success tuple including stats for history
         return (
@@ -346,6 +460,7 @@ def process_video(
             final_vmaf_target,
             crf_search_time,
             encoding_time,
+            verified_vmaf,
         )
 
     except AbAv1CancelledError:
@@ -378,3 +493,6 @@ def process_video(
                 },
             )
         return None
+    finally:
+        if staged_dir:
+            staging.release(staged_dir)
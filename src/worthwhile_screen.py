@@ -0,0 +1,168 @@
+# src/worthwhile_screen.py
+"""
+NOT_WORTHWHILE pre-screen for Layer-1 analysis.
+
+Some sources (heavily compressed HEVC, low-bitrate web rips) almost always end
+NOT_WORTHWHILE, but only after a CRF search that ran through the whole VMAF
+fallback. The history already holds the verdict of every searched file, so
+files are grouped by codec, bits per pixel per frame and duration band, and a
+group's share of NOT_WORTHWHILE verdicts (against CONVERTED ones) becomes the
+likelihood that a new file of that group ends the same way.
+
+Scans store the likelihood on SCANNED records (not_worthwhile_likelihood). A
+file at or above NOT_WORTHWHILE_SCREEN_THRESHOLD is flagged: the worker runs a
+reduced-sample crf-search first and records NOT_WORTHWHILE if even that fails,
+or the queue leaves it out (NOT_WORTHWHILE_SCREEN_SKIP).
+
+The screen is checked on history it was not trained on: a stable
+NOT_WORTHWHILE_SCREEN_HOLDOUT_PERCENT of records (by path hash) is held out and
+the precision and recall of the flags on them are logged with every build.
+"""
+
+import logging
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+
+from src.config import (
+    NOT_WORTHWHILE_SCREEN_ASSUMED_FPS,
+    NOT_WORTHWHILE_SCREEN_BPP_BANDS,
+    NOT_WORTHWHILE_SCREEN_DURATION_BANDS,
+    NOT_WORTHWHILE_SCREEN_HOLDOUT_PERCENT,
+    NOT_WORTHWHILE_SCREEN_MIN_SAMPLES,
+    NOT_WORTHWHILE_SCREEN_THRESHOLD,
+)
+from src.history_index import HistoryIndex
+from src.models import FileRecord, FileStatus
+
+logger = logging.getLogger(__name__)
+
+
+def _band(value: float, edges: tuple[float, ...]) -> str:
+    """Label of the band value falls in: "<a", "a-b" or ">=z"."""
+    lower = None
+    for edge in edges:
+        if value < edge:
+            return f"<{edge:g}" if lower is None else f"{lower:g}-{edge:g}"
+        lower = edge
+    return f">={lower:g}"
+
+
+def get_bpp_band(bitrate_kbps: float | None, width: int | None, height: int | None, fps: float | None) -> str:
+    """Categorize bits per pixel per frame into NOT_WORTHWHILE_SCREEN_BPP_BANDS.
+
+    Records scanned before fps was stored use NOT_WORTHWHILE_SCREEN_ASSUMED_FPS.
+
+    Returns:
+        Band label such as "<0.02", "0.05-0.1" or ">=0.2", or "unknown".
+    """
+    if not bitrate_kbps or not width or not height:
+        return "unknown"
+    bpp = bitrate_kbps * 1000 / (width * height * (fps or NOT_WORTHWHILE_SCREEN_ASSUMED_FPS))
+    return _band(bpp, NOT_WORTHWHILE_SCREEN_BPP_BANDS)
+
+
+def _group_key(record: FileRecord) -> str | None:
+    """Screen group of a record ("codec:bpp:duration"), or None if it cannot be grouped."""
+    band = get_bpp_band(record.bitrate_kbps, record.width, record.height, record.fps)
+    if not record.video_codec or band == "unknown" or not record.duration_sec:
+        return None
+    return f"{record.video_codec.lower()}:{band}:{_band(record.duration_sec, NOT_WORTHWHILE_SCREEN_DURATION_BANDS)}s"
+
+
+def _label(record: FileRecord) -> bool | None:
+    """True for NOT_WORTHWHILE, False for CONVERTED, None for records that are no verdict."""
+    if record.status == FileStatus.NOT_WORTHWHILE:
+        # A pre-screen check's verdict would only confirm the flag that caused it
+        return None if record.provisional_verdict else True
+    # A rescanned replace-mode output carries the AV1 output's metadata, not the source's
+    if record.status == FileStatus.CONVERTED and (record.video_codec or "").lower() != "av1":
+        return False
+    return None
+
+
+def _held_out(record: FileRecord) -> bool:
+    """Whether a record belongs to the evaluation set (stable across runs)."""
+    return zlib.crc32(record.path_hash.encode()) % 100 < NOT_WORTHWHILE_SCREEN_HOLDOUT_PERCENT
+
+
+@dataclass(frozen=True)
+class ScreenReport:
+    """Precision and recall of the screen's flags on held-out history."""
+
+    held_out: int  # Labeled records held out of training
+    losers: int  # Held-out records that ended NOT_WORTHWHILE
+    flagged: int  # Held-out records the screen flagged
+    correct: int  # Flagged records that did end NOT_WORTHWHILE
+
+    @property
+    def precision(self) -> float | None:
+        return self.correct / self.flagged if self.flagged else None
+
+    @property
+    def recall(self) -> float | None:
+        return self.correct / self.losers if self.losers else None
+
+    def summary(self) -> str:
+        def percent(value: float | None) -> str:
+            return f"{value:.0%}" if value is not None else "n/a"
+
+        return (
+            f"{self.flagged} of {self.held_out} held-out files flagged, precision {percent(self.precision)}, "
+            f"recall {percent(self.recall)} ({self.losers} NOT_WORTHWHILE)"
+        )
+
+
+class NotWorthwhileScreen:
+    """NOT_WORTHWHILE share per group of similar files, trained on history records."""
+
+    def __init__(self, records: list[FileRecord]):
+        self._losers: Counter[str] = Counter()
+        self._verdicts: Counter[str] = Counter()
+        for record in records:
+            label = _label(record)
+            key = _group_key(record) if label is not None else None
+            if key is not None:
+                self._verdicts[key] += 1
+                self._losers[key] += label
+
+    def likelihood(self, record: FileRecord) -> float | None:
+        """Likelihood that a file ends NOT_WORTHWHILE.
+
+        Returns:
+            The group's NOT_WORTHWHILE share with add-one smoothing (so small
+            groups stay below the threshold), or None when the file cannot be
+            grouped or its group has fewer than NOT_WORTHWHILE_SCREEN_MIN_SAMPLES verdicts.
+        """
+        key = _group_key(record)
+        if key is None or self._verdicts[key] < NOT_WORTHWHILE_SCREEN_MIN_SAMPLES:
+            return None
+        return (self._losers[key] + 1) / (self._verdicts[key] + 2)
+
+    def flags(self, record: FileRecord) -> bool:
+        """Whether the file is a high-confidence NOT_WORTHWHILE."""
+        return is_flagged(self.likelihood(record))
+
+
+def is_flagged(likelihood: float | None) -> bool:
+    """Whether a stored not_worthwhile_likelihood flags its file."""
+    return likelihood is not None and likelihood >= NOT_WORTHWHILE_SCREEN_THRESHOLD
+
+
+def evaluate_screen(records: list[FileRecord]) -> ScreenReport:
+    """Train on all but the held-out records and count the flags on those held out."""
+    screen = NotWorthwhileScreen([r for r in records if not _held_out(r)])
+    held_out = [(r, label) for r in records if _held_out(r) and (label := _label(r)) is not None]
+    flagged = [label for r, label in held_out if screen.flags(r)]
+    return ScreenReport(
+        held_out=len(held_out), losers=sum(label for _, label in held_out), flagged=len(flagged), correct=sum(flagged)
+    )
+
+
+def build_not_worthwhile_screen(index: HistoryIndex) -> NotWorthwhileScreen:
+    """Train the screen on the whole history (one pass) and log its held-out precision/recall."""
+    records = index.get_all_records()
+    report = evaluate_screen(records)
+    if report.held_out:
+        logger.info(f"NOT_WORTHWHILE pre-screen: {report.summary()}")
+    return NotWorthwhileScreen(records)
@@ -0,0 +1,215 @@
+# tests/test_analysis_tree.py
+"""Tests for src/gui/analysis_tree.py: running folder aggregates and the
+path <-> item registry.
+
+Uses a minimal in-memory stand-in for ttk.Treeview (parent/exists/item only)
+so the bookkeeping can be checked without a display.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from src.gui.analysis_tree import (
+    EMPTY_AGGREGATE,
+    TreeItemRegistry,
+    apply_file_aggregate,
+    batch_update_tree_rows,
+    compute_file_aggregate,
+    render_folder_aggregates,
+)
+from src.models import FileRecord, FileStatus
+
+
+class FakeTree:
+    """Just enough of ttk.Treeview for row and aggregate updates; counts every call."""
+
+    def __init__(self):
+        self.parents: dict[str, str] = {}
+        self.values: dict[str, tuple] = {}
+        self.tags: dict[str, tuple] = {}
+        self.calls = 0
+
+    def add(self, item_id: str, parent: str = "") -> str:
+        self.parents[item_id] = parent
+        return item_id
+
+    def parent(self, item_id: str) -> str:
+        self.calls += 1
+        return self.parents.get(item_id, "")
+
+    def exists(self, item_id: str) -> bool:
+        self.calls += 1
+        return item_id in self.parents
+
+    def item(self, item_id: str, option=None, values=None, tags=None):
+        self.calls += 1
+        if option == "tags":
+            return self.tags.get(item_id, ())
+        if values is not None:
+            self.values[item_id] = values
+        if tags is not None:
+            self.tags[item_id] = tags
+        return None
+
+
+@pytest.fixture
+def gui():
+    """Tree layout: A/ (f1, B/ (f2))."""
+    tree = FakeTree()
+    tree.add("A")
+    tree.add("B", "A")
+    tree.add("f1", "A")
+    tree.add("f2", "B")
+    return SimpleNamespace(analysis_tree=tree, folder_aggregates={}, file_aggregates={}, analysis_sort_keys={})
+
+
+def make_record(status: FileStatus, **overrides) -> FileRecord:
+    fields = {"path_hash": "h", "original_path": None, "status": status, "file_size_bytes": 1000, "file_mtime": 0.0}
+    fields.update(overrides)
+    return FileRecord(**fields)
+
+
+def test_compute_file_aggregate_counts_size_only_for_finished_files():
+    assert compute_file_aggregate(None, {}) == EMPTY_AGGREGATE
+    assert compute_file_aggregate(None, {}, 1000) == (1000, 0, 0.0, 0)  # Uncached: size only, as when scanned
+    assert compute_file_aggregate(make_record(FileStatus.CONVERTED), {}) == (1000, 0, 0.0, 0)
+
+
+def test_compute_file_aggregate_flags_layer1_estimates():
+    record = make_record(FileStatus.SCANNED, estimated_reduction_percent=40.0, duration_sec=60.0)
+    size, savings, _, estimates = compute_file_aggregate(record, {})
+    assert (size, savings, estimates) == (1000, 400, 1)
+
+    record = make_record(FileStatus.ANALYZED, predicted_size_reduction=25.0, duration_sec=60.0)
+    size, savings, _, estimates = compute_file_aggregate(record, {})
+    assert (size, savings, estimates) == (1000, 250, 0)
+
+
+def test_deltas_propagate_to_every_ancestor(gui):
+    apply_file_aggregate(gui, "f1", (100, 10, 5.0, 1))
+    apply_file_aggregate(gui, "f2", (200, 20, 7.0, 0))
+
+    assert gui.folder_aggregates["B"] == (200, 20, 7.0, 0)
+    assert gui.folder_aggregates["A"] == (300, 30, 12.0, 1)
+
+
+def test_changing_a_file_applies_only_the_difference(gui):
+    apply_file_aggregate(gui, "f1", (100, 10, 5.0, 1))
+    apply_file_aggregate(gui, "f2", (200, 20, 7.0, 0))
+    apply_file_aggregate(gui, "f2", (200, 50, 7.0, 1))
+
+    assert gui.folder_aggregates["A"] == (300, 60, 12.0, 2)
+
+
+def test_withdrawing_a_file_restores_folder_sums(gui):
+    apply_file_aggregate(gui, "f1", (100, 10, 5.0, 1))
+    apply_file_aggregate(gui, "f2", (200, 20, 7.0, 0))
+    apply_file_aggregate(gui, "f1", EMPTY_AGGREGATE)
+
+    assert gui.folder_aggregates["A"] == (200, 20, 7.0, 0)
+    assert "f1" not in gui.file_aggregates
+
+
+def test_batch_mode_defers_rendering_to_dirty_folders(gui):
+    dirty: set[str] = set()
+    apply_file_aggregate(gui, "f2", (200, 20, 7.0, 0), dirty)
+
+    assert dirty == {"A", "B"}
+    assert gui.analysis_tree.values == {}
+
+    render_folder_aggregates(gui, dirty)
+    assert set(gui.analysis_tree.values) == {"A", "B"}
+
+
+# ---------------------------------------------------------------------------
+# TreeItemRegistry
+# ---------------------------------------------------------------------------
+
+
+def test_registry_maps_both_directions():
+    registry = TreeItemRegistry()
+    registry["/v/a.mkv"] = "I1"
+
+    assert registry.get("/v/a.mkv") == "I1"
+    assert registry.file_path_for_item("I1") == "/v/a.mkv"
+    assert list(registry) == ["/v/a.mkv"]
+
+
+def test_registry_reregistering_a_path_drops_the_old_item():
+    registry = TreeItemRegistry()
+    registry["/v/a.mkv"] = "I1"
+    registry["/v/a.mkv"] = "I2"
+
+    assert registry.file_path_for_item("I1") is None
+    assert registry.file_path_for_item("I2") == "/v/a.mkv"
+
+
+def test_registry_pop_and_discard_keep_directions_in_sync():
+    registry = TreeItemRegistry()
+    registry["/v/a.mkv"] = "I1"
+    registry["/v/b.mkv"] = "I2"
+    registry.register_folder("F1", "/v/Show")
+
+    assert registry.pop("/v/a.mkv") == "I1"
+    registry.discard_item("I2")
+    registry.discard_item("F1")
+
+    assert len(registry) == 0
+    assert registry.file_path_for_item("I1") is None
+    assert registry.folder_path_for_item("F1") is None
+
+
+def test_registry_folders_are_not_file_entries():
+    registry = TreeItemRegistry()
+    registry.register_folder("F1", "/v/Show")
+
+    assert not registry
+    assert registry.folder_path_for_item("F1") == "/v/Show"
+    assert registry.file_path_for_item("F1") is None
+
+    registry.clear()
+    assert registry.folder_path_for_item("F1") is None
+
+
+# ---------------------------------------------------------------------------
+# batch_update_tree_rows cost
+# ---------------------------------------------------------------------------
+
+
+def build_library_gui(total_files: int, monkeypatch) -> SimpleNamespace:
+    """A three-level tree (10 shows x 10 seasons x N episodes) with one SCANNED record per file."""
+    tree = FakeTree()
+    registry = TreeItemRegistry()
+    records: dict[str, FileRecord] = {}
+    for i in range(total_files):
+        show, season = f"show{i % 10}", f"season{i % 100}"
+        tree.add(show)
+        tree.add(season, show)
+        path = f"/lib/{show}/{season}/ep{i}.mkv"
+        registry[path] = tree.add(f"ep{i}", season)
+        records[path] = make_record(FileStatus.SCANNED, estimated_reduction_percent=40.0, duration_sec=600.0)
+
+    index = SimpleNamespace(lookup_file=records.get)
+    monkeypatch.setattr("src.gui.analysis_tree.get_history_index", lambda: index)
+    monkeypatch.setattr("src.gui.analysis_tree.compute_grouped_percentiles", dict)
+    return SimpleNamespace(
+        analysis_tree=tree,
+        folder_aggregates={},
+        file_aggregates={},
+        analysis_sort_keys={},
+        get_tree_item_map=lambda: registry,
+    )
+
+
+def tree_calls_for_batch(total_files: int, monkeypatch) -> int:
+    gui = build_library_gui(total_files, monkeypatch)
+    batch = [f"/lib/show{i % 10}/season{i % 100}/ep{i}.mkv" for i in range(50)]
+    gui.analysis_tree.calls = 0
+    batch_update_tree_rows(gui, batch)
+    return gui.analysis_tree.calls
+
+
+def test_batch_update_cost_is_independent_of_tree_size(monkeypatch):
+    """Benchmark in call counts: updating 50 rows touches the tree the same
+    number of times whether the library holds 200 or 20,000 files."""
+    assert tree_calls_for_batch(200, monkeypatch) == tree_calls_for_batch(20_000, monkeypatch)
@@ -0,0 +1,40 @@
+# tests/test_batch_search.py
+"""Tests for src/conversion_engine/batch_search.py: which files take the batch
+lane, and its clips/hour against the same searches run one at a time."""
+
+from src.config import BATCH_SEARCH_MAX_DURATION_SEC, MAX_CONCURRENT_JOBS
+from src.conversion_engine.batch_search import (
+    BATCH_SLOTS_PER_SEARCH_SLOT,
+    BatchSearchMeter,
+    is_batch_clip,
+    split_search_slots,
+)
+
+
+def test_only_short_files_of_known_duration_take_the_lane():
+    assert is_batch_clip(120.0)
+    assert is_batch_clip(BATCH_SEARCH_MAX_DURATION_SEC)
+    assert not is_batch_clip(BATCH_SEARCH_MAX_DURATION_SEC + 1)
+    assert not is_batch_clip(0.0)
+    assert not is_batch_clip(None)
+
+
+def test_throughput_is_reported_against_back_to_back_searches():
+    meter = BatchSearchMeter()
+    assert meter.report() is None
+
+    # Four 60s searches, two at a time: 120s of wall time, 240s back to back
+    for start in (0.0, 0.0, 60.0, 60.0):
+        meter.record(start, start + 60.0)
+    report = meter.report()
+
+    assert (report.clips, report.wall_sec, report.search_sec) == (4, 120.0, 240.0)
+    assert (report.clips_per_hour, report.serial_clips_per_hour) == (120.0, 60.0)
+    assert report.summary() == "4 short clip(s) searched at 120 clips/hour (one at a time: 60 clips/hour)"
+
+
+def test_lane_slots_come_out_of_the_search_budget():
+    assert split_search_slots(1, 0) == (1, 0)  # A single search slot is shared: no lane
+    assert split_search_slots(2, 0) == (1, BATCH_SLOTS_PER_SEARCH_SLOT)  # Auto: one search slot's worth
+    assert split_search_slots(3, BATCH_SLOTS_PER_SEARCH_SLOT + 1) == (1, BATCH_SLOTS_PER_SEARCH_SLOT + 1)
+    assert split_search_slots(3, 100) == (1, min(2 * BATCH_SLOTS_PER_SEARCH_SLOT, MAX_CONCURRENT_JOBS))
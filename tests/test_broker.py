@@ -0,0 +1,233 @@
+# tests/test_broker.py
+"""Tests for src/conversion_engine/broker.py: path mapping, lease bookkeeping
+(with a fake clock), and a coordinator/node run over loopback HTTP with the
+worker's per-file processing and both history indexes faked out."""
+
+import dataclasses
+import io
+import threading
+from types import SimpleNamespace
+
+import pytest
+from src.conversion_engine import worker
+from src.conversion_engine.broker import (
+    OUTCOME_FAILED,
+    OUTCOME_STOPPED,
+    OUTCOME_SUCCEEDED,
+    BrokerClient,
+    BrokerError,
+    BrokerJob,
+    BrokerServer,
+    JobBroker,
+    PathMapper,
+    jobs_from_queue,
+)
+from src.headless import NodeSink
+from src.history_index import compute_path_hash, record_to_dict
+from src.models import (
+    BrokerJobState,
+    FileRecord,
+    FileStatus,
+    OperationType,
+    OutputMode,
+    QueueConversionConfig,
+    QueueFileItem,
+    QueueItem,
+    QueueItemStatus,
+)
+
+
+def make_job(job_id: str, path: str = "/v/a.mkv") -> BrokerJob:
+    return BrokerJob(
+        job_id=job_id,
+        path=path,
+        source_folder="/v",
+        operation_type=OperationType.CONVERT,
+        output_mode=OutputMode.SUFFIX,
+        output_suffix="_av1",
+        output_folder=None,
+    )
+
+
+def make_record(path: str, **fields) -> FileRecord:
+    return FileRecord(
+        path_hash=compute_path_hash(path),
+        original_path=path,
+        status=FileStatus.CONVERTED,
+        file_size_bytes=1000,
+        file_mtime=0.0,
+        **fields,
+    )
+
+
+class FakeIndex:
+    """In-memory stand-in for HistoryIndex, keyed by path hash."""
+
+    def __init__(self):
+        self.records: dict[str, FileRecord] = {}
+
+    def get(self, path_hash):
+        return self.records.get(path_hash)
+
+    def lookup_file(self, file_path):
+        return self.records.get(compute_path_hash(file_path))
+
+    def upsert(self, record):
+        self.records[record.path_hash] = record
+
+    def save(self):
+        pass
+
+    def save_if_stale(self, interval):
+        pass
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_path_mapper_translates_both_ways():
+    mapper = PathMapper.parse(["//NAS/Media=/mnt/media", "z:\\tv=/srv/tv"])
+
+    assert mapper.to_local("//nas/media/films/a.mkv") == "/mnt/media/films/a.mkv"
+    assert mapper.to_local("Z:/TV/show/e1.mkv") == "/srv/tv/show/e1.mkv"
+    assert mapper.to_local("//nas/mediaextra/a.mkv") == "//nas/mediaextra/a.mkv"  # Component boundary
+    assert mapper.to_coordinator("/mnt/media/films/a.mkv") == "//NAS/Media/films/a.mkv"
+    assert mapper.to_coordinator("/elsewhere/a.mkv") == "/elsewhere/a.mkv"
+    with pytest.raises(ValueError, match="COORDINATOR_PREFIX=LOCAL_PREFIX"):
+        PathMapper.parse(["/mnt/media"])
+
+
+def test_jobs_from_queue_expands_pending_items_per_file():
+    items = [
+        QueueItem(
+            id="folder",
+            source_path="/v",
+            is_folder=True,
+            files=[QueueFileItem(path="/v/a.mkv"), QueueFileItem(path="/v/sub/b.mkv")],
+        ),
+        QueueItem(id="single", source_path="/w/c.mkv", is_folder=False, operation_type=OperationType.ANALYZE),
+        QueueItem(id="done", source_path="/w/d.mkv", is_folder=False, status=QueueItemStatus.COMPLETED),
+    ]
+
+    jobs = jobs_from_queue(items)
+
+    assert [(j.path, j.source_folder, j.operation_type) for j in jobs] == [
+        ("/v/a.mkv", "/v", OperationType.CONVERT),
+        ("/v/sub/b.mkv", "/v", OperationType.CONVERT),
+        ("/w/c.mkv", "/w", OperationType.ANALYZE),
+    ]
+
+
+def test_expired_lease_requeues_then_fails_the_job():
+    clock = FakeClock()
+    broker = JobBroker([make_job("a")], lease_sec=60, max_attempts=2, clock=clock)
+
+    first = broker.claim("node-1")["job"]
+    assert broker.claim("node-2") == {"state": "wait"}
+    clock.now += 30
+    assert broker.heartbeat("a", first["token"], {"phase": "encoding"})
+    clock.now += 61  # node-1 went silent
+
+    second = broker.claim("node-2")["job"]
+    assert second["token"] != first["token"]
+    assert not broker.heartbeat("a", first["token"])  # node-1 learns it lost the job
+    assert not broker.complete("a", first["token"], OUTCOME_FAILED)  # ...and cannot fail it
+
+    clock.now += 61
+    assert broker.expire() == 1
+    assert broker.finished
+    assert broker.summary()["counts"][BrokerJobState.FAILED.value] == 1
+    assert broker.claim("node-3") == {"state": "done"}
+
+
+def test_stop_requeues_and_late_success_is_kept():
+    clock = FakeClock()
+    broker = JobBroker([make_job("a")], lease_sec=60, clock=clock)
+
+    token = broker.claim("node-1")["job"]["token"]
+    assert broker.complete("a", token, OUTCOME_STOPPED)
+    late_token = broker.claim("node-1")["job"]["token"]
+    clock.now += 61
+    broker.claim("node-2")  # Takes over the expired lease
+
+    assert broker.complete("a", late_token, OUTCOME_SUCCEEDED)  # The encode is done; keep it
+    assert broker.finished
+    assert not broker.complete("a", late_token, OUTCOME_SUCCEEDED)
+
+
+def test_merge_keeps_coordinator_path_and_newest_record(monkeypatch):
+    index = FakeIndex()
+    monkeypatch.setattr("src.conversion_engine.broker.get_history_index", lambda: index)
+    coordinator_path = "/v/a.mkv"
+    index.upsert(make_record(coordinator_path, first_seen="2024-01-01 00:00:00", last_updated="2024-01-01 00:00:00"))
+    broker = JobBroker([make_job("a", coordinator_path), make_job("b", "/v/b.mkv")])
+    node_record = make_record("/mnt/v/a.mkv", first_seen="2024-02-01 00:00:00", last_updated="2024-02-01 00:00:00")
+
+    token = broker.claim("node")["job"]["token"]
+    broker.complete("a", token, OUTCOME_SUCCEEDED, record_to_dict(node_record))
+
+    merged = index.get(compute_path_hash(coordinator_path))
+    assert merged.original_path == coordinator_path
+    assert merged.first_seen == "2024-01-01 00:00:00"
+    assert merged.last_updated == "2024-02-01 00:00:00"
+    assert compute_path_hash("/mnt/v/a.mkv") not in index.records
+
+    token = broker.claim("node")["job"]["token"]
+    broker.complete("b", token, OUTCOME_SUCCEEDED, {"status": "bogus"})  # Malformed records are ignored
+    assert compute_path_hash("/v/b.mkv") not in index.records
+    assert broker.finished
+
+
+def test_server_rejects_a_wrong_secret():
+    shared = "s3cret"
+    server = BrokerServer(JobBroker([make_job("a")]), "127.0.0.1", 0, secret=shared).start()
+    try:
+        assert BrokerClient(server.url, secret=shared).status()["counts"]["pending"] == 1
+        with pytest.raises(BrokerError, match="403"):
+            BrokerClient(server.url, secret=shared[::-1]).claim("node")
+    finally:
+        server.stop()
+
+
+def test_node_encodes_coordinator_jobs_over_loopback(monkeypatch):
+    coordinator_index, node_index = FakeIndex(), FakeIndex()
+    monkeypatch.setattr("src.conversion_engine.broker.get_history_index", lambda: coordinator_index)
+    monkeypatch.setattr("src.headless.get_history_index", lambda: node_index)
+    monkeypatch.setattr("src.conversion_engine.worker.get_history_index", lambda: node_index)
+    monkeypatch.setattr("src.headless.BROKER_POLL_SEC", 0.05)
+
+    def fake_process_file(ctx, job):
+        output = job.file_path.replace(".mkv", "_av1.mkv")
+        node_index.upsert(dataclasses.replace(make_record(job.file_path), output_path=output, last_updated="now"))
+        return SimpleNamespace(
+            status=QueueItemStatus.COMPLETED, counter="files_succeeded", error_msg=None, skip_reason=None
+        )
+
+    monkeypatch.setattr(worker, "_process_file", fake_process_file)
+    broker = JobBroker([make_job("a", "/coord/v/a.mkv"), make_job("b", "/coord/v/b.mkv")])
+    server = BrokerServer(broker, "127.0.0.1", 0).start()
+    try:
+        stop_event = threading.Event()
+        sink = NodeSink(
+            BrokerClient(server.url), PathMapper.parse(["/coord=/node"]), "node-1", stop_event, stream=io.StringIO()
+        )
+        assert sink.prefetch().files[0].path == "/node/v/a.mkv"
+        config = QueueConversionConfig(
+            queue_items=sink.queue_items, extensions=["mkv"], convert_audio=False, audio_codec="opus"
+        )
+
+        worker.queue_conversion_worker(config, stop_event, threading.Event(), sink)
+    finally:
+        server.stop()
+
+    assert broker.finished
+    assert broker.summary()["counts"][BrokerJobState.DONE.value] == 2
+    merged = coordinator_index.get(compute_path_hash("/coord/v/b.mkv"))
+    assert merged.original_path == "/coord/v/b.mkv"
+    assert merged.output_path == "/coord/v/b_av1.mkv"
+    assert sink.final_message == "Queue complete"
@@ -3,9 +3,9 @@
 
 import os
 
-from src.cache_helpers import converted_verdict_applies, is_file_unchanged
+from src.cache_helpers import converted_verdict_applies, crf_for_vmaf_target, is_file_unchanged, reusable_crf
 from src.history_index import compute_path_hash
-from src.models import FileRecord, FileStatus
+from src.models import CrfVmafPoint, FileRecord, FileStatus
 
 
 def make_record(file_path: str, *, status: FileStatus = FileStatus.CONVERTED, **overrides) -> FileRecord:
@@ -138,3 +138,60 @@ def test_missing_mkv_keeps_verdict_conservatively(tmp_path):
     record.path_hash = compute_path_hash(missing)
 
     assert converted_verdict_applies(record, missing) is True
+
+
+# ---------------------------------------------------------------------------
+# crf_for_vmaf_target / reusable_crf
+# ---------------------------------------------------------------------------
+
+CURVE = [CrfVmafPoint(crf=36, vmaf=91.0), CrfVmafPoint(crf=28, vmaf=96.2), CrfVmafPoint(crf=32, vmaf=94.6)]
+
+
+def test_curve_interpolates_between_bracketing_points():
+    assert crf_for_vmaf_target(CURVE, 94.6) == 32
+    assert crf_for_vmaf_target(CURVE, 93.0) == 33.75  # 33.78 rounded down to the 0.25 step
+    assert crf_for_vmaf_target(CURVE, 97.0) is None  # Above the sampled range
+    assert crf_for_vmaf_target(CURVE, 90.0) is None  # Below it
+    assert crf_for_vmaf_target([], 95.0) is None
+
+
+def test_reusable_crf_prefers_the_searched_target_then_the_curve(tmp_path):
+    file_path = write_file(tmp_path / "movie.mp4")
+    record = make_record(
+        file_path,
+        status=FileStatus.ANALYZED,
+        best_crf=30.5,
+        vmaf_target_when_analyzed=95,
+        preset_when_analyzed=6,
+        crf_curve=CURVE,
+    )
+
+    assert reusable_crf(record, 95, 6) == 30.5
+    assert reusable_crf(record, 93, 6) == 33.75
+    assert reusable_crf(record, 93, 4) is None  # Preset mismatch
+    assert reusable_crf(record, 97, 6) is None  # Higher target outside the curve: search again
+    record.crf_curve = []
+    assert reusable_crf(record, 93, 6) == 30.5  # No curve: the higher-quality cached CRF still works
+
+
+def test_curve_points_over_the_size_cap_answer_nothing(tmp_path):
+    # Fell back from VMAF 95 to 93: the 95 probes predicted outputs over AB_AV1_MAX_ENCODED_PERCENT
+    fallback_curve = [
+        CrfVmafPoint(crf=28, vmaf=96.0, size_percent=95.0),
+        CrfVmafPoint(crf=32, vmaf=94.2, size_percent=88.0),
+        CrfVmafPoint(crf=34, vmaf=93.4, size_percent=76.0),
+        CrfVmafPoint(crf=36, vmaf=92.1, size_percent=68.0),
+    ]
+    record = make_record(
+        write_file(tmp_path / "movie.mp4"),
+        status=FileStatus.ANALYZED,
+        best_crf=34.25,
+        vmaf_target_when_analyzed=93,
+        preset_when_analyzed=6,
+        crf_curve=fallback_curve,
+    )
+
+    assert crf_for_vmaf_target(fallback_curve, 95.0) is None  # Both bracketing points were too large
+    assert crf_for_vmaf_target(fallback_curve, 94.0) is None  # The lower CRF was too large
+    assert crf_for_vmaf_target(fallback_curve, 93.0) == 34.5  # Within the cap on both sides
+    assert reusable_crf(record, 95, 6) is None  # Search again rather than encode at a rejected CRF
@@ -0,0 +1,155 @@
+# tests/test_chunked_encode.py
+"""Tests for src/chunked_encode.py: when to chunk, the join command, output
+verification, and the split/encode/join orchestration with ffmpeg, ffprobe
+and ab-av1 faked out."""
+
+import os
+from types import SimpleNamespace
+
+import pytest
+from src.chunked_encode import (
+    ChunkedEncodeError,
+    build_join_command,
+    encode_chunked,
+    should_chunk,
+    verify_joined_output,
+)
+from src.config import CHUNKED_ENCODE_MIN_DURATION_SEC
+from src.models import ProgressEvent
+
+SOURCE_INFO = {
+    "format": {"duration": "600.0"},
+    "file_size": 10_000,
+    "streams": [
+        {"codec_type": "video", "codec_name": "h264"},
+        {"codec_type": "audio", "codec_name": "aac"},
+        {"codec_type": "audio", "codec_name": "ac3"},
+        {"codec_type": "subtitle", "codec_name": "mov_text"},
+    ],
+}
+
+
+def test_should_chunk_needs_long_input_and_several_jobs():
+    assert should_chunk(CHUNKED_ENCODE_MIN_DURATION_SEC, 4)
+    assert not should_chunk(CHUNKED_ENCODE_MIN_DURATION_SEC - 1, 4)
+    assert not should_chunk(CHUNKED_ENCODE_MIN_DURATION_SEC * 3, 1)
+    assert not should_chunk(None, 4)
+
+
+def test_join_command_converts_only_non_aac_opus_audio():
+    cmd = build_join_command(
+        "ffmpeg", "list.txt", "in.mp4", "out.mkv", video_info=SOURCE_INFO, convert_audio=True, audio_codec="opus"
+    )
+
+    assert cmd[-1] == "out.mkv"
+    assert cmd[cmd.index("-c") + 1] == "copy"
+    assert "-c:a:1" in cmd
+    assert cmd[cmd.index("-c:a:1") + 1] == "libopus"
+    assert "-c:a:0" not in cmd  # AAC is kept
+    assert cmd[cmd.index("-c:s:0") + 1] == "srt"
+
+    copied = build_join_command(
+        "ffmpeg", "list.txt", "in.mp4", "out.mkv", video_info=SOURCE_INFO, convert_audio=False, audio_codec="opus"
+    )
+    assert not any(arg.startswith("-c:a") for arg in copied)
+
+
+@pytest.mark.parametrize(
+    ("output_duration", "output_frames", "ok"),
+    [
+        ("600.4", 15000, True),
+        ("590.0", 15000, False),  # A segment went missing
+        ("600.0", 14999, False),  # A frame was dropped at a boundary
+    ],
+)
+def test_verify_joined_output(output_duration, output_frames, ok):
+    frames = {"in.mkv": 15000, "out.mkv": output_frames}
+
+    def verify():
+        verify_joined_output(
+            "in.mkv",
+            "out.mkv",
+            SOURCE_INFO,
+            frame_counter=frames.get,
+            info_reader=lambda path: {"format": {"duration": output_duration}},
+        )
+
+    if ok:
+        verify()
+    else:
+        with pytest.raises(ChunkedEncodeError):
+            verify()
+
+
+@pytest.fixture
+def fake_tools(monkeypatch):
+    """Fake ffmpeg passes, ffprobe and ab-av1; records segment encodes, can fail one segment."""
+    tools = SimpleNamespace(encodes=[], fail_segment=None)
+
+    def fake_run_ffmpeg(cmd, *, cwd, cancel_event, pid_callback, step):
+        if step == "split":
+            for i in range(3):
+                with open(os.path.join(cwd, f"segment_{i:05d}.mkv"), "wb") as f:
+                    f.write(b"v")
+        else:
+            with open(cmd[-1], "wb") as f:
+                f.write(b"joined" * 100)
+
+    class FakeWrapper:
+        def encode_with_crf(self, input_path, output_path, crf, file_info_callback=None, **kwargs):
+            if tools.fail_segment is not None and f"{tools.fail_segment:05d}" in input_path:
+                raise ChunkedEncodeError("boom")
+            file_info_callback("seg", "progress", ProgressEvent(progress_encoding=50.0))
+            file_info_callback("seg", "completed", {"message": "done"})
+            tools.encodes.append((os.path.basename(input_path), crf))
+            with open(output_path, "wb") as f:
+                f.write(b"a")
+
+    monkeypatch.setattr("src.chunked_encode._run_ffmpeg", fake_run_ffmpeg)
+    monkeypatch.setattr("src.chunked_encode.AbAv1Wrapper", FakeWrapper)
+    monkeypatch.setattr("src.chunked_encode.get_ffmpeg_path", lambda: "ffmpeg")
+    monkeypatch.setattr(
+        "src.chunked_encode.get_video_info",
+        lambda path: {"format": {"duration": "600.0" if path.endswith("joined.mkv") else "200.0"}},
+    )
+    monkeypatch.setattr("src.chunked_encode.count_video_frames", lambda path: 15000)
+    return tools
+
+
+def test_encode_chunked_encodes_every_segment_and_replaces_output(tmp_path, fake_tools):
+    source = tmp_path / "movie.mp4"
+    source.write_bytes(b"x" * 10_000)
+    output = tmp_path / "movie.mkv"
+    events = []
+
+    stats = encode_chunked(
+        str(source),
+        str(output),
+        crf=28.0,
+        jobs=2,
+        video_info=SOURCE_INFO,
+        file_info_callback=lambda name, status, info=None: events.append((status, info)),
+    )
+
+    assert sorted(fake_tools.encodes) == [(f"segment_{i:05d}.mkv", 28.0) for i in range(3)]
+    assert output.read_bytes() == b"joined" * 100
+    assert stats.output_size == 600
+    assert stats.size_reduction == pytest.approx(94.0)
+    assert events[0][0] == "starting"
+    assert events[-1][0] == "completed"
+    progress = [info.progress_encoding for status, info in events if status == "progress"]
+    assert progress == sorted(progress)
+    assert progress[-1] == pytest.approx(100.0)
+    assert sorted(os.listdir(tmp_path)) == ["movie.mkv", "movie.mp4"]  # Work folder removed
+
+
+def test_failed_segment_leaves_output_untouched(tmp_path, fake_tools):
+    fake_tools.fail_segment = 1
+    source = tmp_path / "movie.mkv"
+    source.write_bytes(b"x" * 10_000)
+
+    with pytest.raises(ChunkedEncodeError, match="Segment 2 failed"):
+        encode_chunked(str(source), str(source), crf=28.0, jobs=1, video_info=SOURCE_INFO)
+
+    assert source.read_bytes() == b"x" * 10_000
+    assert os.listdir(tmp_path) == ["movie.mkv"]
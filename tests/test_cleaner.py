@@ -0,0 +1,26 @@
+# tests/test_cleaner.py
+"""Tests for src/ab_av1/cleaner.py: temp folder sweeps with concurrent runs."""
+
+from src.ab_av1.cleaner import active_run, clean_ab_av1_temp_folders
+
+
+def test_sweep_skips_directory_with_a_live_run(tmp_path):
+    (tmp_path / ".ab-av1-abc").mkdir()
+
+    with active_run(str(tmp_path)):
+        assert clean_ab_av1_temp_folders(str(tmp_path)) == 0
+        assert (tmp_path / ".ab-av1-abc").exists()
+
+    assert clean_ab_av1_temp_folders(str(tmp_path)) == 1
+    assert not (tmp_path / ".ab-av1-abc").exists()
+
+
+def test_last_run_to_leave_a_directory_unblocks_the_sweep(tmp_path):
+    (tmp_path / ".ab-av1-abc").mkdir()
+
+    with active_run(str(tmp_path)):
+        with active_run(str(tmp_path)):
+            pass
+        assert clean_ab_av1_temp_folders(str(tmp_path)) == 0
+
+    assert clean_ab_av1_temp_folders(str(tmp_path)) == 1
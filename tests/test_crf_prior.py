@@ -0,0 +1,74 @@
+# tests/test_crf_prior.py
+"""Tests for src/crf_prior.py: bitrate bands, grouping similar records into
+CRF bounds, and the probe baseline, on in-memory records (no history file)."""
+
+from src.config import CRF_PRIOR_MIN_SAMPLES, CRF_SEARCH_BASELINE_PROBES
+from src.crf_prior import compute_crf_prior, get_bitrate_band
+from src.models import FileRecord, FileStatus
+
+
+def make_record(n: int, *, status: FileStatus = FileStatus.ANALYZED, crf: float = 30.0, **overrides) -> FileRecord:
+    fields = {
+        "path_hash": f"hash{n}",
+        "original_path": None,
+        "status": status,
+        "file_size_bytes": 1000,
+        "file_mtime": 0.0,
+        "video_codec": "h264",
+        "width": 1920,
+        "height": 1080,
+        "bitrate_kbps": 4000.0,  # ~1.9 bits/s per pixel
+        "preset_when_analyzed": 6,
+    }
+    if status == FileStatus.CONVERTED:
+        fields.update(final_crf=crf, vmaf_target_used=95)
+    else:
+        fields.update(best_crf=crf, vmaf_target_when_analyzed=95)
+    fields.update(overrides)
+    return FileRecord(**fields)
+
+
+def test_bitrate_bands():
+    assert get_bitrate_band(4000, 1920, 1080) == "1-2"
+    assert get_bitrate_band(500, 1920, 1080) == "<0.5"
+    assert get_bitrate_band(80000, 1920, 1080) == ">=8"
+    assert get_bitrate_band(None, 1920, 1080) == "unknown"
+
+
+def test_prior_bounds_come_from_similar_searched_records():
+    similar = [make_record(i, crf=28 + i) for i in range(8)]
+    similar += [make_record(8, status=FileStatus.CONVERTED, crf=36), make_record(9, crf=37)]
+    unrelated = [
+        make_record(20, crf=50, video_codec="hevc"),
+        make_record(21, crf=50, width=1280, height=720),
+        make_record(22, crf=50, bitrate_kbps=20000.0),
+        make_record(23, crf=50, preset_when_analyzed=4),
+        make_record(24, crf=50, vmaf_target_when_analyzed=93),  # Searched at a fallback target
+        make_record(25, status=FileStatus.SCANNED, crf=50),
+    ]
+
+    prior = compute_crf_prior(similar + unrelated, "H264", 1920, 1080, 4100.0)
+
+    assert prior is not None
+    assert prior.bounds == (26, 39)  # P10 28.1 and P90 36.9, two CRF outside
+    assert (prior.samples, prior.source) == (10, "h264:1080p:1-2:p6")
+    assert prior.baseline_probes == CRF_SEARCH_BASELINE_PROBES
+    assert prior.probes_saved(4) == CRF_SEARCH_BASELINE_PROBES - 4
+
+
+def test_no_prior_without_enough_similar_records_or_metadata():
+    records = [make_record(i, crf=30 + i % 3) for i in range(CRF_PRIOR_MIN_SAMPLES)]
+
+    assert compute_crf_prior(records[:-1], "h264", 1920, 1080, 4000.0) is None
+    assert compute_crf_prior(records, None, 1920, 1080, 4000.0) is None
+    assert compute_crf_prior(records, "h264", 1920, 1080, None) is None
+
+
+def test_baseline_is_the_median_of_unbounded_searches():
+    records = [make_record(i, crf=30 + i % 3, crf_search_probes=7) for i in range(CRF_PRIOR_MIN_SAMPLES)]
+    records.append(make_record(99, crf=31, crf_search_probes=3, crf_probes_saved=4))  # A bounded search
+
+    prior = compute_crf_prior(records, "h264", 1920, 1080, 4000.0)
+
+    assert prior is not None
+    assert prior.baseline_probes == 7
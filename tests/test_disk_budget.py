@@ -0,0 +1,119 @@
+# tests/test_disk_budget.py
+"""Tests for src/conversion_engine/disk_budget.py: output size prediction and
+per-volume reservations (admit, defer, refuse, release) with free space faked."""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+from src.ab_av1.exceptions import OutputFileError
+from src.config import DISK_MIN_FREE_BYTES, DISK_RESERVATION_MARGIN
+from src.conversion_engine.disk_budget import DiskSpaceBudget, predict_output_size
+from src.models import FileRecord, FileStatus
+
+GB = 1024**3
+
+
+def make_job(job_id: int) -> SimpleNamespace:
+    return SimpleNamespace(job_id=job_id, file_path=f"/videos/{job_id}.mp4")
+
+
+def fake_disk(free: int) -> SimpleNamespace:
+    """Fake volume: .usage stands in for shutil.disk_usage; change .free to fill or free it."""
+    disk = SimpleNamespace(free=free)
+    disk.usage = lambda path: disk
+    return disk
+
+
+def test_prediction_prefers_search_then_record_then_default():
+    record = FileRecord(
+        path_hash="h",
+        original_path=None,
+        status=FileStatus.SCANNED,
+        file_size_bytes=1000,
+        file_mtime=0.0,
+        estimated_reduction_percent=60.0,
+    )
+
+    assert predict_output_size(record, 1000, searched_size=123) == 123
+    assert predict_output_size(record, 1000) == 400
+    record.predicted_output_size = 250
+    assert predict_output_size(record, 1000) == 250
+    assert 0 < predict_output_size(None, 1000) < 1000
+
+
+def test_reservations_share_the_volume_and_are_released(tmp_path):
+    reports = []
+    budget = DiskSpaceBudget(on_change=reports.append, disk_usage=fake_disk(DISK_MIN_FREE_BYTES + 3 * GB).usage)
+    size = int(GB / DISK_RESERVATION_MARGIN)  # Reserves 1 GB with the margin
+    stop = threading.Event()
+
+    with budget.reservation(make_job(1), str(tmp_path / "a.mkv"), size, stop) as first:
+        assert first
+        with budget.reservation(make_job(2), str(tmp_path / "new" / "b.mkv"), size, stop) as second:
+            assert second  # Folder does not exist yet: checked on its parent
+            (volume,) = budget.summary()
+            assert (volume.jobs, volume.reserved_bytes) == (2, pytest.approx(2 * GB, abs=2))
+            (tmp_path / "a.mkv").write_bytes(b"x" * 1000)  # Bytes written no longer count as reserved
+            assert budget.summary()[0].reserved_bytes == pytest.approx(2 * GB - 1000, abs=2)
+
+    assert budget.summary() == []
+    assert [len(volumes) for volumes in reports] == [1, 1, 1, 0]
+
+
+def test_job_that_does_not_fit_waits_for_running_jobs(monkeypatch, tmp_path):
+    monkeypatch.setattr("src.conversion_engine.disk_budget.DISK_ADMISSION_POLL_SEC", 0.05)
+    disk = fake_disk(DISK_MIN_FREE_BYTES + GB)
+    budget = DiskSpaceBudget(disk_usage=disk.usage)
+    size = int(0.8 * GB / DISK_RESERVATION_MARGIN)
+    admitted = threading.Event()
+
+    def second_job():
+        with budget.reservation(make_job(2), str(tmp_path / "b.mkv"), size, threading.Event()) as reserved:
+            if reserved:
+                admitted.set()
+
+    with budget.reservation(make_job(1), str(tmp_path / "a.mkv"), size, threading.Event()):
+        waiter = threading.Thread(target=second_job)
+        waiter.start()
+        assert not admitted.wait(0.2)  # Deferred while job 1 holds its reservation
+        disk.free += GB  # e.g. job 1 replaced its original
+    waiter.join(timeout=5)
+    assert admitted.is_set()
+
+
+def test_output_that_cannot_fit_alone_is_refused_and_stop_ends_a_wait(tmp_path):
+    budget = DiskSpaceBudget(disk_usage=fake_disk(DISK_MIN_FREE_BYTES + GB).usage)
+
+    with (
+        pytest.raises(OutputFileError, match="Not enough disk space") as refused,
+        budget.reservation(make_job(1), str(tmp_path / "a.mkv"), 2 * GB, threading.Event()),
+    ):
+        pass
+    assert refused.value.error_type == "insufficient_space"
+
+    stopped = threading.Event()
+    stopped.set()
+    with budget.reservation(make_job(1), str(tmp_path / "a.mkv"), GB // 2, stopped) as first:
+        assert first  # A free reservation is taken even when stopping
+        with budget.reservation(make_job(2), str(tmp_path / "b.mkv"), GB // 2, stopped) as second:
+            assert not second
+
+
+def test_free_space_is_read_outside_the_lock(tmp_path):
+    disk = fake_disk(DISK_MIN_FREE_BYTES + 3 * GB)
+    lock_free = []
+
+    def usage(path):
+        # A slow share stalls only the caller: another job can still release meanwhile
+        checker = threading.Thread(target=budget.release, args=(make_job(99),))
+        checker.start()
+        checker.join(timeout=1)
+        lock_free.append(not checker.is_alive())
+        return disk
+
+    budget = DiskSpaceBudget(disk_usage=usage)
+    with budget.reservation(make_job(1), str(tmp_path / "a.mkv"), GB, threading.Event()):
+        budget.summary()
+
+    assert lock_free and all(lock_free)
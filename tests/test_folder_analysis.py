@@ -0,0 +1,170 @@
+# tests/test_folder_analysis.py
+"""Tests for src/folder_analysis.py: the streaming analysis pipeline and folder scan."""
+
+import os
+import threading
+
+import pytest
+from src.folder_analysis import AnalysisPipeline, iter_folder_scan, scan_folder_fast
+from src.history_index import HistoryIndex, compute_path_hash
+from src.models import FileRecord, FileStatus
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    """A fresh, isolated HistoryIndex backed by a temp history file."""
+    monkeypatch.setattr("src.history_index.get_history_path", lambda: str(tmp_path / "history.json"))
+    return HistoryIndex()
+
+
+@pytest.fixture
+def probes(monkeypatch):
+    """Fake ffprobe; records every path it is asked to probe."""
+    probed: list[str] = []
+    lock = threading.Lock()
+
+    def fake_get_video_info(path):
+        with lock:
+            probed.append(path)
+        return {
+            "streams": [{"codec_type": "video", "codec_name": "h264", "width": 1920, "height": 1080}],
+            "format": {"duration": "120.0", "bit_rate": "5000000"},
+        }
+
+    monkeypatch.setattr("src.folder_analysis.get_video_info", fake_get_video_info)
+    return probed
+
+
+@pytest.fixture
+def library(tmp_path):
+    root = tmp_path / "videos"
+    (root / "Show").mkdir(parents=True)
+    for name in ("a.mkv", "b.mkv", os.path.join("Show", "c.mkv")):
+        (root / name).write_bytes(b"video-bytes")
+    return root
+
+
+def cache_record(path: str) -> FileRecord:
+    stat = os.stat(path)
+    return FileRecord(
+        path_hash=compute_path_hash(path),
+        original_path=path,
+        status=FileStatus.SCANNED,
+        file_size_bytes=stat.st_size,
+        file_mtime=stat.st_mtime,
+        video_codec="h264",
+        width=1920,
+        height=1080,
+        estimated_reduction_percent=40.0,
+    )
+
+
+def run_pipeline(paths, root, out, index, **kwargs) -> tuple[dict, AnalysisPipeline]:
+    pipeline = AnalysisPipeline(paths, root, out, index, anonymize=False, **kwargs)
+    return {result.path: result for result in pipeline.results()}, pipeline
+
+
+def test_pipeline_probes_only_cache_misses(library, tmp_path, index, probes):
+    out = tmp_path / "out"
+    (out / "Show").mkdir(parents=True)
+    (out / "Show" / "c.mkv").write_bytes(b"done")
+    cached_path = str(library / "a.mkv")
+    index.upsert(cache_record(cached_path))
+    paths = [cached_path, str(library / "b.mkv"), str(library / "Show" / "c.mkv"), str(library / "gone.mkv")]
+
+    results, pipeline = run_pipeline(paths, library, out, index)
+
+    assert probes == [str(library / "b.mkv")]
+    assert {path: result.status for path, result in results.items()} == {
+        paths[0]: "needs_conversion",
+        paths[1]: "needs_conversion",
+        paths[2]: "already_done",
+        paths[3]: "skipped_error",
+    }
+    assert index.get(compute_path_hash(paths[1])).status == FileStatus.SCANNED
+    stats = pipeline.stats
+    assert (stats.walked, stats.cache_hits, stats.output_exists, stats.stat_errors) == (4, 1, 1, 1)
+    assert (stats.probed, stats.recorded, stats.emitted) == (1, 1, 4)
+
+
+def test_pipeline_flags_files_similar_files_say_are_not_worthwhile(library, tmp_path, index, probes):
+    for n in range(12):  # Same group as the fake probe: h264, ~0.1 bits per pixel per frame, short
+        index.upsert(
+            FileRecord(
+                path_hash=f"loser{n}",
+                original_path=None,
+                status=FileStatus.NOT_WORTHWHILE,
+                file_size_bytes=1000,
+                file_mtime=0.0,
+                video_codec="h264",
+                width=1920,
+                height=1080,
+                bitrate_kbps=5000.0,
+                duration_sec=100.0,
+            )
+        )
+    path = str(library / "b.mkv")
+
+    results, _ = run_pipeline([path], library, tmp_path / "out", index)
+
+    assert results[path].status == "needs_conversion"
+    assert results[path].status_detail.startswith("Likely not worthwhile")
+    assert index.get(compute_path_hash(path)).not_worthwhile_likelihood > 0.9
+
+
+def test_pipeline_streams_with_bounded_queues(library, tmp_path, index, probes):
+    total = 200
+    pulled = 0
+
+    def source():
+        nonlocal pulled
+        for _ in range(total):
+            pulled += 1
+            yield str(library / "a.mkv")
+
+    pipeline = AnalysisPipeline(source(), library, tmp_path / "out", index, anonymize=False, queue_size=2)
+    results = pipeline.results()
+    next(results)
+    pulled_before_first_result = pulled
+    remaining = sum(1 for _ in results)
+
+    assert pulled_before_first_result < total  # Source is consumed lazily, not collected up front
+    assert remaining == total - 1
+    stats = pipeline.stats
+    assert max(stats.peak_probe_queue, stats.peak_record_queue, stats.peak_output_queue) <= 2
+
+
+def test_pipeline_stops_when_consumer_closes_early(library, tmp_path, index, probes):
+    paths = [str(library / "a.mkv")] * 100
+    pipeline = AnalysisPipeline(paths, library, tmp_path / "out", index, anonymize=False, queue_size=2)
+
+    results = pipeline.results()
+    next(results)
+    results.close()  # Joins every stage thread
+
+    assert pipeline.stats.walked < len(paths)
+
+
+def test_pipeline_honours_stop_event(library, tmp_path, index, probes):
+    stop_event = threading.Event()
+    stop_event.set()
+
+    results, pipeline = run_pipeline(
+        [str(library / "a.mkv")] * 10, library, tmp_path / "out", index, stop_event=stop_event
+    )
+
+    assert results == {}
+    assert pipeline.stats.walked == 0
+
+
+def test_folder_scan_streams_folders_in_dfs_order(library):
+    (library / "notes.txt").write_bytes(b"ignored")
+
+    folders = list(iter_folder_scan(str(library), ["mkv"]))
+
+    assert [folder.relative_path for folder in folders] == ["(root)", "Show"]
+    assert [os.path.basename(f.path) for f in folders[0].files] == ["a.mkv", "b.mkv"]
+    assert folders[0].total_size_bytes == 2 * len(b"video-bytes")
+
+    summary = scan_folder_fast(str(library), ["mkv"])
+    assert (summary.total_folders, summary.total_files) == (2, 3)
@@ -0,0 +1,129 @@
+# tests/test_headless.py
+"""Tests for src/headless.py: building queue items from arguments, the
+JSON-lines event sink, and a full worker run driven through that sink (with
+per-file processing and the history index faked out)."""
+
+import io
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+from src.conversion_engine import worker
+from src.headless import JsonLinesSink, build_parser, build_queue_items
+from src.history_index import compute_path_hash
+from src.models import (
+    FileRecord,
+    FileStatus,
+    OperationType,
+    OutputMode,
+    QueueConversionConfig,
+    QueueItem,
+    QueueItemStatus,
+    QueueOrder,
+)
+
+
+def read_events(stream: io.StringIO) -> list[dict]:
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+@pytest.fixture
+def history(monkeypatch):
+    """Fake history index; returns the path -> record dict lookups read from."""
+    records: dict = {}
+    fake_index = SimpleNamespace(lookup_file=records.get, save=lambda: None, save_if_stale=lambda interval: None)
+    for module in ("src.headless", "src.cache_helpers", "src.conversion_engine.worker"):
+        monkeypatch.setattr(f"{module}.get_history_index", lambda: fake_index)
+    return records
+
+
+def test_build_queue_items_scans_folders_and_filters_by_history(tmp_path, history):
+    for name in ("a.mkv", "b.MP4", "notes.txt", "done.mkv"):
+        (tmp_path / name).write_bytes(b"x" * 10)
+    done = tmp_path / "done.mkv"
+    history[str(done)] = FileRecord(
+        path_hash=compute_path_hash(str(done)),
+        original_path=str(done),
+        status=FileStatus.NOT_WORTHWHILE,
+        file_size_bytes=10,
+        file_mtime=done.stat().st_mtime,
+    )
+    events = []
+
+    args = build_parser().parse_args([str(tmp_path), "--mode", "suffix", "--suffix", "_small"])
+    items = build_queue_items(args, ["mkv", "mp4"], lambda event, **fields: events.append((event, fields)))
+
+    assert len(items) == 1
+    item = items[0]
+    assert item.is_folder
+    assert item.output_mode == OutputMode.SUFFIX
+    assert item.output_suffix == "_small"
+    assert item.operation_type == OperationType.CONVERT
+    assert [f.path for f in item.files] == [str(tmp_path / "a.mkv"), str(tmp_path / "b.MP4")]
+    assert events == [("filtered", {"file": str(done), "reason": "not worth converting"})]
+
+
+def test_build_queue_items_reads_gui_config_queue(tmp_path, history):
+    items = [
+        QueueItem(id="pending", source_path="/v/a.mkv", is_folder=False),
+        QueueItem(id="interrupted", source_path="/v/b.mkv", is_folder=False, status=QueueItemStatus.STOPPED),
+        QueueItem(id="done", source_path="/v/c.mkv", is_folder=False, status=QueueItemStatus.COMPLETED),
+    ]
+    queue_file = tmp_path / "config.json"
+    queue_file.write_text(json.dumps({"audio_codec": "opus", "queue_items": [i.to_dict() for i in items]}))
+
+    args = build_parser().parse_args(["--queue", str(queue_file)])
+    loaded = build_queue_items(args, ["mkv"], lambda event, **fields: None)
+
+    assert [(i.id, i.status) for i in loaded] == [
+        ("pending", QueueItemStatus.PENDING),
+        ("interrupted", QueueItemStatus.PENDING),
+    ]
+
+
+def test_sink_counts_errors_and_claims_items_in_order():
+    stream = io.StringIO()
+    items = [QueueItem(id=name, source_path=f"/v/{name}.mkv", is_folder=False) for name in ("a", "b")]
+    sink = JsonLinesSink(items, order=QueueOrder.USER, stream=stream)
+
+    sink.file_event("a.mkv", "failed", {"message": "boom", "type": "scan_error"})
+    sink.file_event("b.mkv", "skipped_not_worth", {"message": "no gain"})
+
+    assert sink.session.error_count == 1
+    assert sink.session.error_details == [{"filename": "a.mkv", "message": "boom"}]
+    assert sink.session.skipped_not_worth_files == ["b.mkv"]
+    assert [e["status"] for e in read_events(stream)] == ["failed", "skipped_not_worth"]
+
+    assert sink.next_item() == (items[0], 1, False)
+    assert items[0].status == QueueItemStatus.CONVERTING
+    assert sink.next_item() == (items[1], 0, False)
+    assert sink.next_item() == (None, 0, False)
+
+
+def test_worker_reports_through_the_sink(monkeypatch, history):
+    def fake_process_file(ctx, job):
+        ctx.sink.file_event(job.file_path, "completed", {"message": "ok"})
+        ctx.sink.call(setattr, ctx.sink.session, "processed_files", ctx.sink.session.processed_files + 1)
+        return SimpleNamespace(
+            status=QueueItemStatus.COMPLETED, counter="files_succeeded", error_msg=None, skip_reason=None
+        )
+
+    monkeypatch.setattr(worker, "_process_file", fake_process_file)
+    items = [QueueItem(id=name, source_path=f"/v/{name}.mkv", is_folder=False) for name in ("a", "b", "c")]
+    stream = io.StringIO()
+    sink = JsonLinesSink(items, stream=stream)
+    config = QueueConversionConfig(queue_items=items, extensions=["mkv"], convert_audio=False, audio_codec="opus")
+
+    worker.queue_conversion_worker(config, threading.Event(), threading.Event(), sink)
+
+    events = read_events(stream)
+    assert sink.final_message == "Queue complete"
+    assert sink.scheduler is not None
+    assert all(item.status == QueueItemStatus.COMPLETED for item in items)
+    assert sorted(e["file"] for e in events if e["event"] == "file") == ["/v/a.mkv", "/v/b.mkv", "/v/c.mkv"]
+    assert {e["id"] for e in events if e["event"] == "item" and e["status"] == "completed"} == {"a", "b", "c"}
+    finished = events[-1]
+    assert finished["event"] == "finished"
+    assert finished["processed"] == 3
+    assert finished["errors"] == 0
@@ -0,0 +1,184 @@
+# tests/test_journal.py
+"""Tests for src/conversion_engine/journal.py: journaling a job's lifecycle,
+rolling back partial outputs, and startup recovery after a simulated crash
+(with the history index faked out)."""
+
+import os
+from types import SimpleNamespace
+
+import pytest
+from src.config import STAGING_COPY_SUFFIX
+from src.conversion_engine.journal import (
+    JobJournal,
+    JournalJob,
+    JournalLock,
+    read_journal,
+    recover_interrupted_jobs,
+    roll_back_output,
+)
+from src.conversion_engine.scheduler import ENCODE_STAGE, SEARCH_STAGE
+from src.history_index import compute_path_hash
+from src.models import FileRecord, FileStatus
+
+
+class FakeIndex:
+    def __init__(self):
+        self.records: dict[str, FileRecord] = {}
+        self.saves = 0
+
+    def get(self, path_hash):
+        return self.records.get(path_hash)
+
+    def upsert(self, record):
+        self.records[record.path_hash] = record
+
+    def save(self):
+        self.saves += 1
+
+
+@pytest.fixture
+def index(monkeypatch):
+    fake_index = FakeIndex()
+    monkeypatch.setattr("src.conversion_engine.journal.get_history_index", lambda: fake_index)
+    return fake_index
+
+
+def make_job(job_id: int, path) -> SimpleNamespace:
+    return SimpleNamespace(job_id=job_id, file_path=str(path), queue_item=SimpleNamespace(id="item-1"))
+
+
+def make_record(path, status: FileStatus, last_updated: str) -> FileRecord:
+    return FileRecord(
+        path_hash=compute_path_hash(str(path)),
+        original_path=str(path),
+        status=status,
+        file_size_bytes=10,
+        file_mtime=0.0,
+        last_updated=last_updated,
+    )
+
+
+def test_recovery_rolls_back_an_interrupted_encode(tmp_path, index):
+    done, crashed = tmp_path / "done.mp4", tmp_path / "crashed.mp4"
+    for source in (done, crashed):
+        source.write_bytes(b"source")
+    journal_path = tmp_path / "state" / "journal.jsonl"
+    journal = JobJournal(str(journal_path))
+
+    journal.begin(make_job(1, done))
+    journal.stage(make_job(1, done), ENCODE_STAGE, output_path=str(tmp_path / "done_av1.mkv"))
+    (tmp_path / "done_av1.mkv").write_bytes(b"finished")
+    journal.record(make_job(1, done), make_record(done, FileStatus.CONVERTED, "2024-01-01 10:00:00"))
+    journal.commit(make_job(1, done))
+
+    journal.begin(make_job(2, crashed))
+    journal.stage(make_job(2, crashed), SEARCH_STAGE)
+    journal.record(make_job(2, crashed), make_record(crashed, FileStatus.ANALYZED, "2024-01-01 10:05:00"))
+    journal.stage(make_job(2, crashed), ENCODE_STAGE, output_path=str(tmp_path / "crashed_av1.mkv"))
+    (tmp_path / "crashed_av1.mkv").write_bytes(b"half")
+    (tmp_path / ".ab-av1-abc").mkdir()
+    (tmp_path / ".av1-chunks-xyz").mkdir()
+    journal.close()  # A job is still open: the journal is kept
+    with open(journal_path, "a", encoding="utf-8") as f:
+        f.write('{"op": "comm')  # Torn last line
+
+    report = recover_interrupted_jobs(str(journal_path))
+
+    assert report.interrupted == [str(crashed)]
+    assert report.removed_outputs == [str(tmp_path / "crashed_av1.mkv")]
+    assert report.cleaned_folders == 2
+    assert report.restored_records == 2
+    assert sorted(os.listdir(tmp_path)) == ["crashed.mp4", "done.mp4", "done_av1.mkv", "state"]
+    assert index.records[compute_path_hash(str(crashed))].status == FileStatus.ANALYZED  # CRF is reused
+    assert index.saves == 1
+    assert recover_interrupted_jobs(str(journal_path)).interrupted == []  # Journal was emptied
+
+
+def test_recovery_keeps_newer_history_records(tmp_path, index):
+    source = tmp_path / "a.mp4"
+    newer = make_record(source, FileStatus.CONVERTED, "2024-02-01 00:00:00")
+    index.upsert(newer)
+    journal_path = tmp_path / "journal.jsonl"
+    journal = JobJournal(str(journal_path))
+    journal.begin(make_job(1, source))
+    journal.record(make_job(1, source), make_record(source, FileStatus.ANALYZED, "2024-01-01 00:00:00"))
+    journal.commit(make_job(1, source))
+    journal.close()
+
+    assert journal_path.read_text() == ""  # Clean close empties the journal
+    assert read_journal(str(journal_path)) == {}
+    assert index.get(newer.path_hash) is newer
+
+
+def test_abort_removes_the_partial_output_but_not_an_existing_one(tmp_path):
+    source = tmp_path / "a.mp4"
+    source.write_bytes(b"source")
+    existing = tmp_path / "b_av1.mkv"
+    existing.write_bytes(b"earlier result")
+    journal = JobJournal(None)
+
+    journal.begin(make_job(1, source))
+    journal.stage(make_job(1, source), ENCODE_STAGE, output_path=str(tmp_path / "a_av1.mkv"))
+    (tmp_path / "a_av1.mkv").write_bytes(b"half")
+    journal.abort(make_job(1, source))
+
+    journal.begin(make_job(2, source))
+    journal.stage(make_job(2, source), ENCODE_STAGE, output_path=str(existing))  # e.g. skipped: output exists
+    journal.abort(make_job(2, source))
+
+    assert sorted(os.listdir(tmp_path)) == ["a.mp4", "b_av1.mkv"]
+
+
+def test_rollback_keeps_the_output_once_the_source_is_gone(tmp_path):
+    output = tmp_path / "a.mkv"
+    output.write_bytes(b"only copy")
+    job = JournalJob(key="k", file_path=str(tmp_path / "a.mp4"), output_path=str(output))
+
+    assert not roll_back_output(job)
+    assert output.exists()
+
+
+def test_replace_in_place_rolls_back_the_staging_copy_but_keeps_the_source(tmp_path, index):
+    source = tmp_path / "a.mkv"
+    source.write_bytes(b"source")
+    journal_path = tmp_path / "state" / "journal.jsonl"
+    journal = JobJournal(str(journal_path))
+    journal.begin(make_job(1, source))
+    journal.stage(make_job(1, source), ENCODE_STAGE, output_path=str(source))  # REPLACE: output is the input
+    (tmp_path / f"a.mkv{STAGING_COPY_SUFFIX}").write_bytes(b"half a copy")
+    journal.close()  # Crashed with the job open: the journal stays for recovery
+
+    recover_interrupted_jobs(str(journal_path))
+
+    assert sorted(os.listdir(tmp_path)) == ["a.mkv", "state"]
+    assert source.read_bytes() == b"source"
+
+
+def test_a_second_process_journals_beside_the_first_and_recovery_skips_it(tmp_path, index):
+    source, other = tmp_path / "a.mp4", tmp_path / "b.mp4"
+    for path in (source, other):
+        path.write_bytes(b"source")
+    journal_path = str(tmp_path / "state" / "journal.jsonl")
+    running = JobJournal(journal_path)  # Another process, still converting
+    running.begin(make_job(1, source))
+    running.stage(make_job(1, source), ENCODE_STAGE, output_path=str(tmp_path / "a_av1.mkv"))
+    (tmp_path / "a_av1.mkv").write_bytes(b"half")
+    (tmp_path / ".ab-av1-live").mkdir()
+
+    second = JobJournal(journal_path)
+    assert second.path != journal_path  # The journal is taken: this run writes its own
+    second.begin(make_job(1, other))
+    second.stage(make_job(1, other), ENCODE_STAGE, output_path=str(tmp_path / "b_av1.mkv"))
+    (tmp_path / "b_av1.mkv").write_bytes(b"half")
+    second.close()  # Crashed with the job open: its journal stays, unlocked
+
+    report = recover_interrupted_jobs(journal_path)
+
+    assert report.interrupted == [str(other)]  # Only the dead process's job
+    assert (tmp_path / "a_av1.mkv").exists()
+    assert (tmp_path / ".ab-av1-live").exists()  # Shared folder of a running job is not swept
+    assert not os.path.exists(second.path)
+    assert not os.path.exists(second.path + ".lock")
+    assert JournalLock(journal_path).acquire() is False  # Still held by the running journal
+    running.close()
+    assert JournalLock(journal_path).acquire()
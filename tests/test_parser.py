@@ -135,6 +135,19 @@ def test_fractional_best_crf_line_is_not_truncated():
     assert recorder.events[0].crf == 23.25
 
 
+def test_crf_vmaf_lines_build_the_crf_curve():
+    parser, _ = make_parser()
+    stats = make_stats()
+
+    parser.parse_line("sample 1/5 crf 30 VMAF 95.80 (41%)", stats)
+    parser.parse_line("crf 30 VMAF 95.40 predicted video stream size 450 MiB (38%)", stats)  # Replaces the sample line
+    parser.parse_line("crf 34 VMAF 93.10", stats)
+
+    assert [(p.crf, p.vmaf, p.size_percent) for p in stats.crf_curve.values()] == [(30, 95.4, 38.0), (34, 93.1, None)]
+    stats.reset_for_attempt(93)
+    assert len(stats.crf_curve) == 2  # Kept across VMAF fallback attempts
+
+
 def test_predicted_size_reduction_line_stores_reduction_without_callback():
     parser, recorder = make_parser()
     stats = make_stats()
@@ -0,0 +1,117 @@
+# tests/test_preset_transfer.py
+"""Tests for src/preset_transfer.py: carrying a file's results across presets,
+the median CRF offset between two presets, and predictions from it, on
+in-memory records (no history file); plus the wrapper's sample-encode check."""
+
+from src.ab_av1.runner import ProcessResult
+from src.ab_av1.wrapper import AbAv1Wrapper
+from src.config import PRESET_TRANSFER_MIN_SAMPLES
+from src.models import CrfVmafPoint, FileRecord, FileStatus, PresetCrf
+from src.preset_transfer import PresetTransferModel, carried_preset_history
+
+from tests.test_wrapper import fake_ab_av1
+
+
+def make_record(n: int, *, preset: int = 4, crf: float = 30.0, history=(), **overrides) -> FileRecord:
+    fields = {
+        "path_hash": f"hash{n}",
+        "original_path": None,
+        "status": FileStatus.ANALYZED,
+        "file_size_bytes": 1000,
+        "file_mtime": 0.0,
+        "preset_when_analyzed": preset,
+        "best_crf": crf,
+        "vmaf_target_when_analyzed": 95,
+        "preset_history": list(history),
+    }
+    fields.update(overrides)
+    return FileRecord(**fields)
+
+
+def measured(count: int, offsets=(-3.0,)) -> list[FileRecord]:
+    """Files searched at preset 6, then at preset 4 (CRF offset cycling through offsets)."""
+    return [
+        make_record(i, preset=4, crf=32 + offsets[i % len(offsets)], history=[PresetCrf(6, 95, 32.0)])
+        for i in range(count)
+    ]
+
+
+def test_carried_history_keeps_other_presets_and_the_latest_result():
+    previous = make_record(
+        1, preset=6, crf=33.0, history=[PresetCrf(4, 95, 29.0), PresetCrf(6, 95, 31.0), PresetCrf(8, 93, 40.0)]
+    )
+
+    assert carried_preset_history(previous, 4) == [PresetCrf(6, 95, 33.0), PresetCrf(8, 93, 40.0)]
+    assert carried_preset_history(previous, 6) == [PresetCrf(4, 95, 29.0), PresetCrf(8, 93, 40.0)]
+    assert carried_preset_history(None, 6) == []
+
+
+def test_offset_is_the_median_in_both_directions():
+    records = measured(PRESET_TRANSFER_MIN_SAMPLES, offsets=(-2.0, -3.0, -3.0, -4.0, -10.0))
+    records += [
+        make_record(50, preset=4, crf=20.0, history=[PresetCrf(6, 90, 40.0)]),  # Other VMAF target
+        make_record(51, preset=4, crf=20.0, history=[PresetCrf(6, 95, 40.0)], preset_transfer_from=6),
+        make_record(52, preset=4, crf=20.0, history=[PresetCrf(6, 95, 40.0)], status=FileStatus.SCANNED),
+    ]
+
+    model = PresetTransferModel(records)
+
+    assert model.offset(6, 4) == (-3.0, PRESET_TRANSFER_MIN_SAMPLES)
+    assert model.offset(4, 6) == (3.0, PRESET_TRANSFER_MIN_SAMPLES)
+    assert model.offset(6, 8) is None
+
+
+def test_no_offset_below_the_minimum_files():
+    assert PresetTransferModel(measured(PRESET_TRANSFER_MIN_SAMPLES - 1)).offset(6, 4) is None
+
+
+def test_prediction_from_the_records_own_search_or_its_history():
+    model = PresetTransferModel(measured(PRESET_TRANSFER_MIN_SAMPLES, offsets=(-2.6,)))
+    searched_at_6 = make_record(
+        100, preset=6, crf=35.0, crf_curve=[CrfVmafPoint(crf=30.0, vmaf=96.0), CrfVmafPoint(crf=35.0, vmaf=95.0)]
+    )
+
+    transfer = model.predict(searched_at_6, 95, 4)
+    assert (transfer.crf, transfer.from_preset, transfer.from_crf) == (32.25, 6, 35.0)  # Rounded down to the step
+    assert model.predict(searched_at_6, 96, 4).from_crf == 30.0  # From the stored curve
+    assert model.predict(searched_at_6, 95, 6) is None  # Same preset: the cache answers it
+
+    converted_at_8 = make_record(
+        101,
+        preset=8,
+        crf=None,
+        status=FileStatus.CONVERTED,
+        final_crf=45.0,
+        vmaf_target_used=95,
+        history=[PresetCrf(6, 95, 36.0)],
+    )
+    assert model.predict(converted_at_8, 95, 4).crf == 33.25
+    assert model.predict(converted_at_8, 93, 4) is None  # No result at that target
+
+
+def test_verify_crf_accepts_only_samples_that_reach_the_target(monkeypatch, tmp_path):
+    video, commands = fake_ab_av1(
+        monkeypatch,
+        tmp_path,
+        [
+            ProcessResult(
+                return_code=0,
+                output="VMAF 95.40 predicted video stream size 120 MiB (40%) taking 3 minutes\n",
+                error_line=None,
+            ),
+            ProcessResult(
+                return_code=0,
+                output="VMAF 94.10 predicted video stream size 110 MiB (37%) taking 3 minutes\n",
+                error_line=None,
+            ),
+        ],
+    )
+
+    result = AbAv1Wrapper().verify_crf(video, crf=32.25, vmaf_target=95, preset=4, samples=3)
+
+    assert commands[0][1:4] == ["sample-encode", "-i", video]
+    assert commands[0][commands[0].index("--crf") + 1] == "32.25"
+    assert commands[0][commands[0].index("--samples") + 1] == "3"
+    assert (result.best_crf, result.best_vmaf, result.predicted_size_reduction) == (32.25, 95.4, 60.0)
+    assert (result.sample_encodes, result.crf_curve) == (1, [CrfVmafPoint(crf=32.25, vmaf=95.4, size_percent=40.0)])
+    assert AbAv1Wrapper().verify_crf(video, crf=34.0, vmaf_target=95, preset=4, samples=3) is None
@@ -0,0 +1,147 @@
+# tests/test_quality_check.py
+"""Tests for src/quality_check.py: segment placement, the libvmaf command and
+score parsing, scoring an output with a faked ffmpeg, the predicted VMAF of
+an output's CRF, and trust per group from in-memory records."""
+
+from types import SimpleNamespace
+
+import pytest
+from src.ab_av1.exceptions import AbAv1CancelledError
+from src.ab_av1.runner import ProcessResult
+from src.config import (
+    QUALITY_DRIFT_MAX_MISS,
+    QUALITY_DRIFT_MIN_RECORDS,
+    QUALITY_DRIFT_TRIAL_PERCENT,
+    QUALITY_DRIFT_WINDOW,
+)
+from src.models import FileRecord, FileStatus
+from src.quality_check import (
+    CRF_SOURCE_CACHE,
+    CRF_SOURCE_SEARCH,
+    QualityDriftModel,
+    build_vmaf_command,
+    is_drift_trial,
+    parse_vmaf_score,
+    predicted_vmaf,
+    score_output,
+    segment_starts,
+)
+
+
+def make_record(n: int, error: float | None, *, source: str = CRF_SOURCE_CACHE, **overrides) -> FileRecord:
+    fields = {
+        "path_hash": f"hash{n}",
+        "original_path": None,
+        "status": FileStatus.CONVERTED,
+        "file_size_bytes": 1000,
+        "file_mtime": 0.0,
+        "video_codec": "h264",
+        "width": 1920,
+        "height": 1080,
+        "crf_source": source,
+        "sample_vmaf_error": error,
+    }
+    fields.update(overrides)
+    return FileRecord(**fields)
+
+
+def test_segments_spread_over_the_file():
+    assert segment_starts(100.0, 4, 5.0) == [10.0, 35.0, 60.0, 85.0]
+    assert segment_starts(12.0, 4, 5.0) == [0.5, 6.5]  # Only two segments fit
+    assert segment_starts(3.0, 4, 5.0) == [0.0]
+
+
+def test_command_seeks_both_inputs_and_picks_the_4k_model():
+    cmd = build_vmaf_command("ffmpeg", "/src.mp4", "/out.mkv", 35.0, 5.0, width=3840)
+
+    assert cmd[cmd.index("/out.mkv") - 5 : cmd.index("/out.mkv")] == ["-ss", "35", "-t", "5", "-i"]
+    assert cmd[cmd.index("/src.mp4") - 5 : cmd.index("/src.mp4")] == ["-ss", "35", "-t", "5", "-i"]
+    assert cmd.index("/out.mkv") < cmd.index("/src.mp4")  # libvmaf takes the distorted input first
+    assert "vmaf_4k" in cmd[cmd.index("-lavfi") + 1]
+    hd = build_vmaf_command("ffmpeg", "/src.mp4", "/out.mkv", 0.0, 5.0, width=1920)
+    assert "vmaf_4k" not in hd[hd.index("-lavfi") + 1]
+
+
+def test_parse_score():
+    assert parse_vmaf_score("frame=  120 fps=40\n[Parsed_libvmaf_4 @ 0x1] VMAF score: 95.371245\n") == 95.371245
+    assert parse_vmaf_score("frame=  120 fps=40\n") is None
+
+
+def fake_ffmpeg(monkeypatch, outputs: list[ProcessResult]) -> list[list[str]]:
+    commands = []
+
+    def fake_run(cmd, *, cwd, env, cancel_event, pid_callback):
+        commands.append(cmd)
+        return outputs[len(commands) - 1]
+
+    monkeypatch.setattr("src.quality_check.get_ffmpeg_path", lambda: "/vendor/ffmpeg")
+    monkeypatch.setattr("src.quality_check.run_ab_av1", fake_run)
+    return commands
+
+
+def scored(score: float) -> ProcessResult:
+    return ProcessResult(return_code=0, output=f"VMAF score: {score}", error_line=None)
+
+
+def test_score_is_the_mean_of_the_segments(monkeypatch):
+    commands = fake_ffmpeg(monkeypatch, [scored(94.0), scored(96.0), scored(95.0), scored(93.0)])
+
+    assert score_output("/src.mp4", "/out.mkv", 600.0) == 94.5
+    assert len(commands) == 4
+
+
+def test_failed_segment_gives_no_score_and_cancel_raises(monkeypatch):
+    fake_ffmpeg(monkeypatch, [scored(94.0), ProcessResult(return_code=1, output="error", error_line=None)])
+    assert score_output("/src.mp4", "/out.mkv", 600.0) is None
+
+    fake_ffmpeg(monkeypatch, [ProcessResult(return_code=1, output="", error_line=None, cancelled=True)])
+    with pytest.raises(AbAv1CancelledError):
+        score_output("/src.mp4", "/out.mkv", 600.0)
+
+
+def test_predicted_vmaf_of_the_best_crf_or_the_target():
+    record = SimpleNamespace(best_crf=30.0, best_vmaf_achieved=95.6)
+
+    assert predicted_vmaf(record, 30.0, 95) == 95.6
+    assert predicted_vmaf(record, 31.25, 94) == 94.0  # Interpolated from the curve for the target
+    assert predicted_vmaf(None, 30.0, None) is None
+
+
+def test_group_loses_trust_once_enough_outputs_missed():
+    missed = -(QUALITY_DRIFT_MAX_MISS + 0.5)
+    records = [make_record(i, missed) for i in range(QUALITY_DRIFT_MIN_RECORDS)]
+    records += [
+        make_record(50, 0.4, source=CRF_SOURCE_SEARCH),
+        make_record(51, missed, width=1280, height=720),
+        make_record(52, None),  # Not checked
+    ]
+    model = QualityDriftModel(records)
+
+    cache = model.drift(CRF_SOURCE_CACHE, "H264", 1920, 1080)
+    assert (cache.checked, cache.median_error, cache.trusted) == (QUALITY_DRIFT_MIN_RECORDS, missed, False)
+    assert model.drift(CRF_SOURCE_SEARCH, "h264", 1920, 1080).trusted
+    assert model.drift(CRF_SOURCE_CACHE, "h264", 1280, 720).trusted  # Too few checked outputs
+    assert model.drift(CRF_SOURCE_CACHE, "hevc", 1920, 1080) is None
+    assert model.all_drifts()[0].crf_source == CRF_SOURCE_CACHE  # Most checked first
+
+
+def test_distrust_ages_out_as_trials_check_well_again():
+    def drift(records):
+        return QualityDriftModel(records).drift(CRF_SOURCE_CACHE, "h264", 1920, 1080)
+
+    missed = -(QUALITY_DRIFT_MAX_MISS + 0.5)
+    old = [make_record(i, missed, last_updated=f"2026-01-{i + 1:02d}") for i in range(QUALITY_DRIFT_WINDOW)]
+    trials = [make_record(100 + i, 0.2, last_updated=f"2026-02-{i + 1:02d}") for i in range(QUALITY_DRIFT_WINDOW)]
+    assert not drift(old).trusted
+
+    # Listed first: the window follows last_updated, not history order
+    recovered = drift(trials[:-1] + old)
+    assert recovered.checked == QUALITY_DRIFT_WINDOW  # Only the latest checks count
+    assert recovered.trusted
+    assert not drift(trials[: QUALITY_DRIFT_WINDOW // 2 - 1] + old).trusted  # Too few good checks yet
+
+
+def test_trials_are_a_stable_share_of_files():
+    trials = [is_drift_trial(f"hash{n}") for n in range(2000)]
+    assert trials == [is_drift_trial(f"hash{n}") for n in range(2000)]
+    assert abs(sum(trials) / len(trials) * 100 - QUALITY_DRIFT_TRIAL_PERCENT) < 5
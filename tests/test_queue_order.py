@@ -0,0 +1,134 @@
+# tests/test_queue_order.py
+"""Tests for src/queue_order.py: savings prediction, policy ranking and
+applying a policy to queue items (with a faked-out history index)."""
+
+from types import SimpleNamespace
+
+import pytest
+from src.models import FileRecord, FileStatus, OperationType, QueueFileItem, QueueItem, QueueItemStatus, QueueOrder
+from src.queue_order import FileCost, QueueCosts, order_costs, order_folder_files, pick_next_item, predicted_savings
+
+GB = 1024**3
+
+
+def make_record(path: str, size: int = GB, duration: float = 1000.0, **fields) -> FileRecord:
+    return FileRecord(
+        path_hash=path,
+        original_path=path,
+        status=FileStatus.SCANNED,
+        file_size_bytes=size,
+        file_mtime=0.0,
+        duration_sec=duration,
+        video_codec="h264",
+        width=1920,
+        height=1080,
+        **fields,
+    )
+
+
+@pytest.fixture
+def history(monkeypatch):
+    """Fake history index plus flat 1x-realtime percentiles; returns the path -> record dict."""
+    records: dict[str, FileRecord] = {}
+    monkeypatch.setattr("src.queue_order.get_history_index", lambda: SimpleNamespace(lookup_file=records.get))
+    flat = {(None, None): {"p25": 1.0, "p50": 1.0, "p75": 1.0, "count": 20}}
+    monkeypatch.setattr("src.queue_order.compute_grouped_percentiles", lambda op: flat)
+    return records
+
+
+def test_predicted_savings_prefers_crf_search_prediction():
+    assert predicted_savings(None) is None
+    assert predicted_savings(make_record("a")) is None
+    assert predicted_savings(make_record("a", estimated_reduction_percent=50.0)) == GB / 2
+    assert predicted_savings(make_record("a", estimated_reduction_percent=50.0, predicted_size_reduction=25.0)) == (
+        GB / 4
+    )
+    assert predicted_savings(make_record("a", predicted_output_size=GB // 4, predicted_size_reduction=25.0)) == (
+        GB * 3 / 4
+    )
+
+
+COSTS = [
+    FileCost("slow-big", savings_bytes=900.0, seconds=300.0),  # 3 B/s
+    FileCost("unknown", savings_bytes=None, seconds=None),
+    FileCost("quick-small", savings_bytes=100.0, seconds=20.0),  # 5 B/s
+    FileCost("medium", savings_bytes=400.0, seconds=100.0),  # 4 B/s
+]
+
+
+@pytest.mark.parametrize(
+    ("policy", "kwargs", "expected"),
+    [
+        (QueueOrder.USER, {}, ["slow-big", "unknown", "quick-small", "medium"]),
+        (QueueOrder.SAVINGS_RATE, {}, ["quick-small", "medium", "slow-big", "unknown"]),
+        (QueueOrder.SHORTEST_FIRST, {}, ["quick-small", "medium", "slow-big", "unknown"]),
+        # 150s window: slow-big no longer fits after quick-small + medium and is deferred
+        (QueueOrder.DEADLINE, {"time_budget": 150.0}, ["quick-small", "medium", "slow-big", "unknown"]),
+        # Two parallel jobs double the window; everything known fits in rate order
+        (
+            QueueOrder.DEADLINE,
+            {"time_budget": 220.0, "parallelism": 2},
+            ["quick-small", "medium", "slow-big", "unknown"],
+        ),
+    ],
+)
+def test_order_costs(policy, kwargs, expected):
+    assert [c.key for c in order_costs(COSTS, policy, **kwargs)] == expected
+
+
+def test_deadline_skips_a_file_that_does_not_fit_for_one_that_does():
+    costs = [
+        FileCost("best-rate-but-long", savings_bytes=1000.0, seconds=100.0),  # 10 B/s
+        FileCost("fits", savings_bytes=80.0, seconds=10.0),  # 8 B/s
+    ]
+
+    assert [c.key for c in order_costs(costs, QueueOrder.SAVINGS_RATE)] == ["best-rate-but-long", "fits"]
+    assert [c.key for c in order_costs(costs, QueueOrder.DEADLINE, time_budget=50.0)] == ["fits", "best-rate-but-long"]
+
+
+def test_order_folder_files_ranks_by_savings_per_hour(history):
+    files = [QueueFileItem(path=p) for p in ("/v/long.mkv", "/v/new.mkv", "/v/short.mkv")]
+    history["/v/long.mkv"] = make_record("/v/long.mkv", duration=3600.0, estimated_reduction_percent=40.0)
+    history["/v/short.mkv"] = make_record("/v/short.mkv", duration=600.0, estimated_reduction_percent=30.0)
+    item = QueueItem(id="f", source_path="/v", is_folder=True, files=files)
+
+    assert not order_folder_files(item, QueueOrder.USER)
+    assert order_folder_files(item, QueueOrder.SAVINGS_RATE)
+    assert [f.path for f in item.files] == ["/v/short.mkv", "/v/long.mkv", "/v/new.mkv"]
+    assert not order_folder_files(item, QueueOrder.SAVINGS_RATE)  # Already in order
+
+
+def test_pick_next_item_skips_non_pending_and_follows_policy(history):
+    history["/v/a.mkv"] = make_record("/v/a.mkv", duration=3000.0, estimated_reduction_percent=50.0)
+    history["/v/b.mkv"] = make_record("/v/b.mkv", duration=300.0, estimated_reduction_percent=2.0)
+    history["/v/c.mkv"] = make_record("/v/c.mkv", duration=60.0, estimated_reduction_percent=90.0)
+    items = [
+        QueueItem(id=name, source_path=f"/v/{name}.mkv", is_folder=False, operation_type=OperationType.CONVERT)
+        for name in ("a", "b", "c")
+    ]
+    items[2].status = QueueItemStatus.COMPLETED
+
+    assert pick_next_item(items, QueueOrder.USER).id == "a"
+    assert pick_next_item(items, QueueOrder.SHORTEST_FIRST).id == "b"
+    assert pick_next_item(items, QueueOrder.SAVINGS_RATE).id == "a"  # ~179 kB/s beats ~72 kB/s
+    assert pick_next_item(items, QueueOrder.DEADLINE, time_budget=600.0).id == "b"  # a would miss the window
+    assert pick_next_item([items[2]], QueueOrder.SAVINGS_RATE) is None
+
+
+def test_queue_costs_estimate_each_file_once_per_run(history, monkeypatch):
+    history["/v/a.mkv"] = make_record("/v/a.mkv", duration=3000.0, estimated_reduction_percent=50.0)
+    history["/v/b.mkv"] = make_record("/v/b.mkv", duration=300.0, estimated_reduction_percent=2.0)
+    lookups = []
+    lookup = history.get
+    monkeypatch.setattr(
+        "src.queue_order.get_history_index",
+        lambda: SimpleNamespace(lookup_file=lambda path: lookups.append(path) or lookup(path)),
+    )
+    items = [QueueItem(id=name, source_path=f"/v/{name}.mkv", is_folder=False) for name in ("a", "b")]
+    costs = QueueCosts()
+
+    costs.prime(items)
+    assert pick_next_item(items, QueueOrder.SHORTEST_FIRST, costs=costs).id == "b"
+    items[1].status = QueueItemStatus.CONVERTING
+    assert pick_next_item(items, QueueOrder.SHORTEST_FIRST, costs=costs).id == "a"
+    assert sorted(lookups) == ["/v/a.mkv", "/v/b.mkv"]  # Claims only ranked cached costs
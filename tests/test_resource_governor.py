@@ -0,0 +1,68 @@
+# tests/test_resource_governor.py
+"""Tests for src/resource_governor.py: reading /proc metrics (from fake /proc
+files), the throttle hysteresis, held scheduler slots and paused probes."""
+
+import contextlib
+import threading
+from types import SimpleNamespace
+
+import pytest
+from src.conversion_engine.scheduler import ENCODE_STAGE, SEARCH_STAGE, JobScheduler
+from src.resource_governor import GovernorPolicy, ResourceGovernor, SystemSample, SystemSampler
+
+CALM = SystemSample(load_per_core=0.5, available_memory=0.5, disk_busy=0.2)
+
+
+def write_proc(root, io_ticks: int) -> None:
+    (root / "loadavg").write_text("12.00 8.00 4.00 3/900 4242\n")
+    (root / "meminfo").write_text("MemTotal:       16000000 kB\nMemFree: 100 kB\nMemAvailable:    4000000 kB\n")
+    (root / "diskstats").write_text(
+        f"   8       0 sda 100 0 2000 50 300 0 4000 60 0 {io_ticks} 110\n"
+        "   8       1 sda1 90 0 1800 40 280 0 3800 55 0 100 95\n"
+        "   7       0 loop0 5 0 10 1 0 0 0 0 0 999999 1\n"
+    )
+
+
+def test_sampler_reads_proc(monkeypatch, tmp_path):
+    monkeypatch.setattr("src.resource_governor.os.cpu_count", lambda: 8)
+    clock = iter([100.0, 102.0])
+    sampler = SystemSampler(str(tmp_path), clock=lambda: next(clock))
+
+    write_proc(tmp_path, io_ticks=1000)
+    first = sampler.sample()
+    write_proc(tmp_path, io_ticks=2500)  # 1.5 s of I/O in 2 s; loop devices are ignored
+    second = sampler.sample()
+
+    assert first == SystemSample(load_per_core=1.5, available_memory=0.25, disk_busy=0.0)
+    assert second.disk_busy == pytest.approx(0.75)
+
+
+def test_throttle_holds_slots_and_pauses_probes_until_load_drops():
+    scheduler = JobScheduler(5, stage_limits={SEARCH_STAGE: 2, ENCODE_STAGE: 3})
+    governor = ResourceGovernor(GovernorPolicy(max_load_per_core=1.0))
+    states = []
+    governor.add_listener(states.append)
+    governor.attach(scheduler)
+
+    state = governor.update(SystemSample(load_per_core=2.0, available_memory=0.05, disk_busy=0.2))
+
+    assert state.throttled
+    assert state.reasons == ("load 2.0/core", "5% memory available")
+    assert scheduler.hold_stage_slots(ENCODE_STAGE, 2) == 2  # One encode slot left to jobs
+    assert scheduler.hold_stage_slots(SEARCH_STAGE, 1) == 1
+    assert not governor.wait_for_probe(should_stop=lambda: True)
+
+    # Inside the limit but not far enough inside it: still throttled
+    assert governor.update(SystemSample(load_per_core=0.9, available_memory=0.5, disk_busy=0.2)).throttled
+    assert not governor.update(CALM).throttled
+    assert [s.throttled for s in states] == [True, True, False]
+    assert governor.wait_for_probe()
+
+    stopped = threading.Event()
+    stopped.set()
+    with contextlib.ExitStack() as stack:  # Every slot is back with the jobs
+        admitted = [
+            stack.enter_context(scheduler.stage(name, SimpleNamespace(stage=None, borrowed_slots=0), stopped))
+            for name in (ENCODE_STAGE, ENCODE_STAGE, ENCODE_STAGE, SEARCH_STAGE, SEARCH_STAGE)
+        ]
+        assert all(admitted)
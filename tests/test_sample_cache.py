@@ -0,0 +1,79 @@
+# tests/test_sample_cache.py
+"""Tests for src/sample_cache.py: per-file, per-preset directories, release on
+a verdict, and the stale-cache sweep (age, size cap, directories in use), under
+a temporary script directory; plus the wrapper passing the directory to ab-av1."""
+
+import os
+import time
+
+import pytest
+from src.ab_av1.cleaner import active_run
+from src.ab_av1.runner import ProcessResult
+from src.ab_av1.wrapper import AbAv1Wrapper
+from src.sample_cache import get_sample_cache_dir, release_sample_cache, sweep_sample_cache
+
+from tests.test_wrapper import fake_ab_av1
+
+DAY = 86400
+
+
+@pytest.fixture(autouse=True)
+def script_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr("src.sample_cache.get_script_directory", lambda: str(tmp_path / "app"))
+
+
+def fill(path: str, size: int, age_days: float = 0) -> None:
+    """Create a cache directory holding one file of size bytes, aged age_days."""
+    cached = os.path.join(path, "ab-av1", "cache.db")
+    os.makedirs(os.path.dirname(cached), exist_ok=True)
+    with open(cached, "wb") as f:
+        f.write(b"x" * size)
+    stamp = time.time() - age_days * DAY
+    for item in (cached, os.path.dirname(cached), path):
+        os.utime(item, (stamp, stamp))
+
+
+def test_release_removes_every_preset_of_the_file_only():
+    kept = get_sample_cache_dir("/videos/other.mkv", 6)
+    dirs = [get_sample_cache_dir("/videos/movie.mkv", preset) for preset in (4, 6)]
+    assert dirs[0] != dirs[1] and get_sample_cache_dir("/videos/movie.mkv", 6) == dirs[1]
+    for path in [kept, *dirs]:
+        os.makedirs(path)
+
+    with active_run(dirs[0]):
+        assert release_sample_cache("/videos/movie.mkv") == 1  # In use: kept until its run ends
+    assert release_sample_cache("/videos/movie.mkv") == 1
+
+    assert not any(os.path.exists(path) for path in dirs)
+    assert os.path.isdir(kept)
+
+
+def test_sweep_removes_stale_then_least_recently_used_over_the_cap():
+    stale = get_sample_cache_dir("/videos/stale.mkv", 6)
+    old, busy, recent = (get_sample_cache_dir(f"/videos/{name}.mkv", 6) for name in ("old", "busy", "recent"))
+    fill(stale, 10, age_days=30)
+    fill(busy, 400, age_days=3)
+    fill(old, 400, age_days=2)
+    fill(recent, 400)
+
+    with active_run(busy):
+        assert sweep_sample_cache(max_bytes=1000, max_age_days=14) == 2
+
+    assert [os.path.exists(path) for path in (stale, busy, old, recent)] == [False, True, False, True]
+
+
+def test_crf_search_runs_in_the_sample_cache_dir(monkeypatch, tmp_path):
+    envs = []
+    monkeypatch.setattr(AbAv1Wrapper, "_process_env", staticmethod(lambda verbose: envs.append({}) or envs[-1]))
+    video, commands = fake_ab_av1(
+        monkeypatch,
+        tmp_path,
+        [ProcessResult(return_code=0, output="crf 30 VMAF 95.10\nBest CRF: 30\n", error_line=None)],
+    )
+    cache_dir = get_sample_cache_dir(video, 6)
+
+    AbAv1Wrapper().crf_search(video, vmaf_target=95, preset=6, sample_cache_dir=cache_dir)
+
+    assert commands[0][commands[0].index("--temp-dir") + 1] == cache_dir
+    assert envs[0]["XDG_CACHE_HOME"] == cache_dir
+    assert os.path.isdir(cache_dir)
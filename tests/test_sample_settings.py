@@ -0,0 +1,48 @@
+# tests/test_sample_settings.py
+"""Tests for src/sample_settings.py: sampling chosen from duration and similar
+files' VMAF errors, and the per-setting benchmark, on in-memory records."""
+
+from src.config import CRF_SAMPLE_DURATION_SEC, CRF_SAMPLES_MAX, CRF_SAMPLES_MIN
+from src.models import FileRecord, FileStatus
+from src.sample_settings import choose_sample_settings, sample_settings_benchmark
+
+
+def test_sample_count_follows_duration_and_short_files_get_shorter_samples():
+    film = choose_sample_settings(3 * 3600)
+    clip = choose_sample_settings(120)
+
+    assert (film.samples, film.sample_duration_sec) == (CRF_SAMPLES_MAX, CRF_SAMPLE_DURATION_SEC)
+    assert choose_sample_settings(40 * 60).samples == 4
+    assert (clip.samples, clip.sample_duration_sec) == (CRF_SAMPLES_MIN, 8)  # 20% of the clip
+    assert choose_sample_settings(None) is None
+
+
+def test_similar_files_errors_adjust_the_count():
+    duration = 90 * 60  # 8 samples by duration
+
+    assert choose_sample_settings(duration, [1.5] * 5).samples == 12
+    assert choose_sample_settings(duration, [0.1] * 5).samples == 6
+    assert choose_sample_settings(duration, [1.5] * 4).samples == 8  # Too few scored searches
+
+
+def test_benchmark_groups_searches_by_setting():
+    def record(n, samples, error=None):
+        return FileRecord(
+            path_hash=f"hash{n}",
+            original_path=None,
+            status=FileStatus.CONVERTED,
+            file_size_bytes=1000,
+            file_mtime=0.0,
+            crf_search_time_sec=100.0 * samples,
+            crf_search_samples=samples,
+            crf_sample_duration_sec=20.0,
+            sample_vmaf_error=error,
+        )
+
+    records = [record(1, 4, -0.5), record(2, 4, 1.5), record(3, 4), record(4, 8, 0.2)]
+
+    four, eight = sample_settings_benchmark(records)
+
+    assert (four.samples, four.searches, four.verified) == (4, 3, 2)
+    assert (four.mean_search_time_sec, four.mean_abs_vmaf_error) == (400.0, 1.0)
+    assert (eight.samples, eight.searches, eight.mean_abs_vmaf_error) == (8, 1, 0.2)
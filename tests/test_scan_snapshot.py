@@ -0,0 +1,130 @@
+# tests/test_scan_snapshot.py
+"""Tests for src/scan_snapshot.py: listing, persistence, and revalidation diffs."""
+
+import os
+
+import pytest
+from src.scan_snapshot import (
+    ScanSnapshot,
+    clear_all_snapshots,
+    diff_snapshots,
+    load_snapshot,
+    save_snapshot,
+    walk_video_files,
+)
+
+EXTENSIONS = ["mkv", "mp4"]
+EXT_SET = {".mkv", ".mp4"}
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    """Point snapshot storage at a per-test temp dir (never the real one)."""
+    path = tmp_path / "snapshots"
+    monkeypatch.setattr("src.scan_snapshot.get_snapshot_dir", lambda: str(path))
+    return path
+
+
+@pytest.fixture
+def library(tmp_path):
+    """A small library: root file, nested season folders, a non-video file, an empty folder."""
+    root = tmp_path / "library"
+    (root / "Show" / "Season 1").mkdir(parents=True)
+    (root / "Empty").mkdir()
+    (root / "movie.mkv").write_bytes(b"m" * 10)
+    (root / "notes.txt").write_bytes(b"ignored")
+    (root / "Show" / "Season 1" / "e01.mp4").write_bytes(b"e" * 20)
+    (root / "Show" / "Season 1" / "e02.MKV").write_bytes(b"e" * 30)
+    return root
+
+
+def take_snapshot(root) -> ScanSnapshot:
+    return ScanSnapshot.from_listing(str(root), EXTENSIONS, walk_video_files(str(root), EXT_SET))
+
+
+def test_walk_skips_non_video_files_and_keeps_dfs_order(library):
+    listing = list(walk_video_files(str(library), EXT_SET))
+
+    dirs = [os.path.relpath(dirpath, library) for dirpath, _ in listing]
+    assert dirs == [".", "Empty", "Show", os.path.join("Show", "Season 1")]
+    assert [name for name, _, _ in listing[0][1]] == ["movie.mkv"]
+    assert [name for name, _, _ in listing[3][1]] == ["e01.mp4", "e02.MKV"]
+
+
+def test_from_listing_keeps_only_folders_with_files(library):
+    snapshot = take_snapshot(library)
+
+    assert snapshot.folders == ["", os.path.join("Show", "Season 1")]
+    paths = [path for _, path, _, _ in snapshot.iter_files()]
+    assert paths == [
+        os.path.join(str(library), "movie.mkv"),
+        os.path.join(str(library), "Show", "Season 1", "e01.mp4"),
+        os.path.join(str(library), "Show", "Season 1", "e02.MKV"),
+    ]
+
+
+def test_save_load_round_trip(library, snapshot_dir):
+    snapshot = take_snapshot(library)
+    save_snapshot(snapshot)
+
+    loaded = load_snapshot(str(library), ["MP4", "mkv"])
+
+    assert loaded == snapshot
+
+
+def test_load_ignores_snapshot_taken_with_other_extensions(library, snapshot_dir):
+    save_snapshot(take_snapshot(library))
+
+    assert load_snapshot(str(library), ["mkv"]) is None
+
+
+def test_load_ignores_corrupt_snapshot(library, snapshot_dir):
+    save_snapshot(take_snapshot(library))
+    (next(snapshot_dir.iterdir())).write_text("{not json", encoding="utf-8")
+
+    assert load_snapshot(str(library), EXTENSIONS) is None
+
+
+def test_save_prunes_oldest_roots(tmp_path, snapshot_dir, monkeypatch):
+    monkeypatch.setattr("src.scan_snapshot.SCAN_SNAPSHOT_MAX_ROOTS", 2)
+    save_snapshot(ScanSnapshot(root=str(tmp_path / "root0"), extensions=EXTENSIONS))
+    (oldest,) = snapshot_dir.iterdir()
+    os.utime(oldest, (0, 0))
+    save_snapshot(ScanSnapshot(root=str(tmp_path / "root1"), extensions=EXTENSIONS))
+    save_snapshot(ScanSnapshot(root=str(tmp_path / "root2"), extensions=EXTENSIONS))
+
+    assert len(os.listdir(snapshot_dir)) == 2
+    assert load_snapshot(str(tmp_path / "root0"), EXTENSIONS) is None
+
+
+def test_clear_all_snapshots(library, snapshot_dir):
+    save_snapshot(take_snapshot(library))
+
+    assert clear_all_snapshots() == 1
+    assert load_snapshot(str(library), EXTENSIONS) is None
+
+
+def test_diff_of_unchanged_library_is_empty(library):
+    assert diff_snapshots(take_snapshot(library), take_snapshot(library)).is_empty
+
+
+def test_diff_reports_added_removed_and_changed_files(library):
+    before = take_snapshot(library)
+    season = library / "Show" / "Season 1"
+    (season / "e01.mp4").unlink()
+    (season / "e02.MKV").write_bytes(b"e" * 99)
+    (library / "Empty" / "new.mkv").write_bytes(b"n")
+
+    diff = diff_snapshots(before, take_snapshot(library))
+
+    assert [path for path, _, _ in diff.added] == [str(library / "Empty" / "new.mkv")]
+    assert diff.removed == [str(season / "e01.mp4")]
+    assert [(path, size) for path, size, _ in diff.changed] == [(str(season / "e02.MKV"), 99)]
+
+
+def test_diff_tolerates_json_mtime_precision(library):
+    before = take_snapshot(library)
+    after = take_snapshot(library)
+    after.files = [(idx, name, size, mtime + 0.5) for idx, name, size, mtime in after.files]
+
+    assert diff_snapshots(before, after).is_empty
@@ -0,0 +1,313 @@
+# tests/test_scheduler.py
+"""Tests for src/conversion_engine/scheduler.py: job concurrency, per-stage
+limits, display-job handover, linked cancel events and thread-safe queue item
+bookkeeping."""
+
+import contextlib
+import threading
+from types import SimpleNamespace
+
+import pytest
+from src.config import MAX_CONCURRENT_JOBS
+from src.conversion_engine.scheduler import (
+    ENCODE_STAGE,
+    SEARCH_STAGE,
+    JobCancelEvent,
+    JobScheduler,
+    QueueItemTracker,
+    resolve_job_count,
+)
+from src.models import OperationType, OutputMode, QueueFileItem, QueueItem, QueueItemStatus
+
+
+def make_folder_item(file_count: int) -> QueueItem:
+    files = [QueueFileItem(path=f"/v/ep{i}.mkv") for i in range(file_count)]
+    return QueueItem(
+        id="item-1",
+        source_path="/v",
+        is_folder=True,
+        output_mode=OutputMode.REPLACE,
+        operation_type=OperationType.CONVERT,
+        files=files,
+        total_files=file_count,
+    )
+
+
+@pytest.mark.parametrize(
+    ("requested", "cpu_count", "expected"),
+    [(0, 32, 4), (0, 4, 1), (0, 1024, MAX_CONCURRENT_JOBS), (3, 2, 3), (99, 32, MAX_CONCURRENT_JOBS)],
+)
+def test_resolve_job_count(requested, cpu_count, expected):
+    assert resolve_job_count(requested, cpu_count) == expected
+
+
+def test_job_cancel_event_follows_parent_but_not_siblings():
+    parent = threading.Event()
+    first, second = JobCancelEvent(parent), JobCancelEvent(parent)
+
+    first.set()
+    assert first.is_set()
+    assert not second.is_set()
+
+    parent.set()
+    assert second.is_set()
+
+
+def run_jobs(scheduler: JobScheduler, count: int, target) -> None:
+    item = make_folder_item(count)
+    for index in range(count):
+        assert scheduler.reserve(threading.Event())
+        scheduler.start(item, index, item.files[index].path, None, target)
+    scheduler.wait_idle()
+
+
+def test_scheduler_never_exceeds_max_jobs():
+    scheduler = JobScheduler(3)
+    lock = threading.Lock()
+    running = peak = 0
+    gate = threading.Barrier(3, timeout=5)  # Only passes if three jobs really overlap
+
+    def target(job):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        if job.file_index < 3:
+            gate.wait()
+        with lock:
+            running -= 1
+
+    run_jobs(scheduler, 10, target)
+
+    assert peak == 3
+    assert scheduler.active_jobs() == []
+
+
+def test_stages_have_their_own_limits():
+    scheduler = JobScheduler(4, stage_limits={SEARCH_STAGE: 1, ENCODE_STAGE: 2})
+    lock = threading.Lock()
+    running = {SEARCH_STAGE: 0, ENCODE_STAGE: 0}
+    peak = dict(running)
+    overlapped = threading.Event()  # A search ran while an encode was in progress
+
+    def occupy(name):
+        with lock:
+            running[name] += 1
+            peak[name] = max(peak[name], running[name])
+            if running[SEARCH_STAGE] and running[ENCODE_STAGE]:
+                overlapped.set()
+        overlapped.wait(0.05)
+        with lock:
+            running[name] -= 1
+
+    def target(job):
+        for name in (SEARCH_STAGE, ENCODE_STAGE):
+            with scheduler.stage(name, job, threading.Event()) as admitted:
+                assert admitted
+                assert job.stage == name
+                occupy(name)
+        assert job.stage is None
+
+    run_jobs(scheduler, 12, target)
+
+    assert peak == {SEARCH_STAGE: 1, ENCODE_STAGE: 2}
+    assert overlapped.is_set()
+
+
+def test_stage_wait_gives_up_when_stopped():
+    scheduler = JobScheduler(2, stage_limits={ENCODE_STAGE: 1})
+    stop_event = threading.Event()
+    holding, release, second_done = threading.Event(), threading.Event(), threading.Event()
+    admitted_by_file = {}
+    item = make_folder_item(2)
+
+    def target(job):
+        with scheduler.stage(ENCODE_STAGE, job, stop_event) as admitted:
+            admitted_by_file[job.file_index] = admitted
+            if job.file_index == 0:
+                holding.set()
+                release.wait(5)
+        if job.file_index == 1:
+            second_done.set()
+
+    for index in (0, 1):
+        scheduler.reserve(threading.Event())
+        scheduler.start(item, index, item.files[index].path, None, target)
+        if index == 0:
+            assert holding.wait(5)
+            stop_event.set()
+
+    assert second_done.wait(5)  # Gave up while file 0 still holds the only encode slot
+    release.set()
+    scheduler.wait_idle()
+
+    assert admitted_by_file == {0: True, 1: False}
+
+
+def test_leave_stage_frees_the_slot_before_the_block_ends():
+    scheduler = JobScheduler(2, stage_limits={ENCODE_STAGE: 1})
+    left, second_admitted, release = threading.Event(), threading.Event(), threading.Event()
+    item = make_folder_item(2)
+
+    def target(job):
+        with scheduler.stage(ENCODE_STAGE, job, threading.Event()) as admitted:
+            assert admitted
+            if job.file_index == 0:
+                scheduler.leave_stage(job)  # Encoder done; only copying the output now
+                assert job.stage is None
+                left.set()
+                release.wait(5)
+            else:
+                second_admitted.set()
+
+    for index in (0, 1):
+        scheduler.reserve(threading.Event())
+        scheduler.start(item, index, item.files[index].path, None, target)
+        if index == 0:
+            assert left.wait(5)
+
+    assert second_admitted.wait(5)  # Got the only encode slot while file 0 is still in its block
+    release.set()
+    scheduler.wait_idle()
+    stopped = threading.Event()
+    stopped.set()
+    with (
+        scheduler.stage(ENCODE_STAGE, SimpleNamespace(stage=None, borrowed_slots=0), stopped) as first,
+        scheduler.stage(ENCODE_STAGE, SimpleNamespace(stage=None, borrowed_slots=0), stopped) as second,
+    ):
+        assert (first, second) == (True, False)  # The slot was released exactly once
+
+
+def test_borrowed_slots_come_back_with_the_jobs_own_slot():
+    scheduler = JobScheduler(3, stage_limits={ENCODE_STAGE: 3})
+    job = SimpleNamespace(stage=None, borrowed_slots=0)
+    other = SimpleNamespace(stage=None, borrowed_slots=0)
+    stopped = threading.Event()
+    stopped.set()
+
+    with scheduler.stage(ENCODE_STAGE, job, stopped) as admitted:
+        assert admitted
+        assert scheduler.borrow_stage_slots(job, 5) == 2  # Only the free slots
+        with scheduler.stage(ENCODE_STAGE, other, stopped) as other_admitted:
+            assert not other_admitted  # The stage limit still holds
+        scheduler.leave_stage(job)
+        assert (job.stage, job.borrowed_slots) == (None, 0)
+    assert scheduler.borrow_stage_slots(job, 1) == 0  # Holds no slot to borrow beside
+
+    with contextlib.ExitStack() as stack:  # All three slots are free again
+        jobs = [SimpleNamespace(stage=None, borrowed_slots=0) for _ in range(3)]
+        assert all(stack.enter_context(scheduler.stage(ENCODE_STAGE, j, stopped)) for j in jobs)
+
+
+def test_reserve_gives_up_when_stopped():
+    scheduler = JobScheduler(1)
+    stop_event = threading.Event()
+    release = threading.Event()
+    item = make_folder_item(1)
+
+    assert scheduler.reserve(stop_event)
+    scheduler.start(item, 0, item.files[0].path, None, lambda job: release.wait(5))
+    stop_event.set()
+
+    assert not scheduler.reserve(stop_event)
+    release.set()
+    scheduler.wait_idle()
+
+
+def test_wait_for_free_slot_leaves_the_slot_free():
+    scheduler = JobScheduler(1)
+    stop_event = threading.Event()
+    release = threading.Event()
+    item = make_folder_item(1)
+
+    assert scheduler.wait_for_free_slot(stop_event)
+    assert scheduler.reserve(stop_event)  # Still free after waiting
+    scheduler.start(item, 0, item.files[0].path, None, lambda job: release.wait(5))
+    stopped = threading.Event()
+    stopped.set()
+    assert not scheduler.wait_for_free_slot(stopped)
+
+    threading.Timer(0.3, release.set).start()
+    assert scheduler.wait_for_free_slot(stop_event)  # Returns once the job finished
+    scheduler.wait_idle()
+
+
+def test_display_job_passes_to_the_oldest_running_job():
+    promoted = []
+    handed_over = threading.Event()
+
+    def on_display_change(job):
+        promoted.append(job)
+        handed_over.set()
+
+    scheduler = JobScheduler(2, on_display_change=on_display_change)
+    finish = {0: threading.Event(), 1: threading.Event()}
+    item = make_folder_item(2)
+
+    jobs = []
+    for index in (0, 1):
+        scheduler.reserve(threading.Event())
+        jobs.append(
+            scheduler.start(item, index, item.files[index].path, None, lambda job: finish[job.file_index].wait(5))
+        )
+
+    assert scheduler.is_display_job(jobs[0])
+    assert not scheduler.is_display_job(jobs[1])
+
+    finish[0].set()
+    assert handed_over.wait(5)
+
+    assert promoted == [jobs[1]]
+    assert scheduler.is_display_job(jobs[1])
+    finish[1].set()
+    scheduler.wait_idle()
+
+
+def test_tracker_counts_concurrent_results_and_finalizes_once():
+    file_count = 40
+    item = make_folder_item(file_count)
+    reports = []
+    tracker = QueueItemTracker(item, lambda *args: reports.append(args))
+    finalized = []
+    scheduler = JobScheduler(8)
+
+    tracker.begin()
+
+    def target(job):
+        counter = ("files_succeeded", "files_skipped", "files_failed")[job.file_index % 3]
+        status = QueueItemStatus.ERROR if counter == "files_failed" else QueueItemStatus.COMPLETED
+        if tracker.file_finished(job.file_index, status, counter):
+            finalized.append(job.file_index)
+
+    for index in range(file_count):
+        scheduler.reserve(threading.Event())
+        tracker.file_started(index)
+        scheduler.start(item, index, item.files[index].path, None, target)
+    if tracker.close_dispatch():
+        finalized.append("dispatcher")
+    scheduler.wait_idle()
+    tracker.finalize(stopped=False)
+
+    assert len(finalized) == 1
+    assert item.processed_files == file_count
+    assert (item.files_succeeded, item.files_skipped, item.files_failed) == (14, 13, 13)
+    assert item.status == QueueItemStatus.COMPLETED
+    # Every progress report is a consistent snapshot, so processed counts arrive in order
+    processed = [args[2] for args in reports if args[1] == QueueItemStatus.CONVERTING]
+    assert processed == list(range(file_count + 1))
+    assert item.last_error == "Processing failed (see logs for details)"
+
+
+def test_tracker_marks_undispatched_files_stopped():
+    item = make_folder_item(4)
+    tracker = QueueItemTracker(item, lambda *args: None)
+    tracker.begin()
+    tracker.file_started(0)
+
+    assert tracker.mark_stopped(1) == 3
+    assert not tracker.close_dispatch()  # File 0 is still running
+    assert tracker.file_finished(0, QueueItemStatus.COMPLETED, "files_succeeded")
+
+    tracker.finalize(stopped=True)
+    assert item.status == QueueItemStatus.STOPPED
+    assert [f.status for f in item.files] == [QueueItemStatus.COMPLETED] + [QueueItemStatus.STOPPED] * 3
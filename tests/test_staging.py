@@ -0,0 +1,107 @@
+# tests/test_staging.py
+"""Tests for src/staging.py: scratch space admission, the mover's verified
+copy and cancellation, and process_video() encoding through a staging folder
+(with ab-av1, ffprobe and the history index faked out)."""
+
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+from src.ab_av1.exceptions import AbAv1CancelledError
+from src.ab_av1.stats import EncodeStats
+from src.config import STAGING_COPY_SUFFIX, STAGING_MIN_FREE_BYTES
+from src.staging import StagingArea
+from src.video_conversion import process_video
+
+
+@pytest.fixture
+def staging(tmp_path):
+    area = StagingArea(str(tmp_path / "scratch"))
+    os.makedirs(area.root)
+    yield area
+    area.close()
+
+
+def test_reserve_needs_room_for_the_file(monkeypatch, staging):
+    free = STAGING_MIN_FREE_BYTES + 1000
+    monkeypatch.setattr("src.staging.shutil.disk_usage", lambda path: SimpleNamespace(free=free))
+
+    folder = staging.reserve(400)
+    assert os.path.isdir(folder)
+    assert os.path.dirname(folder) == staging.root
+    assert staging.reserve(600) is None  # Twice the input no longer fits above the reserve
+
+
+def test_reserve_counts_space_promised_to_other_folders(monkeypatch, staging):
+    free = STAGING_MIN_FREE_BYTES + 1000
+    monkeypatch.setattr("src.staging.shutil.disk_usage", lambda path: SimpleNamespace(free=free))
+    monkeypatch.setattr("src.staging.STAGING_SPACE_FACTOR", 1)
+
+    first = staging.reserve(600)
+    assert staging.reserve(600) is None  # The first file's 600 bytes are spoken for
+    with open(os.path.join(first, "sample.mkv"), "wb") as f:
+        f.write(b"x" * 500)
+    free -= 500  # Written bytes leave the free space and the reservation alike
+    assert staging.reserve(600) is None
+    staging.release(first)
+    free += 500
+    assert staging.reserve(600) is not None
+    assert len(os.listdir(staging.root)) == 1  # Rejected reservations leave no folder behind
+
+
+def test_move_copies_and_verifies_beside_the_destination(tmp_path, staging):
+    staged = tmp_path / "scratch" / "a.mkv"
+    staged.write_bytes(os.urandom(100_000))
+    destination = tmp_path / "nas" / "a.mkv"
+    destination.parent.mkdir()
+
+    partial = staging.move(str(staged), str(destination))
+
+    assert partial == str(destination) + STAGING_COPY_SUFFIX
+    assert (tmp_path / "nas" / ("a.mkv" + STAGING_COPY_SUFFIX)).read_bytes() == staged.read_bytes()
+
+
+def test_cancelled_move_leaves_nothing_behind(tmp_path, staging):
+    staged = tmp_path / "scratch" / "a.mkv"
+    staged.write_bytes(b"x" * 1000)
+    cancel_event = threading.Event()
+    cancel_event.set()
+
+    with pytest.raises(AbAv1CancelledError):
+        staging.move(str(staged), str(tmp_path / "a.mkv"), cancel_event)
+
+    assert sorted(os.listdir(tmp_path)) == ["scratch"]
+
+
+def test_process_video_encodes_in_scratch_and_renames_into_place(monkeypatch, tmp_path, staging):
+    source = tmp_path / "nas" / "movie.mp4"
+    source.parent.mkdir()
+    source.write_bytes(b"x" * 10_000)
+    output = tmp_path / "nas" / "movie_av1.mkv"
+    encoded_in = []
+    events = []
+
+    class FakeWrapper:
+        def auto_encode(self, input_path, output_path, **kwargs):
+            encoded_in.append(os.path.dirname(output_path))
+            with open(output_path, "wb") as f:
+                f.write(b"a" * 4000)
+            return EncodeStats(crf=30.0, vmaf=95.0, vmaf_target_used=95)
+
+    monkeypatch.setattr("src.video_conversion.AbAv1Wrapper", FakeWrapper)
+    monkeypatch.setattr("src.video_conversion.get_video_info", lambda path: {"file_size": 10_000, "streams": []})
+    monkeypatch.setattr(
+        "src.video_conversion.get_history_index", lambda: SimpleNamespace(lookup_file=lambda path: None)
+    )
+
+    result = process_video(str(source), str(output), staging=staging, on_encoded=lambda: events.append("encoded"))
+
+    assert result is not None
+    assert result[0] == str(output)
+    assert result[3] == 4000
+    assert os.path.dirname(encoded_in[0]) == staging.root
+    assert events == ["encoded"]
+    assert output.read_bytes() == b"a" * 4000
+    assert sorted(os.listdir(tmp_path / "nas")) == ["movie.mp4", "movie_av1.mkv"]
+    assert os.listdir(staging.root) == []  # Scratch folder released
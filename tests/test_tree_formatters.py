@@ -1,16 +1,22 @@
 # tests/test_tree_formatters.py
-"""Characterization tests for the pure formatting/parsing functions in
-src/gui/tree_formatters.py (the module has no tkinter dependency; the
-tree-sorting helpers that take a gui object are not covered here)."""
+"""Characterization tests for the formatting/parsing functions in
+src/gui/tree_formatters.py (the module has no tkinter dependency), plus
+sort_analysis_tree against a minimal in-memory tree."""
 
 import math
+from types import SimpleNamespace
 
+from src.gui.analysis_tree import TreeItemRegistry
 from src.gui.tree_formatters import (
+    AnalysisSortKeys,
+    efficiency_gb_per_hour,
     format_compact_time,
     format_efficiency,
+    longest_increasing_run,
     parse_efficiency_to_value,
     parse_size_to_bytes,
     parse_time_to_seconds,
+    sort_analysis_tree,
 )
 
 GIB = 1024**3
@@ -132,3 +138,120 @@ def test_parse_efficiency_to_value_invalid_values_sort_last():
     assert parse_efficiency_to_value("5 MB/h") == -math.inf  # only GB/h is recognized
     assert parse_efficiency_to_value("junk") == -math.inf
     assert parse_efficiency_to_value("1 2 GB/h") == -math.inf
+
+
+# ---------------------------------------------------------------------------
+# Sort keys
+# ---------------------------------------------------------------------------
+
+
+def test_efficiency_gb_per_hour():
+    assert efficiency_gb_per_hour(2 * GIB, 3600) == 2.0
+    assert efficiency_gb_per_hour(0, 3600) is None
+    assert efficiency_gb_per_hour(GIB, 0) is None
+
+
+def test_sort_keys_from_totals_leaves_missing_values_unset():
+    keys = AnalysisSortKeys.from_totals(10 * GIB, GIB, 1800)
+    assert (keys.size, keys.savings, keys.time, keys.efficiency) == (10 * GIB, GIB, 1800, 2.0)
+
+    empty = AnalysisSortKeys.from_totals(0, 0, 0)
+    assert (empty.size, empty.savings, empty.time, empty.efficiency) == (None, None, None, None)
+
+
+def test_longest_increasing_run():
+    assert longest_increasing_run([]) == set()
+    assert longest_increasing_run([0, 1, 2]) == {0, 1, 2}
+    assert longest_increasing_run([1, 2, 3, 0]) == {0, 1, 2}
+    assert len(longest_increasing_run([3, 0, 4, 1, 5, 2])) == 3
+
+
+# ---------------------------------------------------------------------------
+# sort_analysis_tree
+# ---------------------------------------------------------------------------
+
+
+class FakeTree:
+    """Ordered children per parent with ttk.Treeview's detach/move semantics."""
+
+    def __init__(self):
+        self.children: dict[str, list[str]] = {"": []}
+        self.moves = 0
+
+    def add(self, item_id: str, parent: str = "") -> None:
+        self.children[parent].append(item_id)
+        self.children.setdefault(item_id, [])
+
+    def get_children(self, item_id: str = "") -> tuple[str, ...]:
+        return tuple(self.children[item_id])
+
+    def detach(self, *items: str) -> None:
+        for siblings in self.children.values():
+            siblings[:] = [child for child in siblings if child not in items]
+
+    def move(self, item_id: str, parent: str, index: int) -> None:
+        self.moves += 1
+        self.children[parent].insert(index, item_id)
+
+    def heading(self, col, text):
+        pass
+
+
+def make_sort_gui(rows: dict[str, AnalysisSortKeys]) -> SimpleNamespace:
+    """Root holds one folder F (with files a, b) followed by the given files."""
+    tree = FakeTree()
+    registry = TreeItemRegistry()
+    tree.add("F")
+    registry.register_folder("F", "/lib/F")
+    for item_id in ("a", "b"):
+        tree.add(item_id, "F")
+        registry[f"/lib/F/{item_id}.mkv"] = item_id
+    for item_id in rows:
+        tree.add(item_id)
+        registry[f"/lib/{item_id}.mkv"] = item_id
+    sort_keys = {"F": AnalysisSortKeys(size=1), "a": AnalysisSortKeys(size=2), "b": AnalysisSortKeys(size=1), **rows}
+    return SimpleNamespace(
+        analysis_tree=tree,
+        analysis_sort_keys=sort_keys,
+        get_tree_item_map=lambda: registry,
+        _sort_col=None,
+        _sort_reverse=False,
+    )
+
+
+def test_sort_uses_raw_values_with_folders_first_and_missing_last():
+    gui = make_sort_gui(
+        {"x": AnalysisSortKeys(efficiency=0.5), "y": AnalysisSortKeys(), "z": AnalysisSortKeys(efficiency=12.0)}
+    )
+
+    sort_analysis_tree(gui, "efficiency", descending=False)
+    assert gui.analysis_tree.get_children("") == ("F", "z", "x", "y")  # Ascending efficiency: best GB/h first
+
+    sort_analysis_tree(gui, "efficiency", descending=True)
+    assert gui.analysis_tree.get_children("") == ("F", "x", "z", "y")
+
+    sort_analysis_tree(gui, "size", descending=False)
+    sort_analysis_tree(gui, "efficiency")  # First click on the column
+    assert gui.analysis_tree.get_children("") == ("F", "z", "x", "y")
+
+
+def test_sort_recurses_into_folders():
+    gui = make_sort_gui({})
+
+    sort_analysis_tree(gui, "size", descending=False)
+
+    assert gui.analysis_tree.get_children("F") == ("b", "a")
+
+
+def test_sort_moves_only_out_of_place_rows():
+    gui = make_sort_gui({f"r{i}": AnalysisSortKeys(size=i) for i in range(100)})
+    gui.analysis_sort_keys["r0"] = AnalysisSortKeys(size=1000)
+
+    sort_analysis_tree(gui, "size", descending=False)
+
+    assert gui.analysis_tree.get_children("")[-1] == "r0"
+    assert gui.analysis_tree.moves == 2  # r0 at the root, a/b inside F
+
+    gui.analysis_tree.moves = 0
+    sort_analysis_tree(gui, "size", descending=False)
+    assert gui.analysis_tree.moves == 0
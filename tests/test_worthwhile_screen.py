@@ -0,0 +1,68 @@
+# tests/test_worthwhile_screen.py
+"""Tests for src/worthwhile_screen.py: bits-per-pixel bands, group likelihoods
+and the held-out precision/recall report, on in-memory records."""
+
+from src.config import NOT_WORTHWHILE_SCREEN_MIN_SAMPLES
+from src.models import FileRecord, FileStatus
+from src.worthwhile_screen import NotWorthwhileScreen, evaluate_screen, get_bpp_band
+
+
+def make_record(n: int, status: FileStatus = FileStatus.NOT_WORTHWHILE, **overrides) -> FileRecord:
+    fields = {
+        "path_hash": f"hash{n}",
+        "original_path": None,
+        "status": status,
+        "file_size_bytes": 1000,
+        "file_mtime": 0.0,
+        "video_codec": "hevc",
+        "width": 1920,
+        "height": 1080,
+        "fps": 24.0,
+        "bitrate_kbps": 1500.0,  # ~0.03 bits per pixel per frame
+        "duration_sec": 1500.0,
+    }
+    fields.update(overrides)
+    return FileRecord(**fields)
+
+
+def test_bpp_bands():
+    assert get_bpp_band(1500, 1920, 1080, 24) == "0.02-0.05"
+    assert get_bpp_band(1500, 1920, 1080, None) == "0.02-0.05"  # Assumed frame rate
+    assert get_bpp_band(20000, 1920, 1080, 24) == ">=0.2"
+    assert get_bpp_band(None, 1920, 1080, 24) == "unknown"
+
+
+def test_group_of_losers_is_flagged_once_it_has_enough_verdicts():
+    losers = [make_record(i) for i in range(NOT_WORTHWHILE_SCREEN_MIN_SAMPLES)]
+    converted = [make_record(100 + i, FileStatus.CONVERTED, video_codec="h264") for i in range(20)]
+    new_file = make_record(999, FileStatus.SCANNED)
+
+    screen = NotWorthwhileScreen(losers + converted)
+
+    assert screen.likelihood(new_file) == (NOT_WORTHWHILE_SCREEN_MIN_SAMPLES + 1) / (
+        NOT_WORTHWHILE_SCREEN_MIN_SAMPLES + 2
+    )
+    assert screen.flags(new_file)
+    assert not screen.flags(make_record(999, FileStatus.SCANNED, video_codec="h264"))
+    assert screen.likelihood(make_record(999, FileStatus.SCANNED, duration_sec=60.0)) is None  # Unseen group
+    assert not NotWorthwhileScreen(losers[1:]).flags(new_file)  # Too few verdicts
+    # One converted file among them keeps the group under the threshold
+    assert not NotWorthwhileScreen([*losers, make_record(500, FileStatus.CONVERTED)]).flags(new_file)
+
+
+def test_report_counts_flags_on_held_out_records():
+    records = [make_record(i) for i in range(200)]
+    records += [make_record(1000 + i, FileStatus.CONVERTED, video_codec="h264") for i in range(200)]
+
+    report = evaluate_screen(records)
+
+    assert 0 < report.held_out < len(records)  # Trained without the held-out records
+    assert report.precision == 1.0
+    assert report.recall == 1.0
+    assert report.flagged == report.losers > 0
+
+
+def test_provisional_verdicts_do_not_train_the_screen():
+    losers = [make_record(i, provisional_verdict=True) for i in range(NOT_WORTHWHILE_SCREEN_MIN_SAMPLES)]
+
+    assert NotWorthwhileScreen(losers).likelihood(make_record(999, FileStatus.SCANNED)) is None
@@ -1,19 +1,51 @@
 # tests/test_wrapper.py
-"""Tests for the pure helpers in src/ab_av1/wrapper.py.
+"""Tests for src/ab_av1/wrapper.py: the pure helpers, and crf-search bound
+widening, the curve-predicted VMAF fallback and probe reuse with the ab-av1
+process faked.
 
 _is_no_suitable_crf pins the VMAF-fallback trigger contract: it must tolerate
 wording drift (case, suffixes) in ab-av1's NoGoodCrf message, because ab-av1 is
 auto-updated and a silent mismatch would disable the entire fallback ladder.
 """
 
+import pytest
+from src.ab_av1.exceptions import ConversionNotWorthwhileError
 from src.ab_av1.runner import ProcessResult
-from src.ab_av1.wrapper import _format_cmd_for_log, _is_no_suitable_crf
+from src.ab_av1.stats import InputProbe
+from src.ab_av1.wrapper import AbAv1Wrapper, _fallback_target, _format_cmd_for_log, _is_no_suitable_crf
+from src.models import CrfVmafPoint
 
 
 def _failed(error_line, output=""):
     return ProcessResult(return_code=1, output=output, error_line=error_line)
 
 
+def fake_ab_av1(monkeypatch, tmp_path, runs: list[ProcessResult]) -> tuple[str, list[list[str]]]:
+    """Fake the ab-av1 process: each run replays its output; returns (video path, commands run)."""
+    video = tmp_path / "movie.mp4"
+    video.write_bytes(b"video-bytes")
+    monkeypatch.setattr("src.ab_av1.wrapper.get_ab_av1_path", lambda: "/vendor/ab-av1")
+    monkeypatch.setattr(
+        "src.ab_av1.wrapper.get_video_info",
+        lambda path: {"streams": [{"codec_type": "video", "codec_name": "h264"}], "format": {}},
+    )
+    commands = []
+
+    def fake_run(cmd, *, cwd, env, on_line, cancel_event, pid_callback):
+        commands.append(cmd)
+        result = runs[len(commands) - 1]
+        for line in result.output.splitlines():
+            on_line(line)
+        return result
+
+    monkeypatch.setattr("src.ab_av1.wrapper.run_ab_av1", fake_run)
+    return str(video), commands
+
+
+def flags(cmd):
+    return {flag: cmd[cmd.index(flag) + 1] for flag in ("--min-vmaf", "--min-crf", "--max-crf") if flag in cmd}
+
+
 class TestIsNoSuitableCrf:
     def test_exact_message_matches(self):
         assert _is_no_suitable_crf(_failed("Failed to find a suitable crf")) is True
@@ -50,3 +82,86 @@ class TestFormatCmdForLog:
     def test_no_replacements_returns_joined_cmd(self):
         cmd = ["ab-av1", "crf-search", "--min-vmaf", "95"]
         assert _format_cmd_for_log(cmd, {}) == "ab-av1 crf-search --min-vmaf 95"
+
+
+class TestCrfSearchBounds:
+    def test_hit_bounds_are_widened_and_the_search_rerun(self, monkeypatch, tmp_path):
+        video, commands = fake_ab_av1(
+            monkeypatch,
+            tmp_path,
+            [
+                ProcessResult(return_code=1, output="", error_line="Failed to find a suitable crf"),
+                ProcessResult(
+                    return_code=0, output="crf 28 VMAF 96.10\ncrf 30 VMAF 95.40\nBest CRF: 30\n", error_line=None
+                ),
+                ProcessResult(return_code=0, output="crf 33 VMAF 95.10\nBest CRF: 33\n", error_line=None),
+            ],
+        )
+
+        result = AbAv1Wrapper().crf_search(video, vmaf_target=95, crf_bounds=(26, 30))
+
+        # No CRF met the target above --min-crf: widened before any VMAF fallback;
+        # then the best CRF landed on --max-crf: widened and searched again
+        assert [flags(cmd) for cmd in commands] == [
+            {"--min-vmaf": "95", "--min-crf": "26", "--max-crf": "30"},
+            {"--min-vmaf": "95", "--max-crf": "30"},
+            {"--min-vmaf": "95"},
+        ]
+        assert (result.best_crf, result.vmaf_target_used, result.used_fallback) == (33, 95, False)
+        assert result.sample_encodes == 3
+
+
+class TestVmafFallback:
+    def test_target_is_predicted_from_the_probed_curve(self):
+        curve = [
+            CrfVmafPoint(crf=10, vmaf=94.8, size_percent=92.0),  # Over the size limit
+            CrfVmafPoint(crf=20, vmaf=92.6, size_percent=61.0),
+        ]
+        assert _fallback_target(curve, 95) == 92
+        assert _fallback_target(curve[:1], 95) == 94  # Nothing within the size limit: one step
+        assert _fallback_target([], 95) == 94
+        assert _fallback_target([CrfVmafPoint(crf=10, vmaf=99.0)], 95) == 94  # Never the same target again
+        assert _fallback_target([curve[0], CrfVmafPoint(crf=30, vmaf=88.0)], 95) == 90  # Clamped to the minimum
+        assert _fallback_target([CrfVmafPoint(crf=10, vmaf=89.2)], 95) is None  # No CRF reaches the minimum
+        assert _fallback_target(curve, 90) is None  # Ladder exhausted
+
+    def test_search_jumps_to_the_predicted_target_or_gives_up(self, monkeypatch, tmp_path):
+        no_crf = "crf 10 VMAF 93.40 predicted video stream size 900 MiB (70%)\ncrf 20 VMAF 91.20\n"
+        video, commands = fake_ab_av1(
+            monkeypatch,
+            tmp_path,
+            [
+                ProcessResult(return_code=1, output=no_crf, error_line="Failed to find a suitable crf"),
+                ProcessResult(return_code=0, output="crf 11 VMAF 93.10\nBest CRF: 11\n", error_line=None),
+            ],
+        )
+
+        result = AbAv1Wrapper().crf_search(video, vmaf_target=95)
+
+        assert [flags(cmd)["--min-vmaf"] for cmd in commands] == ["95", "93"]
+        assert (result.best_crf, result.vmaf_target_used, result.used_fallback) == (11, 93, True)
+
+        failed = ProcessResult(return_code=1, output="crf 10 VMAF 88.00\n", error_line="Failed to find a suitable crf")
+        video, commands = fake_ab_av1(monkeypatch, tmp_path, [failed])
+        with pytest.raises(ConversionNotWorthwhileError, match="no CRF probed reached VMAF 90"):
+            AbAv1Wrapper().crf_search(video, vmaf_target=95)
+        assert len(commands) == 1
+
+
+class TestInputProbe:
+    def test_current_probe_replaces_ffprobe_until_the_file_changes(self, monkeypatch, tmp_path):
+        done = ProcessResult(return_code=0, output="crf 30 VMAF 95.10\nBest CRF: 30\n", error_line=None)
+        video, _ = fake_ab_av1(monkeypatch, tmp_path, [done, done])
+        info = {"streams": [{"codec_type": "video", "codec_name": "h264"}], "format": {}}
+        probe = InputProbe.of(video, info)
+        probed = []
+        monkeypatch.setattr("src.ab_av1.wrapper.get_video_info", lambda path: probed.append(path) or info)
+
+        result = AbAv1Wrapper().crf_search(video, vmaf_target=95, probe=probe)
+        assert probed == []
+        assert result.original_size == probe.file_size
+
+        with open(video, "ab") as f:
+            f.write(b"more")
+        AbAv1Wrapper().crf_search(video, vmaf_target=95, probe=probe)
+        assert probed == [video]
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark Analysis-tree batch updates against library size.
+
+Times batch_update_tree_rows() for a fixed batch of rows while the tree grows,
+using an in-memory stand-in for ttk.Treeview and the history index so only the
+bookkeeping cost (registry lookups, aggregate deltas) is measured. With the
+path <-> item registry and running folder sums the per-batch time should stay
+flat as the library grows; the old implementation rebuilt an item -> path map
+and re-summed folder children on every batch.
+
+Usage:
+    python tools/bench_tree_updates.py
+    python tools/bench_tree_updates.py --sizes 1000 10000 100000 --batch 50 --repeat 20
+"""
+
+import argparse
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.gui import analysis_tree
+from src.gui.analysis_tree import TreeItemRegistry, batch_update_tree_rows
+from src.models import FileRecord, FileStatus
+
+
+class FakeTree:
+    """In-memory subset of ttk.Treeview used by batch_update_tree_rows."""
+
+    def __init__(self):
+        self.parents: dict[str, str] = {}
+        self.tags: dict[str, tuple] = {}
+
+    def add(self, item_id: str, parent: str = "") -> str:
+        self.parents[item_id] = parent
+        return item_id
+
+    def parent(self, item_id: str) -> str:
+        return self.parents.get(item_id, "")
+
+    def exists(self, item_id: str) -> bool:
+        return item_id in self.parents
+
+    def item(self, item_id: str, option=None, values=None, tags=None):
+        if option == "tags":
+            return self.tags.get(item_id, ())
+        if tags is not None:
+            self.tags[item_id] = tags
+        return None
+
+
+def build_gui(total_files: int) -> tuple[SimpleNamespace, list[str]]:
+    """Build a 3-level library (shows / seasons / episodes) with one record per file."""
+    tree = FakeTree()
+    registry = TreeItemRegistry()
+    records: dict[str, FileRecord] = {}
+    paths: list[str] = []
+    for i in range(total_files):
+        show, season = f"show{i % 20}", f"season{i % 400}"
+        tree.add(show)
+        tree.add(season, show)
+        path = f"/lib/{show}/{season}/ep{i}.mkv"
+        registry[path] = tree.add(f"ep{i}", season)
+        records[path] = FileRecord(
+            path_hash=str(i),
+            original_path=path,
+            status=FileStatus.SCANNED,
+            file_size_bytes=1_000_000_000 + i,
+            file_mtime=0.0,
+            duration_sec=1200.0,
+            video_codec="h264",
+            width=1920,
+            height=1080,
+            estimated_reduction_percent=40.0,
+        )
+        paths.append(path)
+
+    index = SimpleNamespace(lookup_file=records.get)
+    analysis_tree.get_history_index = lambda: index
+    analysis_tree.compute_grouped_percentiles = dict
+    gui = SimpleNamespace(
+        analysis_tree=tree,
+        folder_aggregates={},
+        file_aggregates={},
+        analysis_sort_keys={},
+        get_tree_item_map=lambda: registry,
+    )
+    return gui, paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--batch", type=int, default=50, help="rows per batch update")
+    parser.add_argument("--repeat", type=int, default=20, help="batches timed per size")
+    args = parser.parse_args()
+
+    print(f"{'files':>10}  {'ms/batch':>10}  {'us/row':>8}")
+    for size in args.sizes:
+        gui, paths = build_gui(size)
+        batch_update_tree_rows(gui, paths)  # Populate aggregates, as after a full scan
+        step = max(1, size // args.batch)
+        batch = paths[::step][: args.batch]
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            gui.file_aggregates.clear()  # Force every row in the batch to push a delta
+            batch_update_tree_rows(gui, batch)
+        elapsed = (time.perf_counter() - start) / args.repeat
+
+        print(f"{size:>10}  {elapsed * 1000:>10.3f}  {elapsed * 1e6 / len(batch):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()